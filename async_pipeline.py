@@ -0,0 +1,223 @@
+"""
+async_pipeline.py
+
+Description: This script runs conversions and validations as an asyncio pipeline. The dictionary download, the
+reading and writing of files and the gemmi validation subprocesses of many files overlap instead of running one
+after another, and each kind of resource has its own concurrency limit. Pipeline.convert runs the synchronous
+conversion of json_to_mmcif.py, and Pipeline.validate the in-process validation of mmcif_validator.py.
+
+Blocking steps (JSON parsing, mmCIF reading and writing, in-process validation) run in worker threads, so they
+overlap with downloads and subprocesses but not with each other's Python code; for CPU-bound batches use
+json_to_mmcif.py -b, which spreads the files over worker processes.
+
+Example usage:
+    import asyncio
+    from async_pipeline import Limits, convert_many_async
+    results = asyncio.run(convert_many_async([("a.json", None), ("b.json", None)], "json", download_dict="no",
+                                             limits=Limits(validate=4)))
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import time
+import asyncio
+from functools import partial
+from collections import namedtuple
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary
+from profiling import stage
+from compressed_io import base_name
+from result_cache import job_files, category_cache
+from json_to_mmcif import convert_and_check, file_to_validate, load_precheck_index
+
+Limits = namedtuple("Limits", ["download", "io", "convert", "validate"],
+                    defaults=(1, 16, os.cpu_count() or 1, os.cpu_count() or 1))
+Limits.__doc__ = """
+Concurrency limits of a Pipeline, one per kind of resource.
+
+    download (int): Dictionary downloads at a time (default: 1).
+    io (int): Dictionary index loads and result cache lookups and stores at a time (default: 16).
+    convert (int): Conversions reading the input and writing an mmCIF file at a time (default: number of CPUs).
+    validate (int): Validations at a time, i.e. gemmi subprocesses (default: number of CPUs).
+"""
+
+
+def _staged(name, function, *args, **details):
+    """Calls function(*args) inside a profiling stage."""
+    with stage(name, **details):
+        return function(*args)
+
+
+class Pipeline:
+    """
+    Converts and validates files on the running event loop.
+
+    The dictionary is fetched once per pipeline, in the background, while the first inputs are read.
+
+    Parameters:
+        download_dict (str): "yes" to refresh the cached dictionary if it has expired, "no" to use it as it is.
+        dict_ttl (float): Seconds a downloaded dictionary is reused before checking for a newer one.
+        limits (Limits): Concurrency limits (default: Limits()).
+        cache (ResultCache): Restore the outputs of unchanged inputs from this cache and store new ones in it
+            (default: no cache).
+    """
+
+    def __init__(self, download_dict="yes", dict_ttl=DEFAULT_TTL, limits=None, cache=None):
+        self.download_dict = download_dict
+        self.dict_ttl = dict_ttl
+        self.limits = limits or Limits()
+        self.cache = cache
+        # Made in the running loop the first time they are used, since before Python 3.10 they are bound to the
+        # event loop current when they are made
+        self._semaphores = {}
+        self._in_process_lock = None
+        self._dictionary = None
+
+    def _semaphore(self, resource):
+        """Returns the semaphore that limits the concurrent steps of resource."""
+        semaphore = self._semaphores.get(resource)
+        if semaphore is None:
+            semaphore = self._semaphores[resource] = asyncio.Semaphore(getattr(self.limits, resource))
+        return semaphore
+
+    @property
+    def _in_process(self):
+        """MmcifValidator is not thread-safe, so in-process validations run one at a time under this lock."""
+        if self._in_process_lock is None:
+            self._in_process_lock = asyncio.Lock()
+        return self._in_process_lock
+
+    async def _run(self, resource, function, *args, **kwargs):
+        """Runs a blocking function once a slot of resource is free."""
+        async with self._semaphore(resource):
+            return await asyncio.get_running_loop().run_in_executor(None, partial(function, *args, **kwargs))
+
+    def dictionary(self):
+        """
+        Returns an awaitable for the path of the dictionary, starting the download the first time it is called.
+        """
+        if self._dictionary is None:
+            self._dictionary = asyncio.ensure_future(
+                self._run("download", _staged, "get_dictionary", self._get_dictionary, download=self.download_dict))
+            # A failed download is reported by whoever awaits it; if no one does, it is not logged again
+            self._dictionary.add_done_callback(lambda future: future.cancelled() or future.exception())
+        return self._dictionary
+
+    def _get_dictionary(self):
+        return get_dictionary(self.download_dict, ttl=self.dict_ttl)
+
+    async def index(self):
+        """Returns the DictionaryIndex for the fast check, or None if the dictionary cannot be had."""
+        try:
+            dic_file = await self.dictionary()
+        except OSError as e:
+            # The conversion goes ahead; validate reports the missing dictionary
+            print(f"Warning: fast validation skipped ({e})")
+            return None
+        return await self._run("io", load_precheck_index, dic_file)
+
+    async def convert(self, input_json_file, input_cif_file, input_format, patch=False, stream=False,
+                      writer="pdbx", index=None, precheck=False, output_format="cif"):
+        """
+        Converts the JSON file to mmCIF with json_to_mmcif.convert_and_check in a worker thread; see there for the
+        arguments and the return value. With precheck the index of the pipeline's dictionary is used for the fast
+        check.
+        """
+        if precheck and index is None:
+            index = await self.index()
+        return await self._run("convert", convert_and_check, input_json_file, input_cif_file, input_format, patch,
+                               stream, writer, index, output_format)
+
+    async def validate(self, input_json_file, input_cif_file, validate, in_process=False, output_format="cif",
+                       category_cache=None, checked=True):
+        """
+        Validates the converted file (validate all) or input_cif_file (validate only) against the pipeline's
+        dictionary; see json_to_mmcif.download_and_validate.
+        """
+        from mmcif_validator import mmcif_validation_async, validate_and_print, gemmi_reads
+        val_filename = base_name(input_json_file) + '_val.txt'
+        dic_file = await self.dictionary()
+        cif_file, result = file_to_validate(input_json_file, input_cif_file, validate, output_format, checked)
+        if cif_file is None:
+            return result
+
+        if in_process or category_cache is not None or not gemmi_reads(cif_file):
+            async with self._in_process:
+                return await self._run("validate", validate_and_print, cif_file, self.download_dict, val_filename,
+                                       in_process=True, category_cache=category_cache, dic_file=dic_file)
+        async with self._semaphore("validate"):
+            return await mmcif_validation_async(cif_file, dic_file, val_filename)
+
+    async def run_file(self, input_json_file, input_cif_file, input_format, validate, patch=False, stream=False,
+                       writer="pdbx", precheck=False, in_process=False, output_format="cif"):
+        """
+        Converts (unless validate is only) and validates one file, the way json_to_mmcif.py does for -j.
+        With a result cache the outputs of unchanged inputs are restored instead, and a file merged with
+        input_format cif is validated only in the categories not in its CategoryCache.
+
+        Returns:
+            The result of validate.
+        """
+        self.dictionary()
+        key = None
+        if self.cache is not None:
+            inputs, outputs = job_files(input_json_file, input_cif_file, input_format, validate, output_format)
+            lookup = partial(self.cache.lookup, inputs, await self.dictionary(), outputs, input_format=input_format,
+                             validate=validate, patch=patch, stream=stream, writer=writer, precheck=precheck,
+                             output_format=output_format)
+            key, entry = await self._run("io", _staged, "cache_lookup", lookup)
+            if entry is not None:
+                return entry["result"]
+
+        checked = True
+        if validate != "only":
+            _, checked = await self.convert(input_json_file, input_cif_file, input_format, patch, stream, writer,
+                                            precheck=precheck and validate == "all", output_format=output_format)
+        result = await self.validate(input_json_file, input_cif_file, validate, in_process, output_format,
+                                     category_cache(self.cache, input_format, validate), checked)
+        # Errors (a tuple with the message) depend on more than the inputs and are not cached
+        if key is not None and isinstance(result, bool):
+            await self._run("io", _staged, "cache_store", self.cache.store, key, outputs, result)
+        return result
+
+    async def process(self, input_json_file, input_cif_file, input_format, validate, patch=False, stream=False,
+                      writer="pdbx", precheck=False, in_process=False, output_format="cif"):
+        """
+        Same as run_file, without raising.
+
+        Returns:
+            tuple: (input_json_file, succeeded, message, elapsed seconds), as json_to_mmcif.process_input_file.
+        """
+        start = time.perf_counter()
+        try:
+            result = await self.run_file(input_json_file, input_cif_file, input_format, validate, patch, stream,
+                                         writer, precheck, in_process, output_format)
+        except Exception as e:
+            return input_json_file, False, f"{type(e).__name__}: {e}", time.perf_counter() - start
+        if isinstance(result, tuple):
+            return input_json_file, result[0], result[1], time.perf_counter() - start
+        return input_json_file, bool(result), "" if result else "validation failed", time.perf_counter() - start
+
+
+async def convert_many_async(pairs, input_format, validate="all", download_dict="yes", dict_ttl=DEFAULT_TTL,
+                             patch=False, stream=False, writer="pdbx", precheck=True, limits=None, cache=None,
+                             output_format="cif"):
+    """
+    Converts and validates many files concurrently on the running event loop.
+
+    Parameters:
+        pairs (list): (input_json_file, input_cif_file) tuples, e.g. from json_to_mmcif.collect_batch_inputs.
+        limits (Limits): Concurrency limit of each kind of resource.
+        cache (ResultCache): Cache of results to skip unchanged inputs (default: no cache).
+        The other parameters have the meaning of the json_to_mmcif.py options.
+
+    Returns:
+        list: One (input_json_file, succeeded, message, elapsed seconds) tuple per file, in input order; a
+        failing file does not stop the others.
+    """
+    pipeline = Pipeline(download_dict, dict_ttl, limits, cache=cache)
+    return list(await asyncio.gather(*(pipeline.process(json_file, cif_file, input_format, validate, patch,
+                                                        stream, writer, precheck, output_format=output_format)
+                                       for json_file, cif_file in pairs)))
@@ -0,0 +1,67 @@
+"""
+bench_bcif.py
+
+Description: This script compares BinaryCIF with text mmCIF on a JSON dictionary with a large loop category: the
+size of the file, the time to write it (translate_json_to_cif with the native writer and with --output-format
+bcif) and the time to read it back into the JSON form (mmcif_to_json). It checks that both files read back as
+the same data.
+
+Example usage:
+    python benchmarks/bench_bcif.py --rows 200000 --repeat 3
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import gzip
+import time
+import argparse
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from json_to_mmcif import translate_json_to_cif, mmcif_to_json
+from bench_cif_writer import make_loop_dict
+
+
+def best_time(function, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BinaryCIF against text mmCIF")
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the loop category (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    container_dict = make_loop_dict(args.rows)
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_json_file = os.path.join(temp_dir, "bench.json")
+        for output_format in ("cif", "bcif"):
+            path = os.path.join(temp_dir, "bench." + output_format)
+            encode, _ = best_time(lambda: translate_json_to_cif(container_dict, input_json_file, "native",
+                                                                output_format=output_format), args.repeat)
+            decode, data = best_time(lambda: mmcif_to_json(path), args.repeat)
+            with open(path, 'rb') as f:
+                content = f.read()
+            results[output_format] = (len(content), len(gzip.compress(content, 6)), encode, decode, data)
+
+    print(f"{'format':8} {'MB':>8} {'gzip MB':>8} {'write s':>8} {'read s':>8}")
+    for output_format, (size, compressed, encode, decode, _) in results.items():
+        print(f"{output_format:8} {size / 1e6:8.2f} {compressed / 1e6:8.2f} {encode:8.3f} {decode:8.3f}")
+    if results["cif"][4] != results["bcif"][4]:
+        print("Error: the BinaryCIF file reads back differently from the mmCIF file.")
+        sys.exit(1)
+    print("Data identical.")
+
+
+if __name__ == "__main__":
+    main()
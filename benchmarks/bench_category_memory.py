@@ -0,0 +1,103 @@
+"""
+bench_category_memory.py
+
+Description: This script measures the peak memory and the number of memory blocks of the two places where large
+loops were copied between rows and columns: reading an mmCIF file into the JSON form (mmcif_to_json) and building
+the DataContainers that PdbxWriter writes (build_containers). Each is compared with the row-based code it
+replaced, and the results are checked to be the same.
+
+Example usage:
+    python benchmarks/bench_category_memory.py --rows 200000
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_reader import iter_categories, category_to_json
+from json_to_mmcif import (mmcif_to_json, build_containers, translate_json_to_cif, add_container, add_category,
+                           insert_data)
+from bench_cif_writer import make_loop_dict
+
+
+def legacy_mmcif_to_json(input_cif_file):
+    """mmcif_to_json as it was before Category: a list per row, transposed into columns afterwards."""
+    json_data_dict = {}
+    for category in iter_categories(input_cif_file):
+        json_data_dict.setdefault(category.name, {}).update(category_to_json(category))
+    return json_data_dict
+
+
+def legacy_build_containers(container_dict, container_id):
+    """build_containers as it was before Category: key and value lists, then rows as lists in insert_data."""
+    cif_data_list = []
+    container = add_container(cif_data_list, container_id)
+    for category_name, category_data in container_dict.items():
+        add_category(container, category_name, list(category_data.keys()))
+        insert_data(container, category_name, list(category_data.values()))
+    return cif_data_list
+
+
+def measure(function, *args):
+    """
+    Returns:
+        tuple: (result, peak bytes while it ran, memory blocks held by the result)
+    """
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    return result, peak, blocks
+
+
+def container_rows(cif_data_list):
+    """Returns the rows of every category as lists, so containers built from lists and tuples compare equal."""
+    return [[list(row) for row in category.data] for container in cif_data_list
+            for category in (container.getObj(name) for name in container.getObjNameList())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory of the row and column category forms")
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the loop category (default: 100000)")
+    args = parser.parse_args()
+
+    container_dict = make_loop_dict(args.rows)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_json_file = os.path.join(temp_dir, "bench.json")
+        translate_json_to_cif(container_dict, input_json_file, "native")
+        cif_file = os.path.join(temp_dir, "bench.cif")
+        comparisons = [
+            ("mmcif_to_json", (legacy_mmcif_to_json, cif_file), (mmcif_to_json, cif_file), lambda r: r),
+            ("build_containers", (legacy_build_containers, container_dict, "bench"),
+             (build_containers, container_dict, "bench"), container_rows),
+        ]
+
+        print(f"{'stage':18} {'form':8} {'peak MB':>9} {'blocks':>10}")
+        failed = False
+        for stage, legacy, columnar, comparable in comparisons:
+            results = {}
+            for form, (function, *function_args) in (("rows", legacy), ("columns", columnar)):
+                result, peak, blocks = measure(function, *function_args)
+                results[form] = comparable(result)
+                print(f"{stage:18} {form:8} {peak / 1e6:9.1f} {blocks:10d}")
+                del result
+            if results["rows"] != results["columns"]:
+                print(f"Error: {stage} gives a different result in column form.")
+                failed = True
+    if failed:
+        sys.exit(1)
+    print("Results identical.")
+
+
+if __name__ == "__main__":
+    main()
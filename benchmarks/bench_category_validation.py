@@ -0,0 +1,96 @@
+"""
+bench_category_validation.py
+
+Description: This script times the validation of a large synthetic mmCIF file in full and by category
+(category_validation.py): with an empty category cache, with every category cached, and after one small category
+changed, as after merging a JSON file into a model. It checks that every validation by category gives the report
+of the full one. With --dictionary the file is validated against that dictionary; otherwise against a synthetic one.
+
+Example usage:
+    python benchmarks/bench_category_validation.py --rows 300000
+    python benchmarks/bench_category_validation.py --rows 50000 --loops 4 --repeat 5
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mmcif_validator import MmcifValidator
+from result_cache import CategoryCache
+from synthetic import make_json_dict, write_cif_file, write_dictionary
+
+
+def timed(function):
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validation by category against a full validation")
+    parser.add_argument("--rows", type=int, default=300000, help="rows of each loop category (default: 300000)")
+    parser.add_argument("--loops", type=int, default=1, help="loop categories (default: 1)")
+    parser.add_argument("--categories", type=int, default=20, help="single-row categories (default: 20)")
+    parser.add_argument("--dictionary", help="dictionary to validate against (default: a synthetic one)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    json_dict = make_json_dict(categories=args.categories, loops=args.loops, rows=args.rows)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cif_file = os.path.join(temp_dir, "model.cif")
+        write_cif_file(cif_file, json_dict)
+        dic_file = args.dictionary
+        if dic_file is None:
+            dic_file = os.path.join(temp_dir, "synthetic.dic")
+            write_dictionary(dic_file, json_dict)
+        validator = MmcifValidator(dic_file)
+        validator.dictionary_sha256()
+        timings = {}
+
+        def run(method, function, prepare=None):
+            for _ in range(args.repeat):
+                if prepare is not None:
+                    prepare()
+                seconds, result = timed(function)
+                timings[method] = min(timings.get(method, seconds), seconds)
+            return result
+
+        full = run("full", lambda: validator.validate_file(cif_file))
+
+        def empty_cache():
+            nonlocal cache
+            cache = CategoryCache(os.path.join(temp_dir, f"categories_{time.monotonic_ns()}.db"))
+        cache = None
+        reports = [run("by category, empty cache", lambda: validator.validate_file(cif_file, cache), empty_cache)]
+        reports.append(run("by category, all cached", lambda: validator.validate_file(cif_file, cache)))
+
+        # One single-row category changes, as a JSON merge changes a few of them
+        changes = iter(range(1, 1 << 30))
+
+        def change_one():
+            json_dict["bench_category_0"]["value"] = "%.3f" % next(changes)
+            write_cif_file(cif_file, json_dict)
+        reports.append(run("by category, one changed", lambda: validator.validate_file(cif_file, cache), change_one))
+        changed = validator.validate_file(cif_file)
+
+    if reports[0] != full or reports[1] != full or reports[2] != changed:
+        sys.exit("The validation by category differs from the full validation")
+    rows = sum(len(values["id"]) for values in json_dict.values() if isinstance(values["id"], list))
+    print(f"{len(json_dict)} categories, {rows} loop rows")
+    print(f"{'method':28} {'seconds':>8} {'speed-up':>8}")
+    for method, seconds in timings.items():
+        print(f"{method:28} {seconds:8.2f} {timings['full'] / seconds:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
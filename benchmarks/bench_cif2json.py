@@ -0,0 +1,60 @@
+"""
+bench_cif2json.py
+
+Description: This script times the NDJSON export of a corpus of synthetic mmCIF files (cif2json.py) in one process
+and with a pool of worker processes, checks that both write the same records, and prints the files, blocks and MB
+per second of each.
+
+Example usage:
+    python benchmarks/bench_cif2json.py --files 200 --rows 200 --workers 4
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif2json import export_corpus
+from synthetic import make_json_dict, write_cif_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NDJSON export of an mmCIF corpus")
+    parser.add_argument("--files", type=int, default=200, help="files in the corpus (default: 200)")
+    parser.add_argument("--rows", type=int, default=100, help="rows of the loop category of each file (default: 100)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPUs)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cif_files = []
+        for number in range(args.files):
+            json_dict = make_json_dict(categories=20, loops=1, rows=args.rows, seed=number)
+            cif_files.append(os.path.join(temp_dir, f"entry_{number}.cif"))
+            write_cif_file(cif_files[-1], json_dict, block=f"entry_{number}")
+        size = sum(os.path.getsize(cif_file) for cif_file in cif_files)
+
+        outputs = []
+        print(f"{'export':20} {'seconds':>8} {'files/s':>9} {'MB/s':>7}")
+        for name, workers in (("one process", 1), (f"{args.workers} workers", args.workers)):
+            outputs.append(os.path.join(temp_dir, f"export_{workers}.ndjson"))
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                export_corpus(cif_files, outputs[-1], workers=workers)
+            seconds = time.perf_counter() - start
+            print(f"{name:20} {seconds:8.3f} {args.files / seconds:9.1f} {size / seconds / 1e6:7.1f}")
+
+        with open(outputs[0]) as first, open(outputs[1]) as second:
+            if first.read() != second.read():
+                sys.exit("The workers wrote different records from the single process")
+
+
+if __name__ == "__main__":
+    main()
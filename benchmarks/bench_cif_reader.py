@@ -0,0 +1,119 @@
+"""
+bench_cif_reader.py
+
+Description: This script measures the throughput of the streaming cif_reader against the previous line-based
+mmcif_to_json and against mmcif.io.PdbxReader on synthetic mmCIF files.
+
+Example usage:
+    python benchmarks/bench_cif_reader.py --rows 200000 --repeat 3
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_reader import iter_categories
+from json_to_mmcif import mmcif_to_json
+from mmcif.io.PdbxReader import PdbxReader
+
+
+def legacy_mmcif_to_json(input_cif_file):
+    """mmcif_to_json as it was before cif_reader: single-line "_cat.item value" pairs only."""
+    json_data_dict = {}
+    with open(input_cif_file, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('_'):
+                key, value = line.split(maxsplit=1)
+                if isinstance(value, str):
+                    value = value.strip('"')
+                if '.' in key:
+                    category, sub_key = key[1:].split('.', 1)
+                    if category not in json_data_dict:
+                        json_data_dict[category] = {}
+                    json_data_dict[category][sub_key] = value
+    return json_data_dict
+
+
+def write_pairs_file(path, categories):
+    """Writes a file of single-row categories, the only layout the legacy reader understands."""
+    with open(path, 'w') as f:
+        f.write("data_bench\n")
+        for i in range(categories):
+            f.write(f"#\n_em_cat_{i}.id                 {i}\n")
+            f.write(f"_em_cat_{i}.mode               \"BRIGHT FIELD\"\n")
+            f.write(f"_em_cat_{i}.value              {i * 0.5:.3f}\n")
+            f.write(f"_em_cat_{i}.details            'value with spaces {i}'\n")
+
+
+def write_loop_file(path, rows):
+    """Writes one large loop_ category, like per-micrograph metadata or atom_site."""
+    with open(path, 'w') as f:
+        f.write("data_bench\n#\nloop_\n_em_micrograph.id\n_em_micrograph.defocus\n"
+                "_em_micrograph.dose\n_em_micrograph.detector\n_em_micrograph.file\n")
+        for i in range(rows):
+            f.write(f"{i} {-10000 - i % 30000} {40.5 + i % 7:.2f} \"TFS FALCON 4i\" movie_{i:07d}.tiff\n")
+        f.write("#\n")
+
+
+def read_with_cif_reader(path):
+    for _ in iter_categories(path):
+        pass
+
+
+def read_with_pdbx_reader(path):
+    containers = []
+    with open(path, 'r') as f:
+        PdbxReader(f).read(containers)
+    return containers
+
+
+def time_reader(function, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mmCIF readers")
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the loop workload (default: 100000)")
+    parser.add_argument("--categories", type=int, default=20000,
+                        help="categories in the key/value workload (default: 20000)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    readers = {
+        "legacy mmcif_to_json": legacy_mmcif_to_json,
+        "cif_reader.iter_categories": read_with_cif_reader,
+        "mmcif_to_json": mmcif_to_json,
+        "PdbxReader": read_with_pdbx_reader,
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workloads = {"pairs": os.path.join(temp_dir, "pairs.cif"), "loop": os.path.join(temp_dir, "loop.cif")}
+        write_pairs_file(workloads["pairs"], args.categories)
+        write_loop_file(workloads["loop"], args.rows)
+
+        print(f"{'workload':8} {'reader':28} {'seconds':>9} {'MB/s':>8}")
+        for workload, path in workloads.items():
+            size_mb = os.path.getsize(path) / 1e6
+            for name, function in readers.items():
+                if name.startswith("legacy") and workload == "loop":
+                    continue  # the legacy reader cannot parse loop_ tables
+                seconds = time_reader(function, path, args.repeat)
+                print(f"{workload:8} {name:28} {seconds:9.3f} {size_mb / seconds:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
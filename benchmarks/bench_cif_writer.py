@@ -0,0 +1,72 @@
+"""
+bench_cif_writer.py
+
+Description: This script measures the time to write a converter JSON dictionary with large loop categories as
+mmCIF with PdbxWriter (translate_json_to_cif) and with the native column writer of cif_writer, and checks that
+both produce the same file.
+
+Example usage:
+    python benchmarks/bench_cif_writer.py --rows 200000 --repeat 3
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from json_to_mmcif import translate_json_to_cif
+
+
+def make_loop_dict(rows):
+    """A JSON dictionary with one single-row category and one large loop, like per-micrograph metadata."""
+    return {
+        "em_imaging": {"microscope_model": "TFS KRIOS", "mode": "BRIGHT FIELD", "nominal_cs": "2.7"},
+        "em_micrograph": {
+            "id": [str(i) for i in range(rows)],
+            "defocus": [str(-10000 - i % 30000) for i in range(rows)],
+            "dose": ["%.2f" % (40.5 + i % 7) for i in range(rows)],
+            "detector": ["TFS FALCON 4i" for _ in range(rows)],
+            "file": ["movie_%07d.tiff" % i for i in range(rows)],
+        },
+    }
+
+
+def time_writer(container_dict, input_json_file, writer, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        translate_json_to_cif(container_dict, input_json_file, writer)
+        best = min(best, time.perf_counter() - start)
+    with open(input_json_file.split(".")[0] + '.cif', 'rb') as f:
+        return best, f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mmCIF writers")
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the loop category (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    container_dict = make_loop_dict(args.rows)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_json_file = os.path.join(temp_dir, "bench.json")
+        results = {writer: time_writer(container_dict, input_json_file, writer, args.repeat)
+                   for writer in ("pdbx", "native")}
+
+    print(f"{'writer':8} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    for writer, (seconds, _) in results.items():
+        print(f"{writer:8} {seconds:9.3f} {args.rows / seconds:12.0f} {results['pdbx'][0] / seconds:7.1f}x")
+    if results["pdbx"][1] != results["native"][1]:
+        print("Error: the native writer output differs from PdbxWriter.")
+        sys.exit(1)
+    print("Output identical.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+bench_corpus_validation.py
+
+Description: This script times the validation of a corpus of synthetic mmCIF files three ways: one gemmi validate
+process per file, as mmcif_validator.py does, corpus_validator.py in one process, and corpus_validator.py with a
+pool of forked workers sharing the parsed dictionary. It prints the files per second of each. With --dictionary
+the files are validated against that dictionary (e.g. the full mmcif_pdbx_v50.dic, whose parsing dominates the
+cost of a process per file); otherwise against a synthetic one.
+
+Example usage:
+    python benchmarks/bench_corpus_validation.py --files 500 --rows 200 --workers 8
+    python benchmarks/bench_corpus_validation.py --dictionary mmcif_tools/mmcif_pdbx_v50.dic --files 100
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from corpus_validator import validate_corpus
+from synthetic import make_json_dict, write_cif_file, write_dictionary
+
+
+def per_file_gemmi(cif_files, dic_file, temp_dir):
+    """Validates each file with its own gemmi validate process, writing one text report per file."""
+    for number, cif_file in enumerate(cif_files):
+        with open(os.path.join(temp_dir, f"report_{number}.txt"), "w") as report:
+            subprocess.run(["gemmi", "validate", "-v", cif_file, "-d", dic_file], stdout=report,
+                           stderr=subprocess.PIPE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark corpus validation against one gemmi process per file")
+    parser.add_argument("--files", type=int, default=200, help="files in the corpus (default: 200)")
+    parser.add_argument("--rows", type=int, default=100, help="rows of the loop category of each file (default: 100)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPUs)")
+    parser.add_argument("--dictionary", help="dictionary to validate against (default: a synthetic one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cif_files = []
+        for number in range(args.files):
+            json_dict = make_json_dict(categories=20, loops=1, rows=args.rows, seed=number)
+            cif_files.append(os.path.join(temp_dir, f"entry_{number}.cif"))
+            write_cif_file(cif_files[-1], json_dict, block=f"entry_{number}")
+        dic_file = args.dictionary
+        if dic_file is None:
+            dic_file = os.path.join(temp_dir, "synthetic.dic")
+            write_dictionary(dic_file, json_dict)
+
+        timings = []
+        start = time.perf_counter()
+        per_file_gemmi(cif_files, dic_file, temp_dir)
+        timings.append(("gemmi process per file", time.perf_counter() - start))
+        for workers in sorted({1, args.workers}):
+            # Each run parses the dictionary itself, as a new corpus_validator.py process would
+            from mmcif_validator import _validators
+            _validators.clear()
+            start = time.perf_counter()
+            validate_corpus(cif_files, dic_file, os.path.join(temp_dir, f"report_{workers}.jsonl"), workers)
+            timings.append((f"corpus_validator -w {workers}", time.perf_counter() - start))
+
+    print(f"{'method':28} {'seconds':>8} {'files/s':>8}")
+    for method, seconds in timings:
+        print(f"{method:28} {seconds:8.2f} {args.files / seconds:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
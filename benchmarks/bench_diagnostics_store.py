@@ -0,0 +1,97 @@
+"""
+bench_diagnostics_store.py
+
+Description: This script fills a diagnostics_store.py database with synthetic diagnostics, as many files with as
+many diagnostics each as asked, and times the load and typical corpus-wide queries: the files with a given value
+error, the diagnostics of a category and item, the counts by kind, and the diagnostics of one file.
+
+Example usage:
+    python benchmarks/bench_diagnostics_store.py --files 100000 --per_file 20 --repeat 5
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from diagnostics import Diagnostic, ERROR, WARNING
+from diagnostics_store import DiagnosticStore
+
+CATEGORIES = ["em_imaging", "em_image_recording", "em_map", "em_software", "em_specimen", "em_vitrification",
+              "em_ctf_correction", "em_3d_reconstruction", "em_entity_assembly", "em_sample_support"]
+ITEMS = ["id", "entry_id", "mode", "illumination_mode", "details", "name", "type", "date", "version", "method"]
+KINDS = [("unknown_tag", WARNING), ("missing_key", WARNING), ("missing_mandatory", WARNING),
+         ("not_allowed", ERROR), ("regex", ERROR)]
+
+
+def make_diagnostics(rng, cif_file, count):
+    diagnostics = []
+    for _ in range(count):
+        category, item = rng.choice(CATEGORIES), rng.choice(ITEMS)
+        # Errors are rarer than warnings, as in real reports
+        kind, severity = KINDS[rng.choice([0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 4])]
+        line = rng.randint(1, 5000) if severity == ERROR else None
+        diagnostics.append(Diagnostic(cif_file, line, "block", category, item, severity, kind,
+                                      f"{kind} _{category}.{item}"))
+    return diagnostics
+
+
+def best_time(function, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading and querying the diagnostics store")
+    parser.add_argument("--files", type=int, default=50000, help="validated files (default: 50000)")
+    parser.add_argument("--per_file", type=int, default=20, help="diagnostics per file (default: 20)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions, the best time is reported (default: 5)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_file = os.path.join(temp_dir, "diagnostics.db")
+        start = time.perf_counter()
+        with DiagnosticStore(db_file) as store:
+            for number in range(args.files):
+                cif_file = f"archive/{number % 100:02d}/entry_{number}.cif"
+                diagnostics = make_diagnostics(rng, cif_file, args.per_file)
+                store.add(cif_file, all(d.severity != ERROR for d in diagnostics), diagnostics)
+        # The load includes the ANALYZE run when the store is closed
+        load = time.perf_counter() - start
+        total = args.files * args.per_file
+        print(f"Loaded {total} diagnostics of {args.files} files in {load:.2f}s "
+              f"({total / load:.0f} diagnostics/s), {os.path.getsize(db_file) / 1e6:.1f} MB")
+
+        with DiagnosticStore(db_file) as store:
+            queries = {
+                "files with not_allowed illumination_mode":
+                    lambda: store.files(item="illumination_mode", kind="not_allowed"),
+                "diagnostics of _em_map.date":
+                    lambda: store.query(category="em_map", item="date"),
+                "regex errors in em_software (first 100)":
+                    lambda: store.query(category="em_software", kind="regex", limit=100),
+                "counts of errors by tag":
+                    lambda: store.counts(severity="error", kind="not_allowed"),
+                "diagnostics of one file":
+                    lambda: store.query(file="archive/07/entry_12307.cif"),
+            }
+            print(f"{'query':44} {'ms':>8} {'rows':>8}")
+            for name, query in queries.items():
+                seconds, rows = best_time(query, args.repeat)
+                print(f"{name:44} {seconds * 1000:8.2f} {len(rows):8}")
+
+
+if __name__ == "__main__":
+    main()
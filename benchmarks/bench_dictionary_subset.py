@@ -0,0 +1,86 @@
+"""
+bench_dictionary_subset.py
+
+Description: This script times gemmi validate of an mmCIF file against the whole dictionary and against the
+sub-dictionary of the categories in the file (dictionary_subset.py), together with the one-off cost of indexing
+the dictionary and writing the sub-dictionary and the cost of finding it again. With --dictionary and
+--input_cif_file real files are used (e.g. the full mmcif_pdbx_v50.dic and a converted EMDB file); otherwise a
+synthetic dictionary of --dictionary_categories categories and a file using --categories of them.
+
+Example usage:
+    python benchmarks/bench_dictionary_subset.py --dictionary_categories 3000 --categories 20
+    python benchmarks/bench_dictionary_subset.py --dictionary mmcif_tools/mmcif_pdbx_v50.dic -c test_data/SPA_data.cif
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dictionary_subset import index_frames, subset_for_file
+from synthetic import make_json_dict, write_cif_file, write_dictionary
+
+
+def gemmi_validate(cif_file, dic_file, repeat):
+    """Best wall time of gemmi validate processes, and the report of the last one."""
+    best, report = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        report = subprocess.run(["gemmi", "validate", "-v", cif_file, "-d", dic_file], capture_output=True,
+                                text=True).stdout
+        best = min(best, time.perf_counter() - start)
+    return best, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gemmi validate against the whole and a sub-dictionary")
+    parser.add_argument("--dictionary", help="dictionary to subset (default: a synthetic one)")
+    parser.add_argument("-c", "--input_cif_file", help="file to validate (default: a synthetic one)")
+    parser.add_argument("--dictionary_categories", type=int, default=3000,
+                        help="categories of the synthetic dictionary (default: 3000)")
+    parser.add_argument("--categories", type=int, default=20, help="categories of the synthetic file (default: 20)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions, the best time is reported (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dic_file, cif_file = args.dictionary, args.input_cif_file
+        if dic_file is None:
+            json_dict = make_json_dict(categories=args.dictionary_categories, loops=0)
+            dic_file = os.path.join(temp_dir, "synthetic.dic")
+            write_dictionary(dic_file, json_dict)
+        if cif_file is None:
+            json_dict = make_json_dict(categories=args.categories, loops=1, rows=100)
+            cif_file = os.path.join(temp_dir, "model.cif")
+            write_cif_file(cif_file, json_dict)
+        cache_dir = os.path.join(temp_dir, "subsets")
+
+        start = time.perf_counter()
+        frames = index_frames(dic_file)
+        print(f"Indexed {len(frames['frames'])} save frames of {dic_file} in {time.perf_counter() - start:.3f}s")
+        start = time.perf_counter()
+        subset = subset_for_file(cif_file, dic_file, cache_dir)
+        print(f"First sub-dictionary (index stored, subset written) in {time.perf_counter() - start:.3f}s, "
+              f"{os.path.getsize(subset)} of {os.path.getsize(dic_file)} bytes")
+        start = time.perf_counter()
+        subset_for_file(cif_file, dic_file, cache_dir)
+        lookup = time.perf_counter() - start
+
+        full_seconds, full_report = gemmi_validate(cif_file, dic_file, args.repeat)
+        subset_seconds, subset_report = gemmi_validate(cif_file, subset, args.repeat)
+    if full_report != subset_report:
+        sys.exit("The report against the sub-dictionary differs from the one against the whole dictionary")
+    print(f"{'gemmi validate':28} {'seconds':>8}")
+    print(f"{'whole dictionary':28} {full_seconds:8.3f}")
+    print(f"{'sub-dictionary':28} {subset_seconds:8.3f}")
+    print(f"{'sub-dictionary with lookup':28} {subset_seconds + lookup:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+bench_pipeline.py
+
+Description: This script times each stage of the conversion and validation pipeline (json_to_dict,
+mmcif_to_json, merge, build_containers, write_mmcif_file and validation) on synthetic workloads, writes
+the results as JSON and compares them with a stored baseline. A stage that is slower than its baseline by more
+than the tolerance is reported as a regression and the script exits with status 1.
+
+Example usage:
+    python benchmarks/bench_pipeline.py --output results.json
+    python benchmarks/bench_pipeline.py --workloads large_loop --scale 5 --repeat 5
+    python benchmarks/bench_pipeline.py --save_baseline
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from json_to_mmcif import (json_to_dict, mmcif_to_json, merge_json_into_cif, build_containers, write_mmcif_file,
+                           output_file)
+from compressed_io import base_name
+from synthetic import QUOTING, make_json_dict, write_json_file, write_cif_file, write_dictionary
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+STAGES = ["json_to_dict", "mmcif_to_json", "merge", "build_containers", "write_mmcif_file", "validate"]
+
+# Parameters of make_json_dict for each workload
+WORKLOADS = {
+    "small": dict(categories=20, loops=1, rows=20, value_length=8, quoting="none"),
+    "many_categories": dict(categories=2000, loops=0, rows=1, value_length=12, quoting="none"),
+    "large_loop": dict(categories=5, loops=2, rows=20000, value_length=12, quoting="none"),
+    "long_values": dict(categories=200, loops=1, rows=2000, value_length=200, quoting="spaces"),
+    "quoted": dict(categories=200, loops=1, rows=5000, value_length=24, quoting="mixed"),
+}
+
+
+def scaled(parameters, scale):
+    """Workload parameters with the number of categories and rows multiplied by scale."""
+    parameters = dict(parameters)
+    parameters["categories"] = int(parameters["categories"] * scale)
+    if parameters["rows"] > 1:
+        parameters["rows"] = max(2, int(parameters["rows"] * scale))
+    return parameters
+
+
+def run_workload(parameters, repeat, dictionary, temp_dir):
+    """
+    Times every stage on one workload.
+
+    Returns:
+        dict: {stage: {"best": seconds, "mean": seconds}}; validate is left out when gemmi is not installed.
+    """
+    json_file = os.path.join(temp_dir, "bench.json")
+    cif_file = os.path.join(temp_dir, "input.cif")
+    json_dict = make_json_dict(seed=1, **parameters)
+    write_json_file(json_file, json_dict)
+    write_cif_file(cif_file, make_json_dict(seed=2, **parameters))
+
+    if dictionary is None:
+        dictionary = os.path.join(temp_dir, "synthetic.dic")
+        write_dictionary(dictionary, json_dict, parameters["quoting"])
+    validator = None
+    if dictionary:
+        try:
+            from mmcif_validator import get_validator
+            validator = get_validator(dictionary)
+        except ImportError:
+            print("gemmi is not installed, skipping the validate stage.")
+
+    times = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json_to_dict(json_file)
+        times["json_to_dict"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        cif_dict = mmcif_to_json(cif_file)
+        times["mmcif_to_json"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        merged = merge_json_into_cif(cif_dict, json_dict)
+        times["merge"].append(time.perf_counter() - start)
+
+        # translate_json_to_cif is build_containers followed by write_mmcif_file, timed apart
+        start = time.perf_counter()
+        data_list = build_containers(merged, base_name(json_file))
+        times["build_containers"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        write_mmcif_file(data_list, json_file)
+        times["write_mmcif_file"].append(time.perf_counter() - start)
+
+        if validator is not None:
+            start = time.perf_counter()
+            validator.validate_file(output_file(json_file))
+            times["validate"].append(time.perf_counter() - start)
+
+    return {stage: {"best": min(values), "mean": sum(values) / len(values)}
+            for stage, values in times.items() if values}
+
+
+def compare_to_baseline(results, baseline, tolerance, min_seconds=0.005):
+    """
+    Finds the stages that are slower than in the baseline.
+
+    A stage regresses when its best time is more than tolerance (a fraction) above the baseline and also more
+    than min_seconds slower, so that timer noise on very fast stages is ignored.
+
+    Returns:
+        list: (workload, stage, baseline seconds, current seconds) for each regression.
+    """
+    regressions = []
+    for workload, result in results["workloads"].items():
+        base = baseline.get("workloads", {}).get(workload)
+        if base is None or base["parameters"] != result["parameters"]:
+            continue
+        for stage, timing in result["stages"].items():
+            if stage not in base["stages"]:
+                continue
+            before, now = base["stages"][stage]["best"], timing["best"]
+            if now > before * (1 + tolerance) and now - before > min_seconds:
+                regressions.append((workload, stage, before, now))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion and validation pipeline")
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS),
+                        help="workloads to run (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the categories and rows of every workload (default: 1)")
+    parser.add_argument("--categories", type=int, help="run a custom workload with this many single-row categories")
+    parser.add_argument("--loops", type=int, default=1, help="loop categories of the custom workload (default: 1)")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per loop of the custom workload (default: 1000)")
+    parser.add_argument("--value_length", type=int, default=12,
+                        help="string value length of the custom workload (default: 12)")
+    parser.add_argument("--quoting", choices=QUOTING, default="none", help="quoting of the custom workload")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, the best time is compared (default: 3)")
+    parser.add_argument("--dictionary",
+                        help="dictionary for the validate stage (default: a generated dictionary defining the "
+                             "synthetic categories)")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="baseline results to compare with (default: benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline as a fraction (default: 0.25)")
+    parser.add_argument("--save_baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    workloads = {name: scaled(WORKLOADS[name], args.scale) for name in args.workloads}
+    if args.categories is not None:
+        workloads = {"custom": dict(categories=args.categories, loops=args.loops, rows=args.rows,
+                                    value_length=args.value_length, quoting=args.quoting)}
+
+    results = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "machine": platform.machine()},
+        "repeat": args.repeat,
+        "workloads": {},
+    }
+    print(f"{'workload':16} {'stage':22} {'best s':>9} {'mean s':>9}")
+    for name, parameters in workloads.items():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stages = run_workload(parameters, args.repeat, args.dictionary, temp_dir)
+        results["workloads"][name] = {"parameters": parameters, "stages": stages}
+        for stage, timing in stages.items():
+            print(f"{name:16} {stage:22} {timing['best']:9.4f} {timing['mean']:9.4f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, nothing to compare.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for workload, stage, before, now in regressions:
+        print(f"REGRESSION {workload} {stage}: {before:.4f}s -> {now:.4f}s ({now / before:.2f}x)")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+synthetic.py
+
+Description: This script generates synthetic converter inputs (JSON files and mmCIF files) for benchmarks. The
+number of single-row categories, the number and length of loop categories, the length of the values and how
+much quoting they need can be chosen independently.
+
+Example usage:
+    python benchmarks/synthetic.py --categories 50 --loops 2 --rows 100000 --quoting mixed -o big.json
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_writer import CifWriter
+
+QUOTING = ["none", "spaces", "mixed"]
+ITEMS_PER_CATEGORY = 6
+WORDS = ["BRIGHT", "FIELD", "TFS", "KRIOS", "FALCON", "grid", "square", "foil", "hole", "movie", "dose", "tilt"]
+
+
+def make_value(rng, value_length, quoting):
+    """
+    Returns one string value of about value_length characters.
+
+    quoting none gives plain tokens, spaces gives values with blanks (double-quoted in mmCIF) and mixed also
+    gives values with single and double quotes and multi-line text fields.
+    """
+    if quoting == "none":
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(value_length)) or "x"
+    text = " ".join(rng.choice(WORDS) for _ in range(max(1, value_length // 6)))[:max(value_length, 3)]
+    if quoting == "mixed":
+        kind = rng.randrange(5)
+        if kind == 1:
+            text = "it's " + text
+        elif kind == 2:
+            text = 'the "' + text + '"'
+        elif kind == 3:
+            text = text + "\nsecond line"
+    return text
+
+
+def make_category(rng, rows, value_length, quoting):
+    """A category with an id, a number and string items; lists (a loop) when rows > 1."""
+    columns = {
+        "id": [str(i + 1) for i in range(rows)],
+        "value": ["%.3f" % rng.uniform(-1000, 1000) for _ in range(rows)],
+    }
+    for i in range(ITEMS_PER_CATEGORY - len(columns)):
+        columns["item_%d" % i] = [make_value(rng, value_length, quoting) for _ in range(rows)]
+    if rows == 1:
+        return {item: values[0] for item, values in columns.items()}
+    return columns
+
+
+def make_json_dict(categories=20, loops=1, rows=1000, value_length=12, quoting="none", seed=0):
+    """
+    Generates a converter JSON dictionary.
+
+    Parameters:
+        categories (int): Number of single-row categories.
+        loops (int): Number of loop categories.
+        rows (int): Rows of each loop category.
+        value_length (int): Approximate length of string values.
+        quoting (str): One of QUOTING.
+        seed (int): Seed of the random values, for reproducible inputs.
+    """
+    rng = random.Random(seed)
+    json_dict = {}
+    for i in range(categories):
+        json_dict["bench_category_%d" % i] = make_category(rng, 1, value_length, quoting)
+    for i in range(loops):
+        json_dict["bench_loop_%d" % i] = make_category(rng, max(rows, 2), value_length, quoting)
+    return json_dict
+
+
+def write_json_file(path, json_dict):
+    with open(path, 'w') as f:
+        json.dump(json_dict, f)
+
+
+def write_cif_file(path, json_dict, block="bench"):
+    """Writes json_dict as an mmCIF file in the layout of PdbxWriter."""
+    with open(path, 'w') as f:
+        writer = CifWriter(f)
+        writer.begin_block(block)
+        for name, values in json_dict.items():
+            columns = list(values.values())
+            if not isinstance(columns[0], list):
+                columns = [[value] for value in columns]
+            writer.write_columns(name, list(values), columns)
+        writer.end_block()
+
+
+DICTIONARY_HEADER = r"""data_synthetic.dic
+    _datablock.id                synthetic.dic
+    _dictionary.title            synthetic.dic
+    _dictionary.datablock_id     synthetic.dic
+    _dictionary.version          1.0
+loop_
+_item_type_list.code
+_item_type_list.primitive_code
+_item_type_list.construct
+code      char  '[][_,.;:"&<>()/\{}'`~!@#$%A-Za-z0-9*|+-]*'
+line      char  '[][ \t_(),.;:"&<>/\{}'`~!@#$%?+=*A-Za-z0-9|^-]*'
+text      char  '[][ \n\t()_,.;:"&<>/\{}'`~!@#$%?+=*A-Za-z0-9|^-]*'
+int       numb  '[+-]?[0-9]+'
+float     numb  '-?(([0-9]+)[.]?|([0-9]*[.][0-9]+))([(][0-9]+[)])?([eE][+-]?[0-9]+)?'
+"""
+
+
+def write_dictionary(path, json_dict, quoting="none"):
+    """
+    Writes a DDL2 dictionary that defines the categories of json_dict, so that validating a synthetic file checks
+    the type of every value instead of only reporting unknown tags.
+    """
+    string_type = {"none": "code", "spaces": "line", "mixed": "text"}[quoting]
+    with open(path, 'w') as f:
+        f.write(DICTIONARY_HEADER)
+        for name, values in json_dict.items():
+            f.write(f"\nsave_{name}\n    _category.id              {name}\n    _category.mandatory_code  no\n"
+                    f"    _category_key.name        '_{name}.id'\n    save_\n")
+            for item in values:
+                item_type = {"id": "int", "value": "float"}.get(item, string_type)
+                f.write(f"\nsave__{name}.{item}\n    _item.name                '_{name}.{item}'\n"
+                        f"    _item.category_id         {name}\n    _item.mandatory_code      no\n"
+                        f"    _item_type.code           {item_type}\n    save_\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic JSON or mmCIF input")
+    parser.add_argument("-o", "--output", required=True, help="output file, .json, .cif or .dic")
+    parser.add_argument("--categories", type=int, default=20, help="single-row categories (default: 20)")
+    parser.add_argument("--loops", type=int, default=1, help="loop categories (default: 1)")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per loop category (default: 1000)")
+    parser.add_argument("--value_length", type=int, default=12, help="length of string values (default: 12)")
+    parser.add_argument("--quoting", choices=QUOTING, default="none", help="quoting needs of the values")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+
+    json_dict = make_json_dict(args.categories, args.loops, args.rows, args.value_length, args.quoting, args.seed)
+    if args.output.endswith(".dic"):
+        write_dictionary(args.output, json_dict, args.quoting)
+    elif args.output.endswith(".cif"):
+        write_cif_file(args.output, json_dict)
+    else:
+        write_json_file(args.output, json_dict)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+category_validation.py
+
+Description: This script validates an mmCIF file category by category, reusing the results of the categories that
+are unchanged since an earlier validation against the same dictionary. Merging JSON into an mmCIF file (-f cif)
+changes only the categories of the JSON, so validating the merged file checks only those categories again; the
+results of every other category come from a CategoryCache (result_cache.py). The checks that span categories,
+that the values of linked items are found in their parent items, are run on the whole file each time: they only
+look values up, and take a small part of the time of a validation.
+
+The report is the one a validation of the whole file gives. gemmi reports the diagnostics of each data block in
+a fixed order: the values and unknown tags in file order, then the mandatory items and keys of each category by
+category name, the duplicated keys in file order and the missing parents by child category. The diagnostics of
+each category are kept apart by that order and put back in it, with their lines moved to where the category now
+starts in the file.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+from collections import namedtuple
+from cif_reader import split_tag
+from cif_patch import index_categories
+from diagnostics import parse_message
+
+Unit = namedtuple("Unit", ["block", "category", "key", "line", "items"])
+Unit.__doc__ = """
+One category of a data block: its name, the key of its cached result (made from the text of the category), the
+line it starts on and its gemmi.cif.Item objects.
+"""
+
+# Order of the groups of diagnostics of a data block; see the description of this module
+VALUES, CATEGORIES, DUPLICATES = 0, 1, 2
+
+
+def category_units(cif_file, doc, cache, identity):
+    """
+    Splits a parsed text mmCIF file into its categories.
+
+    Parameters:
+        cif_file (str): Path of the file, uncompressed text mmCIF.
+        doc (gemmi.cif.Document): The file read by gemmi.
+        cache (CategoryCache): Cache the keys are made for.
+        identity (str): Identifies the dictionary; part of every key.
+
+    Returns:
+        list: Unit for each category in file order, or None if the file cannot be split: a category that is
+        not in one piece in its block, two categories sharing a line, two blocks of the same name, or save frames.
+    """
+    if len({block.name for block in doc}) != len(doc):
+        return None
+    try:
+        spans = index_categories(cif_file)
+    except ValueError:
+        return None
+    groups = []
+    for block in doc:
+        for item in block:
+            if item.pair is not None:
+                tag = item.pair[0]
+            elif item.loop is not None:
+                tag = item.loop.tags[0]
+            else:
+                return None
+            category = split_tag(tag)[0]
+            if groups and groups[-1][:2] == (block.name, category):
+                groups[-1][2].append(item)
+            else:
+                groups.append((block.name, category, [item]))
+    names = [group[:2] for group in groups]
+    if names != [(span.block, span.name) for span in spans] or len(set(names)) != len(names):
+        return None
+
+    with open(cif_file, 'rb') as file:
+        data = file.read()
+    view = memoryview(data)
+    units, line, offset = [], 1, 0
+    for (block, category, items), span in zip(groups, spans):
+        line += data.count(b"\n", offset, span.start)
+        offset = span.start
+        key = cache.key(identity, "category", block, category, view[span.start:span.end])
+        units.append(Unit(block, category, key, line, items))
+    return units
+
+
+def _document(source, block, units):
+    """A document of one data block holding copies of the items of units, which keep their line numbers."""
+    from gemmi import cif
+    doc = cif.Document()
+    doc.source = source
+    new_block = doc.add_new_block(block)
+    for unit in units:
+        for item in unit.items:
+            new_block.add_item(item)
+    return doc
+
+
+def _record(message, diagnostic, source, line):
+    """
+    Returns [group, line relative to the start of the category or None, message without the location], or None
+    if the message does not have the expected location.
+    """
+    if diagnostic.line is None:
+        if diagnostic.kind == "unknown_tag":
+            return [VALUES, None, message]
+        return [DUPLICATES if diagnostic.kind == "duplicated_key" else CATEGORIES, None, message]
+    location = f"{source}:{diagnostic.line} "
+    if not message.startswith(location):
+        return None
+    return [VALUES, diagnostic.line - line, message[len(location):]]
+
+
+def _render(record, source, line):
+    _, offset, text = record
+    return text if offset is None else f"{source}:{line + offset} {text}"
+
+
+def validate_by_category(validator, doc, cif_file, cache):
+    """
+    Validates a parsed mmCIF file with a MmcifValidator, validating only the categories not in cache.
+
+    Parameters:
+        validator (MmcifValidator): The validator; see MmcifValidator.validate_file.
+        doc (gemmi.cif.Document): The file read by gemmi.
+        cif_file (str): Path of the file, uncompressed text mmCIF.
+        cache (CategoryCache): Results of categories validated before, where new ones are stored.
+
+    Returns:
+        tuple: (bool, list) - whether the file is valid and its diagnostics, as validate_document gives them, or
+        None if the file cannot be validated by category (see category_units).
+    """
+    identity = validator.dictionary_sha256()
+    units = category_units(cif_file, doc, cache, identity)
+    if units is None:
+        return None
+    source = doc.source
+    entries = cache.get(unit.key for unit in units)
+    new = {}
+    for unit in units:
+        if unit.key in entries:
+            continue
+        valid, messages = validator.validate_document(_document(source, unit.block, [unit]))
+        records = []
+        for message in messages:
+            diagnostic = parse_message(message)
+            if diagnostic.kind == "missing_parent":
+                # The parents are in other categories; see below
+                continue
+            record = _record(message, diagnostic, source, unit.line)
+            if record is None:
+                return None
+            records.append(record)
+        entries[unit.key] = new[unit.key] = {"valid": valid, "messages": records}
+    cache.put(new)
+
+    # gemmi orders the missing parents of a block by a hash of all its categories, so they are not kept by
+    # category; the parent checks of the whole file only look up values, and take a fraction of its validation
+    parents = {}
+    for message in validator.check_parents(doc):
+        diagnostic = parse_message(message)
+        if diagnostic.kind == "missing_parent":
+            parents.setdefault(diagnostic.block, []).append(message)
+
+    blocks = {}
+    for unit in units:
+        blocks.setdefault(unit.block, []).append(unit)
+    messages = []
+    for block, block_units in blocks.items():
+        by_category = sorted(block_units, key=lambda unit: unit.category)
+        for group, ordered in ((VALUES, block_units), (CATEGORIES, by_category), (DUPLICATES, block_units)):
+            for unit in ordered:
+                messages.extend(_render(record, source, unit.line) for record in entries[unit.key]["messages"]
+                                if record[0] == group)
+        messages.extend(parents.get(block, ()))
+    checked = sum(1 for unit in units if unit.key in new)
+    print(f"{checked} of {len(units)} categories of {cif_file} validated, the others taken from the category cache")
+    return all(entries[unit.key]["valid"] for unit in units), messages
@@ -0,0 +1,201 @@
+"""
+cif2json.py
+
+Description: This script exports a corpus of mmCIF files to newline-delimited JSON (NDJSON) for analytics, the
+reverse of json_to_mmcif.py at corpus scale. Every data block becomes one JSON record on its own line,
+{"file": ..., "block": ..., "categories": {category: {item: value}}}, with the categories in the JSON form of the
+converter: a single row as {item: value} and a loop as column arrays {item: [value, ...]} (with --arrays, every
+category as column arrays). Text mmCIF and BinaryCIF files, compressed or not, are read by a pool of worker
+processes; the records are written in input order as soon as the files before them are done, and only a few
+files per worker are read ahead, so memory use depends on the number of workers and not on the size of the
+corpus. An output path ending in .gz, .bz2, .xz or .zst is compressed; - writes to standard output.
+
+Example usage:
+    python cif2json.py -c archive/ -o corpus.ndjson.gz -w 16
+    python cif2json.py -c "sessions/**/*.cif" manifest.txt -o - --arrays | head
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from cif_reader import iter_categories
+from compressed_io import open_file
+from corpus_validator import collect_cif_files
+from profiling import stage, enable_profiling, write_profile
+
+# Files each worker may have read ahead of the writer
+READ_AHEAD = 2
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Export mmCIF files to NDJSON, one record per data block.")
+    parser.add_argument("-c", "--input_cif", nargs="+", required=True,
+                        help="mmCIF files, directories (searched recursively for .cif and .bcif files, compressed "
+                             "or not), quoted glob patterns or manifest files listing one mmCIF file per line")
+    parser.add_argument("-o", "--output", default="export.ndjson",
+                        help="NDJSON file, compressed if it ends in .gz, .bz2, .xz or .zst, or - for standard "
+                             "output (default: export.ndjson)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--arrays", action="store_true",
+                        help="Write every category as column arrays, single rows included, so each item has the "
+                             "same JSON type in every record")
+    parser.add_argument("--profile", metavar="TRACE_FILE",
+                        help="Record wall time, CPU time, peak memory and I/O of each stage, print a summary and "
+                             "save a Chrome trace (chrome://tracing, Perfetto) to TRACE_FILE")
+    return parser.parse_args()
+
+
+def block_records(cif_file, arrays=False):
+    """
+    Reads an mmCIF file into one record per data block.
+
+    A category written in several parts of a block, with different items and the same number of rows, is joined
+    into one. A data_ line repeating the name of the block just before it continues that block, as the reader
+    cannot tell the two apart.
+
+    Returns:
+        list: {"file": cif_file, "block": name, "categories": {...}} dicts in file order; a file without a data_
+        line has one block named "".
+
+    Raises:
+        ValueError: If a category repeats an item or changes its number of rows within a block.
+    """
+    records = []
+    row_counts = {}
+    for category in iter_categories(cif_file, columns=True):
+        name = category.block or ""
+        if not records or records[-1]["block"] != name:
+            records.append({"file": cif_file, "block": name, "categories": {}})
+            row_counts = {}
+        categories = records[-1]["categories"]
+        values = dict(zip(category.items, category.columns)) if arrays else category.to_json()
+        if category.name not in categories:
+            categories[category.name] = values
+            row_counts[category.name] = category.row_count
+            continue
+        repeated = sorted(categories[category.name].keys() & values.keys())
+        if repeated:
+            raise ValueError(f"data_{name}: _{category.name}.{repeated[0]} is repeated")
+        if category.row_count != row_counts[category.name]:
+            raise ValueError(f"data_{name}: {category.name} has {category.row_count} rows here and "
+                             f"{row_counts[category.name]} before")
+        categories[category.name].update(values)
+    return records
+
+
+def export_file(cif_file, arrays=False):
+    """
+    Exports one file in a worker process; the records are encoded there, so the writer only writes lines.
+
+    Returns:
+        tuple: (cif_file, NDJSON text of its records or None, error message or None, bytes read, blocks)
+    """
+    try:
+        records = block_records(cif_file, arrays)
+        size = os.path.getsize(cif_file)
+    except Exception as e:
+        # A file that cannot be read is reported and does not stop the export
+        return cif_file, None, f"{type(e).__name__}: {e}", 0, 0
+    text = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+    return cif_file, text, None, size, len(records)
+
+
+def _ordered_results(cif_files, workers, arrays):
+    """Yields the results of export_file in input order, with at most READ_AHEAD files per worker pending."""
+    if workers <= 1:
+        for cif_file in cif_files:
+            yield export_file(cif_file, arrays)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    pending = deque()
+    files = iter(cif_files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for cif_file in files:
+                pending.append(executor.submit(export_file, cif_file, arrays))
+                if len(pending) >= workers * READ_AHEAD:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def export_corpus(cif_files, output_file, workers=None, arrays=False):
+    """
+    Exports cif_files to one NDJSON file across a pool of worker processes.
+
+    Parameters:
+        cif_files (list): mmCIF files to export.
+        output_file (str): Path of the NDJSON file, see parse_arguments, or - for standard output.
+        workers (int): Number of worker processes (default: number of CPUs); 1 reads the files in this process.
+        arrays (bool): Every category as column arrays; see block_records.
+
+    Returns:
+        list: One (cif_file, error message or None, blocks) tuple per file, in input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Messages go to standard error when the records go to standard output
+    log = sys.stderr if output_file == "-" else sys.stdout
+    results = []
+    total_bytes = total_blocks = 0
+    start = time.perf_counter()
+    output = sys.stdout if output_file == "-" else open_file(output_file, "w")
+    try:
+        with stage("export_corpus", files=len(cif_files), workers=workers):
+            for cif_file, text, error, size, blocks in _ordered_results(cif_files, workers, arrays):
+                if error is not None:
+                    print(f"FAILED {cif_file}: {error}", file=log)
+                else:
+                    output.write(text)
+                    total_bytes += size
+                    total_blocks += blocks
+                results.append((cif_file, error, blocks))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if result[1] is not None)
+    rate = 1 / elapsed if elapsed else 0.0
+    print(f"Exported {total_blocks} data blocks of {len(results) - failed} files ({failed} failed) in "
+          f"{elapsed:.2f}s: {len(results) * rate:.1f} files/s, {total_blocks * rate:.1f} blocks/s, "
+          f"{total_bytes * rate / 1e6:.1f} MB/s" + ("" if output_file == "-" else f". Saved to {output_file}"),
+          file=log)
+    return results
+
+
+def main():
+    """
+    Parses arguments and exports the corpus. Exits with 1 if a file could not be read.
+    """
+    args = parse_arguments()
+    if args.profile:
+        enable_profiling()
+    try:
+        cif_files = collect_cif_files(args.input_cif)
+        if not cif_files:
+            print(f"Error: No mmCIF files found for {' '.join(args.input_cif)}.")
+            sys.exit(1)
+        results = export_corpus(cif_files, args.output, args.workers, args.arrays)
+    finally:
+        if args.profile:
+            # The summary must not end up among the records on standard output
+            write_profile(args.profile, file=sys.stderr if args.output == "-" else None)
+    if any(result[1] is not None for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+cif_binary.py
+
+Description: This script writes and reads BinaryCIF (https://github.com/molstar/BinaryCIF), the MessagePack form
+of mmCIF. Each column is encoded on its own: integer columns with delta, run-length and integer packing, decimal
+columns as fixed point, everything else as a string array (a table of distinct strings and the index of each
+value in it), and "." and "?" as a mask. For each column the smallest of a few encodings is kept.
+
+Values are written so that reading them back gives the text that PdbxWriter writes for them: a number is only
+stored as one if it is read back as the same text (e.g. "1.50" stays a string), and empty values and None
+become "." and "?" as in text mmCIF.
+
+Example usage:
+    from cif_binary import write_bcif, iter_bcif_categories
+    write_bcif("out.bcif", [("out", {"em_software": {"name": ["IMOD", "RELION"], "version": ["4.11", "3.1"]}})])
+    for category in iter_bcif_categories("out.bcif"):
+        print(category.name, category.to_json())
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import re
+import sys
+from array import array
+from cif_category import Category
+from compressed_io import open_file
+
+VERSION = "0.3.0"
+ENCODER = "json_to_mmcif"
+
+# ByteArray data types of the specification and the array typecode of each, little-endian in the file
+INT8, INT16, INT32, UINT8, UINT16, UINT32, FLOAT32, FLOAT64 = 1, 2, 3, 4, 5, 6, 32, 33
+_TYPECODES = {INT8: "b", INT16: "h", INT32: "i", UINT8: "B", UINT16: "H", UINT32: "I", FLOAT32: "f", FLOAT64: "d"}
+
+# Mask values: present, "." (inapplicable) and "?" (unknown)
+PRESENT, NOT_SPECIFIED, UNKNOWN = 0, 1, 2
+_MASKED = {".": NOT_SPECIFIED, "?": UNKNOWN}
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+# Digits after the point of the largest fixed point factor tried for decimal columns
+MAX_DECIMALS = 6
+_DECIMAL = re.compile(r"-?[0-9]+\.([0-9]*)")
+
+
+def cell(value):
+    """Returns the text of a JSON value in an mmCIF file: None is "?", "" is "." and numbers are str(value)."""
+    if isinstance(value, str):
+        return value if value else "."
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "?"
+
+
+# Encodings. Each takes a list and returns the encoded list or bytes and the encoding record; the records of
+# a column are listed in the order they were applied and undone in reverse.
+
+def byte_array(values, data_type):
+    data = array(_TYPECODES[data_type], values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes(), {"kind": "ByteArray", "type": data_type}
+
+
+def delta(values):
+    if not values:
+        return [], {"kind": "Delta", "origin": 0, "srcType": INT32}
+    return [0] + [values[i] - values[i - 1] for i in range(1, len(values))], \
+        {"kind": "Delta", "origin": values[0], "srcType": INT32}
+
+
+def run_length(values):
+    pairs = []
+    previous, count = None, 0
+    for value in values:
+        if value == previous and count:
+            count += 1
+            continue
+        if count:
+            pairs += (previous, count)
+        previous, count = value, 1
+    if count:
+        pairs += (previous, count)
+    return pairs, {"kind": "RunLength", "srcType": INT32, "srcSize": len(values)}
+
+
+def _packing_limits(values, byte_count):
+    unsigned = not values or min(values) >= 0
+    upper = (1 << 8 * byte_count) - 1 if unsigned else (1 << 8 * byte_count - 1) - 1
+    return unsigned, upper, 0 if unsigned else -upper - 1
+
+
+def packed_length(values, byte_count):
+    """Returns the number of values integer_packing gives, without packing them."""
+    unsigned, upper, lower = _packing_limits(values, byte_count)
+    if not values or max(values) < upper and (unsigned or min(values) > lower):
+        return len(values)
+    return len(values) + sum(value // upper if value >= 0 else value // lower for value in values)
+
+
+def integer_packing(values, byte_count):
+    """Packs int32 values into 1 or 2 bytes each, writing larger ones as a run of limit values plus the rest."""
+    unsigned, upper, lower = _packing_limits(values, byte_count)
+    packed = []
+    for value in values:
+        if value >= 0:
+            while value >= upper:
+                packed.append(upper)
+                value -= upper
+        else:
+            while value <= lower:
+                packed.append(lower)
+                value -= lower
+        packed.append(value)
+    return packed, {"kind": "IntegerPacking", "byteCount": byte_count, "isUnsigned": unsigned,
+                    "srcSize": len(values)}
+
+
+def _packed_type(encoding):
+    if encoding["byteCount"] == 1:
+        return UINT8 if encoding["isUnsigned"] else INT8
+    return UINT16 if encoding["isUnsigned"] else INT16
+
+
+def encode_integers(values):
+    """
+    Encodes int32 values with the smallest of: plain int32, integer packing, and run-length, delta, or delta
+    then run-length before it.
+
+    Returns:
+        dict: {"data": bytes, "encoding": [...]} of the column.
+    """
+    best = byte_array(values, INT32)
+    best = (best[0], [best[1]])
+    for steps in ((), (run_length,), (delta,), (delta, run_length)):
+        encoded, encodings = values, []
+        for step in steps:
+            encoded, encoding = step(encoded)
+            encodings.append(encoding)
+        if steps and steps[0] is delta and encoded and not INT32_MIN <= min(encoded) <= max(encoded) <= INT32_MAX:
+            continue
+        for byte_count in (1, 2):
+            # Large values take many limit values; size them before packing
+            if packed_length(encoded, byte_count) * byte_count >= len(best[0]):
+                continue
+            packed, packing = integer_packing(encoded, byte_count)
+            data, encoding = byte_array(packed, _packed_type(packing))
+            best = (data, encodings + [packing, encoding])
+    return {"data": best[0], "encoding": best[1]}
+
+
+def _fixed_point(texts):
+    """Returns (integers, factor) if every text is a decimal read back exactly from integer / factor, else None."""
+    decimals = 0
+    for text in texts:
+        match = _DECIMAL.fullmatch(text)
+        if match is None:
+            return None
+        decimals = max(decimals, len(match.group(1)))
+    if decimals > MAX_DECIMALS:
+        return None
+    factor = 10 ** decimals
+    integers = [round(float(text) * factor) for text in texts]
+    for text, integer in zip(texts, integers):
+        if not INT32_MIN <= integer <= INT32_MAX or repr(integer / factor) != text:
+            return None
+    return integers, factor
+
+
+def _integers(texts):
+    """Returns the texts as ints if each is an int32 written the way str(int) writes it, else None."""
+    try:
+        integers = [int(text) for text in texts]
+    except ValueError:
+        return None
+    for text, integer in zip(texts, integers):
+        if not INT32_MIN <= integer <= INT32_MAX or str(integer) != text:
+            return None
+    return integers
+
+
+def encode_strings(texts):
+    """Encodes a column as a StringArray; -1 indexes masked values."""
+    positions = {}
+    indices = [positions.setdefault(text, len(positions)) if text is not None else -1 for text in texts]
+    strings = list(positions)
+    offsets = [0]
+    for string in strings:
+        offsets.append(offsets[-1] + _utf16_length(string))
+    index_data, offset_data = encode_integers(indices), encode_integers(offsets)
+    return {"data": index_data["data"],
+            "encoding": [{"kind": "StringArray", "dataEncoding": index_data["encoding"],
+                          "stringData": "".join(strings), "offsetEncoding": offset_data["encoding"],
+                          "offsets": offset_data["data"]}]}
+
+
+def _utf16_length(string):
+    # Offsets count UTF-16 code units, as JavaScript strings do
+    if string.isascii():
+        return len(string)
+    return len(string) + sum(1 for character in string if ord(character) > 0xFFFF)
+
+
+def encode_column(values):
+    """
+    Encodes the values of one column.
+
+    Returns:
+        tuple: (data, mask) - the {"data", "encoding"} of the values and of the mask, mask None if no value
+        is "." or "?".
+    """
+    texts = [cell(value) for value in values]
+    mask = [_MASKED.get(text, PRESENT) for text in texts]
+    if any(mask):
+        present = [text for text, masked in zip(texts, mask) if not masked]
+        mask_data = encode_integers(mask)
+    else:
+        present, mask_data = texts, None
+
+    numbers = None
+    if present:
+        numbers = _integers(present)
+        factor = None
+        if numbers is None:
+            fixed = _fixed_point(present)
+            if fixed is not None:
+                numbers, factor = fixed
+    if numbers is None:
+        return encode_strings([None if masked else text for text, masked in zip(texts, mask)]), mask_data
+
+    if mask_data is not None:
+        values = iter(numbers)
+        numbers = [0 if masked else next(values) for masked in mask]
+    data = encode_integers(numbers)
+    if factor is not None:
+        data["encoding"].insert(0, {"kind": "FixedPoint", "factor": factor, "srcType": FLOAT64})
+    return data, mask_data
+
+
+def encode_category(category):
+    """Returns the BinaryCIF record of a cif_category.Category."""
+    columns = []
+    for item, values in zip(category.items, category.columns):
+        data, mask = encode_column(values)
+        columns.append({"name": item, "data": data, "mask": mask})
+    return {"name": "_" + category.name, "rowCount": category.row_count, "columns": columns}
+
+
+def encode_file(blocks):
+    """
+    Encodes data blocks as a BinaryCIF file.
+
+    Parameters:
+        blocks (iterable): (block name, {category: {item: value}}) tuples, as returned by cif_reader.json_blocks.
+
+    Returns:
+        bytes: The MessagePack content of the file.
+    """
+    import msgpack
+    data_blocks = [{"header": name,
+                    "categories": [encode_category(Category.from_json(category_name, category_data))
+                                   for category_name, category_data in categories.items()]}
+                   for name, categories in blocks]
+    return msgpack.packb({"version": VERSION, "encoder": ENCODER, "dataBlocks": data_blocks}, use_bin_type=True)
+
+
+def write_bcif(bcif_file, blocks):
+    """Writes data blocks to a BinaryCIF file, compressed if its name ends in .gz, .bz2, ...; see encode_file."""
+    content = encode_file(blocks)
+    with open_file(bcif_file, "wb") as file:
+        file.write(content)
+    return True
+
+
+# Decoding
+
+def decode(data, encodings):
+    """Undoes encodings, last applied first, and returns the list of values."""
+    for encoding in reversed(encodings):
+        kind = encoding["kind"]
+        if kind == "ByteArray":
+            values = array(_TYPECODES[encoding["type"]])
+            values.frombytes(data)
+            if sys.byteorder == "big":
+                values.byteswap()
+            data = values.tolist()
+        elif kind == "FixedPoint":
+            factor = encoding["factor"]
+            data = [value / factor for value in data]
+        elif kind == "IntervalQuantization":
+            low, step = encoding["min"], (encoding["max"] - encoding["min"]) / (encoding["numSteps"] - 1)
+            data = [low + step * value for value in data]
+        elif kind == "RunLength":
+            expanded = []
+            for i in range(0, len(data), 2):
+                expanded += [data[i]] * data[i + 1]
+            data = expanded
+        elif kind == "Delta":
+            values, total = [], encoding["origin"]
+            if data:
+                values.append(total)
+                for value in data[1:]:
+                    total += value
+                    values.append(total)
+            data = values
+        elif kind == "IntegerPacking":
+            data = _unpack(data, encoding)
+        elif kind == "StringArray":
+            data = _decode_strings(data, encoding)
+        else:
+            raise ValueError(f"unknown BinaryCIF encoding {kind}")
+    return data
+
+
+def _unpack(data, encoding):
+    bits = 8 * encoding["byteCount"]
+    upper = (1 << bits) - 1 if encoding["isUnsigned"] else (1 << bits - 1) - 1
+    lower = None if encoding["isUnsigned"] else -upper - 1
+    values, total = [], 0
+    for value in data:
+        total += value
+        if value != upper and value != lower:
+            values.append(total)
+            total = 0
+    return values
+
+
+def _decode_strings(data, encoding):
+    offsets = decode(encoding["offsets"], encoding["offsetEncoding"])
+    string_data = encoding["stringData"]
+    if _utf16_length(string_data) == len(string_data):
+        strings = [string_data[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    else:
+        units = string_data.encode("utf-16-le")
+        strings = [units[2 * offsets[i]:2 * offsets[i + 1]].decode("utf-16-le") for i in range(len(offsets) - 1)]
+    return [strings[index] if index >= 0 else None for index in decode(data, encoding["dataEncoding"])]
+
+
+def _text(value, data_type):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return str(value)
+    if data_type == FLOAT32:
+        return format(value, ".7g")
+    return repr(value)
+
+
+def decode_column(column):
+    """Returns the values of a column record as text, with "." and "?" for masked values."""
+    data = column["data"]
+    values = decode(data["data"], data["encoding"])
+    data_type = data["encoding"][-1].get("type")
+    texts = [_text(value, data_type) for value in values]
+    if column.get("mask"):
+        mask = decode(column["mask"]["data"], column["mask"]["encoding"])
+        texts = [text if not masked else "." if masked == NOT_SPECIFIED else "?"
+                 for text, masked in zip(texts, mask)]
+    return texts
+
+
+def read_bcif(bcif_file):
+    """
+    Returns the decoded MessagePack content of a BinaryCIF file, with its columns still encoded. bcif_file may also
+    be the content of the file as bytes.
+    """
+    import msgpack
+    if isinstance(bcif_file, (bytes, bytearray)):
+        data, bcif_file = bcif_file, "the data"
+    else:
+        with open_file(bcif_file, "rb") as file:
+            data = file.read()
+    content = msgpack.unpackb(data, raw=False)
+    if not isinstance(content, dict) or "dataBlocks" not in content:
+        raise ValueError(f"{bcif_file} is not a BinaryCIF file")
+    return content
+
+
+def iter_bcif_categories(bcif_file):
+    """
+    Reads a BinaryCIF file, or its content as bytes, category by category; each category is decoded when it is
+    reached.
+
+    Yields:
+        Category: The categories in file order, their values as text and block set to the data block name.
+    """
+    for data_block in read_bcif(bcif_file)["dataBlocks"]:
+        for category in data_block["categories"]:
+            yield Category(category["name"].lstrip("_"), [column["name"] for column in category["columns"]],
+                           [decode_column(column) for column in category["columns"]], data_block["header"])
+
+
+def bcif_to_text(bcif_file):
+    """Returns the content of a BinaryCIF file (a path or bytes) as text mmCIF, laid out as cif_writer writes it."""
+    from io import StringIO
+    from cif_writer import CifWriter
+    output = StringIO()
+    writer = CifWriter(output)
+    block = None
+    for category in iter_bcif_categories(bcif_file):
+        if category.block != block:
+            if block is not None:
+                writer.end_block()
+            block = category.block
+            writer.begin_block(block)
+        writer.write_columns(category.name, category.items, category.columns)
+    if block is not None:
+        writer.end_block()
+    return output.getvalue()
@@ -0,0 +1,74 @@
+"""
+cif_category.py
+
+Description: This script defines Category, the in-memory form of one mmCIF category used between the reader,
+the merge and the writers. A category keeps one list per item (its column) and nothing else: no per-row lists,
+no per-instance dict. It is built straight from the JSON input or from the loop values of the mmCIF reader, and
+the writers read its columns as they are, so a large loop is held once instead of as rows and columns.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+
+class Category:
+    """
+    One category as column arrays.
+
+    Parameters:
+        name (str): Category name without the leading underscore, e.g. em_imaging.
+        items (list): Item names without the category prefix.
+        columns (list): One list of values per item, all of the same length.
+        block (str): Name of the data block the category was read from, None if it does not matter.
+    """
+
+    __slots__ = ("name", "items", "columns", "block")
+
+    def __init__(self, name, items, columns, block=None):
+        self.name = name
+        self.items = items
+        self.columns = columns
+        self.block = block
+
+    @classmethod
+    def from_json(cls, name, values):
+        """
+        Builds a category from its JSON form, {item: value} for one row or {item: [value, ...]} for a loop.
+
+        Lists are used as columns without copying them. As with insert_data, a loop whose lists have different
+        lengths is cut to the shortest one, and a category mixing lists and single values is one row.
+        """
+        columns = list(values.values())
+        if columns and all(isinstance(column, list) for column in columns):
+            row_count = min(map(len, columns))
+            columns = [column[:row_count] if len(column) > row_count else column for column in columns]
+        else:
+            columns = [[value] for value in columns]
+        return cls(name, list(values), columns)
+
+    @classmethod
+    def from_loop(cls, name, items, values, block=None):
+        """Builds a category from the values of a loop_ in file order, len(items) values per row."""
+        width = len(items)
+        return cls(name, items, [values[i::width] for i in range(width)], block)
+
+    @property
+    def row_count(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def rows(self):
+        """Returns an iterator over the rows as tuples, made one at a time from the columns."""
+        return zip(*self.columns)
+
+    def to_json(self):
+        """
+        Returns the JSON form of the category: {item: value} for a single row, {item: [value, ...]} otherwise.
+        The columns are shared, not copied.
+        """
+        if self.row_count == 1:
+            return {item: column[0] for item, column in zip(self.items, self.columns)}
+        return dict(zip(self.items, self.columns))
+
+    def __repr__(self):
+        return f"Category({self.name!r}, {self.items!r}, {self.row_count} rows)"
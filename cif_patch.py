@@ -0,0 +1,340 @@
+"""
+cif_patch.py
+
+Description: This script merges JSON data into an existing mmCIF file by rewriting only the categories that the
+JSON changes or adds. The input file is indexed into byte ranges per category; every other byte is copied to the
+output unchanged (with copy_file_range where the platform has it), so the cost of a merge follows the size of
+the change rather than the size of the file.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import io
+import os
+import re
+import mmap
+import stat
+import tempfile
+from contextlib import nullcontext
+from collections import namedtuple
+from cif_reader import DATA, LOOP, TAG, VALUE, tokenize, split_tag, parse_categories, json_blocks
+from compressed_io import compression_of, open_file
+
+CategorySpan = namedtuple("CategorySpan", ["block", "name", "start", "end"])
+CategorySpan.__doc__ = """
+Byte range of one category in an mmCIF file: from the start of the line holding its first tag (or its loop_)
+to the end of the line holding its last value, newline included.
+"""
+
+
+# Lines that can change the category structure: the start or end of a text field, or a line starting with a
+# tag or a reserved word. Every other line only holds values (or comments) and is never tokenized.
+# _LINE_CANDIDATE is a cheap pre-filter that skips most value lines without entering Python.
+_STRUCTURE_LINE = re.compile(rb"(;)|[ \t]*(?:_|(?i:data_|loop_|save_|global_|stop_))")
+_LINE_CANDIDATE = re.compile(rb"\n(?:;|[ \t]*[_dDlLsSgG])")
+
+
+def index_categories(input_cif_file):
+    """
+    Builds the byte-offset index of the categories of an mmCIF file.
+
+    Only lines that start with a tag, a reserved word or a text field are tokenized; the rows of a loop are
+    skipped by a regular expression scan of the memory-mapped file. Tags are expected at the start of a line,
+    as mmCIF writers produce them.
+
+    Returns:
+        list: CategorySpan for each category, in file order.
+
+    Raises:
+        ValueError: If two categories share a line, so they cannot be replaced independently.
+    """
+    with open(input_cif_file, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _index(mm)
+
+
+def _index(mm):
+    spans = []
+    block = None
+    current = None         # [name, start, end, loop, loop has values]
+
+    def close():
+        if current is not None and current[0] is not None:
+            if spans and current[1] < spans[-1].end:
+                raise ValueError(f"categories {spans[-1].name} and {current[0]} share a line and cannot be patched")
+            spans.append(CategorySpan(block, current[0], current[1], current[2]))
+
+    def value(end):
+        if current is not None:
+            current[2] = end
+            current[4] = current[3]
+
+    def token(kind, text, start, end):
+        nonlocal block, current
+        if kind is VALUE:
+            value(end)
+        elif kind is TAG:
+            category = split_tag(text)[0]
+            if current is not None and (current[3] and not current[4] or not current[3] and current[0] == category):
+                current[0] = current[0] or category
+                current[2] = end
+            else:
+                close()
+                current = [category, start, end, False, False]
+        else:
+            close()
+            current = [None, start, end, True, False] if kind is LOOP else None
+            if kind is DATA:
+                block = text
+
+    previous_end = 0
+    text_field_start = None
+    for line_start, text_field in _structure_lines(mm):
+        if text_field_start is not None:
+            if not text_field:
+                continue
+            # End of a text field; the rest of the closing line may hold more tokens
+            text_field_start = None
+            line_end = _line_end(mm, line_start)
+            value(line_end)
+            for kind, text, _ in tokenize([mm[line_start + 1:line_end].decode('utf-8')]):
+                token(kind, text, line_start, line_end)
+            previous_end = line_end
+            continue
+
+        values_end = _last_value_line_end(mm, previous_end, line_start)
+        if values_end is not None:
+            value(values_end)
+        if text_field:
+            text_field_start = line_start
+            continue
+        line_end = _line_end(mm, line_start)
+        for kind, text, _ in tokenize([mm[line_start:line_end].decode('utf-8')]):
+            token(kind, text, line_start, line_end)
+        previous_end = line_end
+
+    if text_field_start is not None:
+        raise ValueError(f"unterminated text field at byte {text_field_start}")
+    values_end = _last_value_line_end(mm, previous_end, len(mm))
+    if values_end is not None:
+        value(values_end)
+    close()
+    return spans
+
+
+def _structure_lines(mm):
+    """Yields (line start offset, True for a text field delimiter) for each structure line."""
+    match = _STRUCTURE_LINE.match(mm, 0)
+    if match:
+        yield 0, match.group(1) is not None
+    for candidate in _LINE_CANDIDATE.finditer(mm):
+        match = _STRUCTURE_LINE.match(mm, candidate.start() + 1)
+        if match:
+            yield match.start(), match.group(1) is not None
+
+
+def _line_end(mm, position):
+    end = mm.find(b"\n", position)
+    return len(mm) if end < 0 else end + 1
+
+
+def _last_value_line_end(mm, start, end):
+    """End offset of the last line in start:end that is not blank or a comment, or None."""
+    while end > start:
+        line_start = max(start, mm.rfind(b"\n", start, end - 1) + 1)
+        line = mm[line_start:end].strip()
+        if line and not line.startswith(b"#"):
+            return end
+        end = line_start
+    return None
+
+
+def render_category(name, items, rows):
+    """
+    Formats one category exactly as PdbxWriter lays it out inside a data block.
+
+    Returns:
+        str: The item/value lines, or the loop_ header and rows, ending with a newline and without the
+        surrounding "#" separator lines.
+    """
+    from mmcif.api.DataCategory import DataCategory
+    from mmcif.api.PdbxContainers import DataContainer
+    from mmcif.io.PdbxWriter import PdbxWriter
+
+    category = DataCategory(name)
+    for item in items:
+        category.appendAttribute(item)
+    for row in rows:
+        category.append(row)
+    container = DataContainer("patch")
+    container.append(category)
+    text = io.StringIO()
+    PdbxWriter(text).write([container])
+    # PdbxWriter writes "data_patch\n", "\n", the category, "#" and "#\n"
+    return text.getvalue()[len("data_patch\n\n"):-len("##\n")]
+
+
+def merge_category(items, rows, json_values):
+    """
+    Merges the JSON values of one category into its mmCIF items and rows.
+
+    Items present in the JSON replace the mmCIF column of the same name, other items are kept and new items
+    are appended. Scalars are one row, lists are columns.
+
+    Returns:
+        tuple: (items, rows) of the merged category.
+
+    Raises:
+        ValueError: If the JSON and the mmCIF file have a different number of rows.
+    """
+    columns = {item: [row[i] for row in rows] for i, item in enumerate(items)}
+    row_count = len(rows) if items else None
+    for item, value in json_values.items():
+        column = value if isinstance(value, list) else [value]
+        if row_count is None:
+            row_count = len(column)
+        elif len(column) != row_count:
+            raise ValueError(f"{item} has {len(column)} rows in the JSON but the category has {row_count}")
+        columns[item] = column
+    merged_items = list(columns)
+    merged_rows = [list(row) for row in zip(*columns.values())]
+    return merged_items, merged_rows
+
+
+def patch_mmcif_file(input_cif_file, json_dict, output_cif_file):
+    """
+    Writes input_cif_file to output_cif_file with the categories of json_dict merged in.
+
+    Categories of the first data block that are in the JSON are re-rendered with the merged values; categories
+    only in the JSON are added at the end of that block. JSON data with several blocks ({"data_<name>": ...})
+    patches each block of the file with the same name the same way, and blocks the file does not have are
+    appended to it. All other content, including comments, layout and other data blocks, is copied byte for
+    byte. The output is written to a temporary file and moved into place, so output_cif_file may be
+    input_cif_file.
+
+    If either file is compressed (.gz, .bz2, ...), the input is decompressed into memory instead of being mapped
+    and the output is compressed as it is written, so the unchanged ranges are copied by Python rather than by
+    the kernel.
+
+    Returns:
+        list: Names of the categories that were rewritten or added.
+    """
+    data = None
+    if compression_of(input_cif_file) or compression_of(output_cif_file):
+        with open_file(input_cif_file, 'rb') as file:
+            data = file.read()
+        spans = _index(data) if data else []
+    else:
+        spans = index_categories(input_cif_file)
+    file_blocks = list(dict.fromkeys(span.block for span in spans))
+    targets = dict(json_blocks(json_dict, file_blocks[0] if file_blocks else None))
+
+    # (start, end, category, json values) of each rewritten category, and (offset, [(category, json values)])
+    # of the categories added at the end of each block
+    replacements, insertions, new_blocks, names = [], [], [], []
+    for block, categories in targets.items():
+        block_spans = [span for span in spans if span.block == block]
+        if not block_spans and block is not None:
+            new_blocks.append((block, categories))
+            names.extend(categories)
+            continue
+        patched = {}
+        for span in block_spans:
+            if span.name in categories and span.name not in patched:
+                patched[span.name] = span
+        replacements.extend((span.start, span.end, name, categories[name]) for name, span in patched.items())
+        added = [(name, values) for name, values in categories.items() if name not in patched]
+        insertions.append((block_spans[-1].end if block_spans else None, added))
+        names.extend(list(patched) + [name for name, _ in added])
+    replacements.sort(key=lambda replacement: replacement[0])
+
+    output_dir = os.path.dirname(os.path.abspath(output_cif_file))
+    with tempfile.NamedTemporaryFile(dir=output_dir, suffix=".part", delete=False) as part:
+        try:
+            if data is None:
+                with open(input_cif_file, 'rb') as source:
+                    size = os.fstat(source.fileno()).st_size
+                    with (mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) if size else _EmptyMap()) as mm:
+                        _write_patched(source, mm, size, part, replacements, insertions, new_blocks)
+            else:
+                compression = compression_of(output_cif_file)
+                with (open_file(part, 'wb', compression) if compression else nullcontext(part)) as target:
+                    _write_patched(None, data, len(data), target, replacements, insertions, new_blocks)
+        except BaseException:
+            part.close()
+            os.remove(part.name)
+            raise
+    os.chmod(part.name, stat.S_IMODE(os.stat(input_cif_file).st_mode))
+    os.replace(part.name, output_cif_file)
+    return names
+
+
+def _write_patched(source, mm, size, target, replacements, insertions, new_blocks):
+    """Writes the input bytes mm (of the file source, or None) to target with the edits of patch_mmcif_file."""
+    edits = sorted([(start, end, name, values, False) for start, end, name, values in replacements] +
+                   [(size if at is None else at, size if at is None else at, name, values, True)
+                    for at, added in insertions for name, values in added],
+                   key=lambda edit: (edit[0], edit[4]))
+    offset = 0
+    for start, end, name, values, insert in edits:
+        _copy_range(source, mm, target, offset, start)
+        if insert:
+            items, rows = merge_category([], [], values)
+            target.write(("#\n" + render_category(name, items, rows)).encode('utf-8'))
+        else:
+            original = next(parse_categories(mm[start:end].decode('utf-8').splitlines(True)))
+            items, rows = merge_category(original.items, original.rows, values)
+            target.write(render_category(name, items, rows).encode('utf-8'))
+        offset = end
+    _copy_range(source, mm, target, offset, size)
+    if new_blocks and size and mm[size - 1:size] != b"\n":
+        target.write(b"\n")
+    for block, categories in new_blocks:
+        target.write(f"data_{block}\n".encode('utf-8'))
+        for name, values in categories.items():
+            items, rows = merge_category([], [], values)
+            target.write(("#\n" + render_category(name, items, rows)).encode('utf-8'))
+        target.write(b"#\n")
+
+
+def _copy_range(source, mm, target, start, end):
+    """
+    Copies bytes start:end of source to target, in the kernel if copy_file_range is available. Without a source
+    file (decompressed input) the bytes are written from mm.
+    """
+    if end <= start:
+        return
+    if source is None:
+        target.write(memoryview(mm)[start:end])
+        return
+    target.flush()
+    if hasattr(os, "copy_file_range"):
+        # Counted outside the try, so that a failure after a partial copy resumes after the copied bytes
+        copied = 0
+        try:
+            while copied < end - start:
+                count = os.copy_file_range(source.fileno(), target.fileno(), end - start - copied,
+                                           start + copied)
+                if count == 0:
+                    break
+                copied += count
+        except OSError:
+            pass
+        if copied:
+            target.seek(0, os.SEEK_END)
+        start += copied
+    target.write(memoryview(mm)[start:end])
+
+
+class _EmptyMap(bytes):
+    """Stands in for the mmap of an empty file, which cannot be mapped."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
@@ -0,0 +1,290 @@
+"""
+cif_reader.py
+
+Description: This script reads mmCIF files as a stream of categories. Unlike a line-by-line key/value scan it
+understands loop_ tables, quoted values, semicolon-delimited text fields, comments, data_ blocks and save_
+frames, and it only keeps the category being read in memory.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import re
+from collections import namedtuple
+from cif_category import Category
+from compressed_io import open_file
+
+DATA, LOOP, SAVE, GLOBAL, STOP, TAG, VALUE = "data", "loop", "save", "global", "stop", "tag", "value"
+
+# First bytes of a BinaryCIF file: a MessagePack map (fixmap, map 16 or map 32)
+_BCIF_FIRST_BYTES = set(range(0x80, 0x90)) | {0xde, 0xdf}
+
+# Key prefix of a data block in the JSON form of a file with several blocks: {"data_<name>": {category: ...}}
+BLOCK_PREFIX = "data_"
+
+# One token per match: a comment, a quoted string (closed by a quote followed by whitespace or the end of
+# the line) or any other run of non-blank characters
+_TOKEN = re.compile(r"""[ \t]*(?:#.*|'(.*?)'(?=[ \t]|$)|"(.*?)"(?=[ \t]|$)|(\S+))""")
+
+CifCategory = namedtuple("CifCategory", ["block", "frame", "name", "items", "rows", "loop"])
+CifCategory.__doc__ = """
+One category of an mmCIF file.
+
+    block (str): Name of the data block (without data_), None before the first data_ line.
+    frame (str): Name of the save frame (without save_), None outside save frames.
+    name (str): Category name without the leading underscore, e.g. em_imaging.
+    items (list): Item names without the category prefix, e.g. ["mode", "microscope_model"].
+    rows (list): One list of string values per row, in the order of items.
+    loop (bool): True if the category was written as a loop_.
+"""
+
+
+def tokenize(lines):
+    """
+    Splits mmCIF text into tokens.
+
+    Parameters:
+        lines: Iterable of text lines, e.g. an open file.
+
+    Yields:
+        tuple: (kind, value, line_number) with kind one of DATA, LOOP, SAVE, GLOBAL, STOP, TAG or VALUE.
+        Block and frame names are given without their data_/save_ prefix; a bare save_ has the value "".
+    """
+    text_field = None
+    for line_number, line in enumerate(lines, 1):
+        if text_field is not None:
+            if line.startswith(';'):
+                yield VALUE, "".join(text_field)[:-1], text_start
+                text_field = None
+                line = line[1:]
+            else:
+                text_field.append(line)
+                continue
+        elif line.startswith(';'):
+            text_field = [line[1:].rstrip('\r\n'), "\n"]
+            text_start = line_number
+            continue
+
+        if "'" in line or '"' in line or '#' in line:
+            words = _split_quoted(line.rstrip('\r\n'))
+        else:
+            words = line.split()
+        for word in words:
+            if word.__class__ is _Quoted:
+                yield VALUE, str(word), line_number
+                continue
+            first = word[0]
+            if first == '_':
+                yield TAG, word, line_number
+            elif first in 'dD' and word[:5].lower() == 'data_':
+                yield DATA, word[5:], line_number
+            elif first in 'lL' and word.lower() == 'loop_':
+                yield LOOP, word, line_number
+            elif first in 'sS' and word[:5].lower() == 'save_':
+                yield SAVE, word[5:], line_number
+            elif first in 'gG' and word.lower() == 'global_':
+                yield GLOBAL, word, line_number
+            elif first in 'sS' and word.lower() == 'stop_':
+                yield STOP, word, line_number
+            else:
+                yield VALUE, word, line_number
+    if text_field is not None:
+        raise ValueError(f"line {text_start}: unterminated text field")
+
+
+class _Quoted(str):
+    """A value that was quoted in the file, so it is never read as a keyword or tag."""
+    __slots__ = ()
+
+
+def _split_quoted(line):
+    words = []
+    for match in _TOKEN.finditer(line):
+        single, double, word = match.groups()
+        if word is not None:
+            words.append(word)
+        elif single is not None:
+            words.append(_Quoted(single))
+        elif double is not None:
+            words.append(_Quoted(double))
+        # otherwise a comment or trailing blanks
+    return words
+
+
+def split_tag(tag):
+    """Splits _category.item into (category, item); tags without a dot have an empty item name."""
+    category, _, item = tag[1:].partition('.')
+    return category, item
+
+
+def iter_categories(input_cif_file, columns=False):
+    """
+    Reads an mmCIF file category by category.
+
+    Only the category being read is kept in memory, so files of any size can be scanned as long as their
+    largest category fits. BinaryCIF files are read with cif_binary; their columns are decoded one category
+    at a time. Compressed files (.gz, .bz2, .xz, .zst) are decompressed as they are read.
+
+    Parameters:
+        columns (bool): Yield cif_category.Category objects, whose loop columns are sliced straight from the
+            values in the file, instead of CifCategory rows. Save frames are not told apart.
+
+    Yields:
+        CifCategory or Category: The categories in file order.
+
+    Raises:
+        ValueError: If the file is not well-formed mmCIF, with the offending line number.
+    """
+    if is_bcif(input_cif_file):
+        from cif_binary import iter_bcif_categories
+        for category in iter_bcif_categories(input_cif_file):
+            if columns:
+                yield category
+            else:
+                yield CifCategory(category.block, None, category.name, category.items,
+                                  [list(row) for row in category.rows()], category.row_count != 1)
+        return
+    with open_file(input_cif_file, 'r') as file:
+        yield from parse_categories(file, columns)
+
+
+def is_bcif(input_cif_file):
+    """
+    True if input_cif_file is BinaryCIF rather than text mmCIF, judged by its first byte; False if unreadable.
+    input_cif_file may also be the content of a file as bytes.
+    """
+    if isinstance(input_cif_file, (bytes, bytearray)):
+        return bool(input_cif_file) and input_cif_file[0] in _BCIF_FIRST_BYTES
+    try:
+        with open_file(input_cif_file, 'rb') as file:
+            first = file.read(1)
+    except (OSError, TypeError):
+        return False
+    return bool(first) and first[0] in _BCIF_FIRST_BYTES
+
+
+def parse_categories(lines, columns=False):
+    """Same as iter_categories, for any iterable of text lines."""
+    block = frame = None
+    pair = None        # CifCategory collecting "_cat.item value" pairs
+    tag = None         # item of pair still waiting for its value
+    loop = None        # CifCategory of the loop_ being read
+    loop_values = None
+
+    def finish_loop(line_number):
+        width = len(loop.items)
+        if not width or len(loop_values) % width:
+            raise ValueError(f"line {line_number}: loop_ of {loop.name} has {len(loop_values)} values "
+                             f"for {width} items")
+        if columns:
+            return Category.from_loop(loop.name, loop.items, loop_values, loop.block)
+        loop.rows.extend(loop_values[i:i + width] for i in range(0, len(loop_values), width))
+        return loop
+
+    def finish_pair():
+        if columns:
+            return Category(pair.name, pair.items, [[value] for value in pair.rows[0]], pair.block)
+        return pair
+
+    for kind, value, line_number in tokenize(lines):
+        if kind is VALUE:
+            if tag is not None:
+                pair.items.append(tag)
+                pair.rows[0].append(value)
+                tag = None
+            elif loop is not None:
+                loop_values.append(value)
+            else:
+                raise ValueError(f"line {line_number}: value {value!r} without a tag")
+            continue
+        if tag is not None:
+            raise ValueError(f"line {line_number}: _{pair.name}.{tag} has no value")
+
+        if loop is not None:
+            if kind is TAG and not loop_values:
+                category, item = split_tag(value)
+                if loop.name is None:
+                    loop = loop._replace(name=category)
+                elif category != loop.name:
+                    raise ValueError(f"line {line_number}: {value} in loop_ of {loop.name}")
+                loop.items.append(item)
+                continue
+            yield finish_loop(line_number)
+            loop = None
+
+        if kind is TAG:
+            category, item = split_tag(value)
+            if pair is not None and pair.name != category:
+                yield finish_pair()
+                pair = None
+            if pair is None:
+                pair = CifCategory(block, frame, category, [], [[]], False)
+            tag = item
+            continue
+
+        if pair is not None:
+            yield finish_pair()
+            pair = None
+        if kind is LOOP:
+            loop = CifCategory(block, frame, None, [], [], True)
+            loop_values = []
+        elif kind is DATA:
+            block, frame = value, None
+        elif kind is SAVE:
+            frame = value or None
+
+    if tag is not None:
+        raise ValueError(f"_{pair.name}.{tag} has no value at the end of the file")
+    if loop is not None:
+        yield finish_loop("end of file")
+    if pair is not None:
+        yield finish_pair()
+
+
+def category_to_json(category):
+    """
+    Converts a CifCategory to the JSON form used by the converter.
+
+    A single row becomes {item: value}; several rows become column arrays {item: [value, ...]}.
+    """
+    if isinstance(category, Category):
+        return category.to_json()
+    if len(category.rows) == 1:
+        return dict(zip(category.items, category.rows[0]))
+    return {item: [row[i] for row in category.rows] for i, item in enumerate(category.items)}
+
+
+def is_multiblock(json_dict):
+    """True if json_dict holds data blocks ({"data_<name>": {category: ...}}) rather than categories."""
+    return bool(json_dict) and all(key.startswith(BLOCK_PREFIX) for key in json_dict)
+
+
+def json_blocks(json_dict, default_name=None):
+    """
+    Splits the JSON form of an mmCIF file into its data blocks.
+
+    A JSON document holding several entries has one "data_<name>" key per entry, each holding the categories of
+    that entry; any other document is the categories of a single block named default_name.
+
+    Returns:
+        list: (block name, {category: {item: value}}) tuples, in document order.
+
+    Raises:
+        ValueError: If the document mixes data blocks and categories.
+    """
+    if not is_multiblock(json_dict):
+        if any(key.startswith(BLOCK_PREFIX) for key in json_dict):
+            raise ValueError("the JSON mixes data_ blocks and categories at the top level")
+        return [(default_name, json_dict)]
+    return [(key[len(BLOCK_PREFIX):], categories) for key, categories in json_dict.items()]
+
+
+def blocks_to_json(blocks):
+    """
+    Joins {block name: categories} into the JSON form of a file: the categories themselves for a single block,
+    or {"data_<name>": categories} for several.
+    """
+    if len(blocks) <= 1:
+        return next(iter(blocks.values()), {})
+    return {BLOCK_PREFIX + name: categories for name, categories in blocks.items()}
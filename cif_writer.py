@@ -0,0 +1,281 @@
+"""
+cif_writer.py
+
+Description: This script writes mmCIF data blocks with the same layout as mmcif.io.PdbxWriter (column
+alignment, quoting and "#" separators) without building DataContainer/DataCategory objects. Loop rows are
+consumed in chunks from a source that can be read twice: once to measure column widths and types, once to
+write, so a category of any length is written with bounded memory.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import re
+from itertools import islice
+
+SPACING = "  "
+# Rows joined into one string per write() in write_columns
+WRITE_ROWS = 10000
+
+# PdbxWriter data types, in increasing order of precedence for a column
+DT_NULL_VALUE, DT_INTEGER, DT_FLOAT, DT_UNQUOTED_STRING, DT_ITEM_NAME, DT_DOUBLE_QUOTED_STRING, \
+    DT_SINGLE_QUOTED_STRING, DT_MULTI_LINE_STRING = range(8)
+
+FT_NULL_VALUE, FT_NUMBER, FT_UNQUOTED_STRING, FT_QUOTED_STRING, FT_MULTI_LINE_STRING = \
+    "FT_NULL_VALUE", "FT_NUMBER", "FT_UNQUOTED_STRING", "FT_QUOTED_STRING", "FT_MULTI_LINE_STRING"
+FORMAT_TYPES = [FT_NULL_VALUE, FT_NUMBER, FT_NUMBER, FT_UNQUOTED_STRING, FT_QUOTED_STRING, FT_QUOTED_STRING,
+                FT_QUOTED_STRING, FT_MULTI_LINE_STRING]
+
+# The expressions of mmcif.api.DataCategoryFormatted
+_WS_AND_QUOTES = re.compile(r"[\s'\"#]")
+_NEWLINE = re.compile(r"[\n\r]")
+_INTEGER = re.compile(r"^[0-9]+$")
+_FLOAT = re.compile(r"^-?(([0-9]+)[.]?|([0-9]*[.][0-9]+))([(][0-9]+[)])?([eE][+-]?[0-9]+)?$")
+_RESERVED_PREFIXES = ("data_", "loop_", "save_", "stop_")
+
+# The same tests applied to a whole column at once, joined with newlines (see _format_column)
+_NUMBER_OR_NULL = r"(?:-?(?:[0-9]+[.]?|[0-9]*[.][0-9]+)(?:[(][0-9]+[)])?(?:[eE][+-]?[0-9]+)?|[.?]|)"
+_NUMBER_COLUMN = re.compile(_NUMBER_OR_NULL + r"(?:\n" + _NUMBER_OR_NULL + r")*")
+_NULL_COLUMN = re.compile(r"[.?]?(?:\n[.?]?)*")
+_ITEM_NAME_IN_COLUMN = re.compile(r"(?:^|\n)_")
+_QUOTE_OR_RETURN = re.compile(r"['\"\r]")
+_NEEDS_QUOTES = re.compile(r"[^\S\n]|#")
+_QUOTED_LINE = re.compile(r"(?m)^[^\n]*(?:[^\S\n]|#)[^\n]*$")
+_CHANGED_BY_FORMAT = re.compile(r"(?:^|\n)(?:[_\[\]$;]|(?i:data_|loop_|save_|stop_|global_)|(?=\n|$))")
+
+
+def format_value(value):
+    """Returns value as written by PdbxWriter: unquoted, quoted or as a semicolon text field."""
+    if value is None:
+        return "?"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if not isinstance(value, str):
+        return "?"
+    if _INTEGER.search(value) or _FLOAT.search(value):
+        return value
+    if value == "." or value == "?":
+        return value
+    if value == "":
+        return "."
+    if not _WS_AND_QUOTES.search(value):
+        if value[0] in "_[]$#;" or value[:5].lower() in _RESERVED_PREFIXES or value[:7].lower() == "global_":
+            return '"' + value + '"'
+        return value
+    if _NEWLINE.search(value):
+        return _text_field(value)
+    if '"' not in value:
+        return '"' + value + '"'
+    if "'" not in value:
+        return "'" + value + "'"
+    return _text_field(value)
+
+
+def _text_field(value):
+    if value[-1] == "\n":
+        return "\n;" + value + ";\n"
+    return "\n;" + value + "\n;\n"
+
+
+def data_type(value):
+    """Returns the PdbxWriter data type of value, which decides how its column is aligned."""
+    if value is None:
+        return DT_NULL_VALUE
+    if isinstance(value, int):
+        return DT_INTEGER
+    if isinstance(value, float):
+        return DT_FLOAT
+    if _INTEGER.search(value):
+        return DT_INTEGER
+    if _FLOAT.search(value):
+        return DT_FLOAT
+    if value == "." or value == "?" or value == "":
+        return DT_NULL_VALUE
+    if not _WS_AND_QUOTES.search(value):
+        return DT_ITEM_NAME if value.startswith("_") else DT_UNQUOTED_STRING
+    if _NEWLINE.search(value):
+        return DT_MULTI_LINE_STRING
+    if "'" not in value:
+        return DT_DOUBLE_QUOTED_STRING
+    if '"' not in value:
+        return DT_SINGLE_QUOTED_STRING
+    return DT_MULTI_LINE_STRING
+
+
+def value_length(value):
+    """Length PdbxWriter uses for column widths: that of the unformatted value."""
+    return len(value) if isinstance(value, str) else len(str(value))
+
+
+def _format_column(column):
+    """
+    Returns (formatted values, format type, maximum value length) of a column as PdbxWriter works them out.
+
+    Columns of strings without quotes or line breaks, the usual case for large loops, are classified and
+    quoted with a few regular expressions over the joined column instead of value by value.
+    """
+    if all(value.__class__ is str for value in column):
+        max_length = max(map(len, column))
+        joined = "\n".join(column)
+        if joined.count("\n") == len(column) - 1 and not _QUOTE_OR_RETURN.search(joined):
+            if _CHANGED_BY_FORMAT.search(joined):
+                texts = list(map(format_value, column))
+            elif _NEEDS_QUOTES.search(joined):
+                return _QUOTED_LINE.sub(r'"\g<0>"', joined).split("\n"), FT_QUOTED_STRING, max_length
+            else:
+                texts = column
+            if _NEEDS_QUOTES.search(joined):
+                return texts, FT_QUOTED_STRING, max_length
+            if _NULL_COLUMN.fullmatch(joined):
+                return texts, FT_NULL_VALUE, max_length
+            if _NUMBER_COLUMN.fullmatch(joined):
+                return texts, FT_NUMBER, max_length
+            if _ITEM_NAME_IN_COLUMN.search(joined):
+                return texts, FT_QUOTED_STRING, max_length
+            return texts, FT_UNQUOTED_STRING, max_length
+    else:
+        max_length = max(map(value_length, column))
+    return list(map(format_value, column)), FORMAT_TYPES[max(map(data_type, column))], max_length
+
+
+class CifWriter:
+    """
+    Writes mmCIF data blocks to a text stream.
+
+    Usage:
+        writer = CifWriter(stream)
+        writer.begin_block("entry")
+        writer.write_category("em_imaging", ["mode"], [["BRIGHT FIELD"]])
+        writer.write_loop("em_software", ["name", "version"], lambda: iter([rows_chunk_1, rows_chunk_2]))
+        writer.end_block()
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def begin_block(self, name):
+        self.stream.write("data_%s\n" % name)
+
+    def end_block(self):
+        self.stream.write("#\n")
+
+    def write_category(self, name, items, rows):
+        """Writes a category whose rows are all in memory."""
+        self.write_loop(name, items, lambda: iter([rows]))
+
+    def write_loop(self, name, items, row_chunks):
+        """
+        Writes a category from row chunks.
+
+        Parameters:
+            name (str): Category name.
+            items (list): Item names.
+            row_chunks: Callable returning a new iterator over lists of rows each time it is called. It is
+                called twice: to measure the columns and to write them.
+        """
+        width = len(items)
+        if not width:
+            return
+        row_count = 0
+        max_lengths = [0] * width
+        max_types = [DT_NULL_VALUE] * width
+        first_row = None
+        for chunk in row_chunks():
+            for row in chunk:
+                if first_row is None:
+                    first_row = row
+                row_count += 1
+                for i in range(width):
+                    value = row[i]
+                    length = value_length(value)
+                    if length > max_lengths[i]:
+                        max_lengths[i] = length
+                    value_type = data_type(value)
+                    if value_type > max_types[i]:
+                        max_types[i] = value_type
+
+        if row_count == 0:
+            return
+        if row_count == 1:
+            self._write_item_values(name, items, first_row)
+        else:
+            self._write_table(name, items, row_chunks(), [FORMAT_TYPES[t] for t in max_types], max_lengths)
+        self.stream.write("#")
+
+    def write_columns(self, name, items, columns):
+        """
+        Writes a category from column arrays that are all in memory.
+
+        Widths, types and formatting are computed a column at a time with map() over the whole column instead
+        of value by value, which is where most of the time of PdbxWriter goes on large loops.
+
+        Parameters:
+            name (str): Category name.
+            items (list): Item names.
+            columns (list): One list of values per item, all of the same length.
+        """
+        if not items:
+            return
+        row_count = len(columns[0])
+        if row_count == 0:
+            return
+        if row_count == 1:
+            self._write_item_values(name, items, [column[0] for column in columns])
+            self.stream.write("#")
+            return
+
+        last = len(items) - 1
+        columns = [_format_column(column) for column in columns]
+        template = []
+        for i, (texts, format_type, max_length) in enumerate(columns):
+            if format_type == FT_NUMBER:
+                template.append("%%%ds" % max_length)
+            elif format_type == FT_MULTI_LINE_STRING or format_type == FT_QUOTED_STRING and i == last:
+                template.append("%s")
+            elif format_type == FT_QUOTED_STRING:
+                template.append("%%-%ds" % (max_length + 2))
+            else:
+                template.append("%%-%ds" % max_length)
+        template = SPACING.join(template) + SPACING
+
+        write = self.stream.write
+        write("\nloop_" + "".join("\n_%s.%s" % (name, item) for item in items))
+        rows = zip(*(texts for texts, _, _ in columns))
+        for start in range(0, row_count, WRITE_ROWS):
+            write("\n" + "\n".join([template % row for row in islice(rows, WRITE_ROWS)]))
+        write("\n#")
+
+    def _write_item_values(self, name, items, row):
+        name_width = len(SPACING) + len(name) + max(len(item) for item in items) + 2
+        lines = ["\n"]
+        for item, value in zip(items, row):
+            lines.append(("_%s.%s" % (name, item)).ljust(name_width))
+            lines.append(format_value(value))
+            lines.append("\n")
+        self.stream.write("".join(lines))
+
+    def _write_table(self, name, items, row_chunks, format_types, max_lengths):
+        self.stream.write("\nloop_" + "".join("\n_%s.%s" % (name, item) for item in items))
+        last = len(items) - 1
+        cells = []
+        for i, (format_type, max_length) in enumerate(zip(format_types, max_lengths)):
+            if format_type == FT_NUMBER:
+                cells.append(lambda text, n=max_length: text.rjust(n))
+            elif format_type == FT_QUOTED_STRING:
+                cells.append((lambda text: text) if i == last else (lambda text, n=max_length + 2: text.ljust(n)))
+            elif format_type == FT_MULTI_LINE_STRING:
+                cells.append(lambda text: text)
+            else:
+                cells.append(lambda text, n=max_length: text.ljust(n))
+
+        write = self.stream.write
+        for chunk in row_chunks:
+            lines = []
+            for row in chunk:
+                lines.append("\n")
+                for cell, value in zip(cells, row):
+                    lines.append(cell(format_value(value)))
+                    lines.append(SPACING)
+            write("".join(lines))
+        write("\n")
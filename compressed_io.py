@@ -0,0 +1,103 @@
+"""
+compressed_io.py
+
+Description: This script opens the input and output files of the converter whether they are plain or compressed
+with gzip (.gz), bz2 (.bz2), xz (.xz) or, when the zstandard package is installed, zstd (.zst). The compression
+is chosen by the file extension or given explicitly, and the data is compressed and decompressed as it is read
+and written, so a compressed file is never expanded on disk. It also names output files after their input,
+whatever dots the path holds.
+
+Example usage:
+    from compressed_io import open_file, base_name
+    with open_file("session.json.gz", "r") as file:
+        data = json.load(file)
+    base_name("runs/v1.2/session.json.gz")     (runs/v1.2/session)
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+
+# File extension of each compression, without the dot
+COMPRESSIONS = ("gz", "bz2", "xz", "zst")
+# gzip level of written files: close to the size of level 9 at a fraction of the time
+GZIP_LEVEL = 6
+# First bytes of data of each compression, to recognise compressed content held in memory
+MAGIC_NUMBERS = {"gz": b"\x1f\x8b", "bz2": b"BZh", "xz": b"\xfd7zXZ\x00", "zst": b"\x28\xb5\x2f\xfd"}
+
+
+def compression_of(path):
+    """Returns the compression of path from its extension ("gz", "bz2", "xz" or "zst"), or None."""
+    extension = os.path.splitext(path)[1][1:].lower()
+    return extension if extension in COMPRESSIONS else None
+
+
+def strip_compression(path):
+    """Returns path without its compression extension, e.g. a.cif for a.cif.gz."""
+    return os.path.splitext(path)[0] if compression_of(path) else path
+
+
+def decompress(data):
+    """Returns data (bytes) decompressed if it starts with the magic number of a compression, or as it is."""
+    for compression, magic in MAGIC_NUMBERS.items():
+        if data.startswith(magic):
+            import io
+            with open_file(io.BytesIO(data), "rb", compression) as file:
+                return file.read()
+    return data
+
+
+def base_name(path):
+    """
+    Returns path without its compression extension and its file extension, the name the outputs of a
+    conversion are made from: runs/v1.2/session for runs/v1.2/session.json.gz.
+    """
+    path = strip_compression(path)
+    root, extension = os.path.splitext(path)
+    return root if extension else path
+
+
+def open_file(file, mode="r", compression=None, **kwargs):
+    """
+    Opens a plain or compressed file, like open.
+
+    Parameters:
+        file (str or file object): Path, or a binary file object to compress to or decompress from.
+        mode (str): "r", "w", "a" or "x", with "b" for binary data; text otherwise.
+        compression (str): "gz", "bz2", "xz", "zst", or "none" for a plain file. By default it is given by the
+            extension of a path, and a file object is plain.
+        **kwargs: Passed on to open (e.g. buffering, errors); the compressed file types take encoding, errors and
+            newline in text mode.
+
+    Raises:
+        ImportError: For zstd if the zstandard package is not installed.
+    """
+    if compression is None:
+        compression = compression_of(file) if isinstance(file, (str, os.PathLike)) else "none"
+    if compression in ("none", None):
+        return open(file, mode, **kwargs)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression {compression!r}; use one of none, {', '.join(COMPRESSIONS)}")
+
+    # Compressed files buffer on their own
+    kwargs.pop("buffering", None)
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+    if compression == "gz":
+        import gzip
+        if "r" not in mode:
+            kwargs["compresslevel"] = GZIP_LEVEL
+        return gzip.open(file, mode, **kwargs)
+    if compression == "bz2":
+        import bz2
+        return bz2.open(file, mode, **kwargs)
+    if compression == "xz":
+        import lzma
+        return lzma.open(file, mode, **kwargs)
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd files need the zstandard package: pip install zstandard") from e
+    return zstandard.open(file, mode, **kwargs)
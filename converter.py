@@ -0,0 +1,418 @@
+"""
+converter.py
+
+Description: This script converts JSON to mmCIF in memory, for services that embed the converter in a long-lived
+process. A Converter takes the JSON as a dict, as text or bytes (compressed or not) or as a readable stream,
+optionally merges it into mmCIF held the same way, and returns text mmCIF as str, BinaryCIF or compressed output
+as bytes, or writes either to a writable stream; nothing touches the disk. The dictionary, the in-process
+validator and the dictionary index are loaded the first time a conversion needs them and then reused, so each
+request only pays for its own data. json_to_mmcif.py writes its output files through the same Converter and
+imports the merging and container helpers from here.
+
+Example usage:
+    from converter import Converter
+    converter = Converter(writer="native")
+    cif_text = converter.convert({"em_imaging": {"mode": "BRIGHT FIELD"}}, block_name="session")
+    valid, report = converter.validate(cif_text)
+    converter.convert(request.body, cif=model_bytes, output=response, output_format="cif.gz")
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import io
+import os
+import json
+import threading
+from cif_category import Category
+from cif_reader import (BLOCK_PREFIX, parse_categories, category_to_json, is_bcif, is_multiblock, json_blocks,
+                        blocks_to_json)
+from compressed_io import decompress, open_file
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary
+from profiling import stage
+
+# Name of the data block of converted data with a single block
+DEFAULT_BLOCK = "converted"
+
+
+class Converter:
+    """
+    Converts JSON data to mmCIF or BinaryCIF in memory and validates it in process.
+
+    Resources are loaded lazily and once per converter: the dictionary is looked up (or downloaded) and parsed for
+    validation the first time validate is called, and its index the first time check is called. Conversions can
+    run on several threads at once; validations run one at a time, since the validator is not thread-safe.
+
+    Parameters:
+        writer (str): "pdbx" to write mmCIF with PdbxWriter, "native" for the column writer of cif_writer, which
+            gives the same output faster.
+        dic_file (str): Dictionary to validate against (default: the cached dictionary of mmcif_dictionary).
+        download_dict (str): "yes" to refresh the cached dictionary if it has expired, "no" to use it as it is.
+        dict_ttl (float): Seconds a downloaded dictionary is reused before checking for a newer one.
+    """
+
+    def __init__(self, writer="pdbx", dic_file=None, download_dict="no", dict_ttl=DEFAULT_TTL):
+        self.writer = writer
+        self.download_dict = download_dict
+        self.dict_ttl = dict_ttl
+        self._dic_file = dic_file
+        self._validator = None
+        self._index = None
+        self._loading = threading.Lock()
+        self._validating = threading.Lock()
+
+    @property
+    def dictionary(self):
+        """
+        Path of the dictionary, looked up the first time it is needed.
+
+        Raises:
+            FileNotFoundError: If there is no dictionary (download it with download_dict "yes").
+        """
+        if self._dic_file is None:
+            with self._loading:
+                if self._dic_file is None:
+                    dic_file = get_dictionary(self.download_dict, ttl=self.dict_ttl)
+                    if not os.path.isfile(dic_file):
+                        raise FileNotFoundError(f"No mmCIF dictionary at {dic_file}; use download_dict='yes'")
+                    self._dic_file = dic_file
+        return self._dic_file
+
+    @property
+    def validator(self):
+        """The mmcif_validator.MmcifValidator of the dictionary, parsed the first time it is needed."""
+        if self._validator is None:
+            dic_file = self.dictionary
+            with self._loading:
+                if self._validator is None:
+                    from mmcif_validator import MmcifValidator
+                    with stage("load_validator"):
+                        self._validator = MmcifValidator(dic_file)
+        return self._validator
+
+    @property
+    def index(self):
+        """The dictionary_index.DictionaryIndex of the dictionary, compiled or loaded the first time it is needed."""
+        if self._index is None:
+            dic_file = self.dictionary
+            with self._loading:
+                if self._index is None:
+                    from dictionary_index import load_index
+                    with stage("load_index"):
+                        self._index = load_index(dic_file)
+        return self._index
+
+    def load(self, source):
+        """
+        Returns the JSON data of source.
+
+        Parameters:
+            source: A dict, which is returned as it is, JSON text (str), JSON bytes, compressed or not, or a
+                readable stream of either.
+
+        Raises:
+            ValueError: If source is not valid JSON.
+            TypeError: If source is none of the above.
+        """
+        if isinstance(source, dict):
+            return source
+        data = _read(source)
+        if not isinstance(data, (str, bytes)):
+            raise TypeError(f"cannot read JSON from {type(source).__name__}")
+        return json.loads(data)
+
+    def read_cif(self, cif, blocks=False):
+        """
+        Returns mmCIF held in memory as JSON, as json_to_mmcif.mmcif_to_json does for a file.
+
+        Parameters:
+            cif: Text mmCIF (str), text mmCIF or BinaryCIF as bytes, compressed or not, or a readable stream of
+                either.
+            blocks (bool): Key a single data block by data_<name> too.
+        """
+        data = _read(cif)
+        if isinstance(data, bytes):
+            if is_bcif(data):
+                from cif_binary import iter_bcif_categories
+                return categories_to_json(iter_bcif_categories(data), blocks)
+            data = data.decode("utf-8")
+        if not isinstance(data, str):
+            raise TypeError(f"cannot read mmCIF from {type(cif).__name__}")
+        return categories_to_json(parse_categories(io.StringIO(data), columns=True), blocks)
+
+    def merge(self, source, cif):
+        """
+        Merges JSON data into mmCIF held in memory (see load and read_cif for the forms they may take) and returns
+        the merged data; see merge_json_into_cif.
+        """
+        json_dict = self.load(source)
+        return merge_json_into_cif(self.read_cif(cif, is_multiblock(json_dict)), json_dict)
+
+    def convert(self, source, cif=None, output=None, output_format="cif", block_name=DEFAULT_BLOCK):
+        """
+        Converts JSON data to mmCIF, merged into cif if it is given.
+
+        Parameters:
+            source: JSON data; see load.
+            cif: mmCIF to merge the data into; see read_cif.
+            output: Writable stream to write the result to (default: return it).
+            output_format (str): "cif" or "bcif", optionally followed by a compression, e.g. "cif.gz".
+            block_name (str): Name of the data block of data with a single block.
+
+        Returns:
+            str for text mmCIF, bytes for BinaryCIF or compressed output, or output if it is given.
+
+        Raises:
+            ValueError: If the data cannot be written, e.g. a category has columns of different lengths.
+        """
+        data = self.merge(source, cif) if cif is not None else self.load(source)
+        stream = output
+        if output is None:
+            stream = io.StringIO() if output_format == "cif" else io.BytesIO()
+        if not self.write(data, stream, block_name, output_format):
+            raise ValueError("the data could not be written as mmCIF")
+        return output if output is not None else stream.getvalue()
+
+    def write(self, data, output, block_name=DEFAULT_BLOCK, output_format="cif"):
+        """
+        Writes converted data to a writable stream.
+
+        Parameters:
+            data (dict): JSON data, e.g. as returned by load or merge.
+            output: Text or binary stream for mmCIF; a binary stream, or a text stream with a buffer like
+                sys.stdout, for BinaryCIF and compressed output.
+            block_name (str): Name of the data block of data with a single block.
+            output_format (str): "cif" or "bcif", optionally followed by a compression, e.g. "bcif.gz".
+
+        Returns:
+            bool: True if the data was written, False if a category is inconsistent (pdbx writer).
+        """
+        blocks = json_blocks(data, block_name)
+        binary = is_bcif_format(output_format)
+        compression = output_format.partition(".")[2] or None
+        if compression is not None:
+            with open_file(_binary_stream(output), "wb" if binary else "w", compression) as stream:
+                return self._write_blocks(blocks, stream, binary)
+        if binary:
+            return self._write_blocks(blocks, _binary_stream(output), binary)
+        if isinstance(output, io.TextIOBase):
+            return self._write_blocks(blocks, output, binary)
+        stream = io.TextIOWrapper(output, encoding="utf-8")
+        try:
+            return self._write_blocks(blocks, stream, binary)
+        finally:
+            # Flushed into output, which stays open
+            stream.detach()
+
+    def _write_blocks(self, blocks, stream, binary):
+        if binary:
+            from cif_binary import encode_file
+            stream.write(encode_file(blocks))
+            return True
+        if self.writer == "native":
+            from cif_writer import CifWriter
+            writer = CifWriter(stream)
+            for block_name, categories in blocks:
+                writer.begin_block(block_name)
+                for category_name, category_data in categories.items():
+                    # The JSON lists are written as they are, without copying them into rows
+                    category = Category.from_json(category_name, category_data)
+                    writer.write_columns(category.name, category.items, category.columns)
+                writer.end_block()
+            return True
+
+        failed = []
+        result = write_containers(_build_block_containers(blocks, failed), stream)
+        if failed:
+            return False
+        if not result:
+            print("Error: Failed to write mmCIF file.")
+        return result
+
+    def validate(self, cif, source="string"):
+        """
+        Validates mmCIF held in memory against the dictionary, without writing it to disk.
+
+        Parameters:
+            cif: The result of convert, or any mmCIF that read_cif accepts.
+            source (str): Name of the data in the report, in place of a file name.
+
+        Returns:
+            tuple: (bool, str) - whether the data is valid and the text of the validation report, as
+            mmcif_validator.MmcifValidator.validate_file gives it.
+        """
+        data = _read(cif)
+        if isinstance(data, bytes):
+            if is_bcif(data):
+                from cif_binary import bcif_to_text
+                data = bcif_to_text(data)
+            else:
+                data = data.decode("utf-8")
+        validator = self.validator
+        with self._validating:
+            return validator.validate_string(data, source)
+
+    def check(self, source, block_name=DEFAULT_BLOCK):
+        """
+        Checks JSON data against the dictionary index, the fast check of json_to_mmcif.py --precheck, without
+        converting it.
+
+        Returns:
+            tuple: (bool, list) - False if a value would fail validation, and the problems found.
+        """
+        index = self.index
+        valid, problems = True, []
+        for name, categories in json_blocks(self.load(source), block_name):
+            block_valid, block_problems = index.check(categories, name)
+            valid = valid and block_valid
+            problems.extend(block_problems)
+        return valid, problems
+
+
+def categories_to_json(categories, blocks=False):
+    """
+    Joins cif_category.Category objects, e.g. read from mmCIF held in memory, into JSON as
+    json_to_mmcif.mmcif_to_json does.
+    """
+    data_blocks = {}
+    for category in categories:
+        block = data_blocks.setdefault(category.block or "", {})
+        block.setdefault(category.name, {}).update(category_to_json(category))
+    if blocks:
+        return {BLOCK_PREFIX + name: categories for name, categories in data_blocks.items()}
+    return blocks_to_json(data_blocks)
+
+
+def is_bcif_format(output_format):
+    """True if output_format is BinaryCIF, compressed or not."""
+    return output_format.split(".")[0] == "bcif"
+
+
+def write_containers(data_list, stream):
+    """Writes DataContainers to a text stream with PdbxWriter; see json_to_mmcif.write_mmcif_file."""
+    # The mmcif package is imported by the code paths that use it, so that validation-only runs and the native
+    # and streaming writers do not pay for loading it
+    from mmcif.io.PdbxWriter import PdbxWriter
+    pdbx_writer = PdbxWriter(stream)
+    try:
+        for container in data_list:
+            pdbx_writer.write([container])
+    except IndexError as e:
+        print(f"Error: {e}")
+        return False
+    return True
+
+
+def add_container(data_list, container_id):
+    """Adds a container with the specified container_id to the data_list."""
+    from mmcif.api.PdbxContainers import DataContainer
+    container = DataContainer(container_id)
+    data_list.append(container)
+    return container
+
+
+def add_category(container, category_id, items):
+    """Adds a category with the specified category_id and items to the container."""
+    from mmcif.api.DataCategory import DataCategory
+    category = DataCategory(category_id)
+    for item in items:
+        category.appendAttribute(item)
+    container.append(category)
+    return category
+
+
+def merge_json_into_cif(cif_dict, json_dict):
+    """
+    Merges JSON data into CIF data (in place), overwriting existing keys with JSON values.
+
+    JSON data with several blocks ({"data_<name>": ...}) is merged block by block into CIF data read with
+    json_to_mmcif.mmcif_to_json(..., blocks=True): each JSON block into the CIF block of the same name, or added
+    after the last block.
+
+    Raises:
+        ValueError: If the CIF data has several blocks and the JSON does not say which one to merge into.
+    """
+    json_blocks(json_dict)
+    if not is_multiblock(json_dict) and not is_multiblock(cif_dict):
+        return _merge_categories(cif_dict, json_dict)
+    if not is_multiblock(json_dict):
+        raise ValueError("the mmCIF file has several data blocks; key the JSON by data_<name> to choose the block")
+    if cif_dict and not is_multiblock(cif_dict):
+        raise ValueError("JSON data blocks can only be merged into mmCIF data read with blocks=True")
+    for block_key, categories in json_dict.items():
+        _merge_categories(cif_dict.setdefault(block_key, {}), categories)
+    return cif_dict
+
+
+def _merge_categories(cif_dict, json_dict):
+    for category, values in json_dict.items():
+        if category in cif_dict:
+            # Overwrite only keys in CIF that exist in JSON
+            for key, val in values.items():
+                cif_dict[category][key] = val
+        else:
+            cif_dict[category] = values
+    return cif_dict
+
+
+def build_containers(container_dict, container_id):
+    """
+    Builds the DataContainer list that PdbxWriter writes, or returns None if a category is inconsistent.
+
+    The rows of a loop are made once, as tuples, straight from its JSON lists by a Category; the values of a
+    single-row category are its row.
+    """
+    cif_data_list = []
+    container = add_container(cif_data_list, container_id)
+
+    for category_name, category_data in container_dict.items():
+        category_list = list(category_data)
+        cif_values_list = list(category_data.values())
+
+        # Ensure consistent data format
+        if len(category_list) != len(cif_values_list):
+            print(f"Error: Mismatch in attributes and values for category {category_name}")
+            return None
+
+        cat_obj = add_category(container, category_name, category_list)
+        if cif_values_list and any(not isinstance(value, list) for value in cif_values_list):
+            cat_obj.append(cif_values_list)
+        else:
+            # DataCategory.extend deep-copies its rows; the tuples made from the columns are not shared, so they
+            # are added as they are
+            cat_obj.data.extend(Category.from_json(category_name, category_data).rows())
+    return cif_data_list
+
+
+def _read(source):
+    """Reads a stream; bytes are decompressed if they are compressed. Anything else is returned as it is."""
+    if hasattr(source, "read"):
+        source = source.read()
+    if isinstance(source, (bytearray, memoryview)):
+        source = bytes(source)
+    if isinstance(source, bytes):
+        return decompress(source)
+    return source
+
+
+def _binary_stream(output):
+    """Returns output, or the binary buffer under a text stream, for writing bytes to."""
+    if not isinstance(output, io.TextIOBase):
+        return output
+    buffer = getattr(output, "buffer", None)
+    if buffer is None:
+        raise TypeError("BinaryCIF and compressed output need a binary stream")
+    output.flush()
+    return buffer
+
+
+def _build_block_containers(blocks, failed):
+    """Yields the DataContainer of each block as it is written; stops and appends to failed on an error."""
+    for block_name, categories in blocks:
+        with stage("build_containers"):
+            cif_data_list = build_containers(categories, block_name)
+        if cif_data_list is None:
+            failed.append(block_name)
+            return
+        yield from cif_data_list
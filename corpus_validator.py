@@ -0,0 +1,251 @@
+"""
+corpus_validator.py
+
+Description: This script validates a corpus of mmCIF files against the mmCIF dictionary in one run and writes a
+single structured report instead of one text report per file. The dictionary is parsed once, before the worker
+processes are forked, so the workers share it copy-on-write instead of each starting gemmi or parsing it again.
+The files are sorted by size and cut into shards that the workers take in turn, largest first, so that a large
+file met at the end does not leave the other cores idle. The report has one JSON object per line (JSONL) for each
+diagnostic, with file, line, block, category, item, severity, kind and message; a report path ending in .gz, .bz2,
+.xz or .zst is compressed. A report path ending in .db or .sqlite is an indexed SQLite store instead (see
+diagnostics_store.py), which also records the files without diagnostics.
+
+Example usage:
+    python corpus_validator.py -c archive/ -o report.jsonl -w 16 -d no
+    python corpus_validator.py -c "archive/**/*.cif.gz" manifest.txt -o report.jsonl.gz
+    python corpus_validator.py -c archive/ -o diagnostics.db
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from functools import partial
+from compressed_io import open_file, strip_compression
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary
+from mmcif_validator import get_validator
+from profiling import stage, enable_profiling, write_profile
+
+# Extensions of the files taken from a directory, after any compression extension
+CIF_EXTENSIONS = (".cif", ".bcif")
+# Files per shard at most; smaller shards balance the load better, larger ones cost less to hand out
+MAX_SHARD_SIZE = 64
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Validate many mmCIF files against the mmCIF dictionary into one "
+                                                 "JSONL report.")
+    parser.add_argument("-c", "--input_cif", nargs="+", required=True,
+                        help="mmCIF files, directories (searched recursively for .cif and .bcif files, compressed "
+                             "or not), quoted glob patterns or manifest files listing one mmCIF file per line")
+    parser.add_argument("-o", "--report", default="validation_report.jsonl",
+                        help="Report file, one JSON object per diagnostic, or an SQLite store if it ends in .db or "
+                             ".sqlite (default: validation_report.jsonl)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--shard_size", type=int, default=None,
+                        help=f"Files handed to a worker at a time (default: up to {MAX_SHARD_SIZE}, so that each "
+                             f"worker takes several shards)")
+    parser.add_argument("-d", "--download_dict", choices=["yes", "no"], default="yes",
+                        help="Download the latest mmCIF dictionary for validation (default: yes)")
+    parser.add_argument("--dict_ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a downloaded dictionary is reused before checking for a newer one "
+                             "(default: 86400)")
+    parser.add_argument("--profile", metavar="TRACE_FILE",
+                        help="Record wall time, CPU time, peak memory and I/O of each stage, print a summary and "
+                             "save a Chrome trace (chrome://tracing, Perfetto) to TRACE_FILE")
+    return parser.parse_args()
+
+
+def is_cif_file(path):
+    """True if path is named as an mmCIF or BinaryCIF file, compressed or not."""
+    return strip_compression(path).lower().endswith(CIF_EXTENSIONS)
+
+
+def collect_cif_files(inputs):
+    """
+    Expands files, directories, glob patterns and manifest files into a list of mmCIF files without duplicates.
+
+    A directory yields every mmCIF and BinaryCIF file below it (see is_cif_file). An existing file not named as
+    an mmCIF file is read as a manifest with one path per line; blank lines and lines starting with # are skipped.
+    """
+    cif_files = []
+    for corpus_input in inputs:
+        if os.path.isdir(corpus_input):
+            for root, dirs, files in os.walk(corpus_input):
+                dirs.sort()
+                cif_files.extend(os.path.join(root, f) for f in sorted(files) if is_cif_file(f))
+        elif os.path.isfile(corpus_input) and not is_cif_file(corpus_input):
+            with open(corpus_input, 'r') as manifest:
+                cif_files.extend(line.strip() for line in manifest
+                                 if line.strip() and not line.lstrip().startswith('#'))
+        elif os.path.isfile(corpus_input):
+            cif_files.append(corpus_input)
+        elif glob.has_magic(corpus_input):
+            cif_files.extend(sorted(glob.glob(corpus_input, recursive=True)))
+        else:
+            # A missing file is reported as a file that cannot be read
+            cif_files.append(corpus_input)
+    return list(dict.fromkeys(cif_files))
+
+
+def make_shards(cif_files, workers, shard_size=None):
+    """
+    Cuts cif_files into shards, largest files first.
+
+    Parameters:
+        workers (int): Number of worker processes; by default each gets about four shards.
+        shard_size (int): Files per shard, or None to choose it from the number of files and workers.
+
+    Returns:
+        list: Lists of files.
+    """
+    def size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    ordered = sorted(cif_files, key=size, reverse=True)
+    if shard_size is None:
+        shard_size = min(MAX_SHARD_SIZE, len(ordered) // (workers * 4))
+    shard_size = max(1, shard_size)
+    return [ordered[i:i + shard_size] for i in range(0, len(ordered), shard_size)]
+
+
+def validate_shard(dic_file, cif_files):
+    """
+    Validates a shard in a worker process with the validator of that process; in a forked worker it is the one
+    the parent built, so the dictionary is not parsed again.
+
+    Returns:
+        list: One (cif_file, valid, diagnostics, elapsed seconds) tuple per file.
+    """
+    validator = get_validator(dic_file)
+    results = []
+    for cif_file in cif_files:
+        start = time.perf_counter()
+        valid, diagnostics = validator.diagnose_file(cif_file)
+        results.append((cif_file, valid, diagnostics, time.perf_counter() - start))
+    return results
+
+
+class JsonlReport:
+    """
+    A report with one JSON object per line for each diagnostic; files without diagnostics add no lines.
+
+    Parameters:
+        report_file (str): Path of the report, compressed if its extension says so.
+    """
+
+    def __init__(self, report_file):
+        self.report_file = report_file
+        self._file = open_file(report_file, "w")
+
+    def add(self, cif_file, valid, diagnostics):
+        """Writes the diagnostics of one validated file."""
+        for diagnostic in diagnostics:
+            self._file.write(json.dumps(diagnostic._asdict()) + "\n")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_report(report_file):
+    """Returns the report validate_corpus writes to: a DiagnosticStore for a database file, a JsonlReport otherwise."""
+    from diagnostics_store import DiagnosticStore, is_store
+    return DiagnosticStore(report_file) if is_store(report_file) else JsonlReport(report_file)
+
+
+def validate_corpus(cif_files, dic_file, report_file, workers=None, shard_size=None):
+    """
+    Validates cif_files against dic_file across a pool of worker processes and writes one report.
+
+    The diagnostics of a shard are written as soon as it is done, in the order the shards finish. Where fork is
+    not available the workers are spawned and each parses the dictionary once.
+
+    Parameters:
+        cif_files (list): mmCIF files to validate.
+        dic_file (str): Path to the dictionary file.
+        report_file (str): Path of the JSONL report or of the store, see open_report.
+        workers (int): Number of worker processes (default: number of CPUs); 1 validates in this process.
+        shard_size (int): Files per shard, see make_shards.
+
+    Returns:
+        list: One (cif_file, valid, number of diagnostics, elapsed seconds) tuple per file, in input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    with stage("load_dictionary"):
+        get_validator(dic_file)
+    shards = make_shards(cif_files, workers, shard_size)
+
+    start = time.perf_counter()
+    results = {}
+    with open_report(report_file) as report, stage("validate_corpus", files=len(cif_files), workers=workers):
+        if workers <= 1:
+            shard_results = map(partial(validate_shard, dic_file), shards)
+            pool = None
+        else:
+            import multiprocessing
+            method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            # Stages inside the worker processes are not recorded; use -w 1 to profile them
+            pool = multiprocessing.get_context(method).Pool(workers, initializer=get_validator,
+                                                            initargs=(dic_file,))
+            shard_results = pool.imap_unordered(partial(validate_shard, dic_file), shards)
+        try:
+            for shard_result in shard_results:
+                for cif_file, valid, diagnostics, elapsed in shard_result:
+                    report.add(cif_file, valid, diagnostics)
+                    results[cif_file] = (cif_file, valid, len(diagnostics), elapsed)
+        finally:
+            if pool is not None:
+                pool.terminate()
+    elapsed = time.perf_counter() - start
+
+    ordered = [results[cif_file] for cif_file in cif_files]
+    failed = sum(1 for result in ordered if not result[1])
+    print(f"Validated {len(ordered)} files ({len(ordered) - failed} valid, {failed} failed) with "
+          f"{sum(result[2] for result in ordered)} diagnostics in {elapsed:.2f}s, "
+          f"{len(ordered) / elapsed if elapsed else 0.0:.1f} files/s. Report saved to {report_file}")
+    return ordered
+
+
+def main():
+    """
+    Parses arguments, validates the corpus and writes the report. Exits with 1 if a file failed validation.
+    """
+    args = parse_arguments()
+    if args.profile:
+        enable_profiling()
+    try:
+        cif_files = collect_cif_files(args.input_cif)
+        if not cif_files:
+            print(f"Error: No mmCIF files found for {' '.join(args.input_cif)}.")
+            sys.exit(1)
+        with stage("get_dictionary", download=args.download_dict):
+            dic_file = get_dictionary(args.download_dict, ttl=args.dict_ttl)
+        if not os.path.isfile(dic_file):
+            print(f"Error: Dictionary file '{dic_file}' does not exist. Download it using the option -d yes")
+            sys.exit(1)
+        results = validate_corpus(cif_files, dic_file, args.report, args.workers, args.shard_size)
+    finally:
+        if args.profile:
+            write_profile(args.profile)
+    if not all(result[1] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+diagnostics.py
+
+Description: This script turns the diagnostics of the gemmi validator into records with the file, line, data
+block, category, item, severity, kind and message of each one, so that validation results can be stored and
+queried instead of read as text. Errors are the diagnostics that make a file fail validation: values outside an
+enumeration, not matching the regular expression of their type, not numbers or out of range, and files that
+cannot be read. The others (unknown tags and categories, missing keys and mandatory items, duplicated keys,
+missing parents) are warnings.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import re
+from collections import namedtuple
+
+# line is None when gemmi does not give one; category and item are None when the diagnostic is not about one
+Diagnostic = namedtuple("Diagnostic", ["file", "line", "block", "category", "item", "severity", "kind", "message"])
+
+ERROR = "error"
+WARNING = "warning"
+
+# "<file>:<line> [<block>] <message>", the location being left out by diagnostics about a whole block
+_LOCATION = re.compile(r"(?:(?P<file>.*?):(?P<line>\d+) )?\[(?P<block>[^\]\n]*)\] (?P<message>.*)", re.S)
+# Errors of the reader: "<file>:<line>[:<column>(<offset>)]: [in data_<block>: ]<message>"
+_READ_ERROR = re.compile(r"(?P<file>.*?):(?P<line>\d+)(?::\d+\(\d+\))?:? "
+                         r"(?:in data_(?P<block>\S+): )?(?P<message>.*)", re.S)
+# Prefix of dictionary notes, and of the unknown tags of a block with gemmi 0.6
+_NOTE = "Note: "
+# Value diagnostics in a loop_ start with the tag, since their line is the one of the loop_
+_TAG = r"(?:(?P<tag>_[^\s:]+): )?"
+# (kind, severity, pattern of the message) in the order they are tried
+KINDS = [
+    ("not_allowed", ERROR, re.compile(_TAG + r".* is not one of the allowed values", re.S)),
+    ("regex", ERROR, re.compile(_TAG + r".* does not match the \S+ regex", re.S)),
+    ("not_number", ERROR, re.compile(_TAG + r".*expected (?:number|integer), got", re.S)),
+    ("out_of_range", ERROR, re.compile(_TAG + r".*value out of expected range", re.S)),
+    ("unknown_tag", WARNING, re.compile(r"unknown tag (?P<tag>_\S+)")),
+    ("unknown_category", WARNING, re.compile(r"category not in the dictionary: (?P<category>\S+)")),
+    ("missing_mandatory", WARNING, re.compile(r"missing mandatory tag: (?P<tag>_\S+)")),
+    ("missing_key", WARNING, re.compile(r"missing category key: (?P<tag>_\S+)")),
+    ("duplicated_key", WARNING, re.compile(r"category (?P<category>\S+) has \d+ duplicated key")),
+    ("missing_parent", WARNING, re.compile(r"(?:\d+ missing parent\(s\) of |parent tag of )(?P<tag>_\S+)")),
+    ("missing_parent", WARNING, re.compile(r".*missing parent", re.S)),
+]
+
+
+def split_tag(tag):
+    """Returns the category and item of a tag: ("em_imaging", "mode") for _em_imaging.mode."""
+    if tag is None:
+        return None, None
+    category, _, item = tag.lstrip("_").partition(".")
+    return (category, item) if item else (None, category)
+
+
+def parse_message(message, file=None, valid=True, tag_at=None):
+    """
+    Parses one diagnostic of gemmi.cif.Ddl.validate_cif or gemmi validate.
+
+    Parameters:
+        message (str): The diagnostic, continuation lines included.
+        file (str): File the diagnostic is about, if the message does not name it.
+        valid (bool): Whether the file passed validation. A diagnostic of an unknown kind is an error in a file
+            that failed and a warning otherwise.
+        tag_at (callable): tag_at(block, line) returns the tag of the pair item on a line; a value diagnostic
+            outside a loop_ gives the line of its tag but not the tag itself.
+
+    Returns:
+        Diagnostic: The parsed diagnostic.
+    """
+    if message.startswith(_NOTE + "["):
+        # gemmi 0.6 reports unknown tags as notes
+        message = message[len(_NOTE):]
+    location = _LOCATION.match(message)
+    if location is None:
+        match = _READ_ERROR.match(message)
+        if match is None:
+            return Diagnostic(file, None, None, None, None, ERROR, "syntax", message)
+        tag = re.search(r"(?<!\S)(_[^\s.]+\.[^\s:,*]+)", match.group("message"))
+        category, item = split_tag(tag.group(1) if tag else None)
+        return Diagnostic(match.group("file"), int(match.group("line")), match.group("block"), category, item,
+                          ERROR, "syntax", match.group("message"))
+
+    line = int(location.group("line")) if location.group("line") else None
+    block, text = location.group("block"), location.group("message")
+    for kind, severity, pattern in KINDS:
+        match = pattern.match(text)
+        if match is None:
+            continue
+        tag = match.groupdict().get("tag")
+        if tag is None and line is not None and tag_at is not None:
+            tag = tag_at(block, line)
+        category, item = split_tag(tag)
+        category = match.groupdict().get("category") or category
+        return Diagnostic(location.group("file") or file, line, block, category, item, severity, kind, text)
+    return Diagnostic(location.group("file") or file, line, block, None, None, WARNING if valid else ERROR,
+                      "other", text)
+
+
+def pair_tags(doc):
+    """
+    Returns a tag_at function for parse_message over a parsed gemmi.cif.Document. The lines of the pair items
+    are only collected when the first one is looked up.
+    """
+    tags = None
+
+    def tag_at(block, line):
+        nonlocal tags
+        if tags is None:
+            tags = {}
+            for cif_block in doc:
+                for cif_item in cif_block:
+                    if cif_item.pair is not None:
+                        tags[(cif_block.name, cif_item.line_number)] = cif_item.pair[0]
+        return tags.get((block, line))
+
+    return tag_at
+
+
+def file_tags(cif_file, lines):
+    """
+    Returns {line: tag} for the pair items that start on the given lines of a text mmCIF file, plain or
+    compressed, read without parsing it; a text report does not hold the tag of value errors outside a loop_.
+    """
+    from compressed_io import open_file
+    tags, lines = {}, set(lines)
+    with open_file(cif_file, "r", errors="replace") as file:
+        for number, text in enumerate(file, 1):
+            if number in lines:
+                token = text.split(None, 1)[0] if text.strip() else ""
+                if token.startswith("_"):
+                    tags[number] = token
+                lines.discard(number)
+                if not lines:
+                    break
+    return tags
+
+
+def parse_report(text, cif_file=None, base_dir=None):
+    """
+    Parses the output of gemmi validate, with or without -v and for one or several files, e.g. a _val.txt report.
+
+    Dictionary notes are skipped; the unknown tags gemmi 0.6 reports as notes are not. The tags of value errors
+    outside a loop_ are read from the validated file when it can be found: as named in the report, under
+    base_dir, or in base_dir under its own name.
+
+    Parameters:
+        text (str): The report.
+        cif_file (str): File the report is about, if it has no "Reading ..." line.
+        base_dir (str): Directory to look for the validated file in, e.g. the one of the report.
+
+    Returns:
+        list: (cif_file, valid, diagnostics) for each file of the report; valid is None if the report does not end
+        with OK or FAILED.
+    """
+    entries = []
+    for line in text.splitlines():
+        if line[:1] in ("\t", " ") and entries:
+            # Continuation of a note or of a diagnostic, e.g. the allowed values
+            entries[-1] += "\n" + line
+        elif line.strip():
+            entries.append(line)
+
+    reports, messages = [], []
+
+    def finish(valid):
+        diagnostics = [parse_message(message, cif_file, valid is not False) for message in messages]
+        reports.append((cif_file, valid, _with_tags(diagnostics, cif_file, base_dir)))
+        messages.clear()
+
+    for entry in entries:
+        if entry.startswith("Note:") and not entry.startswith(_NOTE + "["):
+            continue
+        if entry.startswith("Reading ") and entry.endswith("..."):
+            if messages:
+                finish(None)
+            cif_file = entry[len("Reading "):-len("...")]
+        elif entry in ("OK", "FAILED"):
+            finish(entry == "OK")
+        else:
+            messages.append(entry)
+    if messages:
+        finish(None)
+    return reports
+
+
+def _with_tags(diagnostics, cif_file, base_dir):
+    lines = {d.line for d in diagnostics if d.line is not None and d.item is None and d.severity == ERROR
+             and d.kind != "syntax"}
+    if not lines or cif_file is None:
+        return diagnostics
+    candidates = [cif_file]
+    if base_dir is not None:
+        candidates += [os.path.join(base_dir, cif_file), os.path.join(base_dir, os.path.basename(cif_file))]
+    path = next((candidate for candidate in candidates if os.path.isfile(candidate)), None)
+    from cif_reader import is_bcif
+    if path is None or is_bcif(path):
+        return diagnostics
+    try:
+        tags = file_tags(path, lines)
+    except (OSError, EOFError):
+        return diagnostics
+    tagged = []
+    for diagnostic in diagnostics:
+        if diagnostic.line in lines and diagnostic.line in tags and diagnostic.item is None:
+            category, item = split_tag(tags[diagnostic.line])
+            diagnostic = diagnostic._replace(category=category, item=item)
+        tagged.append(diagnostic)
+    return tagged
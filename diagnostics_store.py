@@ -0,0 +1,379 @@
+"""
+diagnostics_store.py
+
+Description: This script keeps validation diagnostics in an indexed SQLite database, so that questions over a
+whole corpus ("which files have a disallowed _em_imaging.illumination_mode?") are answered by an index lookup
+instead of by reading thousands of text reports. It loads the text reports of gemmi validate and json_to_mmcif
+(_val.txt) and the JSONL reports of corpus_validator.py, parsed by diagnostics.py. Loading is incremental: a
+report that has not changed since it was loaded is skipped, and the diagnostics of a file validated again replace
+its previous ones. corpus_validator.py writes to a store directly when its report ends in .db or .sqlite.
+
+Example usage:
+    python diagnostics_store.py -s diagnostics.db --load reports/ "archive/**/*_val.txt" report.jsonl
+    python diagnostics_store.py -s diagnostics.db --item illumination_mode --kind not_allowed --files
+    python diagnostics_store.py -s diagnostics.db --category em_imaging --count
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import glob
+import json
+import time
+import sqlite3
+import argparse
+from compressed_io import open_file, strip_compression
+from diagnostics import Diagnostic, ERROR, parse_report
+
+# Extensions of the database files corpus_validator.py writes to as a store
+STORE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# Names of the reports taken from a directory, after any compression extension
+REPORT_SUFFIXES = ("_val.txt", ".jsonl")
+# Files written in one transaction when loading
+COMMIT_FILES = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    valid INTEGER,
+    source_id INTEGER REFERENCES sources(id),
+    loaded REAL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    item TEXT NOT NULL,
+    UNIQUE (category, item)
+);
+CREATE TABLE IF NOT EXISTS kinds (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    UNIQUE (kind, severity)
+);
+CREATE TABLE IF NOT EXISTS diagnostics (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    tag_id INTEGER NOT NULL REFERENCES tags(id),
+    kind_id INTEGER NOT NULL REFERENCES kinds(id),
+    line INTEGER,
+    block TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS diagnostics_tag ON diagnostics(tag_id, kind_id, file_id);
+CREATE INDEX IF NOT EXISTS diagnostics_kind ON diagnostics(kind_id, tag_id, file_id);
+CREATE INDEX IF NOT EXISTS diagnostics_file ON diagnostics(file_id);
+"""
+
+
+def is_store(path):
+    """True if path is named as a diagnostics database."""
+    return path.lower().endswith(STORE_EXTENSIONS)
+
+
+def is_report(path):
+    """True if path is named as a text or JSONL validation report, compressed or not."""
+    return strip_compression(path).endswith(REPORT_SUFFIXES)
+
+
+def collect_reports(inputs):
+    """Expands report files, directories (searched recursively, see is_report) and glob patterns."""
+    reports = []
+    for report_input in inputs:
+        if os.path.isdir(report_input):
+            for root, dirs, files in os.walk(report_input):
+                dirs.sort()
+                reports.extend(os.path.join(root, f) for f in sorted(files) if is_report(f))
+        elif glob.has_magic(report_input):
+            reports.extend(sorted(glob.glob(report_input, recursive=True)))
+        else:
+            reports.append(report_input)
+    return list(dict.fromkeys(reports))
+
+
+class DiagnosticStore:
+    """
+    An SQLite database of validation diagnostics: one row per validated file, with whether it passed, and one
+    per diagnostic. The tags (category and item) and the kinds (kind and severity) are kept in their own small
+    tables, so a diagnostic row holds integers that are indexed by tag and kind, by kind and by file, and a query
+    reads only the index entries of the tags and kinds it asks for.
+
+    Parameters:
+        db_file (str): Path of the database, created if it does not exist.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._db = sqlite3.connect(db_file)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._pending = 0
+        self._added = False
+        self._tags, self._kinds = {}, {}
+        self._read_ids()
+
+    def _read_ids(self):
+        """Reads the ids of the tags and kinds, which other connections may have added."""
+        self._tags = {(category, item): tag_id for tag_id, category, item in
+                      self._db.execute("SELECT id, category, item FROM tags")}
+        self._kinds = {(kind, severity): kind_id for kind_id, kind, severity in
+                       self._db.execute("SELECT id, kind, severity FROM kinds")}
+
+    def _id(self, ids, table, columns, key):
+        if key not in ids:
+            ids[key] = self._db.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES (?, ?)", key).lastrowid
+        return ids[key]
+
+    def add(self, cif_file, valid, diagnostics, source_id=None):
+        """
+        Stores the result of validating cif_file, replacing any earlier one.
+
+        Parameters:
+            valid (bool): Whether the file passed validation, None if not known.
+            diagnostics (list): Its diagnostics.Diagnostic records.
+            source_id (int): The report it was loaded from, None for results stored by the validator.
+        """
+        db = self._db
+        row = db.execute("SELECT id FROM files WHERE path = ?", (cif_file,)).fetchone()
+        if row is None:
+            file_id = db.execute("INSERT INTO files (path, valid, source_id, loaded) VALUES (?, ?, ?, ?)",
+                                 (cif_file, valid, source_id, time.time())).lastrowid
+        else:
+            file_id = row[0]
+            db.execute("DELETE FROM diagnostics WHERE file_id = ?", (file_id,))
+            db.execute("UPDATE files SET valid = ?, source_id = ?, loaded = ? WHERE id = ?",
+                       (valid, source_id, time.time(), file_id))
+        # A missing category or item is stored as "", since NULLs would not be unique
+        db.executemany("INSERT INTO diagnostics VALUES (?, ?, ?, ?, ?, ?)",
+                       [(file_id,
+                         self._id(self._tags, "tags", ("category", "item"), (d.category or "", d.item or "")),
+                         self._id(self._kinds, "kinds", ("kind", "severity"), (d.kind, d.severity)),
+                         d.line, d.block, d.message) for d in diagnostics])
+        self._pending += 1
+        self._added = True
+        if self._pending >= COMMIT_FILES:
+            self.commit()
+
+    def load_report(self, report_file):
+        """
+        Loads a text or JSONL report, unless it is unchanged since it was last loaded.
+
+        Returns:
+            int: The number of files loaded from it, None if it was skipped.
+        """
+        stat = os.stat(report_file)
+        path = os.path.abspath(report_file)
+        row = self._db.execute("SELECT id, size, mtime_ns FROM sources WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[1:] == (stat.st_size, stat.st_mtime_ns):
+            return None
+        if row is None:
+            source_id = self._db.execute("INSERT INTO sources (path, size, mtime_ns) VALUES (?, ?, ?)",
+                                         (path, stat.st_size, stat.st_mtime_ns)).lastrowid
+        else:
+            source_id = row[0]
+            self._db.execute("UPDATE sources SET size = ?, mtime_ns = ? WHERE id = ?",
+                             (stat.st_size, stat.st_mtime_ns, source_id))
+
+        with open_file(report_file, "r", errors="replace") as file:
+            if strip_compression(report_file).endswith(".jsonl"):
+                results = _jsonl_results(file)
+            else:
+                # A _val.txt report is named after the file it is about and written next to it
+                name = strip_compression(report_file)
+                default = name[:-len("_val.txt")] + ".cif" if name.endswith("_val.txt") else None
+                results = parse_report(file.read(), default, os.path.dirname(report_file) or ".")
+        count = 0
+        for cif_file, valid, diagnostics in results:
+            self.add(cif_file, valid, diagnostics, source_id)
+            count += 1
+        self.commit()
+        return count
+
+    def query(self, category=None, item=None, kind=None, severity=None, file=None, block=None, limit=None):
+        """
+        Returns the diagnostics matching every given field, as diagnostics.Diagnostic records, file by file in the
+        order they were stored.
+
+        file and block may be glob patterns (e.g. "archive/*/7abc*"); category and item are names without the
+        leading underscore or dot, e.g. em_imaging and illumination_mode.
+        """
+        where, parameters = self._where(category, item, kind, severity, file, block)
+        sql = ("SELECT files.path, d.line, d.block, tags.category, tags.item, kinds.severity, kinds.kind, d.message "
+               "FROM diagnostics AS d JOIN files ON files.id = d.file_id JOIN tags ON tags.id = d.tag_id "
+               "JOIN kinds ON kinds.id = d.kind_id" + where + " ORDER BY d.file_id, d.rowid")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [Diagnostic(path, line, block, category or None, item or None, severity, kind, message)
+                for path, line, block, category, item, severity, kind, message in self._db.execute(sql, parameters)]
+
+    def files(self, category=None, item=None, kind=None, severity=None, file=None, block=None, valid=None):
+        """
+        Returns the paths of the files with a diagnostic matching every given field, or of all the files that
+        match file and valid if no diagnostic field is given.
+        """
+        conditions, parameters = [], []
+        if file is not None:
+            conditions.append("path GLOB ?" if glob.has_magic(file) else "path = ?")
+            parameters.append(file)
+        if valid is not None:
+            conditions.append("valid = ?")
+            parameters.append(int(valid))
+        if (category, item, kind, severity, block) != (None,) * 5:
+            where, diagnostic_parameters = self._where(category, item, kind, severity, None, block)
+            conditions.append("id IN (SELECT DISTINCT d.file_id FROM diagnostics AS d" + where + ")")
+            parameters += diagnostic_parameters
+        sql = "SELECT path FROM files" + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        return [row[0] for row in self._db.execute(sql + " ORDER BY path", parameters)]
+
+    def counts(self, category=None, item=None, kind=None, severity=None, file=None, block=None):
+        """
+        Returns the number of diagnostics and of files for each category, item and kind among the matching ones.
+
+        Returns:
+            list: (category, item, kind, diagnostics, files) tuples, the most frequent first.
+        """
+        where, parameters = self._where(category, item, kind, severity, file, block)
+        tags = {tag_id: key for key, tag_id in self._tags.items()}
+        kinds = {kind_id: key[0] for key, kind_id in self._kinds.items()}
+        counts = [tags[tag_id] + (kinds[kind_id], diagnostics, files) for tag_id, kind_id, diagnostics, files in
+                  self._db.execute("SELECT d.tag_id, d.kind_id, COUNT(*), COUNT(DISTINCT d.file_id) FROM "
+                                   "diagnostics AS d" + where + " GROUP BY d.tag_id, d.kind_id", parameters)]
+        counts.sort(key=lambda count: (-count[3],) + count[:3])
+        return [(category or None, item or None, kind, diagnostics, files)
+                for category, item, kind, diagnostics, files in counts]
+
+    def summary(self):
+        """Returns (files, valid files, diagnostics, errors) in the store."""
+        files, valid = self._db.execute("SELECT COUNT(*), COALESCE(SUM(valid), 0) FROM files").fetchone()
+        diagnostics = self._db.execute("SELECT COUNT(*) FROM diagnostics").fetchone()[0]
+        where, parameters = self._where(severity=ERROR)
+        errors = self._db.execute("SELECT COUNT(*) FROM diagnostics AS d" + where, parameters).fetchone()[0]
+        return files, valid, diagnostics, errors
+
+    def _where(self, category=None, item=None, kind=None, severity=None, file=None, block=None):
+        """Returns the WHERE clause over diagnostics AS d selecting the given fields, and its parameters."""
+        self._read_ids()
+        conditions, parameters = [], []
+        if category is not None or item is not None:
+            conditions.append(_in("d.tag_id", [tag_id for (tag_category, tag_item), tag_id in self._tags.items()
+                                               if category in (None, tag_category) and item in (None, tag_item)]))
+        if kind is not None or severity is not None:
+            conditions.append(_in("d.kind_id", [kind_id for (kind_kind, kind_severity), kind_id in
+                                                self._kinds.items()
+                                                if kind in (None, kind_kind) and severity in (None, kind_severity)]))
+        if file is not None:
+            conditions.append("d.file_id IN (SELECT id FROM files WHERE path " +
+                              ("GLOB ?)" if glob.has_magic(file) else "= ?)"))
+            parameters.append(file)
+        if block is not None:
+            conditions.append("d.block GLOB ?" if glob.has_magic(block) else "d.block = ?")
+            parameters.append(block)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+    def commit(self):
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        if self._added:
+            # Statistics let SQLite pick the most selective index; PRAGMA optimize refreshes them once they exist
+            stats = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+            self._db.execute("PRAGMA optimize" if stats else "ANALYZE")
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _in(column, ids):
+    """An SQL condition on column being one of the integer ids; false if there are none."""
+    return f"{column} IN ({', '.join(map(str, ids))})" if ids else "0"
+
+
+def _jsonl_results(file):
+    """Groups the records of a JSONL report by file; a file is valid if none of its diagnostics is an error."""
+    by_file = {}
+    for line in file:
+        if line.strip():
+            record = json.loads(line)
+            by_file.setdefault(record["file"], []).append(Diagnostic(**record))
+    return [(cif_file, all(d.severity != ERROR for d in diagnostics), diagnostics)
+            for cif_file, diagnostics in by_file.items()]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Load validation reports into an indexed SQLite store and query "
+                                                 "their diagnostics.")
+    parser.add_argument("-s", "--store", default="diagnostics.db",
+                        help="SQLite database of diagnostics (default: diagnostics.db)")
+    parser.add_argument("--load", nargs="+", metavar="REPORT",
+                        help="Text (_val.txt) and JSONL reports, directories searched recursively for them, or "
+                             "quoted glob patterns; unchanged reports are skipped")
+    parser.add_argument("--category", help="Category name, e.g. em_imaging")
+    parser.add_argument("--item", help="Item name, e.g. illumination_mode")
+    parser.add_argument("--kind", help="Kind of diagnostic, e.g. not_allowed, regex, unknown_tag, missing_key, "
+                                       "syntax")
+    parser.add_argument("--severity", choices=["error", "warning"], help="Severity of the diagnostic")
+    parser.add_argument("--file", help="Validated file, or a glob pattern of files")
+    parser.add_argument("--block", help="Data block name, or a glob pattern")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--files", action="store_true", help="Print the matching files instead of the diagnostics")
+    output.add_argument("--count", action="store_true",
+                        help="Print the number of matching diagnostics and files by category, item and kind")
+    parser.add_argument("--limit", type=int, help="Print at most this many diagnostics")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    fields = dict(category=args.category, item=args.item, kind=args.kind, severity=args.severity, file=args.file,
+                  block=args.block)
+    with DiagnosticStore(args.store) as store:
+        if args.load:
+            start = time.perf_counter()
+            loaded = skipped = files = 0
+            for report_file in collect_reports(args.load):
+                count = store.load_report(report_file)
+                if count is None:
+                    skipped += 1
+                else:
+                    loaded += 1
+                    files += count
+            print(f"Loaded {files} files from {loaded} reports ({skipped} unchanged) in "
+                  f"{time.perf_counter() - start:.2f}s into {args.store}", file=sys.stderr)
+            if not any(fields.values()) and not args.files and not args.count:
+                return
+        if args.files:
+            for path in store.files(**fields):
+                print(path)
+        elif args.count:
+            for category, item, kind, diagnostics, files in store.counts(**fields):
+                tag = f"_{category}.{item}" if category else (item or "-")
+                print(f"{diagnostics}\t{files}\t{kind}\t{tag}")
+        elif any(fields.values()):
+            for d in store.query(limit=args.limit, **fields):
+                tag = f" _{d.category}.{d.item}" if d.category else ""
+                location = f"{d.file}:{d.line}" if d.line is not None else d.file
+                print(f"{location} [{d.block or ''}] {d.severity} {d.kind}{tag}: {d.message.splitlines()[0]}")
+        else:
+            files, valid, diagnostics, errors = store.summary()
+            print(f"{files} files ({valid} valid, {files - valid} failed), {diagnostics} diagnostics "
+                  f"({errors} errors) in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
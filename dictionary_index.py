@@ -0,0 +1,378 @@
+"""
+dictionary_index.py
+
+Description: This script compiles the mmCIF dictionary into a compact index of its categories, category keys,
+mandatory items, item types with their regular expressions and enumerations, and checks converted data against
+it in pure Python. The index is written once next to the dictionary (mmcif_pdbx_v50.dic.idx) and is memory-mapped
+when loaded: only a small header is parsed up front and the definition of a category is decoded the first time
+data of that category is checked.
+
+The fast check finds the common validation problems without writing or parsing an mmCIF file: values outside
+an enumeration and values not matching the regular expression of their type, which make gemmi validation fail,
+and unknown tags and missing category keys and mandatory items, which gemmi reports but accepts. The full gemmi
+validation then only has to run for files without errors. Every error it finds is also an error for gemmi; the
+reverse is not true, e.g. numeric types and ranges are left to gemmi.
+
+Example usage:
+    python dictionary_index.py mmcif_tools/mmcif_pdbx_v50.dic
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import re
+import json
+import mmap
+import struct
+import argparse
+import tempfile
+import warnings
+from cif_reader import parse_categories
+from mmcif_dictionary import make_shared
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"MMCIFIDX"
+INDEX_VERSION = 1
+# Magic, format version and length of the JSON header
+_PREFIX = struct.Struct("<8sII")
+_NULL_VALUES = (None, "", ".", "?")
+
+
+def index_path(dic_file):
+    """Returns the path of the index compiled from dic_file."""
+    return dic_file + INDEX_SUFFIX
+
+
+def read_dictionary(dic_file):
+    """
+    Reads the definitions of a DDL2 dictionary.
+
+    Returns:
+        tuple: (types, categories)
+            - types (dict): {type code: [primitive code, construct]} from _item_type_list.
+            - categories (dict): {category: {"keys": [item, ...], "mandatory": [item, ...],
+              "items": {item: [type code or None, [enumeration values] or None]}}}, with item names without the
+              category prefix.
+    """
+    types = {}
+    frames = {}
+    with open(dic_file, 'r', errors='replace') as file:
+        for category in parse_categories(file):
+            if category.frame is None:
+                if category.name == "item_type_list":
+                    for row in _rows(category, "code", "primitive_code", "construct"):
+                        types[row[0]] = [row[1], row[2]]
+                continue
+            frame = frames.setdefault(category.frame, {})
+            frame[category.name] = category
+
+    categories = {}
+    items = {}
+    for frame_name, frame in frames.items():
+        if "category" in frame:
+            name = _first(frame["category"], "id")
+            definition = categories.setdefault(name, {"keys": [], "mandatory": [], "items": {}})
+            if "category_key" in frame:
+                definition["keys"] = [row[0] for row in _rows(frame["category_key"], "name")]
+        if "item" not in frame:
+            continue
+        item_type = _first(frame.get("item_type"), "code")
+        enumeration = [row[0] for row in _rows(frame.get("item_enumeration"), "value")] or None
+        for tag, category_id, mandatory_code in _rows(frame["item"], "name", "category_id", "mandatory_code"):
+            own_frame = frame_name == tag
+            # An item listed in a parent's frame takes its definition from its own frame when it has one
+            if tag in items and not own_frame:
+                continue
+            items[tag] = (category_id, mandatory_code, item_type, enumeration)
+
+    for tag, (category_id, mandatory_code, item_type, enumeration) in items.items():
+        category_name, _, item = tag[1:].partition('.')
+        definition = categories.setdefault(category_id or category_name,
+                                           {"keys": [], "mandatory": [], "items": {}})
+        definition["items"][item] = [item_type, enumeration]
+        if (mandatory_code or "").lower() == "yes":
+            definition["mandatory"].append(item)
+    for name, definition in categories.items():
+        definition["keys"] = [key[1:].partition('.')[2] for key in definition["keys"]]
+        definition["mandatory"].sort()
+    return types, categories
+
+
+def _rows(category, *items):
+    """The values of items in each row of a CifCategory; missing items are None. No category gives no rows."""
+    if category is None:
+        return []
+    positions = [category.items.index(item) if item in category.items else None for item in items]
+    return [[row[i] if i is not None else None for i in positions] for row in category.rows]
+
+
+def _first(category, item):
+    rows = _rows(category, item)
+    return rows[0][0] if rows else None
+
+
+def compile_index(dic_file, output_file=None):
+    """
+    Compiles dic_file into an index file.
+
+    The index starts with a fixed-size prefix and a JSON header holding the size and modification time of the
+    dictionary it was built from, the item types and the offset and length of each category; the category
+    definitions follow as JSON records. The file is replaced atomically.
+
+    Returns:
+        str: The path of the index, by default <dic_file>.idx.
+    """
+    output_file = output_file or index_path(dic_file)
+    stat = os.stat(dic_file)
+    types, categories = read_dictionary(dic_file)
+
+    records = []
+    offsets = {}
+    position = 0
+    for name in sorted(categories):
+        record = json.dumps(categories[name], separators=(",", ":")).encode('utf-8')
+        offsets[name] = [position, len(record)]
+        records.append(record)
+        position += len(record)
+    header = json.dumps({
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "types": types,
+        "categories": offsets,
+    }, separators=(",", ":")).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(output_file))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".part", delete=False) as part:
+        part.write(_PREFIX.pack(INDEX_MAGIC, INDEX_VERSION, len(header)))
+        part.write(header)
+        for record in records:
+            part.write(record)
+    make_shared(part.name)
+    os.replace(part.name, output_file)
+    return output_file
+
+
+class DictionaryIndex:
+    """
+    A compiled dictionary index, memory-mapped and decoded one category at a time.
+
+    Parameters:
+        index_file (str): Path of a file written by compile_index.
+
+    Raises:
+        ValueError: If the file is not an index of this version.
+    """
+
+    def __init__(self, index_file):
+        self.path = index_file
+        with open(index_file, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = _PREFIX.unpack_from(self._map, 0)
+        except struct.error:
+            magic, version = None, None
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"'{index_file}' is not a version {INDEX_VERSION} dictionary index")
+        start = _PREFIX.size
+        header = json.loads(self._map[start:start + header_length])
+        self._data_start = start + header_length
+        self.source = header["source"]
+        self.types = header["types"]
+        self._offsets = header["categories"]
+        self._categories = {}
+        self._regexes = {}
+
+    @property
+    def category_names(self):
+        return list(self._offsets)
+
+    def close(self):
+        self._map.close()
+
+    def is_current(self, dic_file):
+        """True if the index was compiled from dic_file as it is now."""
+        stat = os.stat(dic_file)
+        return self.source == {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def category(self, name):
+        """Returns the definition of a category (see read_dictionary), or None if the dictionary lacks it."""
+        definition = self._categories.get(name)
+        if definition is None and name in self._offsets:
+            offset, length = self._offsets[name]
+            start = self._data_start + offset
+            definition = self._categories[name] = json.loads(self._map[start:start + length])
+        return definition
+
+    def type_regex(self, type_code):
+        """
+        Returns the compiled regular expression of a character type, or None if values of the type are not
+        checked: numeric types, unknown types and constructs that cannot be translated.
+        """
+        if type_code not in self._regexes:
+            primitive, construct = self.types.get(type_code, (None, None))
+            regex = None
+            if construct and primitive in ("char", "uchar"):
+                try:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore", FutureWarning)
+                        regex = re.compile(posix_to_python(construct), re.DOTALL)
+                except (re.error, ValueError):
+                    regex = None
+            self._regexes[type_code] = regex
+        return self._regexes[type_code]
+
+    def check(self, container_dict, block):
+        """
+        Checks converted data against the dictionary.
+
+        Parameters:
+            container_dict (dict): {category: {item: value or list of values}}, as passed to translate_json_to_cif.
+            block (str): Name of the data block, used in the messages.
+
+        Returns:
+            tuple: (bool, list) - False if a value would fail gemmi validation, and the messages in the style of
+            gemmi validate, including the unknown tags and missing items that gemmi only reports.
+        """
+        valid = True
+        value_messages = []
+        category_messages = []
+        for category_name in container_dict:
+            category_data = container_dict[category_name]
+            definition = self.category(category_name)
+            if definition is None:
+                value_messages.extend(f"[{block}] unknown tag _{category_name}.{item}" for item in category_data)
+                continue
+            for item, values in category_data.items():
+                item_definition = definition["items"].get(item)
+                if item_definition is None:
+                    value_messages.append(f"[{block}] unknown tag _{category_name}.{item}")
+                    continue
+                errors = self._check_values(f"_{category_name}.{item}", item_definition,
+                                            values if isinstance(values, list) else [values], block)
+                if errors:
+                    valid = False
+                    value_messages.extend(errors)
+
+        for category_name in sorted(container_dict):
+            definition = self.category(category_name)
+            if definition is None:
+                continue
+            present = container_dict[category_name]
+            category_messages.extend(f"[{block}] missing category key: _{category_name}.{key}"
+                                     for key in definition["keys"] if key not in present)
+            category_messages.extend(f"[{block}] missing mandatory tag: _{category_name}.{item}"
+                                     for item in definition["mandatory"] if item not in present)
+        return valid, value_messages + category_messages
+
+    def _check_values(self, tag, item_definition, values, block):
+        from cif_writer import format_value
+        type_code, enumeration = item_definition
+        regex = self.type_regex(type_code) if type_code else None
+        if regex is None and not enumeration:
+            return []
+        # The enumerations of case-insensitive types (ucode, uline, ...) are compared in upper case
+        folded = type_code is not None and type_code.startswith("u")
+        allowed = {value.upper() for value in enumeration} if enumeration and folded else set(enumeration or ())
+        messages = []
+        for value in values:
+            if value in _NULL_VALUES or isinstance(value, (list, dict)):
+                continue
+            text = value if isinstance(value, str) else str(value)
+            shown = format_value(value).strip()
+            if enumeration and (text.upper() if folded else text) not in allowed:
+                messages.append(f"[{block}] {tag}: {shown} is not one of the allowed values:\n\t"
+                                + "\n\t".join(enumeration))
+            elif regex is not None and not regex.fullmatch(text):
+                messages.append(f"[{block}] {tag}: {shown} does not match the {type_code} regex")
+        return messages
+
+
+def posix_to_python(construct):
+    """
+    Translates a dictionary construct, a POSIX extended regular expression, to Python syntax.
+
+    In a POSIX bracket expression a backslash is an ordinary character and a ] right after the opening [ is a
+    member; both are escaped for Python. \\t and \\n in a bracket expression are read as both the escape and the
+    two characters, so the translated expression never rejects a value the dictionary allows.
+
+    Raises:
+        ValueError: If a bracket expression is not closed.
+    """
+    out = []
+    position = 0
+    while position < len(construct):
+        char = construct[position]
+        if char == "\\" and position + 1 < len(construct):
+            out.append(construct[position:position + 2])
+            position += 2
+            continue
+        if char != "[":
+            out.append(char)
+            position += 1
+            continue
+        position += 1
+        members = ["["]
+        if construct.startswith("^", position):
+            members.append("^")
+            position += 1
+        if construct.startswith("]", position):
+            members.append("\\]")
+            position += 1
+        while position < len(construct) and construct[position] != "]":
+            member = construct[position]
+            if member == "\\" and construct[position + 1:position + 2] in ("t", "n"):
+                members.append("\\\\" + construct[position + 1] + "\\" + construct[position + 1])
+                position += 2
+                continue
+            members.append("\\" + member if member in "\\[^" else member)
+            position += 1
+        if position >= len(construct):
+            raise ValueError(f"unterminated bracket expression in {construct!r}")
+        members.append("]")
+        out.append("".join(members))
+        position += 1
+    return "".join(out)
+
+
+_indexes = {}
+
+
+def load_index(dic_file):
+    """
+    Returns the DictionaryIndex of dic_file, compiling it first if it is missing or older than the dictionary.
+
+    The index is kept for the life of the process and reloaded when the dictionary changes.
+    """
+    key = os.path.abspath(dic_file)
+    index = _indexes.get(key)
+    if index is not None and index.is_current(dic_file):
+        return index
+    path = index_path(dic_file)
+    try:
+        index = DictionaryIndex(path)
+    except (OSError, ValueError):
+        index = None
+    if index is None or not index.is_current(dic_file):
+        if index is not None:
+            index.close()
+        index = DictionaryIndex(compile_index(dic_file, path))
+    _indexes[key] = index
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile an mmCIF dictionary into a dictionary index")
+    parser.add_argument("dic_file", help="dictionary file, e.g. mmcif_tools/mmcif_pdbx_v50.dic")
+    parser.add_argument("-o", "--output", help="index file (default: <dic_file>.idx)")
+    args = parser.parse_args()
+    output_file = compile_index(args.dic_file, args.output)
+    index = DictionaryIndex(output_file)
+    print(f"Compiled {len(index.category_names)} categories and {len(index.types)} types from {args.dic_file} "
+          f"into {output_file} ({os.path.getsize(output_file)} bytes)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+dictionary_subset.py
+
+Description: This script extracts from the mmCIF dictionary the sub-dictionary a file needs: the definitions of
+the categories it uses and of the categories their items are linked to, parents of parents included. Every part
+of the dictionary outside save frames (item types, units, category groups, ...) is kept, and every save frame is
+copied byte for byte, so item types, enumerations, keys, mandatory items and links of the kept categories are
+exactly those of the full dictionary; gemmi validate reports the same diagnostics against either.
+
+The save frames of the dictionary are indexed once (<subset dir>/<dictionary>.frames.json, rebuilt when the
+dictionary changes) and sub-dictionaries are kept in the subset directory by their set of categories, so a
+sub-dictionary is written once and used by every later file with the same categories. mmcif_validation hands a
+sub-dictionary to each gemmi validate process, which then parses a few hundred definitions instead of the whole
+dictionary.
+
+Example usage:
+    python dictionary_subset.py mmcif_tools/mmcif_pdbx_v50.dic -c test_data/TOMO_data.cif
+    python dictionary_subset.py mmcif_tools/mmcif_pdbx_v50.dic --categories em_imaging,em_software -o em.dic
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import re
+import json
+import hashlib
+import argparse
+import tempfile
+from cif_reader import split_tag, parse_categories
+from mmcif_dictionary import make_shared
+
+SUBSET_DIR = "subsets"
+FRAMES_SUFFIX = ".frames.json"
+FRAMES_VERSION = 1
+MAX_SUBSETS = 100
+
+# A tag anywhere in a file; values that look like tags only add categories to the subset
+_TAG = re.compile(rb"(?:^|\s)_([^\s.]+)\.")
+
+
+def subset_dir(dic_file):
+    """Returns the directory holding the sub-dictionaries of dic_file: subsets/ next to it."""
+    return os.path.join(os.path.dirname(os.path.abspath(dic_file)), SUBSET_DIR)
+
+
+def index_frames(dic_file):
+    """
+    Indexes the save frames of a DDL2 dictionary.
+
+    Returns:
+        dict: {"version": FRAMES_VERSION, "source": size and modification time of the dictionary,
+               "header": [[start, end], ...] byte ranges outside save frames,
+               "frames": [[start, end, [category, ...]], ...] byte ranges of the save frames with the categories
+               they define items of (or are linked from),
+               "links": [[child category, parent category], ...] from _item_linked and
+               _pdbx_item_linked_group_list}.
+
+    Raises:
+        ValueError: If a save frame or text field is not closed.
+    """
+    stat = os.stat(dic_file)
+    with open(dic_file, 'rb') as file:
+        data = file.read()
+    header, frames, links = [], [], set()
+    header_start = 0
+    frame_start = None
+    text_field = False
+    position = 0
+    while position < len(data):
+        end = data.find(b"\n", position)
+        end = len(data) if end < 0 else end + 1
+        line = data[position:end]
+        if line.startswith(b";"):
+            text_field = not text_field
+        elif not text_field:
+            word = line.strip()
+            if word[:5].lower() == b"save_":
+                if word[5:] and frame_start is None:
+                    frame_start = position
+                    header.append([header_start, position])
+                elif not word[5:] and frame_start is not None:
+                    frames.append(_frame(data, frame_start, end, links))
+                    frame_start = None
+                    header_start = end
+        position = end
+    if text_field or frame_start is not None:
+        raise ValueError(f"'{dic_file}' ends inside a {'text field' if text_field else 'save frame'}")
+    header.append([header_start, len(data)])
+    return {"version": FRAMES_VERSION, "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+            "header": [span for span in header if span[0] < span[1]], "frames": frames,
+            "links": [list(link) for link in sorted(links)]}
+
+
+def _frame(data, start, end, links):
+    """One entry of index_frames for the save frame in data[start:end]; adds its links to links."""
+    text = data[start:end].decode('utf-8', errors='replace')
+    name = text.split(None, 1)[0][5:]
+    categories = {split_tag(name)[0]} if name.startswith("_") else set()
+    for category in parse_categories(text.splitlines(True)):
+        rows = [dict(zip(category.items, row)) for row in category.rows]
+        if category.name == "category":
+            categories.update(row["id"] for row in rows if row.get("id"))
+        elif category.name == "item":
+            categories.update(split_tag(row["name"])[0] for row in rows if row.get("name"))
+        elif category.name == "item_linked":
+            for row in rows:
+                if row.get("child_name") and row.get("parent_name"):
+                    child = split_tag(row["child_name"])[0]
+                    categories.add(child)
+                    links.add((child, split_tag(row["parent_name"])[0]))
+        elif category.name == "pdbx_item_linked_group_list":
+            links.update((row["child_category_id"], row["parent_category_id"]) for row in rows
+                         if row.get("child_category_id") and row.get("parent_category_id"))
+    return [start, end, sorted(categories)]
+
+
+_frame_indexes = {}
+
+
+def load_frames(dic_file, cache_dir=None):
+    """
+    Returns the frame index of dic_file (see index_frames), indexing the dictionary first if its stored index
+    is missing or older than the dictionary. The index is kept for the life of the process.
+    """
+    cache_dir = cache_dir or subset_dir(dic_file)
+    stat = os.stat(dic_file)
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    key = os.path.abspath(dic_file)
+    frames = _frame_indexes.get(key)
+    if frames is not None and frames["source"] == source:
+        return frames
+    path = os.path.join(cache_dir, os.path.basename(dic_file) + FRAMES_SUFFIX)
+    try:
+        with open(path, 'r') as file:
+            frames = json.load(file)
+    except (OSError, ValueError):
+        frames = None
+    if frames is None or frames.get("version") != FRAMES_VERSION or frames.get("source") != source:
+        frames = index_frames(dic_file)
+        _write_atomic(path, json.dumps(frames, separators=(",", ":")).encode('utf-8'))
+    _frame_indexes[key] = frames
+    return frames
+
+
+def required_categories(frames, categories):
+    """
+    Returns the sorted dictionary categories a sub-dictionary for categories holds: those defined in the
+    dictionary and every category they are linked to as children, transitively.
+    """
+    defined = {category for frame in frames["frames"] for category in frame[2]}
+    parents = {}
+    for child, parent in frames["links"]:
+        parents.setdefault(child, set()).add(parent)
+    required = set()
+    pending = [category for category in categories if category in defined]
+    while pending:
+        category = pending.pop()
+        if category not in required:
+            required.add(category)
+            pending.extend(parents.get(category, set()) & defined)
+    return sorted(required)
+
+
+def write_subset(dic_file, frames, categories, output_file):
+    """
+    Writes the sub-dictionary of dic_file holding the save frames of categories (see required_categories) and
+    everything outside save frames, in the order of the dictionary. The file is replaced atomically.
+    """
+    wanted = set(categories)
+    ranges = list(frames["header"])
+    ranges.extend(frame[:2] for frame in frames["frames"] if wanted.intersection(frame[2]))
+    ranges.sort()
+    with open(dic_file, 'rb') as file:
+        data = file.read()
+    _write_atomic(output_file, b"".join(data[start:end] for start, end in ranges))
+
+
+def categories_in(cif_file):
+    """Returns the set of categories whose tags appear in a text mmCIF file, plain or compressed."""
+    from compressed_io import open_file
+    with open_file(cif_file, 'rb') as file:
+        data = file.read()
+    return {match.decode('utf-8', errors='replace') for match in set(_TAG.findall(data))}
+
+
+def get_subset(dic_file, categories, cache_dir=None):
+    """
+    Returns the path of the sub-dictionary of dic_file for categories, writing it if it is not in cache_dir
+    yet. Sub-dictionaries are named by a hash of the dictionary and their categories; the least recently used
+    are removed beyond MAX_SUBSETS.
+    """
+    cache_dir = cache_dir or subset_dir(dic_file)
+    frames = load_frames(dic_file, cache_dir)
+    required = required_categories(frames, categories)
+    identity = json.dumps([os.path.abspath(dic_file), frames["source"], required]).encode('utf-8')
+    stem = os.path.splitext(os.path.basename(dic_file))[0]
+    path = os.path.join(cache_dir, f"{stem}-{hashlib.sha256(identity).hexdigest()[:24]}.dic")
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    write_subset(dic_file, frames, required, path)
+    _evict(cache_dir)
+    return path
+
+
+def subset_for_file(cif_file, dic_file, cache_dir=None):
+    """Returns the path of the sub-dictionary of dic_file for the categories of cif_file; see get_subset."""
+    return get_subset(dic_file, categories_in(cif_file), cache_dir)
+
+
+def _evict(cache_dir):
+    subsets = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".dic"):
+            try:
+                subsets.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    for _, path in sorted(subsets)[:max(0, len(subsets) - MAX_SUBSETS)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".part", delete=False) as part:
+        part.write(content)
+    make_shared(part.name)
+    os.replace(part.name, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the sub-dictionary of an mmCIF dictionary that a file or "
+                                                 "a set of categories needs")
+    parser.add_argument("dic_file", help="dictionary file, e.g. mmcif_tools/mmcif_pdbx_v50.dic")
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("-c", "--input_cif_file", help="mmCIF file whose categories are kept")
+    selection.add_argument("--categories", help="comma-separated categories to keep, e.g. em_imaging,em_software")
+    parser.add_argument("-o", "--output", help="sub-dictionary file (default: one in the subset directory)")
+    args = parser.parse_args()
+
+    if args.input_cif_file:
+        categories = categories_in(args.input_cif_file)
+    else:
+        categories = {category.strip() for category in args.categories.split(",") if category.strip()}
+    if args.output:
+        frames = load_frames(args.dic_file)
+        required = required_categories(frames, categories)
+        write_subset(args.dic_file, frames, required, args.output)
+        output_file = args.output
+    else:
+        output_file = get_subset(args.dic_file, categories)
+        required = required_categories(load_frames(args.dic_file), categories)
+    print(f"Wrote {len(required)} categories ({', '.join(required)}) to {output_file} "
+          f"({os.path.getsize(output_file)} of {os.path.getsize(args.dic_file)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -49,10 +49,10 @@ class TestJsonToMmcif(unittest.TestCase):
             os.remove(self.cif_file)
         shutil.rmtree(self.temp_dir)
 
-    @patch('urllib.request.urlretrieve')
-    def test_json_conversion(self, mock_urlretrieve):
+    @patch('mmcif_dictionary.DictionaryCache.fetch')
+    def test_json_conversion(self, mock_fetch):
         # Mock the download to bypass network requests
-        mock_urlretrieve.return_value = None
+        mock_fetch.return_value = False
 
         with open(self.json_file, 'w') as f:
             json.dump(self.json_data, f)
@@ -67,9 +67,9 @@ class TestJsonToMmcif(unittest.TestCase):
         with open(expected_mmcif_file, 'r') as f:
             self.assertIn('_em_imaging.mode', f.read())
 
-    @patch('urllib.request.urlretrieve')
-    def test_data_merging(self, mock_urlretrieve):
-        mock_urlretrieve.return_value = None
+    @patch('mmcif_dictionary.DictionaryCache.fetch')
+    def test_data_merging(self, mock_fetch):
+        mock_fetch.return_value = False
 
         with open(self.json_file, "w") as f:
             json.dump(self.json_data, f)
@@ -86,8 +86,28 @@ class TestJsonToMmcif(unittest.TestCase):
         with open(self.mmcif_file, "r") as f:
             self.assertIn("_em_imaging.mode", f.read())
 
-    @patch('urllib.request.urlretrieve')
-    def test_validation_logic(self, mock_urlretrieve):
+    @patch('mmcif_dictionary.DictionaryCache.fetch')
+    def test_patch_merging(self, mock_fetch):
+        with open(self.json_file, "w") as f:
+            json.dump(self.json_data, f)
+
+        existing = "data_model\n# kept as it is\n_entry.id   1ABC\n#\n_em_imaging.mode \"DARK FIELD\"\n#\n"
+        with open(self.cif_file, "w") as f:
+            f.write(existing)
+
+        # Simulate command-line arguments for patching the JSON into the existing file
+        sys.argv = ["json_to_mmcif.py", "-j", self.json_file, "-f", "cif", "-c", self.cif_file, "-p",
+                    "-d", "no", "-v", "all"]
+        run()
+
+        with open(self.mmcif_file, "r") as f:
+            merged = f.read()
+        self.assertTrue(merged.startswith("data_model\n# kept as it is\n_entry.id   1ABC\n#\n"))
+        self.assertIn('_em_imaging.mode              "BRIGHT FIELD"', merged)
+        self.assertIn('_em_imaging.microscope_model  "TFS KRIOS"', merged)
+
+    @patch('mmcif_dictionary.DictionaryCache.fetch')
+    def test_validation_logic(self, mock_fetch):
         with open(self.json_file, 'w') as f:
             json.dump(self.json_data, f)
 
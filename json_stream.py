@@ -0,0 +1,248 @@
+"""
+json_stream.py
+
+Description: This script reads converter JSON input ({category: {item: value or [values]}}) incrementally, using
+the standard library only. A first pass records where each item array starts in the file without decoding it;
+rows are then produced in chunks by reading all arrays of a category side by side, so memory use does not grow
+with the number of rows.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import re
+import json
+from collections import namedtuple
+from contextlib import ExitStack
+from cif_writer import CifWriter
+from cif_reader import BLOCK_PREFIX, json_blocks
+from compressed_io import open_file
+
+READ_SIZE = 1 << 16
+CHUNK_ROWS = 10000
+
+JsonArray = namedtuple("JsonArray", ["offset"])
+JsonArray.__doc__ = "Placeholder for an item array that has not been read, with the byte offset of its '['."
+
+_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.S)
+_LITERAL = re.compile(rb"[-+0-9.eEa-zA-Z]+")
+_ARRAY_SYNTAX = re.compile(rb'["\[\]{}]')
+
+
+class _JsonScanner:
+    """Reads JSON tokens from a binary file starting at a byte offset, holding only a small buffer."""
+
+    def __init__(self, file, offset=0):
+        self.file = file
+        file.seek(offset)
+        self.buffer = b""
+        self.buffer_offset = offset
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        data = self.file.read(READ_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer_offset += self.position
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        return True
+
+    def offset(self):
+        return self.buffer_offset + self.position
+
+    def peek(self):
+        """Skips whitespace and returns the next character (as bytes), or b"" at the end of the file."""
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position:self.position + 1]
+            if not self._fill():
+                return b""
+
+    def expect(self, character):
+        found = self.peek()
+        if found != character:
+            raise ValueError(f"expected {character.decode()!r} at byte {self.offset()}, found {found.decode()!r}")
+        self.position += 1
+
+    def _token(self, pattern):
+        while True:
+            match = pattern.match(self.buffer, self.position)
+            # A match that reaches the end of the buffer may continue in the next read
+            if match and (match.end() < len(self.buffer) or self.eof):
+                self.position = match.end()
+                return match.group()
+            if not self._fill():
+                if match:
+                    continue
+                raise ValueError(f"invalid JSON at byte {self.offset()}")
+
+    def read_scalar(self):
+        """Reads a string, number, true, false or null."""
+        first = self.peek()
+        if first == b'"':
+            return json.loads(self._token(_STRING))
+        if first in (b"{", b"[", b""):
+            raise ValueError(f"expected a single value at byte {self.offset()}")
+        return json.loads(self._token(_LITERAL))
+
+    def skip_array(self):
+        """Moves past the array starting at the current position without decoding it."""
+        self.expect(b"[")
+        depth = 1
+        while depth:
+            match = _ARRAY_SYNTAX.search(self.buffer, self.position)
+            if match is None:
+                self.position = len(self.buffer)
+                if not self._fill():
+                    raise ValueError("unterminated array")
+                continue
+            self.position = match.start()
+            character = match.group()
+            if character == b'"':
+                self._token(_STRING)
+                continue
+            self.position += 1
+            depth += 1 if character in (b"[", b"{") else -1
+
+    def iter_array(self):
+        """Yields the values of the array of scalars starting at the current position."""
+        self.expect(b"[")
+        if self.peek() == b"]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_scalar()
+            separator = self.peek()
+            self.position += 1
+            if separator == b"]":
+                return
+            if separator != b",":
+                raise ValueError(f"expected ',' or ']' at byte {self.offset() - 1}")
+
+
+def scan_json_categories(input_json_file):
+    """
+    Reads the layout of a converter JSON file without loading its arrays.
+
+    Returns:
+        dict: {category: {item: value}}, where each item array is replaced by a JsonArray placeholder. A file
+        with several data blocks gives {"data_<name>": {category: {item: value}}}.
+
+    Raises:
+        ValueError: If the file is not a JSON object of category objects or of data blocks.
+    """
+    with open_file(input_json_file, 'rb') as file:
+        scanner = _JsonScanner(file)
+        layout = _scan_object(scanner, blocks=True)
+    json_blocks(layout)
+    return layout
+
+
+def _scan_object(scanner, blocks):
+    """Reads an object of categories, or with blocks an object that may also hold data_ blocks of categories."""
+    members = {}
+    scanner.expect(b"{")
+    if scanner.peek() == b"}":
+        scanner.position += 1
+        return members
+    while True:
+        key = scanner.read_scalar()
+        scanner.expect(b":")
+        # A repeated key replaces the earlier one, as with json.load
+        members[key] = _scan_object(scanner, False) if blocks and key.startswith(BLOCK_PREFIX) \
+            else _scan_items(scanner)
+        if scanner.peek() == b"}":
+            scanner.position += 1
+            return members
+        scanner.expect(b",")
+
+
+def _scan_items(scanner):
+    items = {}
+    scanner.expect(b"{")
+    if scanner.peek() == b"}":
+        scanner.position += 1
+        return items
+    while True:
+        item = scanner.read_scalar()
+        scanner.expect(b":")
+        if scanner.peek() == b"[":
+            items[item] = JsonArray(scanner.offset())
+            scanner.skip_array()
+        else:
+            items[item] = scanner.read_scalar()
+        if scanner.peek() == b"}":
+            scanner.position += 1
+            return items
+        scanner.expect(b",")
+
+
+def iter_category_rows(input_json_file, items, chunk_rows=CHUNK_ROWS):
+    """
+    Yields the rows of one category in lists of at most chunk_rows rows.
+
+    Parameters:
+        items (dict): {item: value or JsonArray} as returned by scan_json_categories for the category.
+
+    Raises:
+        ValueError: If the item arrays have different lengths, or the category mixes arrays and single values.
+    """
+    values = list(items.values())
+    if not any(isinstance(value, JsonArray) for value in values):
+        yield [values]
+        return
+    if not all(isinstance(value, JsonArray) for value in values):
+        raise ValueError("a category mixes lists and single values")
+
+    with ExitStack() as stack:
+        columns = [_JsonScanner(stack.enter_context(open_file(input_json_file, 'rb')), value.offset).iter_array()
+                   for value in values]
+        chunk = []
+        while True:
+            row = [next(column, _END) for column in columns]
+            if row[0] is _END:
+                if any(value is not _END for value in row):
+                    raise ValueError("item arrays have different lengths")
+                break
+            if any(value is _END for value in row):
+                raise ValueError("item arrays have different lengths")
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+_END = object()
+
+
+def write_json_stream(input_json_file, output_cif_file, container_id, chunk_rows=CHUNK_ROWS):
+    """
+    Converts a JSON file to mmCIF without loading it, with the same output as translate_json_to_cif. Each data
+    block of a file with several blocks is written in turn; a single block is named container_id.
+
+    Each category is read twice, chunk_rows rows at a time: once to measure its columns and once to write it.
+    Compressed input and output files (.gz, .bz2, ...) are decompressed and compressed as they are streamed.
+
+    Returns:
+        dict: The layout of the JSON file as returned by scan_json_categories.
+    """
+    layout = scan_json_categories(input_json_file)
+    with open_file(output_cif_file, "w", buffering=1 << 20) as output:
+        writer = CifWriter(output)
+        for block_name, categories in json_blocks(layout, container_id):
+            writer.begin_block(block_name)
+            for name, items in categories.items():
+                writer.write_loop(name, list(items), lambda items=items: iter_category_rows(input_json_file, items,
+                                                                                              chunk_rows))
+            writer.end_block()
+    return layout
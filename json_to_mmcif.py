@@ -10,34 +10,102 @@ __author__ = 'Amudha Kumari Duraisamy'
 __email__ = 'emdbhelp@ebi.ac.uk'
 __date__ = '2024-10-15'
 
+import os
+import re
+import sys
+import glob
 import json
+import time
 import argparse
-import urllib.request
-from mmcif.api.DataCategory import DataCategory
-from mmcif.api.PdbxContainers import DataContainer
-from mmcif.io.PdbxWriter import PdbxWriter
-from mmcif_validator import validate_and_print
+from cif_reader import iter_categories, is_bcif, is_multiblock, json_blocks
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary
+from compressed_io import COMPRESSIONS, compression_of, strip_compression, base_name, open_file
+from profiling import stage, enable_profiling, write_profile
+# The merging and container helpers are shared with the in-memory conversions of converter, and kept importable
+# from here
+from converter import (Converter, categories_to_json, is_bcif_format, write_containers, add_container, add_category,
+                       merge_json_into_cif, build_containers)
+
+# Formats of the converted file: text mmCIF or BinaryCIF
+OUTPUT_FORMATS = ("cif", "bcif")
 
 def parse_arguments():
     """Example usage (if no input cif file): python json_to_mmcif.py -f json -j test_data/TOMO_data.json -d no -v all
     or if there is an input cif file:
-    python json_to_mmcif.py -f cif -j test_data/SPA_data.json -c test_data/input_mmcif.cif -v only"""
+    python json_to_mmcif.py -f cif -j test_data/SPA_data.json -c test_data/input_mmcif.cif -v only
+    or for a whole directory, glob pattern or manifest file:
+    python json_to_mmcif.py -f json -b "sessions/*/*.json" -w 8 -d yes -v all
+    or to convert the JSON files arriving in session directories as they are written:
+    python json_to_mmcif.py -f json --watch sessions/ -w 4 --metrics watch_metrics.json"""
     parser = argparse.ArgumentParser(description="JSON to mmCIF")
-    parser.add_argument("-j", "--input_json_file", required=True, help="input JSON file to convert or add to mmCIF")
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument("-j", "--input_json_file", help="input JSON file to convert or add to mmCIF")
+    inputs.add_argument("-b", "--batch",
+                        help="directory, glob pattern or manifest file of JSON files to convert in parallel")
+    inputs.add_argument("--watch", nargs="+", metavar="DIRECTORY",
+                        help="watch directories (recursively) and convert each JSON file written or changed in "
+                             "them once it is complete, until interrupted")
     parser.add_argument("-c", "--input_cif_file", help="input mmCIF file to add the JSON information to")
     parser.add_argument("-f", "--input_format", choices=["json", "cif"], required=True,
                         help="json for converting directly from JSON, cif for adding the JSON file to the existing CIF file")
     parser.add_argument("-d", "--download_dict", choices=["yes", "no"], default="yes",
                         help="Download the latest mmCIF dictionary for validation (default: yes)")
+    parser.add_argument("--dict_ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a downloaded dictionary is reused before checking for a newer one "
+                             "(default: 86400)")
     parser.add_argument("-v", "--validate", default="all", choices=["all", "only"],
                         help="Convert and validate (with option all) or Only validate the mmCIF file (with option only)(default: all)")
-    return parser.parse_args()
+    parser.add_argument("-p", "--patch", action="store_true",
+                        help="With -f cif, rewrite only the categories in the JSON and copy the rest of the input "
+                             "mmCIF file unchanged")
+    parser.add_argument("-s", "--stream", action="store_true",
+                        help="With -f json, read the JSON file and write the mmCIF file in chunks of rows, so memory "
+                             "use does not grow with the size of loop categories")
+    parser.add_argument("--writer", choices=["pdbx", "native"], default="pdbx",
+                        help="mmCIF writer: pdbx for mmcif.io.PdbxWriter, native for the faster column writer with "
+                             "identical output (default: pdbx)")
+    parser.add_argument("--output-format", dest="output_format", choices=OUTPUT_FORMATS, default="cif",
+                        help="cif for text mmCIF, bcif for BinaryCIF (MessagePack) written to <name>.bcif; not with "
+                             "-p or -s (default: cif)")
+    parser.add_argument("--compress", choices=("auto", "none") + COMPRESSIONS, default="auto",
+                        help="Compression of the converted file: auto for that of the input JSON file (e.g. "
+                             "session.json.gz gives session.cif.gz), none, gz, bz2, xz or zst (default: auto)")
+    parser.add_argument("--precheck", choices=["yes", "no"], default="yes",
+                        help="With -v all, check the data against a compiled index of the dictionary before writing "
+                             "and only run the full validation if no problem is found (default: yes)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true",
+                        help="Convert and validate even if the inputs are unchanged since a cached run, and do not "
+                             "store the results")
+    parser.add_argument("--cache_size", type=float, default=512,
+                        help="Megabytes the result cache may hold before the least recently used results are "
+                             "removed (default: 512)")
+    parser.add_argument("--profile", metavar="TRACE_FILE",
+                        help="Record wall time, CPU time, peak memory and I/O of each stage, print a summary and "
+                             "save a Chrome trace (chrome://tracing, Perfetto) to TRACE_FILE")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes in batch and watch mode (default: number of CPUs)")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="With --watch, seconds a JSON file must stay unchanged before it is converted, so "
+                             "files still being written are not read (default: 2)")
+    parser.add_argument("--queue_size", type=int, default=64,
+                        help="With --watch, complete files that may wait for a worker; more wait in the directory "
+                             "until there is room (default: 64)")
+    parser.add_argument("--metrics", metavar="METRICS_FILE",
+                        help="With --watch, write the latency, queue depth and file counts as JSON to METRICS_FILE "
+                             "every few seconds")
+    parser.add_argument("--poll", action="store_true",
+                        help="With --watch, scan the directories every few seconds instead of using inotify")
+    args = parser.parse_args()
+    if args.output_format == "bcif" and (args.patch or args.stream):
+        parser.error("--output-format bcif cannot be combined with -p or -s")
+    return args
 
 
 def json_to_dict(input_json_file):
-    """Convert a JSON file to a Python dictionary."""
+    """Convert a JSON file to a Python dictionary. A compressed file (.json.gz, .json.bz2, ...) is decompressed as it
+    is read."""
     try:
-        with open(input_json_file, 'r') as file:
+        with open_file(input_json_file, 'r') as file:
             data = json.load(file)
     except FileNotFoundError as e:
         raise FileNotFoundError(f"File '{input_json_file}' not found.") from e
@@ -45,53 +113,78 @@ def json_to_dict(input_json_file):
         raise TypeError(f"File '{input_json_file}' is not a valid JSON file.") from e
     return data
 
-def mmcif_to_json(input_cif_file):
-    """Converts an mmCIF file to a JSON format."""
-    json_data_dict = {}
-    with open(input_cif_file, 'r') as file:
-        for line in file:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('_'):
-                key, value = line.split(maxsplit=1)
-                if isinstance(value, str):
-                    value = value.strip('"')
-                if '.' in key:
-                    category, sub_key = key[1:].split('.', 1)
-                    if category not in json_data_dict:
-                        json_data_dict[category] = {}
-                    json_data_dict[category][sub_key] = value
-    return json_data_dict
-
-
-def write_mmcif_file(data_list, input_json_file):
-    """Writes CIF data to a new file."""
-    mmcif_filename = input_json_file.split(".")[0] + '.cif'
-    with open(mmcif_filename, "w") as cfile:
-        pdbx_writer = PdbxWriter(cfile)
-        try:
-            pdbx_writer.write(data_list)
-        except IndexError as e:
-            print(f"Error: {e}")
-            return False
-    return True
-
-
-def add_container(data_list, container_id):
-    """Adds a container with the specified container_id to the data_list."""
-    container = DataContainer(container_id)
-    data_list.append(container)
-    return container
-
-
-def add_category(container, category_id, items):
-    """Adds a category with the specified category_id and items to the container."""
-    category = DataCategory(category_id)
-    for item in items:
-        category.appendAttribute(item)
-    container.append(category)
-    return category
+def mmcif_to_json(input_cif_file, blocks=False):
+    """
+    Converts an mmCIF file to a JSON format.
+
+    The file is read category by category with cif_reader, so loop_ tables become column arrays
+    ({item: [value, ...]}) and quoted values and text fields are unquoted. A file with several data blocks
+    gives {"data_<name>": {category: ...}}, one key per block; with blocks, a single block is returned in
+    that form too.
+    """
+    # Columns are sliced from the loop values as they are read, without a list per row
+    return categories_to_json(iter_categories(input_cif_file, columns=True), blocks)
+
+
+def output_file(input_json_file, output_format="cif"):
+    """
+    Returns the path of the file converted from input_json_file.
+
+    output_format is the extension of that file: cif, or bcif for BinaryCIF, optionally followed by a
+    compression (cif.gz, bcif.xz, ...). The name of the input is kept up to its file extension, so
+    runs/v1.2/session.json.gz gives runs/v1.2/session.cif.
+    """
+    return base_name(input_json_file) + "." + output_format
+
+
+def resolve_output_format(output_format, compress, input_json_file):
+    """
+    Returns the output_format of the conversion of input_json_file with a --compress option: auto for the
+    compression of input_json_file, none for a plain file, or a compression (gz, bz2, xz, zst).
+    """
+    if compress == "auto":
+        compress = compression_of(input_json_file)
+    return output_format if compress in (None, "none") else output_format + "." + compress
+
+
+def write_mmcif_file(data_list, input_json_file, output_format="cif"):
+    """
+    Writes CIF data to a new file.
+
+    data_list may be any iterable of DataContainers. They are written one at a time, so a generator that builds
+    each container as it is needed keeps only one data block in memory.
+    """
+    with open_file(output_file(input_json_file, output_format), "w") as cfile:
+        return write_containers(data_list, cfile)
+
+
+def write_native_mmcif_file(container_dict, input_json_file, output_format="cif"):
+    """
+    Writes the JSON data to a new mmCIF file straight from its column arrays with cif_writer.
+
+    The output is identical to translate_json_to_cif with PdbxWriter, without building DataContainer and
+    DataCategory objects. Data with several blocks is written as one data_ block per entry.
+    """
+    return _write_converted(container_dict, input_json_file, "native", output_format)
+
+
+def write_bcif_file(container_dict, input_json_file, output_format="bcif"):
+    """
+    Writes the JSON data to a BinaryCIF file with cif_binary, one data block per entry as with the text writers.
+    Read back, every value has the text the mmCIF writers give it.
+    """
+    return _write_converted(container_dict, input_json_file, "native", output_format)
+
+
+def _write_converted(container_dict, input_json_file, writer, output_format):
+    """Writes the output file of input_json_file with converter.Converter.write; a single block is named after it."""
+    # Data mixing blocks and categories is refused before an existing output file is truncated
+    json_blocks(container_dict)
+    mode = "wb" if is_bcif_format(output_format) else "w"
+    with open_file(output_file(input_json_file, output_format), mode, buffering=1 << 20) as file:
+        # The file compresses, so the converter only encodes
+        return Converter(writer).write(container_dict, file, base_name(input_json_file),
+                                       output_format.split(".")[0])
 
 
 def insert_data(container, category_id, data_list):
@@ -108,73 +201,416 @@ def insert_data(container, category_id, data_list):
     return cat_obj
 
 
-def convert_input_file(input_json_file, input_cif_file, input_format):
-    container_dict = {}
-    if input_format == "json":
-        container_dict = json_to_dict(input_json_file)
+def convert_input_file(input_json_file, input_cif_file, input_format, patch=False, stream=False, writer="pdbx",
+                       index=None, output_format="cif"):
+    """
+    Converts the JSON file to mmCIF, or merges it into input_cif_file with input_format cif.
+
+    With a DictionaryIndex the converted data is checked before it is written (see translate_json_to_cif); the
+    streaming and patching conversions are not checked, since they never hold the whole data in memory.
+    convert_and_check also returns the result of the check.
+
+    With stream (json format only) the JSON file is converted in chunks of rows by json_stream, and the layout
+    of the file (item arrays replaced by JsonArray placeholders) is returned instead of its data. writer selects
+    PdbxWriter ("pdbx") or the column writer of cif_writer ("native") for the other conversions, and
+    output_format "bcif" writes BinaryCIF instead of text mmCIF, and a compression suffix (e.g. "cif.gz") compresses
+    the output (see output_file). input_cif_file may be text mmCIF or BinaryCIF, plain or compressed.
+
+    With patch (cif format only) the merged file is written by patching the categories of the JSON into a copy
+    of input_cif_file, leaving all other content byte for byte as it was, and the JSON data is returned instead
+    of the full merged dictionary. A BinaryCIF input_cif_file cannot be patched, so it is merged in full instead.
+    """
+    return convert_and_check(input_json_file, input_cif_file, input_format, patch, stream, writer, index,
+                             output_format)[0]
+
+
+def convert_and_check(input_json_file, input_cif_file, input_format, patch=False, stream=False, writer="pdbx",
+                      index=None, output_format="cif"):
+    """
+    Same as convert_input_file.
+
+    Returns:
+        tuple: (data, bool) - what convert_input_file returns, and False if the converted file is not to be
+        validated in full (see translate_json_to_cif); pass it to download_and_validate as checked.
+    """
+    if input_format == "json" and stream:
+        from json_stream import write_json_stream
+        with stage("write_json_stream", file=input_json_file):
+            return write_json_stream(input_json_file, output_file(input_json_file, output_format),
+                                     base_name(input_json_file)), True
+
+    with stage("json_to_dict", file=input_json_file):
+        json_dict = json_to_dict(input_json_file)
+    container_dict = json_dict
+
+    if input_format == "cif" and patch and is_bcif(input_cif_file):
+        print(f"Note: {input_cif_file} is BinaryCIF and cannot be patched; merging all its categories instead")
+    elif input_format == "cif" and patch:
+        from cif_patch import patch_mmcif_file
+        with stage("patch_mmcif_file", file=input_cif_file):
+            patch_mmcif_file(input_cif_file, json_dict, output_file(input_json_file, output_format))
+        return json_dict, True
 
     if input_format == "cif":
-        container_dict = json_to_dict(input_json_file)
-        cif_dict = mmcif_to_json(input_cif_file)
-
-        # Merge JSON data into CIF data, overwriting existing keys with JSON values
-        for category, values in container_dict.items():
-            if category in cif_dict:
-                # Overwrite only keys in CIF that exist in JSON
-                for key, val in values.items():
-                    cif_dict[category][key] = val
-            else:
-                cif_dict[category] = values
-        container_dict = cif_dict
+        with stage("mmcif_to_json", file=input_cif_file):
+            cif_dict = mmcif_to_json(input_cif_file, is_multiblock(json_dict))
+        with stage("merge"):
+            container_dict = merge_json_into_cif(cif_dict, json_dict)
+    elif input_format != "json":
+        container_dict = {}
 
-    translate_json_to_cif(container_dict, input_json_file)
+    return container_dict, translate_json_to_cif(container_dict, input_json_file, writer, index, output_format)
 
-    return container_dict
 
-def translate_json_to_cif(container_dict, input_json_file):
-    """Translates input JSON data into a CIF file."""
-    cif_data_list = []
-    container_id = input_json_file.split(".")[0]
-    container = add_container(cif_data_list, container_id)
+def translate_json_to_cif(container_dict, input_json_file, writer="pdbx", index=None, output_format="cif"):
+    """
+    Translates input JSON data into a CIF file, with PdbxWriter or with the native writer, or into a BinaryCIF
+    file with output_format "bcif"; see output_file for compressed output formats.
 
-    for category_name, category_data in container_dict.items():
-        category_list = list(category_data.keys())
-        cif_values_list = list(category_data.values())
+    With a DictionaryIndex the data is checked by precheck_data before it is written, and the problems found are
+    saved as the validation report once the file is. Data with several blocks ({"data_<name>": {category: ...}})
+    is written as one data_ block per entry, each block built and written before the next one is built; a single
+    block is named after the input file. The data is written by converter.Converter, whose in-memory
+    conversions give the same output.
 
-        # Ensure consistent data format
-        if len(category_list) != len(cif_values_list):
-            print(f"Error: Mismatch in attributes and values for category {category_name}")
-            return False
+    Returns:
+        bool: True if the file was written and, with an index, its data passed the fast check, so that the file
+        is to be validated in full.
+    """
+    valid, problems = True, []
+    if index is not None:
+        with stage("precheck"):
+            valid, problems = precheck_data(container_dict, input_json_file, index)
 
-        add_category(container, category_name, category_list)
-        insert_data(container, category_name, cif_values_list)
+    if is_bcif_format(output_format):
+        with stage("write_bcif_file"):
+            result = write_bcif_file(container_dict, input_json_file, output_format)
+    elif writer == "native":
+        with stage("write_native_mmcif_file"):
+            result = write_native_mmcif_file(container_dict, input_json_file, output_format)
+    else:
+        with stage("write_mmcif_file"):
+            result = _write_converted(container_dict, input_json_file, writer, output_format)
 
-    # Write the CIF file and check result
-    result = write_mmcif_file(cif_data_list, input_json_file)
-    if not result:
-        print("Error: Failed to write mmCIF file.")
-    return result
+    if not valid:
+        # The lines of the values can only be looked up in a text file that was written
+        save_precheck_report(problems, input_json_file, index, output_format,
+                             located=result and not is_bcif_format(output_format))
+    return result and valid
+
+
+def precheck_data(container_dict, input_json_file, index):
+    """
+    Checks the data of a conversion against the compiled dictionary index before its mmCIF file is written.
+
+    If a value would fail validation, the problems are to be saved with save_precheck_report, and the full
+    validation of the file is skipped.
+
+    Returns:
+        tuple: (bool, list) - False if a value would fail validation, and the problems found.
+    """
+    valid, problems = True, []
+    for block_name, categories in json_blocks(container_dict, base_name(input_json_file)):
+        block_valid, block_problems = index.check(categories, block_name)
+        valid = valid and block_valid
+        problems.extend(block_problems)
+    return valid, problems
+
+
+def save_precheck_report(problems, input_json_file, index, output_format="cif", located=True):
+    """
+    Saves the problems found by precheck_data as the validation report (<input_json_file>_val.txt).
+
+    The report is laid out as gemmi validate writes it, so diagnostics.parse_report reads both alike; with located,
+    the converted text file is read for the lines of the values.
+    """
+    cif_file = output_file(input_json_file, output_format)
+    tag_lines = _tag_lines(cif_file) if located else {}
+    val_filename = base_name(input_json_file) + '_val.txt'
+    with open(val_filename, "w") as outfile:
+        outfile.write(f"Note: fast check against {index.path}, without numeric types and ranges\n")
+        outfile.write(f"Reading {cif_file}...\n")
+        for problem in problems:
+            outfile.write(_locate_problem(problem, cif_file, tag_lines) + "\n")
+        outfile.write("FAILED\n")
+    print(f"Fast validation failed with {len(problems)} problems and output saved to {val_filename}")
+
+
+# A value problem of DictionaryIndex.check: "[block] _category.item: message"
+_VALUE_PROBLEM = re.compile(r"\[(?P<block>[^\]]*)\] (?P<tag>_[^\s:]+): (?P<message>.*)", re.S)
+
+
+def _locate_problem(problem, cif_file, tag_lines):
+    """
+    Returns a problem of DictionaryIndex.check as gemmi validate reports it: a value of a tag-value pair at the
+    line of its tag and without the tag, a value of a loop at the line of loop_. Other problems have no line.
+    """
+    match = _VALUE_PROBLEM.match(problem)
+    if match is None:
+        return problem
+    block, tag = match.group("block"), match.group("tag")
+    line = tag_lines.get((block, tag))
+    if line is not None:
+        return f"{cif_file}:{line} [{block}] {match.group('message')}"
+    line = tag_lines.get((block, tag[1:].partition(".")[0]))
+    if line is not None:
+        return f"{cif_file}:{line} {problem}"
+    return problem
 
-def download_and_validate(input_json_file, input_cif_file, download_dict, validate):
-    """Download the latest mmcif dictionary and validate an mmCIF file."""
-    mmcif_filename = input_json_file.split(".")[0] + '.cif'
-    val_filename = input_json_file.split(".")[0] + '_val.txt'
-    dic_file = "mmcif_tools/mmcif_pdbx_v50.dic"
-    if download_dict == "yes":
-        urllib.request.urlretrieve("https://mmcif.wwpdb.org/dictionaries/ascii/mmcif_pdbx_v50.dic", dic_file)
+
+def _tag_lines(cif_file):
+    """Returns {(block, tag): line} of the tag-value pairs and {(block, category): line} of the loops of a file."""
+    from cif_reader import tokenize, DATA, LOOP, TAG
+    lines = {}
+    block, loop_line = None, None
+    with open_file(cif_file) as f:
+        for kind, value, line_number in tokenize(f):
+            if kind == DATA:
+                block, loop_line = value, None
+            elif kind == LOOP:
+                loop_line = line_number
+            elif kind == TAG:
+                if loop_line is None:
+                    lines[(block, value)] = line_number
+                else:
+                    lines.setdefault((block, value[1:].partition(".")[0]), loop_line)
+            else:
+                # The values of a loop end its tags
+                loop_line = None
+    return lines
+
+
+def load_precheck_index(dic_file):
+    """Returns the DictionaryIndex of dic_file, compiling it if needed, or None if there is no dictionary."""
+    if not os.path.isfile(dic_file):
+        return None
+    from dictionary_index import load_index
+    with stage("load_index"):
+        return load_index(dic_file)
+
+
+def download_and_validate(input_json_file, input_cif_file, download_dict, validate, dict_ttl=DEFAULT_TTL,
+                          in_process=False, output_format="cif", category_cache=None, checked=True):
+    """
+    Download the latest mmcif dictionary (unless the cached copy is current) and validate an mmCIF file.
+    With in_process the file is validated by the dictionary-once MmcifValidator instead of a gemmi subprocess,
+    and with a result_cache.CategoryCache it is validated in process, only in the categories not in the cache.
+    output_format is the format the JSON file was converted to, e.g. "cif", "bcif" or "cif.gz" (see output_file);
+    files gemmi validate cannot read (BinaryCIF, bz2, xz, zst) are always validated in process. checked is the
+    result of convert_and_check for the converted file; if it is False, the file is not validated again.
+    """
+    from mmcif_validator import validate_and_print
+    cif_file, result = file_to_validate(input_json_file, input_cif_file, validate, output_format, checked)
+    if cif_file is None:
+        return result
+    return validate_and_print(cif_file, download_dict, base_name(input_json_file) + '_val.txt', dict_ttl=dict_ttl,
+                              in_process=in_process, category_cache=category_cache)
+
+
+def file_to_validate(input_json_file, input_cif_file, validate, output_format="cif", checked=True):
+    """
+    Returns the file download_and_validate validates: the converted file with validate all, input_cif_file with
+    validate only.
+
+    Returns:
+        tuple: (cif_file, None), or (None, result) if there is nothing to validate and result is the outcome.
+    """
     if validate == "all":
-        validate_and_print(mmcif_filename, dic_file, val_filename)
-    elif validate == "only":
+        mmcif_filename = output_file(input_json_file, output_format)
+        if not checked:
+            print(f"Full validation of {mmcif_filename} skipped after the conversion reported problems")
+            return None, False
+        return mmcif_filename, None
+    if validate == "only":
         if not input_cif_file:
             print("Error: Please provide the input mmCIF file with -c argument.")
-        validate_and_print(input_cif_file, dic_file, val_filename)
-    return True
+            return None, (False, "Error: no input mmCIF file to validate.")
+        return input_cif_file, None
+    return None, True
+
+
+def collect_batch_inputs(batch_input, input_cif_file=None):
+    """
+    Expands a directory, glob pattern or manifest file into (json, cif) pairs.
+
+    A directory yields every *.json file directly inside it, compressed ones (*.json.gz, ...) included, and a
+    glob pattern every matching file.
+    Any other existing file is read as a manifest with one JSON path per line, optionally followed
+    by the path of the mmCIF file to merge it into; blank lines and lines starting with # are skipped.
+    Without a per-file mmCIF path, input_cif_file is used. A JSON file selected more than once is kept once,
+    with its first mmCIF path, since its outputs are named after it.
+    """
+    if os.path.isdir(batch_input):
+        pairs = [(f, input_cif_file) for f in sorted(glob.glob(os.path.join(batch_input, "*.json*")))
+                 if strip_compression(f).endswith(".json")]
+    elif os.path.isfile(batch_input) and not strip_compression(batch_input).endswith(".json"):
+        pairs = []
+        with open(batch_input, 'r') as manifest:
+            for line in manifest:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = line.split()
+                pairs.append((fields[0], fields[1] if len(fields) > 1 else input_cif_file))
+    else:
+        pairs = [(f, input_cif_file) for f in sorted(glob.glob(batch_input, recursive=True))]
+    # Results are keyed by the JSON file, and two workers must not write the same outputs at once
+    unique = {}
+    for pair in pairs:
+        unique.setdefault(os.path.abspath(pair[0]), pair)
+    return list(unique.values())
+
+
+def process_input_file(input_json_file, input_cif_file, input_format, validate, patch=False, stream=False,
+                       writer="pdbx", precheck=False, cache=None, output_format="cif"):
+    """
+    Converts and validates one file for the batch runner without raising.
+
+    With precheck (and validate all) the data is first checked against the index of the cached dictionary.
+    With a ResultCache the outputs of unchanged inputs are restored from it instead.
+
+    Returns:
+        tuple: (input_json_file, succeeded, message, elapsed seconds)
+    """
+    start = time.perf_counter()
+    try:
+        with stage("process_input_file", file=input_json_file):
+            result = _process_cached(input_json_file, input_cif_file, input_format, validate, patch, stream,
+                                     writer, precheck, cache, output_format)
+    except Exception as e:
+        return input_json_file, False, f"{type(e).__name__}: {e}", time.perf_counter() - start
+    if isinstance(result, tuple):
+        return input_json_file, result[0], result[1], time.perf_counter() - start
+    return input_json_file, bool(result), "" if result else "validation failed", time.perf_counter() - start
+
+
+def _process_cached(input_json_file, input_cif_file, input_format, validate, patch, stream, writer, precheck,
+                    cache, output_format):
+    key = None
+    if cache is not None:
+        from result_cache import job_files
+        inputs, outputs = job_files(input_json_file, input_cif_file, input_format, validate, output_format)
+        with stage("cache_lookup"):
+            key, entry = cache.lookup(inputs, get_dictionary("no"), outputs, input_format=input_format,
+                                      validate=validate, patch=patch, stream=stream, writer=writer,
+                                      precheck=precheck, output_format=output_format)
+        if entry is not None:
+            return entry["result"]
+
+    index = load_precheck_index(get_dictionary("no")) if precheck and validate == "all" else None
+    checked = True
+    if validate != "only":
+        _, checked = convert_and_check(input_json_file, input_cif_file, input_format, patch, stream, writer, index,
+                                       output_format)
+    from result_cache import category_cache
+    result = download_and_validate(input_json_file, input_cif_file, "no", validate, in_process=True,
+                                   output_format=output_format,
+                                   category_cache=category_cache(cache, input_format, validate), checked=checked)
+    if key is not None and isinstance(result, bool):
+        with stage("cache_store"):
+            cache.store(key, outputs, result)
+    return result
+
+
+def run_batch(batch_input, input_cif_file, input_format, download_dict, validate, workers=None,
+              dict_ttl=DEFAULT_TTL, patch=False, stream=False, writer="pdbx", precheck=False, cache=None,
+              output_format="cif", compress="auto"):
+    """
+    Converts and validates every file selected by batch_input across a pool of worker processes.
+
+    compress is the --compress option, applied to each file in turn (see resolve_output_format).
+
+    The dictionary is downloaded once up front and parsed once per worker for in-process validation;
+    a failing file is reported and does not stop the run. With a ResultCache, files whose inputs are unchanged
+    since a cached run are not converted or validated again.
+
+    Returns:
+        list: One (input_json_file, succeeded, message, elapsed seconds) tuple per file, in input order.
+    """
+    pairs = collect_batch_inputs(batch_input, input_cif_file)
+    if not pairs:
+        print(f"Error: No JSON files found for '{batch_input}'.")
+        return []
+    with stage("get_dictionary", download=download_dict):
+        get_dictionary(download_dict, ttl=dict_ttl)
+
+    start = time.perf_counter()
+    results = {}
+    if workers is not None and workers <= 1:
+        for pair in pairs:
+            results[pair[0]] = process_input_file(pair[0], pair[1], input_format, validate, patch, stream,
+                                                  writer, precheck, cache,
+                                                  resolve_output_format(output_format, compress, pair[0]))
+            _print_batch_result(results[pair[0]])
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        # Stages inside the worker processes are not recorded; use -w 1 to profile them
+        with ProcessPoolExecutor(max_workers=workers) as executor, stage("worker_pool", workers=workers):
+            futures = [executor.submit(process_input_file, json_file, cif_file, input_format, validate, patch,
+                                       stream, writer, precheck, cache,
+                                       resolve_output_format(output_format, compress, json_file))
+                       for json_file, cif_file in pairs]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result[0]] = result
+                _print_batch_result(result)
+    elapsed = time.perf_counter() - start
+
+    ordered = [results[json_file] for json_file, _ in pairs]
+    failed = sum(1 for result in ordered if not result[1])
+    print(f"Processed {len(ordered)} files ({len(ordered) - failed} succeeded, {failed} failed) "
+          f"in {elapsed:.2f}s, {len(ordered) / elapsed if elapsed else 0.0:.1f} files/s")
+    return ordered
+
+
+def _print_batch_result(result):
+    input_json_file, succeeded, message, elapsed = result
+    if succeeded:
+        print(f"OK {input_json_file} ({elapsed:.2f}s)")
+    else:
+        print(f"FAILED {input_json_file} ({elapsed:.2f}s): {message}")
 
 
 def run():
     args = parse_arguments()
-    convert_input_file(args.input_json_file, args.input_cif_file, args.input_format)
-    download_and_validate(args.input_json_file, args.input_cif_file, args.download_dict, args.validate)
+    if not args.profile:
+        return run_command(args)
+    enable_profiling()
+    try:
+        with stage("json_to_mmcif"):
+            run_command(args)
+    finally:
+        write_profile(args.profile)
+
+
+def run_command(args):
+    cache = None
+    if not args.no_cache:
+        from result_cache import ResultCache
+        cache = ResultCache(max_size=int(args.cache_size * 1024 * 1024))
+    if args.watch:
+        from session_watcher import watch
+        watch(args.watch, input_format=args.input_format, validate=args.validate, input_cif_file=args.input_cif_file,
+              download_dict=args.download_dict, dict_ttl=args.dict_ttl, workers=args.workers, settle=args.settle,
+              queue_size=args.queue_size, metrics_file=args.metrics, poll=args.poll, patch=args.patch,
+              stream=args.stream, writer=args.writer, precheck=args.precheck == "yes", cache=cache,
+              output_format=args.output_format, compress=args.compress)
+        return
+    if args.batch:
+        results = run_batch(args.batch, args.input_cif_file, args.input_format, args.download_dict,
+                            args.validate, args.workers, args.dict_ttl, args.patch, args.stream, args.writer,
+                            args.precheck == "yes", cache, args.output_format, args.compress)
+        if not results or not all(result[1] for result in results):
+            sys.exit(1)
+        return
+    # The dictionary is fetched while the input is read and converted
+    import asyncio
+    from async_pipeline import Pipeline
+    pipeline = Pipeline(args.download_dict, args.dict_ttl, cache=cache)
+    asyncio.run(pipeline.run_file(args.input_json_file, args.input_cif_file, args.input_format, args.validate,
+                                  args.patch, args.stream, args.writer, args.precheck == "yes",
+                                  output_format=resolve_output_format(args.output_format, args.compress,
+                                                                      args.input_json_file)))
 
 if __name__ == "__main__":
     run()
\ No newline at end of file
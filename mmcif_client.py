@@ -0,0 +1,186 @@
+"""
+mmcif_client.py
+
+Description: This script sends conversion and validation requests to a running mmcif_server.py. It takes the
+same options as json_to_mmcif.py, and only imports the standard library modules it needs, so each call costs a
+Python start and one local request instead of loading mmcif, gemmi and the dictionary.
+
+Example usage:
+    python mmcif_client.py -f json -j test_data/TOMO_data.json -v all
+    python mmcif_client.py --socket /tmp/mmcif.sock -f cif -j test_data/SPA_data.json -c test_data/input_mmcif.cif
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import sys
+import json
+import socket
+import argparse
+import http.client
+
+DEFAULT_SERVER = "127.0.0.1:8350"
+# Token of TCP requests, written by mmcif_server.py
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".mmcif_server_token")
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="JSON to mmCIF through mmcif_server.py")
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument("-j", "--input_json_file", help="input JSON file to convert or add to mmCIF")
+    inputs.add_argument("-b", "--batch", help="directory, glob pattern or manifest file of JSON files to convert")
+    parser.add_argument("-c", "--input_cif_file", help="input mmCIF file to add the JSON information to")
+    parser.add_argument("-f", "--input_format", choices=["json", "cif"], required=True,
+                        help="json for converting directly from JSON, "
+                             "cif for adding the JSON file to the existing CIF file")
+    parser.add_argument("-d", "--download_dict", choices=["yes", "no"],
+                        help="Check for a newer mmCIF dictionary (yes) or use the cached one (no) "
+                             "(default: the setting of the server)")
+    parser.add_argument("--dict_ttl", type=float,
+                        help="Seconds a downloaded dictionary is reused before checking for a newer one "
+                             "(default: the setting of the server)")
+    parser.add_argument("-v", "--validate", default="all", choices=["all", "only"],
+                        help="Convert and validate (with option all) "
+                             "or Only validate the mmCIF file (with option only)(default: all)")
+    parser.add_argument("-p", "--patch", action="store_true",
+                        help="With -f cif, rewrite only the categories in the JSON and copy the rest of the input "
+                             "mmCIF file unchanged")
+    parser.add_argument("-s", "--stream", action="store_true",
+                        help="With -f json, convert the JSON file in chunks of rows")
+    parser.add_argument("--writer", choices=["pdbx", "native"], default="pdbx", help="mmCIF writer (default: pdbx)")
+    parser.add_argument("--output-format", dest="output_format", choices=["cif", "bcif"], default="cif",
+                        help="cif for text mmCIF, bcif for BinaryCIF (default: cif)")
+    parser.add_argument("--compress", choices=["auto", "none", "gz", "bz2", "xz", "zst"], default="auto",
+                        help="Compression of the converted file; auto for that of the input JSON file (default: auto)")
+    parser.add_argument("--precheck", choices=["yes", "no"], default="yes",
+                        help="Check the data against the compiled dictionary index before the full validation "
+                             "(default: yes)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true",
+                        help="Convert and validate even if the inputs are unchanged since a cached run")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="Accepted for compatibility with json_to_mmcif.py; the server's worker pool is used")
+    parser.add_argument("--server", default=DEFAULT_SERVER,
+                        help=f"host:port of the server (default: {DEFAULT_SERVER})")
+    parser.add_argument("--socket", help="Unix socket of the server, instead of --server")
+    parser.add_argument("--token_file", default=DEFAULT_TOKEN_FILE,
+                        help="File holding the token of the server, sent with TCP requests "
+                             "(default: ~/.mmcif_server_token)")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for a reply (default: 600)")
+    return parser.parse_args(argv)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket."""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def read_token(token_file):
+    """Returns the token in token_file, or None if there is no such file."""
+    try:
+        with open(token_file) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def send_request(path, params=None, server=DEFAULT_SERVER, socket_path=None, timeout=600, token=None):
+    """
+    Sends one request to the server.
+
+    Parameters:
+        path (str): Endpoint, e.g. /convert or /health.
+        params (dict): JSON body of a POST request; a GET request is sent without it.
+        token (str): Token of a TCP server; requests on a Unix socket need none.
+
+    Returns:
+        tuple: (HTTP status, decoded JSON reply)
+    """
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        host, _, port = server.rpartition(":")
+        connection = http.client.HTTPConnection(host, int(port), timeout=timeout)
+    headers = {"Authorization": f"Bearer {token}"} if token and not socket_path else {}
+    try:
+        if params is None:
+            connection.request("GET", path, headers=headers)
+        else:
+            connection.request("POST", path, body=json.dumps(params),
+                               headers=dict(headers, **{"Content-Type": "application/json"}))
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def build_request(args):
+    """
+    Maps json_to_mmcif.py options to an endpoint and its JSON body. Paths are made absolute, since the server
+    may run in another directory.
+
+    Returns:
+        tuple: (path, params)
+    """
+    def absolute(path):
+        return os.path.abspath(path) if path else None
+
+    params = {
+        "input_json_file": absolute(args.input_json_file),
+        "input_cif_file": absolute(args.input_cif_file),
+        "input_format": args.input_format,
+        "validate": args.validate,
+        "patch": args.patch,
+        "stream": args.stream,
+        "writer": args.writer,
+        "output_format": args.output_format,
+        "compress": args.compress,
+        "precheck": args.precheck,
+        "cache": "no" if args.no_cache else "yes",
+    }
+    if args.download_dict:
+        params["download_dict"] = args.download_dict
+    if args.dict_ttl is not None:
+        params["dict_ttl"] = args.dict_ttl
+    if args.batch:
+        params["batch"] = absolute(args.batch)
+        return "/batch", params
+    if args.validate == "only":
+        return "/validate", params
+    return ("/merge" if args.input_format == "cif" else "/convert"), params
+
+
+def _print_result(result):
+    status = "OK" if result["ok"] else "FAILED"
+    message = f": {result['message']}" if result.get("message") and not result["ok"] else ""
+    print(f"{status} {result.get('input_json_file') or ''} ({result.get('elapsed', 0.0):.3f}s){message}")
+
+
+def run(argv=None):
+    """Runs the client and returns the exit status: 0 on success, 1 on failure, 2 if the server is unreachable."""
+    args = parse_arguments(argv)
+    path, params = build_request(args)
+    try:
+        status, reply = send_request(path, params, args.server, args.socket, args.timeout,
+                                     None if args.socket else read_token(args.token_file))
+    except OSError as e:
+        print(f"Error: cannot reach mmcif_server at {args.socket or args.server}: {e}")
+        return 2
+    for result in reply.get("results", [reply] if status == 200 else []):
+        _print_result(result)
+    if status != 200:
+        print(f"Error: {reply.get('message', 'request failed')} (HTTP {status})")
+    return 0 if status == 200 and reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,211 @@
+"""
+mmcif_dictionary.py
+
+Description: This script keeps a local, versioned copy of the mmCIF PDBx dictionary. The dictionary is only
+downloaded again when the cached copy is older than its time-to-live, and then only if the server reports a
+change (ETag/If-Modified-Since). Replacements are atomic so concurrent conversions never see a partial file.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+DICTIONARY_URL = "https://mmcif.wwpdb.org/dictionaries/ascii/mmcif_pdbx_v50.dic"
+DICTIONARY_DIR = "mmcif_tools"
+DICTIONARY_NAME = "mmcif_pdbx_v50.dic"
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class DictionaryCache:
+    """
+    A local copy of the mmCIF dictionary with its download metadata.
+
+    The dictionary is stored as <cache_dir>/mmcif_pdbx_v50.dic, so existing tools reading that path keep
+    working, next to a <name>.json metadata file holding the dictionary version, the SHA-256 of its content,
+    the server ETag and Last-Modified headers and the time it was last checked.
+
+    Parameters:
+        cache_dir (str): Directory holding the dictionary.
+        url (str): Location to download the dictionary from.
+        ttl (float): Seconds a downloaded copy is used before the server is asked again.
+        offline (bool): Never contact the server; only use the cached copy.
+    """
+
+    def __init__(self, cache_dir=DICTIONARY_DIR, url=DICTIONARY_URL, ttl=DEFAULT_TTL, offline=False,
+                 timeout=60):
+        self.cache_dir = cache_dir
+        self.url = url
+        self.ttl = ttl
+        self.offline = offline
+        self.timeout = timeout
+        self.path = os.path.join(cache_dir, DICTIONARY_NAME)
+        self.metadata_path = self.path + ".json"
+
+    def read_metadata(self):
+        """Returns the stored metadata, or an empty dict if there is none."""
+        try:
+            with open(self.metadata_path, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def is_fresh(self):
+        """True if a cached dictionary exists and was checked within the time-to-live."""
+        if not os.path.isfile(self.path):
+            return False
+        checked_at = self.read_metadata().get("checked_at", 0)
+        return time.time() - checked_at < self.ttl
+
+    def key(self):
+        """
+        Returns a string identifying the cached dictionary content, "<version>-<sha256>".
+
+        Used by other caches to invalidate their entries when the dictionary changes.
+        """
+        metadata = self.read_metadata()
+        if not metadata.get("sha256") and os.path.isfile(self.path):
+            metadata = {"version": read_dictionary_version(self.path), "sha256": _file_sha256(self.path)}
+        return f"{metadata.get('version') or 'unknown'}-{metadata.get('sha256', 'missing')}"
+
+    def get(self, force=False):
+        """
+        Returns the path of an up-to-date dictionary, downloading or revalidating it when needed.
+
+        If the server cannot be reached, a stale cached copy is used with a warning.
+
+        Raises:
+            FileNotFoundError: In offline mode when no dictionary has been cached yet.
+        """
+        if self.offline:
+            if not os.path.isfile(self.path):
+                raise FileNotFoundError(f"Dictionary file '{self.path}' does not exist. "
+                                        "Download it using the option -d yes")
+            return self.path
+        if not force and self.is_fresh():
+            return self.path
+        # urllib (with its ssl and email dependencies) is only imported when the server has to be asked
+        import urllib.error
+        try:
+            self.fetch(conditional=not force)
+        except (urllib.error.URLError, OSError) as e:
+            if not os.path.isfile(self.path):
+                raise
+            print(f"Warning: could not refresh the dictionary ({e}); using the cached copy {self.path}")
+        return self.path
+
+    def fetch(self, conditional=True):
+        """
+        Downloads the dictionary, sending the stored validators so unchanged content is not transferred.
+
+        Returns:
+            bool: True if the cached dictionary content changed.
+        """
+        import urllib.error
+        import urllib.request
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        metadata = self.read_metadata()
+        request = urllib.request.Request(self.url)
+        if conditional and os.path.isfile(self.path):
+            if metadata.get("etag"):
+                request.add_header("If-None-Match", metadata["etag"])
+            if metadata.get("last_modified"):
+                request.add_header("If-Modified-Since", metadata["last_modified"])
+
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            metadata["checked_at"] = time.time()
+            self._write_metadata(metadata)
+            return False
+
+        with response:
+            sha256 = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=DICTIONARY_NAME, suffix=".part",
+                                             delete=False) as part:
+                try:
+                    for chunk in iter(lambda: response.read(1 << 20), b""):
+                        sha256.update(chunk)
+                        part.write(chunk)
+                except BaseException:
+                    part.close()
+                    os.remove(part.name)
+                    raise
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        changed = sha256.hexdigest() != metadata.get("sha256") or not os.path.isfile(self.path)
+        if changed:
+            metadata["version"] = read_dictionary_version(part.name)
+            metadata["sha256"] = sha256.hexdigest()
+            make_shared(part.name)
+            os.replace(part.name, self.path)
+        else:
+            os.remove(part.name)
+        metadata.update({"url": self.url, "etag": etag, "last_modified": last_modified, "checked_at": time.time()})
+        self._write_metadata(metadata)
+        return changed
+
+    def _write_metadata(self, metadata):
+        with tempfile.NamedTemporaryFile('w', dir=self.cache_dir, suffix=".part", delete=False) as part:
+            json.dump(metadata, part, indent=4)
+        make_shared(part.name)
+        os.replace(part.name, self.metadata_path)
+
+
+_umask = None
+
+
+def make_shared(path):
+    """
+    Gives a file the permissions open() would have given it, 0666 less the umask. Temporary files are made 0600,
+    so files that replace shared ones (the dictionary, its index and metadata) are changed before the replace.
+    """
+    global _umask
+    if _umask is None:
+        # The umask can only be read by setting it
+        _umask = os.umask(0o022)
+        os.umask(_umask)
+    os.chmod(path, 0o666 & ~_umask)
+
+
+def read_dictionary_version(dic_file):
+    """Returns the _dictionary.version of a dictionary file, or None if it is not in the header."""
+    with open(dic_file, 'r', errors='replace') as file:
+        for number, line in enumerate(file):
+            if line.lstrip().startswith("_dictionary.version"):
+                fields = line.split()
+                return fields[1].strip("'\"") if len(fields) > 1 else None
+            if number > 500 or line.startswith("save_"):
+                return None
+    return None
+
+
+def get_dictionary(download_dict="yes", cache_dir=DICTIONARY_DIR, ttl=DEFAULT_TTL):
+    """
+    Returns the path of the mmCIF dictionary for the -d command line option.
+
+    Parameters:
+        download_dict (str): "yes" to download or revalidate the dictionary when the cached copy has expired,
+            "no" to use the cached copy as it is, without contacting the server.
+    """
+    cache = DictionaryCache(cache_dir, ttl=ttl, offline=download_dict != "yes")
+    if cache.offline:
+        return cache.path
+    return cache.get()
+
+
+def _file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
@@ -0,0 +1,387 @@
+"""
+mmcif_server.py
+
+Description: This script runs json_to_mmcif as a long-lived local service. The mmCIF dictionary is fetched once
+and every worker process keeps its imports and a parsed MmcifValidator warm, so a request only pays for the
+conversion and validation of its own files. Requests are JSON over HTTP on localhost or on a Unix socket; see
+mmcif_client.py for a client with the same options as json_to_mmcif.py.
+
+The server reads and writes files for its clients, so it only accepts paths under its --root directories (by
+default its working directory). A Unix socket is made accessible to its owner only; on TCP every request must
+carry the token of --token_file (created with a random token if it is missing) as "Authorization: Bearer".
+
+Endpoints:
+    GET  /health     server status, number of workers and requests in progress
+    POST /convert    convert a JSON file (json_to_mmcif.py -f json)
+    POST /merge      merge a JSON file into an mmCIF file (json_to_mmcif.py -f cif)
+    POST /validate   validate an mmCIF file (json_to_mmcif.py -v only)
+    POST /batch      convert every file of a directory, glob pattern or manifest (json_to_mmcif.py -b)
+
+Example usage:
+    python mmcif_server.py --port 8350 --workers 4 -d yes --root /data/sessions
+    python mmcif_server.py --socket /tmp/mmcif.sock
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import hmac
+import json
+import time
+import secrets
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json_to_mmcif import (process_input_file, download_and_validate, collect_batch_inputs,
+                           resolve_output_format)
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary
+from mmcif_validator import get_validator
+from result_cache import DEFAULT_MAX_SIZE, ResultCache
+
+DEFAULT_PORT = 8350
+# Token of TCP requests, shared with mmcif_client.py
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".mmcif_server_token")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Serve JSON to mmCIF conversion and validation locally")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Port on 127.0.0.1 to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--socket", help="Listen on this Unix socket path instead of a TCP port")
+    parser.add_argument("--token_file", default=DEFAULT_TOKEN_FILE,
+                        help="File holding the token TCP clients must send, created if missing (default: "
+                             "~/.mmcif_server_token)")
+    parser.add_argument("--root", action="append",
+                        help="Directory whose files requests may read and write; may be repeated (default: the "
+                             "working directory)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("-q", "--queue", type=int, default=64,
+                        help="Requests that may wait for a worker before new ones are refused (default: 64)")
+    parser.add_argument("-d", "--download_dict", choices=["yes", "no"], default="yes",
+                        help="Download the latest mmCIF dictionary for validation (default: yes)")
+    parser.add_argument("--dict_ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a downloaded dictionary is reused before checking for a newer one "
+                             "(default: 86400)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true",
+                        help="Never serve results from the result cache or store them in it")
+    parser.add_argument("--cache_size", type=float, default=DEFAULT_MAX_SIZE / (1024 * 1024),
+                        help="Megabytes the result cache may hold (default: 512)")
+    return parser.parse_args()
+
+
+def load_token(token_file):
+    """Returns the token in token_file, writing a random one, readable by its owner only, if the file is missing."""
+    try:
+        with open(token_file) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as file:
+        file.write(token + "\n")
+    return token
+
+
+def _warm_worker(dic_file):
+    """Worker initializer: parses the dictionary once per process before the first request."""
+    if os.path.isfile(dic_file):
+        get_validator(dic_file)
+
+
+def handle_request(kind, params, cache=None):
+    """
+    Runs one request in a worker process.
+
+    Parameters:
+        kind (str): convert, merge or validate.
+        params (dict): input_json_file, input_cif_file, validate, patch, stream, writer, output_format,
+            compress and precheck, with the meaning of the json_to_mmcif.py options.
+        cache (ResultCache): Cache of results for convert and merge requests, or None.
+
+    Returns:
+        dict: {"ok": bool, "message": str, "elapsed": seconds, "input_json_file": str}
+    """
+    input_json_file = params.get("input_json_file")
+    input_cif_file = params.get("input_cif_file")
+    if kind == "validate":
+        start = time.perf_counter()
+        try:
+            result = download_and_validate(input_json_file or input_cif_file, input_cif_file, "no", "only",
+                                           in_process=True)
+        except Exception as e:
+            result = False, f"{type(e).__name__}: {e}"
+        if isinstance(result, tuple):
+            ok, message = result
+        else:
+            ok, message = bool(result), "" if result else "validation failed"
+        elapsed = time.perf_counter() - start
+    else:
+        input_format = "cif" if kind == "merge" else "json"
+        _, ok, message, elapsed = process_input_file(input_json_file, input_cif_file, input_format,
+                                                     params.get("validate", "all"), params.get("patch", False),
+                                                     params.get("stream", False), params.get("writer", "pdbx"),
+                                                     params.get("precheck", "yes") == "yes", cache,
+                                                     resolve_output_format(params.get("output_format", "cif"),
+                                                                           params.get("compress", "auto"),
+                                                                           input_json_file))
+    return {"ok": bool(ok), "message": message, "elapsed": elapsed, "input_json_file": input_json_file}
+
+
+class ConversionService:
+    """
+    The state shared by all connections: the worker pool, the bound on requests in progress, the dictionary
+    settings and the directories requests may use.
+
+    Parameters:
+        roots (list): Directories the files of requests must be in (default: the working directory).
+    """
+
+    def __init__(self, workers=None, queue=64, download_dict="yes", dict_ttl=DEFAULT_TTL,
+                 cache_size=DEFAULT_MAX_SIZE, roots=None):
+        self.download_dict = download_dict
+        self.dict_ttl = dict_ttl
+        self.roots = [os.path.realpath(root) for root in roots or [os.getcwd()]]
+        # None disables the result cache; a request can also opt out with "cache": "no"
+        self.cache = ResultCache(max_size=cache_size) if cache_size else None
+        self.workers = workers or os.cpu_count()
+        dic_file = get_dictionary(download_dict, ttl=dict_ttl)
+        self._refreshed_at = time.monotonic()
+        self._refresh_lock = threading.Lock()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker,
+                                            initargs=(dic_file,))
+        self.slots = threading.BoundedSemaphore(self.workers + queue)
+        self.capacity = self.workers + queue
+        self.in_progress = 0
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def submit(self, kind, params):
+        """
+        Runs a request on the pool and waits for it.
+
+        Returns:
+            dict: The result of handle_request, or None if the server is at capacity.
+        """
+        self.check_paths([params.get("input_json_file"), params.get("input_cif_file")])
+        # Workers rebuild their validator when the dictionary file changes
+        self.refresh_dictionary(params)
+        if not self.slots.acquire(blocking=False):
+            return None
+        return self._start(kind, params).result()
+
+    def batch(self, params):
+        """Runs every file of a batch request, waiting for a free slot before queueing each file."""
+        self.check_paths([params["batch"], params.get("input_cif_file")])
+        pairs = collect_batch_inputs(params["batch"], params.get("input_cif_file"))
+        kind = "merge" if params.get("input_format") == "cif" else "convert"
+        # A manifest may name files anywhere, so every pair is checked too
+        self.check_paths([path for pair in pairs for path in pair])
+        self.refresh_dictionary(params)
+        futures = []
+        for json_file, cif_file in pairs:
+            self.slots.acquire()
+            futures.append(self._start(kind, dict(params, input_json_file=json_file, input_cif_file=cif_file)))
+        return [future.result() for future in futures]
+
+    def refresh_dictionary(self, params):
+        """
+        Refreshes the cached dictionary with the download_dict and dict_ttl of a request, or the server defaults,
+        if the TTL has passed since the server last did. One request refreshes while the others go on.
+        """
+        ttl = params.get("dict_ttl", self.dict_ttl)
+        if (params.get("download_dict") or self.download_dict) != "yes":
+            return
+        if time.monotonic() - self._refreshed_at < ttl or not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            get_dictionary("yes", ttl=ttl)
+            self._refreshed_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def check_paths(self, paths):
+        """
+        Raises PermissionError if a path of a request is outside the roots of the service. The outputs of a
+        request are written next to its inputs, so they are inside the roots too.
+        """
+        for path in paths:
+            if not path:
+                continue
+            real = os.path.realpath(path)
+            if not any(os.path.commonpath([real, root]) == root for root in self.roots):
+                raise PermissionError(f"{path} is outside the directories this server may use")
+
+    def _start(self, kind, params):
+        """Submits a request that holds a slot; the slot is released when it finishes."""
+        with self.lock:
+            self.in_progress += 1
+        try:
+            cache = self.cache if params.get("cache", "yes") == "yes" else None
+            future = self.executor.submit(handle_request, kind, params, cache)
+        except BaseException:
+            self._finished(None)
+            raise
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self.lock:
+            self.in_progress -= 1
+            self.pending.discard(future)
+        self.slots.release()
+
+    def health(self):
+        return {"ok": True, "pid": os.getpid(), "workers": self.workers, "in_progress": self.in_progress,
+                "capacity": self.capacity}
+
+    def close(self):
+        """Cancels the requests still waiting for a worker and waits for the running ones."""
+        # shutdown(cancel_futures=True) needs Python 3.9
+        with self.lock:
+            pending = list(self.pending)
+        for future in pending:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "mmcif_server/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def authorized(self):
+        """True if the request may be served: any request on the Unix socket, one with the token on TCP."""
+        token = self.server.token
+        if token is None:
+            return True
+        given = self.headers.get("Authorization", "")
+        if hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+            return True
+        self.send_json(401, {"ok": False, "message": "missing or wrong token"})
+        return False
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        if self.path == "/health":
+            self.send_json(200, self.server.service.health())
+        else:
+            self.send_json(404, {"ok": False, "message": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        kind = self.path.strip("/")
+        if kind not in ("convert", "merge", "validate", "batch"):
+            self.send_json(404, {"ok": False, "message": f"unknown path {self.path}"})
+            return
+        try:
+            params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError as e:
+            self.send_json(400, {"ok": False, "message": f"invalid JSON request: {e}"})
+            return
+        required = "batch" if kind == "batch" else "input_cif_file" if kind == "validate" else "input_json_file"
+        if not params.get(required) or kind == "merge" and not params.get("input_cif_file"):
+            self.send_json(400, {"ok": False, "message": f"{kind} needs {required}"
+                                 + (" and input_cif_file" if kind == "merge" else "")})
+            return
+
+        service = self.server.service
+        try:
+            if kind == "batch":
+                results = service.batch(params)
+                self.send_json(200, {"ok": bool(results) and all(r["ok"] for r in results), "results": results})
+                return
+            result = service.submit(kind, params)
+        except PermissionError as e:
+            self.send_json(403, {"ok": False, "message": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"ok": False, "message": f"{type(e).__name__}: {e}"})
+            return
+        if result is None:
+            self.send_json(503, {"ok": False, "message": "server busy, try again later"})
+        else:
+            self.send_json(200, result)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    verbose = False
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    verbose = False
+
+
+def make_server(service, port=DEFAULT_PORT, socket_path=None, token=None):
+    """
+    Creates the HTTP server for service, on 127.0.0.1:port or on the Unix socket socket_path.
+
+    The Unix socket is made accessible to its owner only. On TCP, where any local user can connect, requests
+    must carry token.
+
+    The caller runs it with serve_forever() and stops it with shutdown().
+
+    Raises:
+        ValueError: For a TCP server without a token.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, RequestHandler)
+        os.chmod(socket_path, 0o600)
+        server.token = None
+    else:
+        if not token:
+            raise ValueError("a TCP server needs a token; use a Unix socket to serve without one")
+        server = _HTTPServer(("127.0.0.1", port), RequestHandler)
+        server.token = token
+    server.service = service
+    return server
+
+
+def main():
+    args = parse_arguments()
+    service = ConversionService(args.workers, args.queue, args.download_dict, args.dict_ttl,
+                                None if args.no_cache else int(args.cache_size * 1024 * 1024), args.root)
+    token = None if args.socket else load_token(args.token_file)
+    server = make_server(service, args.port, args.socket, token)
+    print(f"Serving on {args.socket or f'http://127.0.0.1:{server.server_address[1]}'} "
+          f"with {service.workers} workers for files under {', '.join(service.roots)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,8 @@ __date__ = '2024-11-20'
 import os
 import subprocess
 import argparse
-import urllib.request
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary
+from profiling import stage, enable_profiling, write_profile
 
 def parse_arguments():
     """
@@ -32,25 +33,267 @@ def parse_arguments():
     parser.add_argument("-c", "--input_cif_file", required=True, help="Path to the input mmCIF file to validate.")
     parser.add_argument("-d", "--download_dict", choices=["yes", "no"], default="yes",
                         help="Download the latest mmCIF dictionary for validation (default: yes)")
+    parser.add_argument("--dict_ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a downloaded dictionary is reused before checking for a newer one "
+                             "(default: 86400)")
+    parser.add_argument("--full_dict", action="store_true",
+                        help="Validate against the whole dictionary instead of the sub-dictionary of the categories "
+                             "in the file (see dictionary_subset.py)")
+    parser.add_argument("--profile", metavar="TRACE_FILE",
+                        help="Record wall time, CPU time, peak memory and I/O of each stage, print a summary and "
+                             "save a Chrome trace (chrome://tracing, Perfetto) to TRACE_FILE")
     return parser.parse_args()
 
-def mmcif_validation(cif_file, download_dict, output_file):
+class MmcifValidator:
+    """
+    Validates mmCIF documents in-process against a dictionary that is parsed only once.
+
+    Reports have the same content as the output of "gemmi validate -v": dictionary notes, a "Reading ..." line,
+    one line per diagnostic and a final OK or FAILED. A validator is not thread-safe; use one per thread.
+
+    Parameters:
+        dic_file (str): Path to the dictionary file for validation.
+    """
+
+    def __init__(self, dic_file):
+        # gemmi is imported by the first validator, so the subprocess path never loads it
+        from gemmi import cif
+        self._cif = cif
+        self.dic_file = dic_file
+        self._ddl = _Ddl(cif, dic_file)
+        self.notes = self._ddl.notes
+        self._dictionary_sha256 = None
+        self._parent_ddl = None
+
+    def validate_document(self, doc):
+        """
+        Validates a parsed gemmi.cif.Document.
+
+        Returns:
+            tuple: (bool, list) - whether the document is valid and the diagnostics reported for it.
+        """
+        return self._ddl.validate(doc)
+
+    def dictionary_sha256(self):
+        """Returns the SHA-256 of the dictionary file, computed the first time it is asked for."""
+        if self._dictionary_sha256 is None:
+            from mmcif_dictionary import _file_sha256
+            self._dictionary_sha256 = _file_sha256(self.dic_file)
+        return self._dictionary_sha256
+
+    def check_parents(self, doc):
+        """
+        Runs only the parent checks of linked items (_item_linked) on a parsed gemmi.cif.Document. The
+        dictionary is read again for them the first time.
+
+        Returns:
+            list: The diagnostics reported; the values of enumerations are checked too, and the caller keeps the
+            diagnostics it needs.
+        """
+        if self._parent_ddl is None:
+            self._parent_ddl = _Ddl(self._cif, self.dic_file, print_unknown_tags=False, use_regex=False,
+                                    use_context=False, use_mandatory=False, use_unique_keys=False)
+        return self._parent_ddl.validate(doc)[1]
+
+    def validate_string(self, cif_text, source="string"):
+        """Validates mmCIF content held in memory; see validate_file for the return value."""
+        return self._validate(lambda: self._cif.read_string(cif_text), source)
+
+    def validate_file(self, cif_file, cache=None):
+        """
+        Validates an mmCIF file. A BinaryCIF file, or one compressed other than with gzip, is decoded to text
+        mmCIF in memory first.
+
+        With a result_cache.CategoryCache, an uncompressed text mmCIF file is validated category by category and
+        only the categories that are not in the cache are checked (see category_validation.py); the report is the
+        same.
+
+        Returns:
+            tuple: (bool, str) - whether the file is valid and the text of the validation report.
+        """
+        if cache is not None and gemmi_reads(cif_file):
+            from compressed_io import compression_of
+            if compression_of(cif_file) is None:
+                return self._validate(lambda: self._cif.read(cif_file), cif_file, cache)
+        if gemmi_reads(cif_file):
+            return self._validate(lambda: self._cif.read(cif_file), cif_file)
+        return self._validate(lambda: self._read_text(cif_file), cif_file)
+
+    def diagnose_file(self, cif_file):
+        """
+        Validates an mmCIF file like validate_file, with the diagnostics parsed into records (see diagnostics.py).
+        Diagnostics of a BinaryCIF file have no line, since the file has none.
+
+        Returns:
+            tuple: (bool, list) - whether the file is valid and its diagnostics.Diagnostic records.
+        """
+        from diagnostics import Diagnostic, ERROR, parse_message, pair_tags
+        try:
+            doc = self._cif.read(cif_file) if gemmi_reads(cif_file) else self._read_text(cif_file)
+        except (RuntimeError, ValueError) as e:
+            return False, [parse_message(str(e), cif_file, valid=False)]
+        except OSError as e:
+            return False, [Diagnostic(cif_file, None, None, None, None, ERROR, "read", str(e))]
+        valid, messages = self.validate_document(doc)
+        tag_at = pair_tags(doc)
+        diagnostics = [parse_message(message, cif_file, valid, tag_at) for message in messages]
+        if diagnostics and not gemmi_reads(cif_file):
+            from cif_reader import is_bcif
+            if is_bcif(cif_file):
+                # The lines are the ones of the decoded text
+                diagnostics = [d._replace(line=None) for d in diagnostics]
+        return valid, diagnostics
+
+    def _read_text(self, cif_file):
+        from cif_reader import is_bcif
+        if is_bcif(cif_file):
+            from cif_binary import bcif_to_text
+            text = bcif_to_text(cif_file)
+        else:
+            from compressed_io import open_file
+            with open_file(cif_file, "r") as file:
+                text = file.read()
+        doc = self._cif.read_string(text)
+        # Diagnostics name the file, as for text mmCIF
+        doc.source = cif_file
+        return doc
+
+    def _validate(self, read, source, cache=None):
+        lines = self.notes + [f"Reading {source}..."]
+        try:
+            doc = read()
+        except (RuntimeError, ValueError) as e:
+            # Syntax errors, duplicate tags and missing values are reported by the reader
+            valid = False
+            lines.append(str(e))
+        else:
+            result = None
+            if cache is not None:
+                from category_validation import validate_by_category
+                result = validate_by_category(self, doc, source, cache)
+            valid, messages = result or self.validate_document(doc)
+            lines.extend(messages)
+        lines.append("OK" if valid else "FAILED")
+        return valid, "\n".join(lines) + "\n"
+
+
+class _Ddl:
+    """
+    A gemmi.cif.Ddl for a dictionary file, with the same interface for the two gemmi APIs: gemmi 0.6, pinned in
+    requirements.txt, returns the messages of the validator as text, and gemmi 0.7 passes them to a logger.
+
+    Parameters:
+        cif: The gemmi.cif module.
+        dic_file (str): Path to the dictionary file.
+        **options: The use_* and print_unknown_tags options of gemmi.cif.Ddl.
+    """
+
+    def __init__(self, cif, dic_file, **options):
+        self._messages = []
+        # gemmi 0.7 reads a parsed dictionary; gemmi 0.6 reads the file and returns its notes
+        self._logged = hasattr(cif.Ddl, "read_ddl")
+        if self._logged:
+            self._ddl = cif.Ddl(logger=self._messages.append, **options)
+            self._ddl.read_ddl(cif.read(dic_file))
+            self.notes = list(self._messages)
+        else:
+            self._ddl = cif.Ddl(**options)
+            self.notes = _split_messages(self._ddl.read_ddl_file(dic_file))
+
+    def validate(self, doc):
+        """
+        Validates a parsed gemmi.cif.Document.
+
+        Returns:
+            tuple: (bool, list) - whether the document is valid and the diagnostics reported for it.
+        """
+        if self._logged:
+            self._messages.clear()
+            valid = self._ddl.validate_cif(doc)
+            return valid, list(self._messages)
+        messages = _split_messages(self._ddl.validate_cif(doc))
+        # gemmi 0.6 does not say whether the document passed; it fails on the errors of diagnostics.py
+        from diagnostics import ERROR, parse_message
+        return all(parse_message(message).severity != ERROR for message in messages), messages
+
+
+def _split_messages(text):
+    """Splits the messages of gemmi 0.6 apart; continuation lines, e.g. the allowed values, start with a tab."""
+    messages = []
+    for line in text.splitlines():
+        if line.startswith("\t") and messages:
+            messages[-1] += "\n" + line
+        elif line:
+            messages.append(line)
+    return messages
+
+
+_validators = {}
+
+
+def gemmi_reads(cif_file):
+    """True if gemmi reads cif_file as it is: text mmCIF, plain or gzipped. Other files are validated in process."""
+    from cif_reader import is_bcif
+    from compressed_io import compression_of
+    return compression_of(cif_file) in (None, "gz") and not is_bcif(cif_file)
+
+
+def get_validator(dic_file):
+    """
+    Returns a MmcifValidator for dic_file, reusing the one already built in this process.
+
+    The validator is rebuilt if the dictionary file has been replaced since it was loaded.
+    """
+    stat = os.stat(dic_file)
+    key = (os.path.abspath(dic_file), stat.st_mtime_ns, stat.st_size)
+    if key not in _validators:
+        _validators.clear()
+        _validators[key] = MmcifValidator(dic_file)
+    return _validators[key]
+
+
+def subset_dictionary(cif_file, dic_file):
+    """
+    Returns the sub-dictionary of dic_file for the categories of cif_file (see dictionary_subset.py), or dic_file
+    itself if the sub-dictionary cannot be made.
+    """
+    from dictionary_subset import subset_for_file
+    try:
+        with stage("subset_dictionary", file=cif_file):
+            return subset_for_file(cif_file, dic_file)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not extract the categories of {cif_file} from the dictionary ({e}); "
+              f"validating against the whole dictionary")
+        return dic_file
+
+
+def mmcif_validation(cif_file, download_dict, output_file, dict_ttl=DEFAULT_TTL, in_process=False,
+                     category_cache=None, subset_dict=True, dic_file=None):
     """
     Validates an mmCIF file using the Gemmi validate command and saves the output to a file.
 
     Parameters:
         cif_file (str): Path to the mmCIF file.
-        dic_file (str): Path to the dictionary file for validation.
+        download_dict (str): "yes" to refresh the cached dictionary if it has expired, otherwise use it as is.
         output_file (str): Path to save the validation output.
+        dict_ttl (float): Seconds a downloaded dictionary is reused before checking for a newer one.
+        in_process (bool): Validate with the MmcifValidator of this process instead of running gemmi, so the
+            dictionary is parsed only once however many files are validated.
+        category_cache (CategoryCache): Validate in process, checking only the categories whose results are not
+            in this cache (see category_validation.py).
+        subset_dict (bool): Hand gemmi the sub-dictionary of the categories in the file instead of the whole
+            dictionary; the report is the same.
+        dic_file (str): Dictionary the caller has already looked up, validated against instead of the one
+            download_dict gives.
 
     Returns:
         tuple: (bool, str)
             - bool: True if validation succeeded, False otherwise.
             - str: Message detailing validation results or errors.
     """
-    dic_file = "mmcif_tools/mmcif_pdbx_v50.dic"
-    if download_dict == "yes":
-        urllib.request.urlretrieve("https://mmcif.wwpdb.org/dictionaries/ascii/mmcif_pdbx_v50.dic", dic_file)
+    if dic_file is None:
+        with stage("get_dictionary", download=download_dict):
+            dic_file = get_dictionary(download_dict, ttl=dict_ttl)
     try:
         # Ensure input files exist
         if not os.path.isfile(cif_file):
@@ -58,13 +301,28 @@ def mmcif_validation(cif_file, download_dict, output_file):
         if not os.path.isfile(dic_file):
             return False, f"Error: Dictionary file '{dic_file}' does not exist. Download it using the option -d yes"
 
+        if in_process or category_cache is not None or not gemmi_reads(cif_file):
+            with stage("load_dictionary"):
+                validator = get_validator(dic_file)
+            with stage("validate_in_process", file=cif_file):
+                valid, report = validator.validate_file(cif_file, category_cache)
+            with open(output_file, "w") as outfile:
+                outfile.write(report)
+            if not valid:
+                print(f"Validation failed with error and output saved to {output_file}")
+                return False
+            print(f"Validation succeeded. Results saved to {output_file}")
+            return True
+
+        if subset_dict:
+            dic_file = subset_dictionary(cif_file, dic_file)
         # Construct the Gemmi command
         command = [
             "gemmi", "validate", "-v", cif_file, "-d", dic_file
         ]
 
         # Execute the command and redirect output to a file
-        with open(output_file, "w") as outfile:
+        with open(output_file, "w") as outfile, stage("gemmi_validate", file=cif_file):
             result = subprocess.run(command, stdout=outfile, stderr=subprocess.PIPE, text=True, env=os.environ.copy())
 
         # Check for errors in stderr or non-zero exit status
@@ -81,24 +339,79 @@ def mmcif_validation(cif_file, download_dict, output_file):
     except Exception as e:
         return False, f"An unexpected error occurred: {str(e)}"
 
-def validate_and_print(input_cif_file, download_dict,  output_val_file):
+async def mmcif_validation_async(cif_file, dic_file, output_file, subset_dict=True):
+    """
+    Validates an mmCIF file with a gemmi validate subprocess started by asyncio, so the event loop can convert
+    and validate other files while it runs.
+
+    Parameters:
+        cif_file (str): Path to the mmCIF file.
+        dic_file (str): Path to the dictionary file.
+        output_file (str): Path to save the validation output.
+        subset_dict (bool): Hand gemmi the sub-dictionary of the categories in the file; see mmcif_validation.
+
+    Returns:
+        The same as mmcif_validation.
+    """
+    import asyncio
+
+    if not os.path.isfile(cif_file):
+        return False, f"Error: Input CIF file '{cif_file}' does not exist."
+    if not os.path.isfile(dic_file):
+        return False, f"Error: Dictionary file '{dic_file}' does not exist. Download it using the option -d yes"
+    if subset_dict:
+        # Scanning the file for its categories is blocking I/O
+        dic_file = await asyncio.get_running_loop().run_in_executor(None, subset_dictionary, cif_file, dic_file)
+    try:
+        with open(output_file, "w") as outfile, stage("gemmi_validate", file=cif_file):
+            process = await asyncio.create_subprocess_exec("gemmi", "validate", "-v", cif_file, "-d", dic_file,
+                                                           stdout=outfile, stderr=asyncio.subprocess.PIPE,
+                                                           env=os.environ.copy())
+            _, stderr = await process.communicate()
+    except Exception as e:
+        return False, f"An unexpected error occurred: {str(e)}"
+
+    stderr = stderr.decode(errors="replace").strip()
+    if process.returncode != 0:
+        print(f"Validation failed with error and output saved to {output_file}")
+        return False
+    if stderr:
+        print(f"Validation encountered issues: {stderr}")
+        return False
+    print(f"Validation succeeded. Results saved to {output_file}")
+    return True
+
+def validate_and_print(input_cif_file, download_dict,  output_val_file, **kwargs):
     """
     A callable function for validation with direct input of arguments.
 
     Parameters:
         input_cif_file (str): Path to the input mmCIF file.
-        cif_dict (str): Path to the mmCIF dictionary file.
+        download_dict (str): "yes" to refresh the cached dictionary if it has expired, otherwise use it as is.
         output_val_file (str): Path to save the validation output.
+        **kwargs: Passed on to mmcif_validation, e.g. dict_ttl or dic_file.
+
+    Returns:
+        The result of mmcif_validation.
     """
-    mmcif_validation(input_cif_file, download_dict, output_val_file)
+    return mmcif_validation(input_cif_file, download_dict, output_val_file, **kwargs)
 
 def main():
     """
     Parses arguments, performs validation, and outputs results.
     """
     args = parse_arguments()
-    output_val_file = args.input_cif_file.split(".")[0] + '_val.txt'
-    validate_and_print(args.input_cif_file, args.download_dict, output_val_file)
+    from compressed_io import base_name
+    output_val_file = base_name(args.input_cif_file) + '_val.txt'
+    if args.profile:
+        enable_profiling()
+    try:
+        with stage("mmcif_validator"):
+            validate_and_print(args.input_cif_file, args.download_dict, output_val_file, dict_ttl=args.dict_ttl,
+                               subset_dict=not args.full_dict)
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main()
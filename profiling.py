@@ -0,0 +1,243 @@
+"""
+profiling.py
+
+Description: This script records how long each stage of a conversion or validation takes (wall time, CPU time,
+peak resident memory and bytes read and written) and writes the stages as a Chrome trace, which can be opened in
+chrome://tracing or https://ui.perfetto.dev, together with a summary table.
+
+Stages are marked in the code with "with stage(name):". Until enable_profiling() is called stage() returns a
+shared no-op context manager, so instrumented code costs one global lookup per stage when profiling is off.
+The stack of open stages is a context variable, so stages of concurrent asyncio tasks and of their worker threads
+nest under the stage that started them. Peak memory is a process-wide counter and is only exact for stages that
+do not overlap.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:         # not available on Windows
+    resource = None
+
+_NO_STAGE = nullcontext()
+_profiler = None
+
+
+def stage(name, **args):
+    """
+    Marks a stage of the work for the active profiler.
+
+    Usage:
+        with stage("json_to_dict", file=input_json_file):
+            ...
+
+    Parameters:
+        name (str): Stage name, shown in the trace and the summary.
+        **args: Extra details stored with the trace event.
+    """
+    if _profiler is None:
+        return _NO_STAGE
+    return _profiler.stage(name, args)
+
+
+def enable_profiling():
+    """Starts recording stages in this process and returns the Profiler."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable_profiling():
+    """Stops recording stages and returns the Profiler that was active, or None."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+def write_profile(trace_file, file=None):
+    """Stops profiling, writes the Chrome trace to trace_file and prints the summary table to file (default: stdout)."""
+    profiler = disable_profiling()
+    if profiler is None:
+        return None
+    profiler.write_trace(trace_file)
+    print(profiler.format_summary(), file=file)
+    print(f"Profile trace saved to {trace_file} (open it in chrome://tracing or https://ui.perfetto.dev)", file=file)
+    return profiler
+
+
+def _read_proc_io():
+    """Bytes read and written by this process so far (Linux), or (None, None)."""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(":") for line in f)
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _reset_peak_rss():
+    """Resets the peak RSS of this process so the next reading covers only what follows (Linux 4.0+)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _read_peak_rss():
+    """Peak resident memory of this process in bytes, or None."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return None
+
+
+def _children_usage():
+    """CPU seconds and peak RSS in bytes of the finished child processes (e.g. gemmi), or (0.0, None)."""
+    if resource is None:
+        return 0.0, None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak = usage.ru_maxrss if os.uname().sysname == "Darwin" else usage.ru_maxrss * 1024
+    return usage.ru_utime + usage.ru_stime, peak
+
+
+class _Stage:
+    """Context manager measuring one stage; nested stages are measured separately and also count for their parent."""
+
+    __slots__ = ("profiler", "name", "args", "start", "cpu", "children_cpu", "read", "written", "peak", "parent",
+                 "token")
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.peak = 0
+
+    def __enter__(self):
+        stack = self.profiler._stack.get()
+        self.parent = stack[-1] if stack else None
+        self.token = self.profiler._stack.set(stack + (self,))
+        self.profiler._reset_peak(self.parent)
+        self.read, self.written = _read_proc_io()
+        self.children_cpu = _children_usage()[0]
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        cpu = time.process_time() - self.cpu
+        children_cpu, children_peak = _children_usage()
+        read, written = _read_proc_io()
+        self.peak = max(self.peak, _read_peak_rss() or 0)
+        self.profiler._stack.reset(self.token)
+        if self.parent is not None:
+            self.parent.peak = max(self.parent.peak, self.peak)
+
+        event = {
+            "name": self.name,
+            "start": self.start,
+            "wall": end - self.start,
+            "cpu": cpu + children_cpu - self.children_cpu,
+            "peak_rss": self.peak or None,
+            "read": read - self.read if read is not None else None,
+            "written": written - self.written if written is not None else None,
+            "args": self.args,
+            "tid": threading.get_ident(),
+        }
+        if children_cpu > self.children_cpu:
+            event["child_peak_rss"] = children_peak
+        self.profiler.events.append(event)
+        return False
+
+
+class Profiler:
+    """
+    Collects the stages of one process.
+
+    Attributes:
+        events (list): One dict per finished stage with name, start, wall and cpu seconds, peak_rss, read and
+            written bytes (None where the platform cannot tell) and args.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.origin = time.perf_counter()
+        self._stack = ContextVar("stages", default=())
+        self._can_reset_peak = _reset_peak_rss()
+
+    def stage(self, name, args=None):
+        return _Stage(self, name, args or {})
+
+    def _reset_peak(self, parent):
+        if self._can_reset_peak:
+            # The enclosing stage keeps the peak reached so far before the counter is reset
+            if parent is not None:
+                parent.peak = max(parent.peak, _read_peak_rss() or 0)
+            _reset_peak_rss()
+
+    def summary(self):
+        """
+        Totals per stage name, in order of first appearance.
+
+        Returns:
+            list: (name, calls, wall seconds, cpu seconds, peak RSS bytes, bytes read, bytes written)
+        """
+        totals = {}
+        for event in sorted(self.events, key=lambda e: e["start"]):
+            calls, wall, cpu, peak, read, written = totals.get(event["name"], (0, 0.0, 0.0, 0, 0, 0))
+            totals[event["name"]] = (calls + 1, wall + event["wall"], cpu + event["cpu"],
+                                     max(peak, event["peak_rss"] or 0), read + (event["read"] or 0),
+                                     written + (event["written"] or 0))
+        return [(name,) + values for name, values in totals.items()]
+
+    def format_summary(self):
+        """The summary as a text table."""
+        lines = [f"{'stage':24} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'peak RSS MB':>11} "
+                 f"{'read MB':>9} {'written MB':>10}"]
+        for name, calls, wall, cpu, peak, read, written in self.summary():
+            lines.append(f"{name:24} {calls:5d} {wall:9.4f} {cpu:9.4f} {peak / 1e6:11.1f} "
+                         f"{read / 1e6:9.2f} {written / 1e6:10.2f}")
+        return "\n".join(lines)
+
+    def trace(self):
+        """The stages in the Chrome trace event format (complete "X" events, times in microseconds)."""
+        pid, tid = os.getpid(), threading.get_ident()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": "json_to_mmcif"}}]
+        for event in self.events:
+            args = {"cpu_ms": round(event["cpu"] * 1000, 3)}
+            for key in ("peak_rss", "child_peak_rss", "read", "written"):
+                if event.get(key) is not None:
+                    args[key + "_bytes"] = event[key]
+            args.update({key: str(value) for key, value in event["args"].items()})
+            events.append({"name": event["name"], "cat": "stage", "ph": "X", "pid": pid,
+                           "tid": event.get("tid", tid),
+                           "ts": round((event["start"] - self.origin) * 1e6, 3),
+                           "dur": round(event["wall"] * 1e6, 3), "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, trace_file):
+        with open(trace_file, "w") as f:
+            json.dump(self.trace(), f, indent=1)
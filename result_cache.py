@@ -0,0 +1,390 @@
+"""
+result_cache.py
+
+Description: This script keeps a content-addressed cache of conversion and validation results. An entry is keyed
+by the SHA-256 of the input JSON and mmCIF files, the cached dictionary (version and SHA-256), the code of the
+converter and validator backends and the options of the run, and holds the converted mmCIF file, the validation
+report and the result. Rerunning over unchanged inputs restores the outputs from the cache, leaving files that
+are already up to date untouched. The cache is bounded in size; the least recently used entries are removed first.
+
+The cache directory also holds the CategoryCache of category_validation.py: the validation results of single
+categories, so that a merged file is validated again only where the merge changed it.
+
+Example usage:
+    python result_cache.py --size          (print the size and number of entries)
+    python result_cache.py --clear
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import tempfile
+from mmcif_dictionary import DICTIONARY_DIR, DictionaryCache, _file_sha256
+from compressed_io import base_name
+
+CACHE_DIR = os.path.join(DICTIONARY_DIR, "results")
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+ENTRY_FILE = "entry.json"
+CATEGORY_DB = "categories.db"
+DEFAULT_MAX_CATEGORIES = 200000
+
+# Modules whose code shapes the converted files and the validation reports
+TOOL_MODULES = ("json_to_mmcif.py", "async_pipeline.py", "converter.py", "cif_reader.py", "cif_category.py",
+                "cif_writer.py", "cif_binary.py", "cif_patch.py", "json_stream.py", "dictionary_index.py",
+                "dictionary_subset.py", "mmcif_validator.py", "result_cache.py", "compressed_io.py",
+                "category_validation.py", "diagnostics.py")
+# Installed packages whose version changes the output: the PdbxWriter, the gemmi validator and MessagePack
+TOOL_PACKAGES = ("mmcif", "gemmi", "msgpack")
+
+_tool_version = None
+
+
+def tool_version():
+    """
+    Returns a SHA-256 identifying the converter: the source of TOOL_MODULES and the installed files of
+    TOOL_PACKAGES, found without importing them.
+    """
+    global _tool_version
+    if _tool_version is None:
+        from importlib.util import find_spec
+        sha256 = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in TOOL_MODULES:
+            path = os.path.join(here, name)
+            if os.path.isfile(path):
+                sha256.update(name.encode() + b"\0" + _file_sha256(path).encode() + b"\0")
+        for name in TOOL_PACKAGES:
+            spec = find_spec(name)
+            if spec is not None and spec.origin and os.path.isfile(spec.origin):
+                stat = os.stat(spec.origin)
+                sha256.update(f"{name}\0{spec.origin}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+        _tool_version = sha256.hexdigest()
+    return _tool_version
+
+
+def job_files(input_json_file, input_cif_file, input_format, validate, output_format="cif"):
+    """
+    Returns the files a run of json_to_mmcif reads and writes.
+
+    Returns:
+        tuple: (list of input files, dict of output files by kind: "cif" for the converted file, mmCIF or
+        BinaryCIF as output_format says, and "report" for the validation report)
+    """
+    name = base_name(input_json_file)
+    inputs, outputs = [], {}
+    if validate != "only":
+        inputs.append(input_json_file)
+        if input_format == "cif":
+            inputs.append(input_cif_file)
+        outputs["cif"] = name + '.' + output_format
+    elif input_cif_file:
+        inputs.append(input_cif_file)
+    if validate in ("all", "only"):
+        outputs["report"] = name + '_val.txt'
+    return inputs, outputs
+
+
+def category_cache(cache, input_format, validate):
+    """
+    Returns the CategoryCache of a ResultCache for a run that merges JSON into an mmCIF file and validates the
+    result, whose categories are mostly the ones of the mmCIF file, or None for other runs and without a cache.
+    """
+    if cache is None or input_format != "cif" or validate != "all":
+        return None
+    return cache.categories()
+
+
+class ResultCache:
+    """
+    A directory of cached results, one subdirectory per key holding the output files and an entry.json with the
+    result and the SHA-256 of each output. Entries are written to a temporary directory and renamed into place,
+    so processes sharing the cache never read a partial entry.
+
+    Parameters:
+        cache_dir (str): Directory of the cache.
+        max_size (int): Bytes the cache may hold; the least recently used entries are removed beyond it.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def key(self, input_files, dic_file, **options):
+        """
+        Returns the key of a run reading input_files, validating against dic_file, with the given options
+        (e.g. input_format, writer), or None if an input file is missing and the run cannot be cached.
+
+        The names of the files are part of the key, since the data block name and the report refer to them.
+        """
+        sha256 = hashlib.sha256()
+        sha256.update(tool_version().encode() + b"\0")
+        sha256.update(DictionaryCache(os.path.dirname(dic_file)).key().encode() + b"\0")
+        sha256.update(json.dumps(options, sort_keys=True).encode() + b"\0")
+        for path in input_files:
+            if not path or not os.path.isfile(path):
+                return None
+            sha256.update(path.encode() + b"\0" + _file_sha256(path).encode() + b"\0")
+        return sha256.hexdigest()
+
+    def lookup(self, input_files, dic_file, outputs, **options):
+        """
+        Computes the key of a run and restores its outputs if it is cached; see key and restore.
+
+        Returns:
+            tuple: (key, entry) - key is None if the run cannot be cached, entry is None if it is not cached.
+        """
+        key = self.key(input_files, dic_file, **options)
+        entry = self.restore(key, outputs) if key else None
+        if entry is not None:
+            print(f"Inputs unchanged; {' and '.join(outputs.values())} restored from the result cache")
+        return key, entry
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def restore(self, key, outputs):
+        """
+        Restores the outputs of the run with key from the cache. Output files whose content is already the
+        cached one are left untouched.
+
+        Parameters:
+            outputs (dict): Path of each kind of output, as returned by job_files.
+
+        Returns:
+            dict: The entry ({"result": ..., "files": {kind: {"sha256", "size"}}}), or None if it is not cached.
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), 'r') as file:
+                entry = json.load(file)
+            if set(entry["files"]) != set(outputs):
+                return None
+            for kind, path in outputs.items():
+                stored = entry["files"][kind]
+                if os.path.isfile(path) and os.path.getsize(path) == stored["size"] \
+                        and _file_sha256(path) == stored["sha256"]:
+                    continue
+                shutil.copyfile(os.path.join(entry_dir, kind), path)
+            # The modification time of the entry file orders the entries for eviction
+            os.utime(os.path.join(entry_dir, ENTRY_FILE))
+        except (OSError, ValueError, KeyError):
+            # Missing, or removed by another process while it was read
+            return None
+        return entry
+
+    def store(self, key, outputs, result):
+        """
+        Stores the outputs of a finished run and its result, then evicts entries beyond max_size.
+
+        Returns:
+            bool: True if the entry was stored.
+        """
+        files = {}
+        for kind, path in outputs.items():
+            if not os.path.isfile(path):
+                return False
+            files[kind] = {"sha256": _file_sha256(path), "size": os.path.getsize(path)}
+        if sum(f["size"] for f in files.values()) > self.max_size:
+            return False
+
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        part = tempfile.mkdtemp(dir=os.path.dirname(entry_dir), prefix=key, suffix=".part")
+        try:
+            for kind, path in outputs.items():
+                shutil.copyfile(path, os.path.join(part, kind))
+            with open(os.path.join(part, ENTRY_FILE), 'w') as file:
+                json.dump({"result": result, "files": files, "created": time.time()}, file)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(part, entry_dir)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(part, ignore_errors=True)
+            return False
+        self.evict()
+        return True
+
+    def entries(self):
+        """
+        Returns the entries of the cache, least recently used first.
+
+        Returns:
+            list: (last use time, size in bytes, entry directory) tuples.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".part"):
+                    continue
+                try:
+                    used = os.stat(os.path.join(entry.path, ENTRY_FILE)).st_mtime
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                except OSError:
+                    continue
+                entries.append((used, size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        """Returns the bytes held by the cache."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache holds at most max_size bytes.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Removes every entry, and the cached categories."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def categories(self):
+        """Returns the CategoryCache kept in the cache directory."""
+        return CategoryCache(os.path.join(self.cache_dir, CATEGORY_DB))
+
+
+class CategoryCache:
+    """
+    Validation results of single categories of mmCIF files (see category_validation.py), in an SQLite database
+    that processes share. An entry is a JSON value stored under a key made by the caller; the least recently used
+    entries beyond max_entries are removed. A connection is only open during a call, so a cache can be passed to
+    worker processes.
+
+    Parameters:
+        db_file (str): Path of the database; it is created by the first store.
+        max_entries (int): Entries the cache may hold.
+    """
+
+    CHUNK = 500
+
+    def __init__(self, db_file=os.path.join(CACHE_DIR, CATEGORY_DB), max_entries=DEFAULT_MAX_CATEGORIES):
+        self.db_file = db_file
+        self.max_entries = max_entries
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+        db = sqlite3.connect(self.db_file, timeout=60)
+        db.execute("CREATE TABLE IF NOT EXISTS categories (key TEXT PRIMARY KEY, entry TEXT NOT NULL, "
+                   "used REAL NOT NULL)")
+        return db
+
+    def key(self, *parts):
+        """
+        Returns the key of an entry made of parts (str or bytes), prefixed by the version of the converter code
+        and the installed packages (see tool_version).
+        """
+        sha256 = hashlib.sha256(tool_version().encode() + b"\0")
+        for part in parts:
+            sha256.update(part.encode() if isinstance(part, str) else part)
+            sha256.update(b"\0")
+        return sha256.hexdigest()
+
+    def get(self, keys):
+        """
+        Returns the cached entries of keys, marking them as used.
+
+        Returns:
+            dict: {key: entry} for the keys in the cache.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys or not os.path.isfile(self.db_file):
+            return {}
+        entries = {}
+        db = self._connect()
+        try:
+            with db:
+                for start in range(0, len(keys), self.CHUNK):
+                    chunk = keys[start:start + self.CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    for key, entry in db.execute(f"SELECT key, entry FROM categories WHERE key IN ({marks})", chunk):
+                        entries[key] = json.loads(entry)
+                    db.execute(f"UPDATE categories SET used = ? WHERE key IN ({marks})", [time.time()] + chunk)
+        except sqlite3.Error:
+            # A damaged or locked cache only costs the validation of the categories again
+            return {}
+        finally:
+            db.close()
+        return entries
+
+    def put(self, entries):
+        """
+        Stores {key: entry} and evicts the least recently used entries beyond max_entries.
+
+        Returns:
+            bool: True if the entries were stored.
+        """
+        if not entries:
+            return True
+        now = time.time()
+        try:
+            db = self._connect()
+        except (OSError, sqlite3.Error):
+            return False
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO categories (key, entry, used) VALUES (?, ?, ?)",
+                               [(key, json.dumps(entry), now) for key, entry in entries.items()])
+                if db.execute("SELECT COUNT(*) FROM categories").fetchone()[0] > self.max_entries:
+                    db.execute("DELETE FROM categories WHERE key IN (SELECT key FROM categories "
+                               "ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        except sqlite3.Error:
+            return False
+        finally:
+            db.close()
+        return True
+
+    def __len__(self):
+        if not os.path.isfile(self.db_file):
+            return 0
+        db = self._connect()
+        try:
+            return db.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the cache of conversion and validation results")
+    parser.add_argument("--cache_dir", default=CACHE_DIR, help=f"Directory of the cache (default: {CACHE_DIR})")
+    actions = parser.add_mutually_exclusive_group(required=True)
+    actions.add_argument("--size", action="store_true", help="Print the size and number of entries")
+    actions.add_argument("--clear", action="store_true", help="Remove every entry")
+    args = parser.parse_args()
+    cache = ResultCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.cache_dir}")
+    else:
+        entries = cache.entries()
+        print(f"{len(entries)} entries, {sum(size for _, size, _ in entries) / 1e6:.1f} MB in {args.cache_dir}")
+        print(f"{len(cache.categories())} validated categories")
+
+
+if __name__ == "__main__":
+    main()
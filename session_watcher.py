@@ -0,0 +1,460 @@
+"""
+session_watcher.py
+
+Description: This script watches session directories for JSON files and converts and validates each new or
+changed file as soon as it is completely written, instead of a cron job starting json_to_mmcif.py for each file.
+Directories are watched recursively with inotify on Linux, so new session directories are picked up too, and
+scanned every few seconds elsewhere or when inotify is not available (--poll).
+
+A file is taken once its size and modification time have not changed for --settle seconds, so files still being
+written or copied are not read half-way. Settled files wait in a queue of at most --queue_size files for a pool
+of worker processes; while the queue is full, newly settled files stay where they are until there is room.
+Each version of a file is processed once: a file changed after it was processed is processed again, a file
+whose converted output is already newer than it when the watch starts is not.
+
+The end-to-end latency of each file, from its last modification to the end of its validation, the depth of the
+queue and the number of files in progress are kept as metrics; they are printed with each result and written as
+JSON to the --metrics file every few seconds and on exit.
+
+Example usage:
+    python json_to_mmcif.py -f json --watch sessions/ -w 4 --metrics watch_metrics.json
+    python json_to_mmcif.py -f cif --watch sessions/ -c model.cif -p --settle 5
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import os
+import json
+import time
+import select
+import struct
+import tempfile
+from collections import deque
+from compressed_io import strip_compression
+from mmcif_dictionary import DEFAULT_TTL, get_dictionary, make_shared
+
+DEFAULT_SETTLE = 2.0
+DEFAULT_QUEUE_SIZE = 64
+POLL_INTERVAL = 2.0
+METRICS_INTERVAL = 5.0
+# Latencies kept for the percentiles of the metrics
+LATENCY_WINDOW = 1000
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+
+def is_session_json(path):
+    """True for the JSON files the watch converts: *.json, compressed or not."""
+    return strip_compression(path).endswith(".json")
+
+
+def _walk_json(directory):
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if is_session_json(name):
+                yield os.path.join(root, name)
+
+
+def _signature(path):
+    """(size, modification time in ns) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class PollingWatcher:
+    """
+    Finds JSON files that appear or change under directories by scanning them.
+
+    Parameters:
+        directories (list): Directories to watch, recursively.
+        interval (float): Seconds between scans.
+    """
+
+    def __init__(self, directories, interval=POLL_INTERVAL):
+        self.directories = list(directories)
+        self.interval = interval
+        self._known = {}
+        self._next_scan = 0.0
+
+    def scan(self):
+        """Returns every JSON file under the directories."""
+        paths = [path for directory in self.directories for path in _walk_json(directory)]
+        self._known = {path: _signature(path) for path in paths}
+        self._next_scan = time.monotonic() + self.interval
+        return paths
+
+    def changes(self, timeout):
+        """Waits up to timeout seconds and returns the JSON files that may have appeared or changed."""
+        wait = self._next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return []
+        previous = self._known
+        paths = self.scan()
+        return [path for path in paths if previous.get(path) != self._known[path]]
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Finds JSON files that appear or change under directories from inotify events. Directories created under a
+    watched one are watched too, and the files already in them reported.
+
+    Raises:
+        OSError: If inotify is not available.
+    """
+
+    def __init__(self, directories):
+        import ctypes
+        import ctypes.util
+        self.directories = list(directories)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watches = {}
+
+    def _add_tree(self, directory):
+        """Watches directory and its subdirectories; returns the JSON files already in them."""
+        import ctypes
+        paths = []
+        for root, _, names in os.walk(directory):
+            descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(root), _WATCH_MASK)
+            if descriptor < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"cannot watch {root}: {os.strerror(errno)}")
+            self._watches[descriptor] = root
+            paths.extend(os.path.join(root, name) for name in names if is_session_json(name))
+        return paths
+
+    def scan(self):
+        return [path for directory in self.directories for path in self._add_tree(directory)]
+
+    def changes(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; every file is checked again
+                paths.extend(self.scan())
+                continue
+            directory = self._watches.get(descriptor)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    paths.extend(self._add_tree(path))
+            elif is_session_json(name):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self._fd)
+
+
+def open_watcher(directories, poll=False):
+    """
+    Starts watching directories with inotify, or by scanning them with poll or when inotify cannot watch them
+    (not Linux, or too many directories for the inotify watch limit).
+
+    Returns:
+        tuple: (watcher, list of the JSON files already under the directories)
+    """
+    if not poll:
+        watcher = None
+        try:
+            watcher = InotifyWatcher(directories)
+            return watcher, watcher.scan()
+        except (OSError, AttributeError) as e:
+            if watcher is not None:
+                watcher.close()
+            print(f"Warning: inotify is not available ({e}); scanning the directories every {POLL_INTERVAL:g}s")
+    watcher = PollingWatcher(directories)
+    return watcher, watcher.scan()
+
+
+class WatchMetrics:
+    """
+    Counters and gauges of a watch: files seen, processed, failed and skipped, the queue depth, the files in
+    progress, and the end-to-end latency and processing time of the last LATENCY_WINDOW files.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.seen = 0
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.settling = 0
+        self.queued = 0
+        self.in_progress = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.processing_times = deque(maxlen=LATENCY_WINDOW)
+
+    def depth(self, settling, queued, in_progress):
+        self.settling, self.queued, self.in_progress = settling, queued, in_progress
+        self.max_queue_depth = max(self.max_queue_depth, queued)
+
+    def record(self, succeeded, latency, processing_time):
+        self.processed += 1
+        self.failed += 0 if succeeded else 1
+        self.latencies.append(latency)
+        self.processing_times.append(processing_time)
+
+    def snapshot(self):
+        """Returns the metrics as a dict of numbers."""
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "files_seen": self.seen,
+            "files_processed": self.processed,
+            "files_failed": self.failed,
+            "files_skipped": self.skipped,
+            "settling": self.settling,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "in_progress": self.in_progress,
+            "latency_seconds": _summary(self.latencies),
+            "processing_seconds": _summary(self.processing_times),
+        }
+
+    def write(self, metrics_file):
+        """Writes the snapshot to metrics_file as JSON, replacing it atomically."""
+        directory = os.path.dirname(os.path.abspath(metrics_file))
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix=".part", delete=False) as part:
+            json.dump(self.snapshot(), part, indent=4)
+        make_shared(part.name)
+        os.replace(part.name, metrics_file)
+
+
+def _summary(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 3),
+            "p50": round(ordered[len(ordered) // 2], 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            "max": round(ordered[-1], 3)}
+
+
+def _warm_worker(dic_file):
+    """
+    Parses the dictionary in a new worker before its first file arrives. Ctrl-C is left to the watch, which
+    lets the files in progress finish.
+    """
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if os.path.isfile(dic_file):
+        from mmcif_validator import get_validator
+        get_validator(dic_file)
+
+
+class SessionWatcher:
+    """
+    Converts and validates the JSON files arriving under directories, with the options of json_to_mmcif.py.
+
+    Parameters:
+        directories (list): Directories to watch, recursively.
+        input_format, validate, patch, stream, writer, precheck, cache, output_format, compress,
+        input_cif_file: As for json_to_mmcif.run_batch.
+        workers (int): Worker processes; 1 or less converts in a thread of this process.
+        settle (float): Seconds a file must stay unchanged before it is taken.
+        queue_size (int): Settled files that may wait for a worker.
+        metrics_file (str): JSON file the metrics are written to, or None.
+        poll (bool): Scan the directories instead of using inotify.
+    """
+
+    def __init__(self, directories, input_format="json", validate="all", input_cif_file=None, download_dict="yes",
+                 dict_ttl=DEFAULT_TTL, workers=None, settle=DEFAULT_SETTLE, queue_size=DEFAULT_QUEUE_SIZE,
+                 metrics_file=None, poll=False, patch=False, stream=False, writer="pdbx", precheck=False,
+                 cache=None, output_format="cif", compress="auto"):
+        self.directories = list(directories)
+        self.input_format = input_format
+        self.validate = validate
+        self.input_cif_file = input_cif_file
+        self.download_dict = download_dict
+        self.dict_ttl = dict_ttl
+        self.workers = workers or os.cpu_count()
+        self.settle = settle
+        self.queue_size = max(1, queue_size)
+        self.metrics_file = metrics_file
+        self.poll = poll
+        self.options = (patch, stream, writer, precheck, cache)
+        self.output_format = output_format
+        self.compress = compress
+        self.metrics = WatchMetrics()
+        # path: (signature, monotonic time of its last change) while it settles
+        self._settling = {}
+        self._queue = deque()
+        # future: (path, signature)
+        self._running = {}
+        # path: signature of the version last processed or skipped
+        self._done = {}
+        self._seen = set()
+
+    def run(self, stop=None):
+        """
+        Watches until stop (a threading.Event) is set, or until interrupted.
+
+        Returns:
+            dict: The final metrics.
+        """
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+        dic_file = get_dictionary(self.download_dict, ttl=self.dict_ttl)
+        dictionary_checked = time.monotonic()
+        if self.workers <= 1:
+            executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker, initargs=(dic_file,))
+        watcher, paths = open_watcher(self.directories, self.poll)
+        metrics_written = time.monotonic()
+        try:
+            for path in paths:
+                self._seen.add(path)
+                if self._up_to_date(path):
+                    self._done[path] = _signature(path)
+                    self.metrics.skipped += 1
+                else:
+                    self._settling[path] = (_signature(path), time.monotonic())
+            print(f"Watching {', '.join(self.directories)} with {type(watcher).__name__} "
+                  f"({len(self._settling)} files to process, {self.metrics.skipped} up to date)")
+            while stop is None or not stop.is_set():
+                timeout = min(self.settle, 0.5) if self._settling or self._running else 1.0
+                if self._running and not self._settling:
+                    wait(list(self._running), timeout=timeout, return_when=FIRST_COMPLETED)
+                    changes = watcher.changes(0)
+                else:
+                    changes = watcher.changes(timeout)
+                self._changed(changes)
+                self._finish()
+                if time.monotonic() - dictionary_checked > self.dict_ttl:
+                    # Replaced atomically; workers rebuild their validator when the file changes
+                    get_dictionary(self.download_dict, ttl=self.dict_ttl)
+                    dictionary_checked = time.monotonic()
+                self._promote()
+                self.metrics.depth(len(self._settling), len(self._queue), len(self._running))
+                self._submit(executor)
+                self.metrics.seen = len(self._seen)
+                self.metrics.depth(len(self._settling), len(self._queue), len(self._running))
+                if self.metrics_file and time.monotonic() - metrics_written > METRICS_INTERVAL:
+                    self.metrics.write(self.metrics_file)
+                    metrics_written = time.monotonic()
+        except KeyboardInterrupt:
+            print("Watch interrupted")
+        finally:
+            watcher.close()
+            # shutdown(cancel_futures=True) needs Python 3.9; files not yet started are cancelled here
+            for future in self._running:
+                future.cancel()
+            executor.shutdown(wait=True)
+            self._finish()
+            self.metrics.seen = len(self._seen)
+            self.metrics.depth(len(self._settling), len(self._queue), len(self._running))
+            if self.metrics_file:
+                self.metrics.write(self.metrics_file)
+        return self.metrics.snapshot()
+
+    def _up_to_date(self, path):
+        """True if the file converted from path is newer than it, so it was processed before the watch."""
+        if self.validate == "only":
+            return False
+        from json_to_mmcif import output_file, resolve_output_format
+        converted = output_file(path, resolve_output_format(self.output_format, self.compress, path))
+        try:
+            return os.path.getmtime(converted) >= os.path.getmtime(path)
+        except OSError:
+            return False
+
+    def _changed(self, paths):
+        now = time.monotonic()
+        for path in paths:
+            signature = _signature(path)
+            if signature is None or self._done.get(path) == signature:
+                continue
+            self._seen.add(path)
+            if self._settling.get(path, (None,))[0] != signature:
+                self._settling[path] = (signature, now)
+
+    def _promote(self):
+        """
+        Moves the files unchanged for settle seconds to the queue, while it has room. A newer version of a file
+        that is queued or being processed waits for it.
+        """
+        now = time.monotonic()
+        busy = {path for path, _ in self._queue} | {path for path, _ in self._running.values()}
+        for path, (signature, changed) in list(self._settling.items()):
+            if len(self._queue) >= self.queue_size:
+                break
+            current = _signature(path)
+            if current is None:
+                del self._settling[path]
+            elif current != signature:
+                self._settling[path] = (current, now)
+            elif now - changed >= self.settle and path not in busy:
+                del self._settling[path]
+                self._queue.append((path, signature))
+
+    def _submit(self, executor):
+        from json_to_mmcif import process_input_file, resolve_output_format
+        patch, stream, writer, precheck, cache = self.options
+        while self._queue and len(self._running) < self.workers:
+            path, signature = self._queue.popleft()
+            future = executor.submit(process_input_file, path, self.input_cif_file, self.input_format,
+                                     self.validate, patch, stream, writer, precheck, cache,
+                                     resolve_output_format(self.output_format, self.compress, path))
+            self._running[future] = (path, signature)
+
+    def _finish(self):
+        for future in [future for future in self._running if future.done()]:
+            path, signature = self._running.pop(future)
+            self._done[path] = signature
+            if future.cancelled():
+                continue
+            try:
+                _, succeeded, message, elapsed = future.result()
+            except Exception as e:
+                succeeded, message, elapsed = False, f"{type(e).__name__}: {e}", 0.0
+            # From the last write of the file to the end of its validation
+            latency = time.time() - signature[1] / 1e9
+            self.metrics.record(succeeded, latency, elapsed)
+            status = "OK" if succeeded else "FAILED"
+            detail = "" if succeeded else f": {message}"
+            print(f"{status} {path} (processing {elapsed:.2f}s, latency {latency:.2f}s, "
+                  f"queue {len(self._queue)}){detail}")
+
+
+def watch(directories, **options):
+    """Runs a SessionWatcher over directories until interrupted; see SessionWatcher for the options."""
+    return SessionWatcher(directories, **options).run()
@@ -0,0 +1,148 @@
+"""
+test_async_pipeline.py
+
+Description: This script is a unit test for the async_pipeline script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from async_pipeline import *
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestAsyncPipeline(unittest.TestCase):
+
+    def setUp(self):
+        # The dictionary is looked up in mmcif_tools/ of the working directory
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        os.mkdir('mmcif_tools')
+        shutil.copy(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'), os.path.join('mmcif_tools', 'mmcif_pdbx_v50.dic'))
+        for name in ('SPA_data.json', 'TOMO_data.json', 'input_mmcif.cif'):
+            shutil.copy(os.path.join(TEST_DATA, name), name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_convert_many(self):
+        """Results come back in input order and a failing file does not stop the others."""
+        with open('bad.json', 'w') as f:
+            f.write('{"em_imaging": ')
+        pairs = [('SPA_data.json', None), ('bad.json', None), ('TOMO_data.json', None)]
+        results = asyncio.run(convert_many_async(pairs, 'json', download_dict='no', precheck=False))
+
+        self.assertEqual([r[0] for r in results], ['SPA_data.json', 'bad.json', 'TOMO_data.json'])
+        self.assertEqual([r[1] for r in results], [True, False, False])
+        self.assertIn('JSONDecodeError', results[1][2])
+        self.assertEqual(results[2][2], 'validation failed')
+        for name in ('SPA_data', 'TOMO_data'):
+            self.assertTrue(os.path.exists(name + '.cif'))
+            self.assertTrue(os.path.exists(name + '_val.txt'))
+        with open('TOMO_data_val.txt') as f:
+            self.assertIn('PARALLEL', f.read())
+
+    def test_same_output_as_sync(self):
+        """The pipeline writes the same mmCIF file as convert_input_file."""
+        from json_to_mmcif import convert_input_file
+        convert_input_file('SPA_data.json', 'input_mmcif.cif', 'cif')
+        with open('SPA_data.cif') as f:
+            expected = f.read()
+        os.remove('SPA_data.cif')
+        results = asyncio.run(convert_many_async([('SPA_data.json', 'input_mmcif.cif')], 'cif', validate='no',
+                                                 download_dict='no'))
+        self.assertTrue(results[0][1])
+        with open('SPA_data.cif') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_sync_inside_loop(self):
+        """convert_input_file and download_and_validate run their own code, so a coroutine can call them too."""
+        from json_to_mmcif import convert_input_file, download_and_validate
+
+        async def convert():
+            convert_input_file('SPA_data.json', None, 'json')
+            return download_and_validate('SPA_data.json', None, 'no', 'all', in_process=True)
+
+        self.assertTrue(asyncio.run(convert()))
+
+    def test_precheck(self):
+        """Data failing the fast check is not validated with gemmi."""
+        with patch('mmcif_validator.mmcif_validation_async') as mock_validate:
+            results = asyncio.run(convert_many_async([('TOMO_data.json', None)], 'json', download_dict='no'))
+        mock_validate.assert_not_called()
+        self.assertFalse(results[0][1])
+        with open('TOMO_data_val.txt') as f:
+            self.assertTrue(f.read().endswith('FAILED\n'))
+
+    def test_pipeline_dictionary(self):
+        """Files are validated in process against the dictionary the pipeline looked up."""
+        os.rename(os.path.join('mmcif_tools', 'mmcif_pdbx_v50.dic'), 'other.dic')
+        pipeline = Pipeline(download_dict='no')
+        with patch.object(Pipeline, '_get_dictionary', return_value=os.path.abspath('other.dic')):
+            result = asyncio.run(pipeline.process('SPA_data.json', None, 'json', 'all', in_process=True))
+        self.assertTrue(result[1], result[2])
+
+    def test_validate_only(self):
+        shutil.copy(os.path.join(TEST_DATA, 'TOMO_data.cif'), 'TOMO_data.cif')
+        pipeline_results = asyncio.run(convert_many_async([('TOMO_data.json', 'TOMO_data.cif'),
+                                                           ('SPA_data.json', None)], 'json', validate='only',
+                                                          download_dict='no'))
+        self.assertEqual([r[1] for r in pipeline_results], [False, False])
+        self.assertIn('no input mmCIF file', pipeline_results[1][2])
+        self.assertFalse(os.path.exists('SPA_data.cif'))
+
+    def test_limits(self):
+        """No more validations run at a time than the validate limit allows."""
+        running, peak = [0], [0]
+
+        async def fake_validation(cif_file, dic_file, output_file):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.02)
+            running[0] -= 1
+            return True
+
+        pairs = []
+        for i in range(6):
+            name = f'file{i}.json'
+            with open(name, 'w') as f:
+                json.dump({"em_imaging": {"mode": "BRIGHT FIELD"}}, f)
+            pairs.append((name, None))
+        with patch('mmcif_validator.mmcif_validation_async', fake_validation):
+            results = asyncio.run(convert_many_async(pairs, 'json', download_dict='no', precheck=False,
+                                                     limits=Limits(validate=2)))
+        self.assertTrue(all(r[1] for r in results))
+        self.assertEqual(peak[0], 2)
+
+    def test_made_outside_loop(self):
+        """A pipeline made before its event loop runs makes its semaphores and lock in that loop."""
+        pipeline = Pipeline(download_dict='no', limits=Limits(validate=1))
+        self.assertEqual(pipeline._semaphores, {})
+        self.assertIsNone(pipeline._in_process_lock)
+
+        async def run_both():
+            return await asyncio.gather(*(pipeline.process(name, None, 'json', 'all', in_process=True)
+                                          for name in ('SPA_data.json', 'TOMO_data.json')))
+
+        results = asyncio.run(run_both())
+        self.assertEqual([r[1] for r in results], [True, False])
+        self.assertIsNotNone(pipeline._in_process_lock)
+        self.assertIn('validate', pipeline._semaphores)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+test_bench_pipeline.py
+
+Description: This script is a unit test for the benchmark harness in benchmarks/bench_pipeline.py and its
+synthetic input generator.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from bench_pipeline import *
+from synthetic import make_json_dict, write_cif_file
+from json_to_mmcif import mmcif_to_json
+
+
+class TestBenchPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_synthetic_round_trip(self):
+        for quoting in QUOTING:
+            json_dict = make_json_dict(categories=3, loops=2, rows=40, value_length=10, quoting=quoting)
+            self.assertEqual(len(json_dict["bench_loop_1"]["id"]), 40)
+            cif_file = os.path.join(self.temp_dir, quoting + '.cif')
+            write_cif_file(cif_file, json_dict)
+            self.assertEqual(mmcif_to_json(cif_file), json_dict, quoting)
+
+    def test_run_workload(self):
+        # Dots in directory names do not cut the output names short
+        temp_dir = os.path.join(self.temp_dir, "runs", "v1.2")
+        os.makedirs(temp_dir)
+        stages = run_workload(WORKLOADS["small"], 1, None, temp_dir)
+        self.assertTrue(os.path.exists(os.path.join(temp_dir, "bench.cif")))
+        self.assertEqual(set(stages) - {"validate"}, set(STAGES) - {"validate"})
+        self.assertTrue(all(timing["best"] >= 0 for timing in stages.values()))
+
+    def test_compare_to_baseline(self):
+        def results(seconds, rows=20):
+            return {"workloads": {"small": {"parameters": {"rows": rows},
+                                            "stages": {"merge": {"best": seconds}}}}}
+        self.assertEqual(compare_to_baseline(results(0.2), results(0.1), 0.25), [("small", "merge", 0.1, 0.2)])
+        self.assertEqual(compare_to_baseline(results(0.11), results(0.1), 0.25), [])
+        # Noise on very fast stages and baselines of other parameters are ignored
+        self.assertEqual(compare_to_baseline(results(0.002), results(0.001), 0.25), [])
+        self.assertEqual(compare_to_baseline(results(0.2, rows=40), results(0.1), 0.25), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
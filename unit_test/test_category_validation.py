@@ -0,0 +1,147 @@
+"""
+test_category_validation.py
+
+Description: This script is a unit test for the category_validation script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import io
+import os
+import sys
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from category_validation import *
+from mmcif_validator import MmcifValidator
+from result_cache import CategoryCache
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+# The test dictionary with the imaging_id of image recordings and software linked to _em_imaging.id
+LINKS = """    loop_
+    _item_linked.child_name
+    _item_linked.parent_name
+    '_em_image_recording.imaging_id' '_em_imaging.id'
+    '_em_software.imaging_id'        '_em_imaging.id'
+    save_
+"""
+
+MODEL = """data_model
+_em_imaging.entry_id          E1
+_em_imaging.id                1
+_em_imaging.specimen_id       1
+_em_imaging.mode              DIFFRACTION
+#
+loop_
+_em_software.id
+_em_software.imaging_id
+_em_software.category
+1 1 RECONSTRUCTION
+2 7 'IMAGE ACQUISITION'
+#
+loop_
+_em_image_recording.id
+_em_image_recording.imaging_id
+_em_image_recording.detector_mode
+1 1 COUNTING
+2 5 FAST
+2 5 FAST
+#
+_em_support_film.material  ?
+_em_unknown.id             1
+#
+data_second
+_em_imaging.id                2
+_em_imaging.date              2024
+"""
+
+
+class TestCategoryValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic')) as f:
+            dictionary = f.read()
+        frame = dictionary.index("save__em_imaging.id\n")
+        end = dictionary.index("    save_\n", frame)
+        self.dic_file = os.path.join(self.temp_dir, 'linked.dic')
+        with open(self.dic_file, 'w') as f:
+            f.write(dictionary[:end] + LINKS + dictionary[end + len("    save_\n"):])
+        self.validator = MmcifValidator(self.dic_file)
+        self.cache = CategoryCache(os.path.join(self.temp_dir, 'categories.db'))
+        self.cif_file = os.path.join(self.temp_dir, 'model.cif')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def validate(self, text):
+        """Validates text in full and by category; returns the reports and the line printed for the latter."""
+        with open(self.cif_file, 'w') as f:
+            f.write(text)
+        full = self.validator.validate_file(self.cif_file)
+        with redirect_stdout(io.StringIO()) as output:
+            by_category = self.validator.validate_file(self.cif_file, self.cache)
+        return full, by_category, output.getvalue()
+
+    def test_same_report(self):
+        """The report by category is the full one, whatever was taken from the cache."""
+        full, by_category, output = self.validate(MODEL)
+        self.assertEqual(by_category, full)
+        self.assertFalse(full[0])
+        self.assertIn("missing parent(s) of _em_image_recording.imaging_id", full[1])
+        self.assertIn("6 of 6 categories", output)
+
+        full, by_category, output = self.validate(MODEL)
+        self.assertEqual(by_category, full)
+        self.assertIn("0 of 6 categories", output)
+
+        # New rows move the categories below them, a new parent row changes the parent checks of two
+        # categories, and an error moves to the other block
+        changed = MODEL.replace("_em_imaging.mode              DIFFRACTION\n",
+                                "_em_imaging.mode              'BRIGHT FIELD'\n"
+                                "_em_imaging.microscope_model  KRIOS\n")
+        changed = changed.replace("2 7 'IMAGE ACQUISITION'\n", "2 7 'IMAGE ACQUISITION'\n3 5 CLASSIFICATION\n")
+        changed = changed.replace("_em_imaging.date              2024\n", "_em_imaging.date              2024-01-01\n"
+                                  "_em_imaging.mode              DIFFRACTION\n")
+        full, by_category, output = self.validate(changed)
+        self.assertEqual(by_category, full)
+        self.assertIn("3 of 6 categories", output)
+        self.assertNotEqual(full, self.validate(MODEL)[0])
+
+        # The second block of the model alone, and the model again
+        full, by_category, output = self.validate(MODEL[MODEL.index("data_second"):])
+        self.assertEqual(by_category, full)
+        self.assertIn("0 of 1 categories", output)
+
+    def test_whole_file(self):
+        """Files that cannot be split into categories are validated in one go."""
+        split = MODEL.replace("_em_unknown.id             1\n",
+                              "_em_unknown.id             1\n_em_imaging.details        x\n")
+        full, by_category, output = self.validate(split)
+        self.assertEqual(by_category, full)
+        self.assertEqual(output, "")
+        with open(self.cif_file, 'w') as f:
+            f.write(split)
+        from gemmi import cif
+        self.assertIsNone(category_units(self.cif_file, cif.read(self.cif_file), self.cache, "test"))
+
+        with open(self.cif_file, 'w') as f:
+            f.write(MODEL)
+        units = category_units(self.cif_file, cif.read(self.cif_file), self.cache, "test")
+        self.assertEqual([(unit.block, unit.category, unit.line) for unit in units],
+                         [("model", "em_imaging", 2), ("model", "em_software", 7),
+                          ("model", "em_image_recording", 14), ("model", "em_support_film", 22),
+                          ("model", "em_unknown", 23), ("second", "em_imaging", 26)])
+        self.assertEqual(units[0].key, category_units(self.cif_file, cif.read(self.cif_file), self.cache,
+                                                      "test")[0].key)
+        self.assertNotEqual(units[0].key, units[5].key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+test_cif2json.py
+
+Description: This script is a unit test for the cif2json script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import io
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+from unittest import mock
+from contextlib import redirect_stdout, redirect_stderr
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif2json import *
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestCif2Json(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.two_blocks = os.path.join(self.temp_dir, 'two.cif')
+        with open(self.two_blocks, 'w') as f:
+            f.write("data_first\n_em_imaging.id 1\n_em_imaging.mode BRIGHT\n"
+                    "data_second\nloop_\n_em_software.id\n_em_software.name\n1 a\n2 b\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_block_records(self):
+        """One record per data block; a single row is a dict of values, a loop one of columns."""
+        records = block_records(self.two_blocks)
+        self.assertEqual([record["block"] for record in records], ["first", "second"])
+        self.assertEqual(records[0]["categories"], {"em_imaging": {"id": "1", "mode": "BRIGHT"}})
+        self.assertEqual(records[1]["categories"], {"em_software": {"id": ["1", "2"], "name": ["a", "b"]}})
+        self.assertEqual(records[0]["file"], self.two_blocks)
+
+        records = block_records(self.two_blocks, arrays=True)
+        self.assertEqual(records[0]["categories"], {"em_imaging": {"id": ["1"], "mode": ["BRIGHT"]}})
+
+    def test_repeated_blocks_and_categories(self):
+        """A block name used again gets its own record; a category split within a block is joined, not replaced."""
+        cif_file = os.path.join(self.temp_dir, 'repeated.cif')
+        with open(cif_file, 'w') as f:
+            f.write("data_a\n_em_imaging.id 1\n_em_software.id 1\n_em_imaging.mode BRIGHT\n"
+                    "data_b\n_em_imaging.id 2\ndata_a\n_em_imaging.id 3\n")
+        records = block_records(cif_file)
+        self.assertEqual([record["block"] for record in records], ["a", "b", "a"])
+        self.assertEqual(records[0]["categories"], {"em_imaging": {"id": "1", "mode": "BRIGHT"},
+                                                    "em_software": {"id": "1"}})
+        self.assertEqual(records[2]["categories"], {"em_imaging": {"id": "3"}})
+
+        for text in ("data_a\n_em_imaging.id 1\n_em_software.id 1\n_em_imaging.id 2\n",
+                     "data_a\n_em_imaging.id 1\ndata_a\n_em_imaging.id 2\n",
+                     "data_a\n_em_imaging.id 1\nloop_\n_em_imaging.mode\nA\nB\n"):
+            with open(cif_file, 'w') as f:
+                f.write(text)
+            with self.assertRaises(ValueError):
+                block_records(cif_file)
+
+    def test_export_corpus(self):
+        """Records of all files are written in input order by the workers; failed files are reported."""
+        cif_files = [os.path.join(TEST_DATA, name) for name in ('SPA_data.cif', 'TOMO_data.cif')]
+        cif_files += [self.two_blocks, os.path.join(self.temp_dir, 'missing.cif')]
+        cif_files += [os.path.join(TEST_DATA, 'input_mmcif.cif')] * 3
+        output_file = os.path.join(self.temp_dir, 'export.ndjson.gz')
+        with redirect_stdout(io.StringIO()) as output:
+            results = export_corpus(cif_files, output_file, workers=2)
+        self.assertIn("FAILED", output.getvalue())
+        self.assertIn("(1 failed)", output.getvalue())
+        self.assertEqual([result[0] for result in results], cif_files)
+        self.assertEqual([result[2] for result in results], [1, 1, 2, 0, 1, 1, 1])
+        self.assertIsNotNone(results[3][1])
+
+        with gzip.open(output_file, 'rt') as f:
+            records = [json.loads(line) for line in f]
+        expected = [cif_file for cif_file in cif_files for _ in range(2 if cif_file == self.two_blocks else 1)
+                    if 'missing' not in cif_file]
+        self.assertEqual([record["file"] for record in records], expected)
+        # The same records as read in this process
+        self.assertEqual(records[2:4], block_records(self.two_blocks))
+
+    def test_standard_output(self):
+        """With - the records go to standard output and the summary does not."""
+        with redirect_stdout(io.StringIO()) as output:
+            export_corpus([self.two_blocks], "-", workers=1)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1])["block"], "second")
+
+    def test_profile_with_standard_output(self):
+        """With - and --profile the profile summary goes to standard error, so standard output stays NDJSON."""
+        trace_file = os.path.join(self.temp_dir, 'trace.json')
+        argv = ["cif2json.py", "-c", self.two_blocks, "-o", "-", "-w", "1", "--profile", trace_file]
+        with mock.patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()) as output, \
+                redirect_stderr(io.StringIO()) as errors:
+            main()
+        self.assertEqual([json.loads(line)["block"] for line in output.getvalue().splitlines()], ["first", "second"])
+        self.assertIn("Profile trace saved", errors.getvalue())
+        self.assertTrue(os.path.isfile(trace_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
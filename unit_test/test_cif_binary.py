@@ -0,0 +1,133 @@
+"""
+test_cif_binary.py
+
+Description: This script is a unit test for the cif_binary script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import glob
+import shutil
+import random
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_binary import *
+from cif_reader import iter_categories, is_bcif
+from json_to_mmcif import json_to_dict, mmcif_to_json, translate_json_to_cif, convert_input_file
+from mmcif_validator import MmcifValidator
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+VALUES = ["1", "-2.5", "1.0e-3", "3(2)", "12.", ".", "?", "", "EPU", "_tag", "data_x", "Global_x", "#x", "x#",
+          "[x", "a b", " ", "it's", 'say "hi"', "it's \"both\"", "two\nlines", "\U0001F52C ok",
+          7, 2.5, None]
+
+
+def read_json(cif_file):
+    """The categories of a text or BinaryCIF file in JSON form, by block."""
+    return [(c.block, c.name, c.to_json()) for c in iter_categories(cif_file, columns=True)]
+
+
+class TestCifBinary(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_integers(self):
+        """Every choice of encode_integers decodes to the input, and the smallest one is kept."""
+        random.seed(1)
+        cases = [[], [0], list(range(1000)), [5] * 1000, [-300, 70000, 0, -2 ** 31, 2 ** 31 - 1, 255, 127, -128],
+                 [random.randint(-40000, 40000) for _ in range(500)]]
+        for values in cases:
+            encoded = encode_integers(values)
+            self.assertEqual(decode(encoded["data"], encoded["encoding"]), values)
+        self.assertEqual([e["kind"] for e in encode_integers(list(range(1000)))["encoding"]],
+                         ["Delta", "RunLength", "IntegerPacking", "ByteArray"])
+        self.assertEqual(len(encode_integers([5] * 1000)["data"]), 4)
+
+    def test_columns(self):
+        """Numbers are stored as numbers only when they read back as the same text."""
+        for values, kinds in (([str(i) for i in range(200)], ["Delta", "RunLength", "IntegerPacking", "ByteArray"]),
+                              (["1.5", "300.0", "-0.25"], ["FixedPoint"]),
+                              (["1.50", "2.5"], ["StringArray"]),
+                              (["007", "8"], ["StringArray"]),
+                              (["1e3", "2"], ["StringArray"]),
+                              (["2147483648"], ["StringArray"])):
+            data, mask = encode_column(values)
+            self.assertIsNone(mask)
+            self.assertEqual([e["kind"] for e in data["encoding"]][:len(kinds)], kinds, values)
+            self.assertEqual(decode_column({"data": data, "mask": mask}), values)
+
+    def test_masked_values(self):
+        values = ["1", None, "", ".", "?", "5"]
+        data, mask = encode_column(values)
+        self.assertIsNotNone(mask)
+        self.assertEqual(decode_column({"data": data, "mask": mask}), ["1", "?", ".", ".", "?", "5"])
+        self.assertEqual(decode_column(dict(zip(("data", "mask"), encode_column([None, "?"])))), ["?", "?"])
+        self.assertEqual(decode_column(dict(zip(("data", "mask"), encode_column(VALUES)))),
+                         [cell(value) for value in VALUES])
+
+    def test_round_trip(self):
+        """A BinaryCIF file reads back as the same categories as the text mmCIF of the same data."""
+        documents = [json_to_dict(path) for path in glob.glob(os.path.join(TEST_DATA, '*.json'))]
+        documents.append({"data_one": {"em_software": {"name": VALUES, "version": list(range(len(VALUES)))}},
+                          "data_two": {"em_imaging": {"mode": "BRIGHT FIELD", "nominal_cs": 2.7}}})
+        for number, container_dict in enumerate(documents):
+            input_json_file = os.path.join(self.temp_dir, f"doc{number}.json")
+            translate_json_to_cif(container_dict, input_json_file)
+            translate_json_to_cif(container_dict, input_json_file, output_format="bcif")
+            base_name = input_json_file.split(".")[0]
+            self.assertTrue(is_bcif(base_name + '.bcif'))
+            self.assertFalse(is_bcif(base_name + '.cif'))
+            self.assertEqual(read_json(base_name + '.bcif'), read_json(base_name + '.cif'))
+            with open(base_name + '.cif') as f:
+                self.assertEqual(bcif_to_text(base_name + '.bcif'), f.read())
+
+    def test_merge_bcif_input(self):
+        """mmcif_to_json and the merge read BinaryCIF input as they read text mmCIF."""
+        cif_file = os.path.join(TEST_DATA, 'input_mmcif.cif')
+        bcif_file = os.path.join(self.temp_dir, 'input_mmcif.bcif')
+        write_bcif(bcif_file, [("input_mmcif", mmcif_to_json(cif_file))])
+        self.assertEqual(mmcif_to_json(bcif_file), mmcif_to_json(cif_file))
+
+        input_json_file = os.path.join(self.temp_dir, 'SPA_data.json')
+        shutil.copy(os.path.join(TEST_DATA, 'SPA_data.json'), input_json_file)
+        from_text = convert_input_file(input_json_file, cif_file, "cif")
+        from_binary = convert_input_file(input_json_file, bcif_file, "cif", output_format="bcif")
+        self.assertEqual(from_binary, from_text)
+        self.assertEqual(mmcif_to_json(input_json_file.split(".")[0] + '.bcif'),
+                         mmcif_to_json(input_json_file.split(".")[0] + '.cif'))
+
+    def test_validate(self):
+        """A BinaryCIF file gets the report of the same data in text mmCIF, naming the BinaryCIF file."""
+        validator = MmcifValidator(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'))
+        input_json_file = os.path.join(self.temp_dir, 'TOMO_data.json')
+        container_dict = json_to_dict(os.path.join(TEST_DATA, 'TOMO_data.json'))
+        translate_json_to_cif(container_dict, input_json_file)
+        translate_json_to_cif(container_dict, input_json_file, output_format="bcif")
+        base_name = input_json_file.split(".")[0]
+        text_valid, text_report = validator.validate_file(base_name + '.cif')
+        binary_valid, binary_report = validator.validate_file(base_name + '.bcif')
+        self.assertEqual(binary_valid, text_valid)
+        self.assertEqual(binary_report, text_report.replace('TOMO_data.cif', 'TOMO_data.bcif'))
+
+    def test_not_bcif(self):
+        self.assertFalse(is_bcif(os.path.join(self.temp_dir, 'missing.bcif')))
+        path = os.path.join(self.temp_dir, 'bad.bcif')
+        with open(path, 'wb') as f:
+            f.write(b'\x81\xa1a\x01')
+        with self.assertRaises(ValueError):
+            list(iter_bcif_categories(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
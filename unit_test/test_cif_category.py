@@ -0,0 +1,69 @@
+"""
+test_cif_category.py
+
+Description: This script is a unit test for the cif_category script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import glob
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_category import *
+from cif_reader import iter_categories, parse_categories, category_to_json
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestCategory(unittest.TestCase):
+
+    def test_slots(self):
+        category = Category("em_imaging", ["mode"], [["BRIGHT FIELD"]])
+        self.assertFalse(hasattr(category, "__dict__"))
+
+    def test_from_json_loop(self):
+        """Lists are used as columns without copying; a loop is cut to its shortest list."""
+        names, versions = ["FEI tomography", "IMOD"], ["5.17", "4.11"]
+        category = Category.from_json("em_software", {"name": names, "version": versions})
+        self.assertIs(category.columns[0], names)
+        self.assertIs(category.columns[1], versions)
+        self.assertEqual(category.row_count, 2)
+        self.assertEqual(list(category.rows()), [("FEI tomography", "5.17"), ("IMOD", "4.11")])
+
+        category = Category.from_json("em_software", {"name": names, "version": ["5.17"]})
+        self.assertEqual(category.columns, [["FEI tomography"], ["5.17"]])
+        self.assertEqual(names, ["FEI tomography", "IMOD"])
+
+    def test_from_json_single_row(self):
+        category = Category.from_json("em_imaging", {"mode": "BRIGHT FIELD", "details": ["a", "b"]})
+        self.assertEqual(category.items, ["mode", "details"])
+        self.assertEqual(list(category.rows()), [("BRIGHT FIELD", ["a", "b"])])
+        self.assertEqual(Category.from_json("em_imaging", {}).row_count, 0)
+
+    def test_from_loop_and_to_json(self):
+        category = Category.from_loop("em_software", ["name", "version"], ["a", "1", "b", "2", "c", "3"], "x")
+        self.assertEqual(category.columns, [["a", "b", "c"], ["1", "2", "3"]])
+        self.assertEqual(category.block, "x")
+        self.assertEqual(category.to_json(), {"name": ["a", "b", "c"], "version": ["1", "2", "3"]})
+        single = Category.from_json("em_imaging", {"mode": "BRIGHT FIELD"})
+        self.assertEqual(single.to_json(), {"mode": "BRIGHT FIELD"})
+
+    def test_reader_columns(self):
+        """The reader gives the same JSON in column form as through rows."""
+        for cif_file in glob.glob(os.path.join(TEST_DATA, '*.cif')):
+            by_rows = [(c.block, c.name, category_to_json(c)) for c in iter_categories(cif_file)]
+            by_columns = [(c.block, c.name, c.to_json()) for c in iter_categories(cif_file, columns=True)]
+            self.assertEqual(by_columns, by_rows, cif_file)
+        text = "data_x\nloop_\n_a.b\n_a.c\n1 2\n3 4\n_d.e 5\n"
+        categories = list(parse_categories(text.splitlines(True), columns=True))
+        self.assertTrue(all(isinstance(c, Category) for c in categories))
+        self.assertEqual([c.columns for c in categories], [[["1", "3"], ["2", "4"]], [["5"]]])
+
+
+if __name__ == '__main__':
+    unittest.main()
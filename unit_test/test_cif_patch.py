@@ -0,0 +1,158 @@
+"""
+test_cif_patch.py
+
+Description: This script is a unit test for the cif_patch script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_patch import *
+from cif_patch import _copy_range
+from json_to_mmcif import mmcif_to_json
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+CIF_TEXT = """data_model
+# header comment, kept as it is
+_entry.id   1ABC
+#
+loop_
+_em_software.name
+_em_software.version
+EPU     3.0
+IMOD    4.11
+#
+_em_imaging.mode  "DARK FIELD"
+_em_imaging.microscope_model  'TFS KRIOS'
+#   odd    spacing   kept
+data_second
+_em_imaging.mode  "DARK FIELD"
+"""
+
+
+class TestCifPatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cif_file = os.path.join(self.temp_dir, 'model.cif')
+        self.output_file = os.path.join(self.temp_dir, 'patched.cif')
+        with open(self.cif_file, 'w') as f:
+            f.write(CIF_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_index_categories(self):
+        spans = index_categories(self.cif_file)
+        self.assertEqual([(s.block, s.name) for s in spans],
+                         [("model", "entry"), ("model", "em_software"), ("model", "em_imaging"),
+                          ("second", "em_imaging")])
+        data = self.read(self.cif_file)
+        self.assertEqual(data[spans[0].start:spans[0].end], b"_entry.id   1ABC\n")
+        self.assertTrue(data[spans[1].start:spans[1].end].startswith(b"loop_\n"))
+        self.assertTrue(data[spans[1].start:spans[1].end].endswith(b"IMOD    4.11\n"))
+
+    def test_shared_line(self):
+        with open(self.cif_file, 'w') as f:
+            f.write("data_x\n_a.x 1 _b.y 2\n")
+        with self.assertRaises(ValueError):
+            index_categories(self.cif_file)
+
+    def test_patch_only_changed_categories(self):
+        json_dict = {"em_imaging": {"mode": "BRIGHT FIELD"},
+                     "em_image_recording": {"film_or_detector_model": "TFS FALCON 4i (4k x 4k)"}}
+        self.assertEqual(patch_mmcif_file(self.cif_file, json_dict, self.output_file),
+                         ["em_imaging", "em_image_recording"])
+        original, patched = self.read(self.cif_file), self.read(self.output_file)
+
+        # Everything before the patched category and the second data block are untouched
+        start = original.index(b'_em_imaging.mode')
+        self.assertEqual(patched[:start], original[:start])
+        self.assertTrue(patched.endswith(original[original.index(b"#   odd"):]))
+        self.assertIn(b'_em_imaging.mode              "BRIGHT FIELD"\n'
+                      b'_em_imaging.microscope_model  "TFS KRIOS"\n'
+                      b'#\n_em_image_recording.film_or_detector_model  "TFS FALCON 4i (4k x 4k)"\n#   odd', patched)
+
+    def test_patch_matches_full_merge(self):
+        """Patching gives the same data as reading, merging and rewriting the whole file."""
+        cif_file = os.path.join(TEST_DATA, 'input_mmcif.cif')
+        with open(os.path.join(TEST_DATA, 'SPA_data.json')) as f:
+            json_dict = json.load(f)
+        patch_mmcif_file(cif_file, json_dict, self.output_file)
+
+        expected = mmcif_to_json(cif_file)
+        for category, values in json_dict.items():
+            expected.setdefault(category, {}).update(values)
+        self.assertEqual(mmcif_to_json(self.output_file), expected)
+
+    def test_patch_loop_in_place(self):
+        json_dict = {"em_software": {"version": ["3.1", "4.12"], "category": ["IMAGE ACQUISITION", "RECONSTRUCTION"]}}
+        patch_mmcif_file(self.cif_file, json_dict, self.cif_file)
+        self.assertEqual(mmcif_to_json(self.cif_file)["data_model"]["em_software"],
+                         {"name": ["EPU", "IMOD"], "version": ["3.1", "4.12"],
+                          "category": ["IMAGE ACQUISITION", "RECONSTRUCTION"]})
+        self.assertEqual([f for f in os.listdir(self.temp_dir) if f.endswith(".part")], [])
+
+        with self.assertRaises(ValueError):
+            patch_mmcif_file(self.cif_file, {"em_software": {"version": "3.1"}}, self.output_file)
+        self.assertFalse(os.path.exists(self.output_file))
+
+    def test_patch_data_blocks(self):
+        """JSON data blocks patch the block of the same name; new blocks are appended."""
+        json_dict = {"data_second": {"em_imaging": {"mode": "BRIGHT FIELD"}},
+                     "data_third": {"em_imaging": {"mode": "DARK FIELD"}, "em_entity": {"id": "1"}}}
+        names = patch_mmcif_file(self.cif_file, json_dict, self.output_file)
+        self.assertEqual(names, ["em_imaging", "em_imaging", "em_entity"])
+        output = self.read(self.output_file).decode()
+        self.assertTrue(output.startswith(CIF_TEXT.split("data_second")[0]))
+        self.assertIn('data_second\n_em_imaging.mode  "BRIGHT FIELD"\n', output)
+        blocks = mmcif_to_json(self.output_file)
+        self.assertEqual(list(blocks), ["data_model", "data_second", "data_third"])
+        self.assertEqual(blocks["data_model"]["em_imaging"]["mode"], "DARK FIELD")
+        self.assertEqual(blocks["data_third"], {"em_imaging": {"mode": "DARK FIELD"}, "em_entity": {"id": "1"}})
+
+    def test_render_category(self):
+        self.assertEqual(render_category("em_imaging", ["mode"], [["BRIGHT FIELD"]]),
+                         '_em_imaging.mode  "BRIGHT FIELD"\n')
+        self.assertEqual(render_category("em_software", ["name", "version"], [["EPU", "3.0"], ["IMOD", "4.11"]]),
+                         "loop_\n_em_software.name\n_em_software.version\nEPU    3.0  \nIMOD  4.11  \n")
+
+
+    @unittest.skipUnless(hasattr(os, "copy_file_range"), "copy_file_range is not available")
+    def test_copy_range_resumes_after_partial_copy(self):
+        """A copy_file_range failure after a partial copy writes only the bytes that were not copied."""
+        real_copy = os.copy_file_range
+        calls = []
+
+        def copy_then_fail(src, dst, count, offset_src=None):
+            calls.append(offset_src)
+            if len(calls) > 1:
+                raise OSError("copy_file_range failed")
+            return real_copy(src, dst, min(count, 10), offset_src)
+
+        data = self.read(self.cif_file)
+        with open(self.cif_file, 'rb') as source, open(self.output_file, 'wb') as target, \
+                mock.patch("os.copy_file_range", copy_then_fail):
+            target.write(b"head\n")
+            _copy_range(source, data, target, 5, 40)
+            target.write(b"tail\n")
+        self.assertEqual(calls, [5, 15])
+        self.assertEqual(self.read(self.output_file), b"head\n" + data[5:40] + b"tail\n")
+
+if __name__ == '__main__':
+    unittest.main()
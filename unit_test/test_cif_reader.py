@@ -0,0 +1,92 @@
+"""
+test_cif_reader.py
+
+Description: This script is a unit test for the cif_reader script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import glob
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_reader import *
+from mmcif.io.PdbxReader import PdbxReader
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+CIF_TEXT = """data_first
+# a comment
+_em_imaging.mode              "BRIGHT FIELD"
+_em_imaging.microscope_model  'TFS KRIOS'   # trailing comment
+_em_imaging.details
+;Recorded with
+the "new" detector
+;
+#
+loop_
+_em_software.name
+_em_software.version
+"FEI tomography"  5.17.0.6930
+IMOD              4.11
+_em_support_film.material  it's
+data_second
+_em_imaging.mode  ?
+save_frame
+_item.name  '_em_imaging.mode'
+save_
+"""
+
+
+class TestCifReader(unittest.TestCase):
+
+    def test_tokenize(self):
+        tokens = list(tokenize("data_x\n_a.b 'it''s' \"q r\" #c\nloop_\n;text\n;\n".splitlines(True)))
+        self.assertEqual([(kind, value) for kind, value, _ in tokens],
+                         [(DATA, "x"), (TAG, "_a.b"), (VALUE, "it''s"), (VALUE, "q r"), (LOOP, "loop_"),
+                          (VALUE, "text")])
+        self.assertEqual(tokens[-1][2], 4)
+
+    def test_parse_categories(self):
+        categories = list(parse_categories(CIF_TEXT.splitlines(True)))
+        self.assertEqual([(c.block, c.frame, c.name, c.loop) for c in categories],
+                         [("first", None, "em_imaging", False), ("first", None, "em_software", True),
+                          ("first", None, "em_support_film", False), ("second", None, "em_imaging", False),
+                          ("second", "frame", "item", False)])
+        imaging = categories[0]
+        self.assertEqual(imaging.items, ["mode", "microscope_model", "details"])
+        self.assertEqual(imaging.rows, [["BRIGHT FIELD", "TFS KRIOS", 'Recorded with\nthe "new" detector']])
+        self.assertEqual(categories[1].rows, [["FEI tomography", "5.17.0.6930"], ["IMOD", "4.11"]])
+        self.assertEqual(categories[2].rows, [["it's"]])
+        self.assertEqual(categories[3].rows, [["?"]])
+
+    def test_category_to_json(self):
+        categories = list(parse_categories(CIF_TEXT.splitlines(True)))
+        self.assertEqual(category_to_json(categories[1]),
+                         {"name": ["FEI tomography", "IMOD"], "version": ["5.17.0.6930", "4.11"]})
+        self.assertEqual(category_to_json(categories[2]), {"material": "it's"})
+
+    def test_malformed(self):
+        for text in ("_a.b\n_a.c 1\n", "data_x\n1\n", "loop_\n_a.b\n_a.c\n1 2 3\n", ";never closed\n",
+                     "loop_\n_a.b\n_c.d\n1 2\n", "_a.b\n"):
+            with self.assertRaises(ValueError, msg=text):
+                list(parse_categories(text.splitlines(True)))
+
+    def test_matches_pdbx_reader(self):
+        """The reader returns the same categories and values as mmcif.io.PdbxReader on the test data."""
+        for cif_file in glob.glob(os.path.join(TEST_DATA, '*.cif')):
+            containers = []
+            with open(cif_file) as f:
+                PdbxReader(f).read(containers)
+            expected = {name: (containers[0].getObj(name).getAttributeList(), containers[0].getObj(name).getRowList())
+                        for name in containers[0].getObjNameList()}
+            found = {c.name: (c.items, c.rows) for c in iter_categories(cif_file)}
+            self.assertEqual(found, expected, cif_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
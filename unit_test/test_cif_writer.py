@@ -0,0 +1,110 @@
+"""
+test_cif_writer.py
+
+Description: This script is a unit test for the cif_writer script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import io
+import os
+import sys
+import json
+import random
+from unittest.mock import patch
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cif_writer import *
+from mmcif.api.DataCategory import DataCategory
+from mmcif.api.PdbxContainers import DataContainer
+from mmcif.io.PdbxWriter import PdbxWriter
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+VALUES = ["1", "-2.5", "1.0e-3", "3(2)", "12.", ".", "?", "", "EPU", "_tag", "data_x", "Global_x", "#x", "x#",
+          "[x", "a b", " ", "a\rb", "it's", 'say "hi"', "it's \"both\"", "two\nlines", "ends\n", 7, 2.5, None]
+
+
+def pdbx_write(name, categories):
+    container = DataContainer(name)
+    for category_name, items, rows in categories:
+        category = DataCategory(category_name)
+        for item in items:
+            category.appendAttribute(item)
+        for row in rows:
+            category.append(row)
+        container.append(category)
+    text = io.StringIO()
+    PdbxWriter(text).write([container])
+    return text.getvalue()
+
+
+def cif_write(name, categories, chunk_rows=2):
+    text = io.StringIO()
+    writer = CifWriter(text)
+    writer.begin_block(name)
+    for category_name, items, rows in categories:
+        writer.write_loop(category_name, items,
+                          lambda rows=rows: iter([rows[i:i + chunk_rows] for i in range(0, len(rows), chunk_rows)]))
+    writer.end_block()
+    return text.getvalue()
+
+
+def column_write(name, categories):
+    text = io.StringIO()
+    writer = CifWriter(text)
+    writer.begin_block(name)
+    for category_name, items, rows in categories:
+        writer.write_columns(category_name, items, [list(column) for column in zip(*rows)])
+    writer.end_block()
+    return text.getvalue()
+
+
+class TestCifWriter(unittest.TestCase):
+
+    def test_format_value(self):
+        self.assertEqual(format_value("EPU"), "EPU")
+        self.assertEqual(format_value(""), ".")
+        self.assertEqual(format_value(None), "?")
+        self.assertEqual(format_value("data_x"), '"data_x"')
+        self.assertEqual(format_value("a b"), '"a b"')
+        self.assertEqual(format_value('say "hi"'), "'say \"hi\"'")
+        self.assertEqual(format_value("two\nlines"), "\n;two\nlines\n;\n")
+
+    def test_fixtures_match_pdbx_writer(self):
+        for name in ("SPA_data.json", "TOMO_data.json"):
+            with open(os.path.join(TEST_DATA, name)) as f:
+                json_dict = json.load(f)
+            categories = []
+            for category, values in json_dict.items():
+                columns = list(values.values())
+                rows = [list(row) for row in zip(*columns)] if isinstance(columns[0], list) else [columns]
+                categories.append((category, list(values), rows))
+            self.assertEqual(cif_write("entry", categories), pdbx_write("entry", categories), name)
+            self.assertEqual(column_write("entry", categories), pdbx_write("entry", categories), name)
+
+    def test_random_values_match_pdbx_writer(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            categories = []
+            for c in range(rng.randint(1, 4)):
+                items = ["item_%d" % i for i in range(rng.randint(1, 5))]
+                values = rng.sample(VALUES, rng.randint(1, 6))
+                rows = [[rng.choice(values) for _ in items] for _ in range(rng.randint(1, 6))]
+                categories.append(("cat_%d" % c, items, rows))
+            expected = pdbx_write("b", categories)
+            self.assertEqual(cif_write("b", categories, rng.randint(1, 3)), expected)
+            self.assertEqual(column_write("b", categories), expected)
+
+    def test_write_columns_in_several_writes(self):
+        rows = [[str(i), "row %d" % i] for i in range(25)]
+        with patch('cif_writer.WRITE_ROWS', 4):
+            self.assertEqual(column_write("b", [("cat", ["id", "name"], rows)]),
+                             pdbx_write("b", [("cat", ["id", "name"], rows)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+test_compressed_io.py
+
+Description: This script is a unit test for the compressed_io script and the compressed inputs and outputs of the
+converter.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from compressed_io import *
+from json_to_mmcif import (json_to_dict, mmcif_to_json, translate_json_to_cif, convert_input_file,
+                           collect_batch_inputs, output_file, resolve_output_format)
+from cif_patch import patch_mmcif_file
+from json_stream import write_json_stream
+from mmcif_validator import MmcifValidator
+from result_cache import job_files
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+def read(path):
+    with open_file(path, 'rb') as f:
+        return f.read()
+
+
+class TestCompressedIo(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def compress(self, path, compression):
+        """Copies path into the temporary directory, compressed."""
+        target = os.path.join(self.temp_dir, os.path.basename(path) + '.' + compression)
+        with open(path, 'rb') as source, open_file(target, 'wb') as f:
+            f.write(source.read())
+        return target
+
+    def test_names(self):
+        self.assertEqual(compression_of("a/b.cif.GZ"), "gz")
+        self.assertIsNone(compression_of("a/b.cif"))
+        self.assertEqual(strip_compression("a/b.json.xz"), "a/b.json")
+        self.assertEqual(strip_compression("a/b.json"), "a/b.json")
+        self.assertEqual(base_name("runs/v1.2/session.v2.json.gz"), "runs/v1.2/session.v2")
+        self.assertEqual(base_name("runs/v1.2/session"), "runs/v1.2/session")
+        self.assertEqual(output_file("runs/v1.2/session.v2.json.gz", "cif.gz"), "runs/v1.2/session.v2.cif.gz")
+        self.assertEqual(job_files("a/run.v1.json.bz2", "in.cif", "cif", "all", "bcif.bz2")[1],
+                         {"cif": "a/run.v1.bcif.bz2", "report": "a/run.v1_val.txt"})
+
+    def test_resolve_output_format(self):
+        self.assertEqual(resolve_output_format("cif", "auto", "a.json"), "cif")
+        self.assertEqual(resolve_output_format("cif", "auto", "a.json.xz"), "cif.xz")
+        self.assertEqual(resolve_output_format("bcif", "none", "a.json.gz"), "bcif")
+        self.assertEqual(resolve_output_format("bcif", "gz", "a.json"), "bcif.gz")
+
+    def test_open_file(self):
+        """Text and binary data round trip through every compression of the standard library."""
+        text = "data_x\n_em_imaging.mode 'BRIGHT FIELD'\nÅ\n" * 100
+        for compression in ("gz", "bz2", "xz"):
+            path = os.path.join(self.temp_dir, "f.cif." + compression)
+            with open_file(path, 'w') as f:
+                f.write(text)
+            with open(path, 'rb') as f:
+                self.assertNotIn(b"BRIGHT", f.read())
+            with open_file(path) as f:
+                self.assertEqual(f.read(), text)
+            with open_file(path, 'rb') as f:
+                self.assertEqual(f.read(), text.encode())
+        path = os.path.join(self.temp_dir, "f.gz")
+        with open(path, 'wb') as f:
+            with open_file(f, 'w', compression="gz") as compressed:
+                compressed.write(text)
+        with open(path, 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), text)
+        with self.assertRaises(ValueError):
+            open_file(os.path.join(self.temp_dir, "f.cif"), 'w', compression="lz4")
+
+    def test_zstd_needs_zstandard(self):
+        try:
+            import zstandard  # noqa: F401
+            self.skipTest("zstandard is installed")
+        except ImportError:
+            pass
+        with self.assertRaises(ImportError):
+            open_file(os.path.join(self.temp_dir, "f.cif.zst"), 'w')
+
+    def test_compressed_inputs(self):
+        """Compressed JSON and mmCIF read as the plain files."""
+        json_file = os.path.join(TEST_DATA, 'SPA_data.json')
+        cif_file = os.path.join(TEST_DATA, 'input_mmcif.cif')
+        self.assertEqual(json_to_dict(self.compress(json_file, "gz")), json_to_dict(json_file))
+        for compression in ("gz", "xz"):
+            self.assertEqual(mmcif_to_json(self.compress(cif_file, compression)), mmcif_to_json(cif_file))
+
+    def test_compressed_outputs(self):
+        """A converted file is the same data whether it is written plain or compressed."""
+        container_dict = json_to_dict(os.path.join(TEST_DATA, 'SPA_data.json'))
+        input_json_file = os.path.join(self.temp_dir, 'run.v1.json')
+        name = os.path.join(self.temp_dir, 'run.v1')
+        for output_format in ("cif", "cif.gz", "bcif", "bcif.bz2"):
+            translate_json_to_cif(container_dict, input_json_file, "native", output_format=output_format)
+            self.assertTrue(os.path.isfile(name + '.' + output_format))
+        self.assertEqual(read(name + '.cif.gz'), read(name + '.cif'))
+        self.assertEqual(read(name + '.bcif.bz2'), read(name + '.bcif'))
+        self.assertEqual(mmcif_to_json(name + '.bcif.bz2'), mmcif_to_json(name + '.cif'))
+
+    def test_stream_and_patch(self):
+        """The streaming converter and the patch read and write compressed files."""
+        json_file = os.path.join(TEST_DATA, 'SPA_data.json')
+        cif_file = os.path.join(TEST_DATA, 'input_mmcif.cif')
+        write_json_stream(json_file, os.path.join(self.temp_dir, 'plain.cif'), 'SPA_data')
+        write_json_stream(self.compress(json_file, "gz"), os.path.join(self.temp_dir, 'stream.cif.gz'), 'SPA_data')
+        self.assertEqual(read(os.path.join(self.temp_dir, 'stream.cif.gz')),
+                         read(os.path.join(self.temp_dir, 'plain.cif')))
+
+        json_dict = json_to_dict(json_file)
+        patch_mmcif_file(cif_file, json_dict, os.path.join(self.temp_dir, 'patched.cif'))
+        patch_mmcif_file(self.compress(cif_file, "gz"), json_dict, os.path.join(self.temp_dir, 'patched.cif.xz'))
+        self.assertEqual(read(os.path.join(self.temp_dir, 'patched.cif.xz')),
+                         read(os.path.join(self.temp_dir, 'patched.cif')))
+
+    def test_convert_and_batch(self):
+        """A gzipped JSON file converts next to itself, and batch directories include it."""
+        input_json_file = self.compress(os.path.join(TEST_DATA, 'TOMO_data.json'), "gz")
+        output_format = resolve_output_format("cif", "auto", input_json_file)
+        convert_input_file(input_json_file, None, "json", output_format=output_format)
+        self.assertEqual(mmcif_to_json(os.path.join(self.temp_dir, 'TOMO_data.cif.gz')),
+                         mmcif_to_json(translate_and_read(json_to_dict(input_json_file), self.temp_dir)))
+        self.assertEqual(collect_batch_inputs(self.temp_dir), [(input_json_file, None)])
+
+    def test_validate(self):
+        """Compressed files get the report of the plain file, naming the compressed file."""
+        validator = MmcifValidator(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'))
+        input_json_file = os.path.join(self.temp_dir, 'TOMO_data.json')
+        container_dict = json_to_dict(os.path.join(TEST_DATA, 'TOMO_data.json'))
+        for output_format in ("cif", "cif.gz", "cif.xz"):
+            translate_json_to_cif(container_dict, input_json_file, output_format=output_format)
+        valid, report = validator.validate_file(os.path.join(self.temp_dir, 'TOMO_data.cif'))
+        for output_format in ("cif.gz", "cif.xz"):
+            self.assertEqual(validator.validate_file(os.path.join(self.temp_dir, 'TOMO_data.' + output_format)),
+                             (valid, report.replace('TOMO_data.cif', 'TOMO_data.' + output_format)))
+
+
+def translate_and_read(container_dict, temp_dir):
+    """Writes container_dict as plain mmCIF and returns its path."""
+    input_json_file = os.path.join(temp_dir, 'plain', 'TOMO_data.json')
+    os.makedirs(os.path.dirname(input_json_file))
+    translate_json_to_cif(container_dict, input_json_file)
+    return os.path.join(temp_dir, 'plain', 'TOMO_data.cif')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+test_converter.py
+
+Description: This script is a unit test for the converter script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import io
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from converter import *
+from cif_binary import read_bcif
+from json_to_mmcif import translate_json_to_cif, mmcif_to_json
+from mmcif_validator import MmcifValidator
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestConverter(unittest.TestCase):
+
+    def setUp(self):
+        # Conversions in memory must not write to the working directory
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        self.dic_file = os.path.join(self.temp_dir, 'test.dic')
+        shutil.copy(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'), self.dic_file)
+        with open(os.path.join(TEST_DATA, 'SPA_data.json'), 'rb') as f:
+            self.json_bytes = f.read()
+        self.data = json.loads(self.json_bytes)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_same_output_as_files(self):
+        """Every input form gives the text json_to_mmcif.py writes to its output file, with either writer."""
+        translate_json_to_cif(self.data, 'session.json')
+        with open('session.cif') as f:
+            expected = f.read()
+        os.remove('session.cif')
+        for writer in ("pdbx", "native"):
+            converter = Converter(writer)
+            for source in (self.data, self.json_bytes, self.json_bytes.decode(), gzip.compress(self.json_bytes),
+                           io.BytesIO(self.json_bytes), io.StringIO(self.json_bytes.decode())):
+                self.assertEqual(converter.convert(source, block_name='session'), expected)
+        self.assertEqual(os.listdir(), ['test.dic'])
+
+    def test_output_forms(self):
+        converter = Converter("native")
+        text = converter.convert(self.data)
+        self.assertTrue(text.startswith("data_converted\n"))
+
+        # Text and binary streams get the same text; compressed and BinaryCIF output are bytes
+        stream = io.BytesIO()
+        self.assertIs(converter.convert(self.data, output=stream), stream)
+        self.assertEqual(stream.getvalue().decode(), text)
+        self.assertFalse(stream.closed)
+        self.assertEqual(gzip.decompress(converter.convert(self.data, output_format="cif.gz")).decode(), text)
+        bcif = converter.convert(self.data, output_format="bcif")
+        self.assertEqual(read_bcif(bcif)["dataBlocks"][0]["header"], "converted")
+        self.assertEqual(converter.read_cif(bcif), converter.read_cif(text))
+        with self.assertRaises(TypeError):
+            converter.convert(self.data, output=io.StringIO(), output_format="bcif")
+
+        with self.assertRaises(ValueError):
+            converter.convert(b"{not json")
+        with self.assertRaises(TypeError):
+            converter.convert(42)
+
+    def test_merge(self):
+        """JSON is merged into mmCIF held as text or BinaryCIF as it is into an mmCIF file."""
+        cif_file = os.path.join(TEST_DATA, 'input_mmcif.cif')
+        with open(cif_file) as f:
+            cif_text = f.read()
+        update = {"em_imaging": {"mode": "DARK FIELD"}}
+        converter = Converter("native")
+        merged = converter.merge(update, cif_text)
+        expected = mmcif_to_json(cif_file)
+        expected["em_imaging"]["mode"] = "DARK FIELD"
+        self.assertEqual(merged, expected)
+        bcif = converter.convert(mmcif_to_json(cif_file), output_format="bcif.gz")
+        self.assertEqual(converter.read_cif(converter.convert(update, cif=bcif)), expected)
+
+    def test_validate(self):
+        """Validation in memory gives the report of the file, and the dictionary is parsed once, when needed."""
+        converter = Converter("native", dic_file=self.dic_file)
+        self.assertIsNone(converter._validator)
+        text = converter.convert(self.data, block_name='session')
+        self.assertIsNone(converter._validator)
+
+        with open('session.cif', 'w') as f:
+            f.write(text)
+        valid, report = MmcifValidator(self.dic_file).validate_file('session.cif')
+        self.assertEqual(converter.validate(text, source='session.cif'), (valid, report))
+        validator = converter.validator
+        self.assertEqual(converter.validate(converter.convert(self.data, block_name='session', output_format='bcif'),
+                                            source='session.cif'), (valid, report))
+        self.assertIs(converter.validator, validator)
+
+        bad = {"em_imaging": {"mode": "NOT A MODE"}}
+        valid, report = converter.validate(converter.convert(bad))
+        self.assertFalse(valid)
+        self.assertIn("not one of the allowed values", report)
+        valid, problems = converter.check(bad)
+        self.assertFalse(valid)
+        self.assertTrue(any("mode" in problem for problem in problems))
+
+        with self.assertRaises(FileNotFoundError):
+            Converter(dic_file=None, download_dict="no").validate(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
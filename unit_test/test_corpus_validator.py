@@ -0,0 +1,91 @@
+"""
+test_corpus_validator.py
+
+Description: This script is a unit test for the corpus_validator script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from corpus_validator import *
+from compressed_io import open_file
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+TEST_DIC = os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic')
+
+
+def read_report(report_file):
+    with open_file(report_file) as f:
+        return sorted((json.loads(line) for line in f), key=lambda d: json.dumps(d, sort_keys=True))
+
+
+class TestCorpusValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.corpus = os.path.join(self.temp_dir, 'corpus')
+        os.makedirs(os.path.join(self.corpus, 'sub'))
+        shutil.copy(os.path.join(TEST_DATA, 'TOMO_data.cif'), self.corpus)
+        with open(os.path.join(TEST_DATA, 'input_mmcif.cif'), 'rb') as f, \
+                gzip.open(os.path.join(self.corpus, 'sub', 'model.cif.gz'), 'wb') as out:
+            out.write(f.read())
+        with open(os.path.join(self.corpus, 'bad.cif'), 'w') as f:
+            f.write('data_x\n_a.b "unterminated\n')
+        with open(os.path.join(self.corpus, 'notes.txt'), 'w') as f:
+            f.write('not an mmCIF file\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_collect_cif_files(self):
+        files = [os.path.join(self.corpus, name) for name in ('TOMO_data.cif', 'bad.cif', 'sub/model.cif.gz')]
+        self.assertEqual(collect_cif_files([self.corpus]), files)
+        manifest = os.path.join(self.temp_dir, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write(f"# corpus\n{files[1]}\n\n{files[0]}\n")
+        self.assertEqual(collect_cif_files([manifest, files[0], os.path.join(self.corpus, '*.cif'), 'missing.cif']),
+                         [files[1], files[0], 'missing.cif'])
+
+    def test_make_shards(self):
+        files = collect_cif_files([self.corpus])
+        shards = make_shards(files, workers=2)
+        self.assertEqual([len(shard) for shard in shards], [1, 1, 1])
+        sizes = [os.path.getsize(shard[0]) for shard in shards]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertEqual(sorted(sum(make_shards(files, 1, shard_size=2), [])), sorted(files))
+
+    def test_validate_corpus(self):
+        """Workers give the report of one process, and it matches the text report of each file."""
+        files = collect_cif_files([self.corpus]) + [os.path.join(self.corpus, 'missing.cif')]
+        report_file = os.path.join(self.temp_dir, 'report.jsonl')
+        results = validate_corpus(files, TEST_DIC, report_file, workers=1)
+        self.assertEqual([(r[0], r[1]) for r in results], [(files[0], False), (files[1], False), (files[2], True),
+                                                           (files[3], False)])
+        report = read_report(report_file)
+        validate_corpus(files, TEST_DIC, report_file + '.gz', workers=2)
+        self.assertEqual(read_report(report_file + '.gz'), report)
+
+        errors = [d for d in report if d["severity"] == "error"]
+        self.assertEqual([(d["file"], d["line"], d["category"], d["item"], d["kind"]) for d in errors],
+                         [(files[0], 13, "em_imaging", "illumination_mode", "not_allowed"),
+                          (files[1], 2, None, None, "syntax"),
+                          (files[3], None, None, None, "read")])
+        _, text = get_validator(TEST_DIC).validate_file(files[0])
+        # gemmi 0.6 reports unknown tags as notes
+        self.assertEqual(sum(1 for d in report if d["file"] == files[0]),
+                         text.count("\n[") + text.count("\nNote: [") + text.count(":13 ["))
+        self.assertEqual(sum(r[2] for r in results), len(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+test_diagnostics.py
+
+Description: This script is a unit test for the diagnostics script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from diagnostics import *
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_value_errors(self):
+        """Value errors give their line; the tag comes from the message in a loop_ and from tag_at otherwise."""
+        tags = {("x", 13): "_em_imaging.illumination_mode"}
+        diagnostic = parse_message("a.cif:13 [x] PARALLEL is not one of the allowed values:\n\tFLOOD BEAM\n\tOTHER",
+                                   tag_at=lambda block, line: tags.get((block, line)))
+        self.assertEqual(diagnostic, Diagnostic("a.cif", 13, "x", "em_imaging", "illumination_mode", ERROR,
+                                                "not_allowed",
+                                                "PARALLEL is not one of the allowed values:\n\tFLOOD BEAM\n\tOTHER"))
+        diagnostic = parse_message("a.cif:5 [x] _em_image_recording.detector_mode: BAD is not one of the allowed "
+                                   "values:\n\tCOUNTING")
+        self.assertEqual((diagnostic.line, diagnostic.category, diagnostic.item, diagnostic.kind),
+                         (5, "em_image_recording", "detector_mode", "not_allowed"))
+        diagnostic = parse_message("a.cif:7 [x] 2020 does not match the yyyy-mm-dd regex")
+        self.assertEqual((diagnostic.severity, diagnostic.kind, diagnostic.item), (ERROR, "regex", None))
+
+    def test_warnings(self):
+        for message, expected in (
+                ("[x] unknown tag _foo.bar", ("unknown_tag", "foo", "bar")),
+                ("[x] missing mandatory tag: _em_imaging.id", ("missing_mandatory", "em_imaging", "id")),
+                ("[x] missing category key: _em_map.entry_id", ("missing_key", "em_map", "entry_id")),
+                ("[x] category em_image_recording has 1 duplicated key:\n  id=1 + imaging_id=1",
+                 ("duplicated_key", "em_image_recording", None))):
+            diagnostic = parse_message(message, "a.cif")
+            self.assertEqual((diagnostic.kind, diagnostic.category, diagnostic.item), expected)
+            self.assertEqual((diagnostic.file, diagnostic.line, diagnostic.block, diagnostic.severity),
+                             ("a.cif", None, "x", WARNING))
+
+    def test_other_kinds(self):
+        """Unknown diagnostics are errors only in files that failed."""
+        self.assertEqual(parse_message("[x] something new", "a.cif").severity, WARNING)
+        self.assertEqual(parse_message("[x] something new", "a.cif", valid=False).severity, ERROR)
+
+    def test_read_errors(self):
+        self.assertEqual(parse_message("a.cif:3 in data_x: duplicate tag _a.b", valid=False),
+                         Diagnostic("a.cif", 3, "x", "a", "b", ERROR, "syntax", "duplicate tag _a.b"))
+        self.assertEqual(parse_message("a.cif:2:0(7): Wrong number of values in loop _a.*", valid=False),
+                         Diagnostic("a.cif", 2, None, None, None, ERROR, "syntax",
+                                    "Wrong number of values in loop _a.*"))
+        self.assertEqual(parse_message("failed", "a.cif", valid=False).kind, "syntax")
+
+    def test_pair_tags(self):
+        from gemmi import cif
+        tag_at = pair_tags(cif.read_string("data_x\n_a.b 1\nloop_\n_c.d\n1\n_a.e 2\n"))
+        self.assertEqual([tag_at("x", line) for line in range(1, 8)], [None, "_a.b", None, None, None, "_a.e", None])
+
+    def test_parse_report(self):
+        """Text reports of one or several files, with notes, continuation lines and the tags read from the file."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        with open(os.path.join(temp_dir, 'a.cif'), 'w') as f:
+            f.write("data_x\n_em_imaging.id 1\n_em_imaging.illumination_mode PARALLEL\n")
+        report = ("Note: Ddl has invalid regex for sequence_dep:\n      [a-z]+$\n      The expression contained...\n"
+                  "Reading a.cif...\n"
+                  "a.cif:3 [x] PARALLEL is not one of the allowed values:\n\tFLOOD BEAM\n\tOTHER\n"
+                  "[x] missing category key: _em_imaging.entry_id\n"
+                  "FAILED\n"
+                  "Reading b.cif...\nb.cif:2:18(25): unterminated \"string\"\nFAILED\n"
+                  "Reading c.cif...\nOK\n")
+        reports = parse_report(report, base_dir=temp_dir)
+        self.assertEqual([(f, valid, len(d)) for f, valid, d in reports],
+                         [("a.cif", False, 2), ("b.cif", False, 1), ("c.cif", True, 0)])
+        self.assertEqual(reports[0][2][0], Diagnostic("a.cif", 3, "x", "em_imaging", "illumination_mode", ERROR,
+                                                      "not_allowed",
+                                                      "PARALLEL is not one of the allowed values:\n\tFLOOD BEAM"
+                                                      "\n\tOTHER"))
+        self.assertEqual(reports[0][2][1].kind, "missing_key")
+        self.assertEqual(parse_report("[x] unknown tag _a.b\n", "d.cif"),
+                         [("d.cif", None, [Diagnostic("d.cif", None, "x", "a", "b", WARNING, "unknown_tag",
+                                                      "unknown tag _a.b")])])
+
+    def test_parse_val_file(self):
+        """A _val.txt report of json_to_mmcif."""
+        with open(os.path.join(TEST_DATA, 'TOMO_data_val.txt')) as f:
+            reports = parse_report(f.read())
+        self.assertEqual([(f, valid) for f, valid, _ in reports], [("test_data/TOMO_data.cif", False)])
+        kinds = [d.kind for d in reports[0][2]]
+        self.assertEqual(kinds[0], "not_allowed")
+        self.assertEqual(set(kinds[1:]), {"missing_key", "missing_mandatory"})
+
+
+if __name__ == '__main__':
+    unittest.main()
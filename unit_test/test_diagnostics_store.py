@@ -0,0 +1,96 @@
+"""
+test_diagnostics_store.py
+
+Description: This script is a unit test for the diagnostics_store script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from diagnostics_store import *
+from diagnostics import WARNING
+from corpus_validator import validate_corpus
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+TEST_DIC = os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic')
+
+
+class TestDiagnosticStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_file = os.path.join(self.temp_dir, 'diagnostics.db')
+        self.cif_files = [os.path.join(self.temp_dir, name) for name in ('TOMO_data.cif', 'input_mmcif.cif')]
+        for cif_file in self.cif_files:
+            shutil.copy(os.path.join(TEST_DATA, os.path.basename(cif_file)), cif_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_add_and_query(self):
+        with DiagnosticStore(self.db_file) as store:
+            store.add("a.cif", False, [
+                Diagnostic("a.cif", 3, "x", "em_imaging", "illumination_mode", ERROR, "not_allowed", "PARALLEL ..."),
+                Diagnostic("a.cif", None, "x", "em_imaging", "id", WARNING, "missing_key", "missing category key"),
+                Diagnostic("a.cif", 1, None, None, None, ERROR, "syntax", "unterminated")])
+            store.add("dir/b.cif", True, [
+                Diagnostic("dir/b.cif", None, "y", "em_imaging", "id", WARNING, "missing_key", "missing key")])
+            store.add("dir/c.cif", True, [])
+            self.assertEqual(store.files(item="illumination_mode", kind="not_allowed"), ["a.cif"])
+            self.assertEqual(store.files(category="em_imaging"), ["a.cif", "dir/b.cif"])
+            self.assertEqual(store.files(file="dir/*"), ["dir/b.cif", "dir/c.cif"])
+            self.assertEqual(store.files(valid=True), ["dir/b.cif", "dir/c.cif"])
+            self.assertEqual(store.files(kind="regex"), [])
+            self.assertEqual(store.files(category="em_nothing"), [])
+            self.assertEqual([d.kind for d in store.query(severity=ERROR)], ["not_allowed", "syntax"])
+            self.assertEqual(store.query(kind="syntax"),
+                             [Diagnostic("a.cif", 1, None, None, None, ERROR, "syntax", "unterminated")])
+            self.assertEqual([d.file for d in store.query(block="y")], ["dir/b.cif"])
+            self.assertEqual(len(store.query(limit=2)), 2)
+            self.assertEqual(store.counts(),
+                             [("em_imaging", "id", "missing_key", 2, 2), (None, None, "syntax", 1, 1),
+                              ("em_imaging", "illumination_mode", "not_allowed", 1, 1)])
+            self.assertEqual(store.summary(), (3, 2, 4, 2))
+
+            # Validating a file again replaces its diagnostics
+            store.add("a.cif", True, [])
+            self.assertEqual(store.summary(), (3, 3, 1, 0))
+
+    def test_load_reports(self):
+        """Text and JSONL reports load the same diagnostics, and unchanged reports are skipped."""
+        jsonl_file = os.path.join(self.temp_dir, 'report.jsonl')
+        validate_corpus(self.cif_files, TEST_DIC, jsonl_file, workers=1)
+        from mmcif_validator import get_validator
+        valid, text = get_validator(TEST_DIC).validate_file(self.cif_files[0])
+        val_file = os.path.join(self.temp_dir, 'TOMO_data_val.txt')
+        with open(val_file, 'w') as f:
+            f.write(text)
+
+        self.assertEqual(collect_reports([self.temp_dir]), [val_file, jsonl_file])
+        with DiagnosticStore(self.db_file) as store:
+            self.assertEqual(store.load_report(val_file), 1)
+            from_text = store.query(file=self.cif_files[0])
+            self.assertEqual(store.load_report(jsonl_file), 2)
+            self.assertIsNone(store.load_report(jsonl_file))
+            self.assertEqual(store.query(file=self.cif_files[0]), from_text)
+            self.assertEqual(store.files(valid=False), [self.cif_files[0]])
+            self.assertEqual(store.files(item="illumination_mode"), [self.cif_files[0]])
+
+    def test_corpus_validator_store(self):
+        """corpus_validator writes to a store, which also holds the files without diagnostics."""
+        validate_corpus(self.cif_files, TEST_DIC, self.db_file, workers=1)
+        with DiagnosticStore(self.db_file) as store:
+            self.assertEqual(store.files(), sorted(self.cif_files))
+            self.assertEqual(store.files(severity=ERROR), [self.cif_files[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+test_dictionary_index.py
+
+Description: This script is a unit test for the dictionary_index script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dictionary_index import *
+from mmcif_validator import MmcifValidator
+from json_to_mmcif import json_to_dict, translate_json_to_cif
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+TEST_DIC = os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic')
+
+
+class TestDictionaryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dic_file = os.path.join(self.temp_dir, 'mmcif_pdbx_v50.dic')
+        shutil.copy(TEST_DIC, self.dic_file)
+        self.index = load_index(self.dic_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_compile(self):
+        """The index holds the keys, mandatory items, types and enumerations of each category."""
+        self.assertTrue(os.path.exists(self.dic_file + '.idx'))
+        self.assertIn('em_imaging', self.index.category_names)
+        em_imaging = self.index.category('em_imaging')
+        self.assertEqual(em_imaging["keys"], ['entry_id', 'id'])
+        self.assertEqual(em_imaging["mandatory"], ['entry_id', 'id', 'specimen_id'])
+        self.assertEqual(em_imaging["items"]["illumination_mode"], ['line', ['FLOOD BEAM', 'SPOT SCAN', 'OTHER']])
+        self.assertEqual(em_imaging["items"]["accelerating_voltage"], ['int', None])
+        self.assertEqual(self.index.types["int"][0], 'numb')
+        self.assertIsNone(self.index.category('no_such_category'))
+
+    def test_shared_permissions(self):
+        """The index can be read by others, as files made with open() can."""
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.assertEqual(os.stat(self.dic_file + '.idx').st_mode & 0o777, 0o666 & ~umask)
+
+    def test_load_reuses_and_recompiles(self):
+        """The index is reused until the dictionary changes, then compiled again."""
+        self.assertIs(load_index(self.dic_file), self.index)
+        with open(self.dic_file, 'a') as f:
+            f.write("\nsave_extra_category\n    _category.id  extra_category\n    save_\n")
+        index = load_index(self.dic_file)
+        self.assertIsNot(index, self.index)
+        self.assertTrue(index.is_current(self.dic_file))
+        self.assertIsNotNone(index.category('extra_category'))
+
+    def test_not_an_index(self):
+        with open(os.path.join(self.temp_dir, 'bad.idx'), 'wb') as f:
+            f.write(b'not an index')
+        with self.assertRaises(ValueError):
+            DictionaryIndex(os.path.join(self.temp_dir, 'bad.idx'))
+
+    def test_check_tomo(self):
+        """The enumeration error of TOMO_data fails the check; missing keys and mandatory items are reported."""
+        with open(os.path.join(TEST_DATA, 'TOMO_data.json')) as f:
+            valid, messages = self.index.check(json.load(f), 'TOMO_data')
+        self.assertFalse(valid)
+        self.assertIn("[TOMO_data] _em_imaging.illumination_mode: PARALLEL is not one of the allowed values:\n"
+                      "\tFLOOD BEAM\n\tSPOT SCAN\n\tOTHER", messages)
+        self.assertIn("[TOMO_data] missing category key: _em_imaging.entry_id", messages)
+        self.assertIn("[TOMO_data] missing mandatory tag: _em_imaging.specimen_id", messages)
+        self.assertIn("[TOMO_data] unknown tag _em_imaging.electron_source", messages)
+
+    def test_check_matches_gemmi(self):
+        """The check reports the same problems as gemmi for SPA_data converted to mmCIF."""
+        json_file = os.path.join(self.temp_dir, 'SPA_data.json')
+        shutil.copy(os.path.join(TEST_DATA, 'SPA_data.json'), json_file)
+        container_dict = json_to_dict(json_file)
+        translate_json_to_cif(container_dict, json_file)
+        block = json_file.split(".")[0]
+        valid, messages = self.index.check(container_dict, block)
+        gemmi_valid, report = MmcifValidator(self.dic_file).validate_file(block + '.cif')
+        self.assertEqual(valid, gemmi_valid)
+        # gemmi 0.6 reports unknown tags as notes, and unknown categories once more on their own
+        lines = [line[len('Note: '):] if line.startswith('Note: [') else line for line in report.splitlines()]
+        gemmi_messages = [line for line in lines if line.startswith('[')
+                          and 'category not in the dictionary' not in line]
+        self.assertEqual(sorted(messages), sorted(gemmi_messages))
+
+    def test_regex_agrees_with_gemmi(self):
+        """Translated type regexes accept and reject the same values as gemmi."""
+        validator = MmcifValidator(self.dic_file)
+        values = ['E', 'E X', '^a', 'a\\b', '[x]', 'a{b}', "it's", '2020-01-01', '2020-1-01x']
+        for item, values in (('entry_id', values[:7]), ('date', values[7:])):
+            for value in values:
+                with self.subTest(item=item, value=value):
+                    data = {"em_imaging": {"entry_id": "E", "id": "1", "specimen_id": "1", item: value}}
+                    valid, _ = self.index.check(data, 't')
+                    quoted = "'" + value + "'" if "'" not in value else '"' + value + '"'
+                    cif_text = ("data_t\n_em_imaging.entry_id E\n_em_imaging.id 1\n_em_imaging.specimen_id 1\n"
+                                f"_em_imaging.{item} {quoted}\n")
+                    if item == 'entry_id':
+                        cif_text = cif_text.replace("_em_imaging.entry_id E\n", "", 1)
+                    self.assertEqual(valid, validator.validate_string(cif_text)[0])
+
+    def test_null_values_skipped(self):
+        data = {"em_imaging": {"entry_id": "E", "id": "1", "specimen_id": "1", "mode": None,
+                               "illumination_mode": ["?", ".", ""]}}
+        self.assertEqual(self.index.check(data, 't'), (True, []))
+
+    def test_posix_to_python(self):
+        self.assertEqual(posix_to_python('[][a\\{]*'), '[\\]\\[a\\\\{]*')
+        self.assertTrue(re.fullmatch(posix_to_python('[^]a]+'), 'bc'))
+        self.assertTrue(re.fullmatch(posix_to_python('[ \\t]+'), ' \t\\t'))
+        with self.assertRaises(ValueError):
+            posix_to_python('[abc')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+test_dictionary_subset.py
+
+Description: This script is a unit test for the dictionary_subset script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dictionary_subset import *
+from mmcif_validator import MmcifValidator, mmcif_validation_async
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+# The imaging_id of image recordings and software linked to _em_imaging.id, in the frame of the parent
+LINKS = """    loop_
+    _item_linked.child_name
+    _item_linked.parent_name
+    '_em_image_recording.imaging_id' '_em_imaging.id'
+    '_em_software.imaging_id'        '_em_imaging.id'
+    save_
+"""
+
+
+class TestDictionarySubset(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic')) as f:
+            dictionary = f.read()
+        frame = dictionary.index("save__em_imaging.id\n")
+        end = dictionary.index("    save_\n", frame)
+        self.dic_file = os.path.join(self.temp_dir, 'linked.dic')
+        with open(self.dic_file, 'w') as f:
+            f.write(dictionary[:end] + LINKS + dictionary[end + len("    save_\n"):])
+        self.cache_dir = os.path.join(self.temp_dir, 'subsets')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_cif(self, name, text):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_index_frames(self):
+        frames = index_frames(self.dic_file)
+        self.assertEqual(frames["links"], [["em_image_recording", "em_imaging"], ["em_software", "em_imaging"]])
+        with open(self.dic_file, 'rb') as f:
+            data = f.read()
+        names = [data[start:end].split()[0].decode() for start, end, _ in frames["frames"]]
+        self.assertEqual(names[:2], ["save_em_imaging", "save__em_imaging.entry_id"])
+        self.assertTrue(all(data[start:end].rstrip().endswith(b"save_") for start, end, _ in frames["frames"]))
+        # The parent frame also belongs to the categories linked to it
+        categories = dict(zip(names, (frame[2] for frame in frames["frames"])))
+        self.assertEqual(categories["save__em_imaging.id"], ["em_image_recording", "em_imaging", "em_software"])
+        self.assertEqual(categories["save_em_support_film"], ["em_support_film"])
+        # Everything else is outside the frames
+        spans = sorted(frames["header"] + [frame[:2] for frame in frames["frames"]])
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(data))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(spans, spans[1:])))
+
+    def test_required_categories(self):
+        frames = load_frames(self.dic_file, self.cache_dir)
+        self.assertEqual(required_categories(frames, {"em_software", "em_nothing"}), ["em_imaging", "em_software"])
+        self.assertEqual(required_categories(frames, {"em_support_film"}), ["em_support_film"])
+        self.assertEqual(required_categories(frames, set()), [])
+
+    def test_same_report(self):
+        """Validation against the sub-dictionary gives the report of the whole dictionary."""
+        full = MmcifValidator(self.dic_file)
+        texts = [
+            "data_x\n_em_support_film.id 1\n_em_support_film.material CARBON\n_em_unknown.id 1\n",
+            "data_x\n_em_software.id 1\n_em_software.imaging_id 3\n",
+            "data_x\n_em_imaging.id 1\n_em_imaging.mode DIFFRACTION\nloop_\n_em_software.id\n_em_software.imaging_id\n"
+            "1 1\n2 2\n",
+        ]
+        for number, text in enumerate(texts):
+            cif_file = self.write_cif(f"{number}.cif", text)
+            subset = subset_for_file(cif_file, self.dic_file, self.cache_dir)
+            self.assertLess(os.path.getsize(subset), os.path.getsize(self.dic_file))
+            self.assertEqual(MmcifValidator(subset).validate_file(cif_file), full.validate_file(cif_file))
+
+        valid, report = MmcifValidator(subset).validate_file(cif_file)
+        self.assertIn("missing parent(s) of _em_software.imaging_id", report)
+        self.assertIn("not one of the allowed values", report)
+
+    def test_subset_cache(self):
+        first = get_subset(self.dic_file, {"em_software"}, self.cache_dir)
+        # The same categories after the link closure give the same file, which is not written again
+        os.utime(first, (0, 0))
+        self.assertEqual(get_subset(self.dic_file, {"em_imaging", "em_software", "em_other"}, self.cache_dir), first)
+        self.assertGreater(os.path.getmtime(first), 0)
+        self.assertNotEqual(get_subset(self.dic_file, {"em_support_film"}, self.cache_dir), first)
+
+        # A changed dictionary is indexed again and gives new sub-dictionaries
+        with open(self.dic_file, 'a') as f:
+            f.write("\nsave_em_specimen\n    _category.id              em_specimen\n    save_\n")
+        specimen = get_subset(self.dic_file, {"em_specimen", "em_software"}, self.cache_dir)
+        self.assertNotEqual(specimen, first)
+        with open(specimen) as f:
+            self.assertIn("save_em_specimen", f.read())
+
+        with patch('dictionary_subset.MAX_SUBSETS', 2):
+            get_subset(self.dic_file, {"em_imaging"}, self.cache_dir)
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.endswith(".dic")]), 2)
+
+        # Sub-dictionaries and frame indexes can be read by others, as files made with open() can
+        umask = os.umask(0o022)
+        os.umask(umask)
+        for name in os.listdir(self.cache_dir):
+            self.assertEqual(os.stat(os.path.join(self.cache_dir, name)).st_mode & 0o777, 0o666 & ~umask, name)
+
+    def test_categories_in(self):
+        cif_file = os.path.join(TEST_DATA, 'TOMO_data.cif')
+        self.assertTrue({"em_imaging", "em_software"} <= categories_in(cif_file))
+        text = "data_x\nloop_ _em_a.id _em_b.id\n1 2\n_em_c.id 'a _em_d.x'\n"
+        self.assertEqual(categories_in(self.write_cif("a.cif", text)), {"em_a", "em_b", "em_c", "em_d"})
+
+    def test_validation_uses_subset(self):
+        """gemmi validate is handed the sub-dictionary and reports the same."""
+        cif_file = self.write_cif("film.cif", "data_x\n_em_support_film.id 1\n_em_support_film.material ?\n")
+        reports = []
+        for subset_dict in (False, True):
+            output_file = os.path.join(self.temp_dir, f"val_{subset_dict}.txt")
+            with patch('dictionary_subset.subset_dir', return_value=self.cache_dir):
+                asyncio.run(mmcif_validation_async(cif_file, self.dic_file, output_file, subset_dict=subset_dict))
+            with open(output_file) as f:
+                reports.append(f.read())
+        self.assertEqual(reports[0], reports[1])
+        self.assertIn("OK", reports[1])
+        self.assertTrue(any(name.endswith(".dic") for name in os.listdir(self.cache_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
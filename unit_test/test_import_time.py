@@ -0,0 +1,107 @@
+"""
+test_import_time.py
+
+Description: This script measures the start-up cost of each json_to_mmcif.py mode with python -X importtime and
+fails if the modules imported by the converter take longer than a budget, or if a mode imports a backend it does
+not use. The budgets can be scaled for slow machines with the IMPORT_TIME_SCALE environment variable.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import re
+import sys
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TEST_DATA = os.path.join(ROOT, 'test_data')
+SCRIPT = os.path.join(ROOT, 'json_to_mmcif.py')
+SCALE = float(os.environ.get("IMPORT_TIME_SCALE", "1"))
+
+# Milliseconds of imports allowed per mode, several times what they take on a developer machine, and the modules
+# that mode must not import (asyncio loads concurrent.futures itself, but only batch mode starts the process pool)
+MODES = {
+    "validate_only": (["-f", "cif", "-j", "SPA_data.json", "-c", "input_mmcif.cif", "-v", "only"], 150,
+                      ["mmcif", "urllib.request", "concurrent.futures.process"]),
+    "json_pdbx": (["-f", "json", "-j", "SPA_data.json"], 250, ["urllib.request", "concurrent.futures.process"]),
+    "json_native": (["-f", "json", "-j", "SPA_data.json", "--writer", "native"], 150,
+                    ["mmcif", "urllib.request", "concurrent.futures.process"]),
+    "json_stream": (["-f", "json", "-j", "SPA_data.json", "-s"], 150,
+                    ["mmcif", "urllib.request", "concurrent.futures.process"]),
+    "cif_patch": (["-f", "cif", "-j", "SPA_data.json", "-c", "input_mmcif.cif", "-p"], 250,
+                  ["urllib.request", "concurrent.futures.process"]),
+    "batch": (["-f", "json", "-b", "SPA_data.json", "-w", "2"], 400, ["urllib.request"]),
+}
+
+_IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(args, cwd):
+    """
+    Runs python -X importtime with args.
+
+    Returns:
+        list: (cumulative microseconds, nesting level, module name) for each imported module.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=cwd, capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            entries.append((int(match.group(1)), len(match.group(2)), match.group(3)))
+    return entries
+
+
+class TestImportTime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.temp_dir, "mmcif_tools"))
+        shutil.copy(os.path.join(TEST_DATA, "mmcif_pdbx_test.dic"),
+                    os.path.join(cls.temp_dir, "mmcif_tools", "mmcif_pdbx_v50.dic"))
+        for name in ("SPA_data.json", "input_mmcif.cif"):
+            shutil.copy(os.path.join(TEST_DATA, name), cls.temp_dir)
+        # Modules loaded by the interpreter itself are not part of the converter's start-up
+        cls.startup = {name for _, _, name in import_times(["-c", "pass"], cls.temp_dir)}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def measure(self, args):
+        """Returns the import milliseconds of the run (best of three) and the names of the imported modules."""
+        best, names = None, set()
+        for _ in range(3):
+            # Without --no-cache the reruns would be served from the result cache and skip the backends
+            entries = import_times([SCRIPT, "-d", "no", "--no-cache"] + args, self.temp_dir)
+            total = sum(us for us, level, name in entries if level == 1 and name not in self.startup) / 1000
+            best = total if best is None else min(best, total)
+            names = {name for _, _, name in entries}
+        return best, names
+
+    def test_budgets(self):
+        """Every mode imports only its own backends and stays within its start-up budget."""
+        for mode, (args, budget, absent) in MODES.items():
+            with self.subTest(mode=mode):
+                milliseconds, names = self.measure(args)
+                # json_to_mmcif.py runs as __main__, so its own imports show that it started
+                self.assertIn("mmcif_dictionary", names)
+                for module in absent:
+                    self.assertNotIn(module, names)
+                self.assertLess(milliseconds, budget * SCALE,
+                                f"{mode} spent {milliseconds:.1f} ms importing modules")
+
+    def test_backends_loaded_when_used(self):
+        """The PdbxWriter and the process pool are still imported by the modes that need them."""
+        self.assertIn("mmcif.io.PdbxWriter", self.measure(MODES["json_pdbx"][0])[1])
+        self.assertIn("concurrent.futures.process", self.measure(MODES["batch"][0])[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+test_json_stream.py
+
+Description: This script is a unit test for the json_stream script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from json_stream import *
+from json_to_mmcif import translate_json_to_cif
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_file = os.path.join(self.temp_dir, 'data.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_json(self, data):
+        with open(self.json_file, 'w') as f:
+            json.dump(data, f, indent=1)
+
+    def test_scan_json_categories(self):
+        self.write_json({"em_imaging": {"mode": "BRIGHT FIELD", "nominal_cs": 2.7, "tilt": None},
+                         "em_software": {"name": ["EPU", "[x]", "\"{"], "version": ["3.0", "4.11", "1"]}})
+        categories = scan_json_categories(self.json_file)
+        self.assertEqual(categories["em_imaging"], {"mode": "BRIGHT FIELD", "nominal_cs": 2.7, "tilt": None})
+        self.assertIsInstance(categories["em_software"]["name"], JsonArray)
+        self.assertEqual(list(iter_category_rows(self.json_file, categories["em_software"], chunk_rows=2)),
+                         [[["EPU", "3.0"], ["[x]", "4.11"]], [["\"{", "1"]]])
+
+    def test_small_read_buffer(self):
+        """Tokens split across reads are joined before they are decoded."""
+        data = {"cat": {"a": [str(i) * (i % 7) for i in range(200)], "b": [i * 1.5 for i in range(200)]}}
+        self.write_json(data)
+        with patch('json_stream.READ_SIZE', 3):
+            categories = scan_json_categories(self.json_file)
+            rows = [row for chunk in iter_category_rows(self.json_file, categories["cat"]) for row in chunk]
+        self.assertEqual(rows, [list(row) for row in zip(data["cat"]["a"], data["cat"]["b"])])
+
+    def test_inconsistent_categories(self):
+        self.write_json({"cat": {"a": ["1", "2"], "b": ["1"]}, "mixed": {"a": ["1"], "b": "1"}})
+        categories = scan_json_categories(self.json_file)
+        with self.assertRaises(ValueError):
+            list(iter_category_rows(self.json_file, categories["cat"]))
+        with self.assertRaises(ValueError):
+            list(iter_category_rows(self.json_file, categories["mixed"]))
+
+    def test_same_output_as_translate_json_to_cif(self):
+        for name in ("SPA_data.json", "TOMO_data.json"):
+            shutil.copy(os.path.join(TEST_DATA, name), self.json_file)
+            with open(self.json_file) as f:
+                translate_json_to_cif(json.load(f), self.json_file)
+            stream_file = os.path.join(self.temp_dir, 'stream.cif')
+            write_json_stream(self.json_file, stream_file, self.json_file.split(".")[0], chunk_rows=1)
+            with open(self.json_file.split(".")[0] + '.cif') as expected, open(stream_file) as streamed:
+                self.assertEqual(streamed.read(), expected.read(), name)
+
+    def test_data_blocks(self):
+        """Each data_ block of the JSON is written as its own block, as translate_json_to_cif writes it."""
+        data = {"data_A": {"em_imaging": {"mode": "BRIGHT FIELD"}, "em_software": {"name": ["EPU", "IMOD"]}},
+                "data_B": {"em_imaging": {"mode": "DARK FIELD"}}}
+        self.write_json(data)
+        layout = scan_json_categories(self.json_file)
+        self.assertEqual(list(layout), ["data_A", "data_B"])
+        self.assertIsInstance(layout["data_A"]["em_software"]["name"], JsonArray)
+
+        stream_file = os.path.join(self.temp_dir, 'stream.cif')
+        write_json_stream(self.json_file, stream_file, "unused", chunk_rows=1)
+        translate_json_to_cif(data, self.json_file)
+        with open(self.json_file.split(".")[0] + '.cif') as expected, open(stream_file) as streamed:
+            text = streamed.read()
+            self.assertEqual(text, expected.read())
+        self.assertEqual([line for line in text.splitlines() if line.startswith("data_")], ["data_A", "data_B"])
+
+        self.write_json({"data_A": {"em_imaging": {"mode": "BRIGHT FIELD"}}, "em_imaging": {"mode": "X"}})
+        with self.assertRaises(ValueError):
+            scan_json_categories(self.json_file)
+
+    def test_bounded_memory(self):
+        """Peak memory does not follow the number of rows."""
+        peaks = []
+        for rows in (2000, 20000):
+            self.write_json({"em_imaging": {"mode": "BRIGHT FIELD"},
+                             "micrograph": {"id": [str(i) for i in range(rows)],
+                                            "defocus": ["%.4f" % (i / 7) for i in range(rows)],
+                                            "path": ["Images-Disc1/GridSquare_%d/Data/FoilHole_%d.mrc" % (i, i)
+                                                     for i in range(rows)]}})
+            tracemalloc.start()
+            write_json_stream(self.json_file, os.path.join(self.temp_dir, 'out.cif'), "data", chunk_rows=500)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.assertLess(peaks[1], peaks[0] * 2)
+        self.assertLess(peaks[1], 4 * 1024 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
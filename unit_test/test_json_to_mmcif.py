@@ -11,12 +11,16 @@ __date__ = '2024-10-22'
 import unittest
 import os
 import tempfile
+import shutil
 from pathlib import Path
+from unittest.mock import patch
 import sys
 
 # Adding the directory above to the system path to import the script.
 sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from json_to_mmcif import *
+from mmcif.api.DataCategory import DataCategory
+from mmcif.api.PdbxContainers import DataContainer
 
 
 class TestJsonToMmcif(unittest.TestCase):
@@ -74,6 +78,12 @@ class TestJsonToMmcif(unittest.TestCase):
         self.assertIn("em_image_recording", data)
         self.assertEqual(data["em_image_recording"]["film_or_detector_model"], "TFS FALCON 4i (4k x 4k)")
 
+        # loop_ tables are returned as column arrays
+        tomo_cif = os.path.join(os.path.dirname(__file__), '..', 'test_data', 'TOMO_data.cif')
+        data = mmcif_to_json(tomo_cif)
+        self.assertEqual(data["em_software"]["name"], ["FEI tomography", "IMOD"])
+        self.assertEqual(data["em_imaging"]["mode"], "BRIGHT FIELD")
+
     def test_write_mmcif_file(self):
         """Test write_mmcif_file function for file output."""
         data_list = []
@@ -183,6 +193,176 @@ class TestJsonToMmcif(unittest.TestCase):
             if os.path.exists(temp_cif_file_path):
                 os.remove(temp_cif_file_path)
 
+    def test_convert_input_file_stream(self):
+        """Test that streaming conversion writes the same mmCIF file as the normal conversion."""
+        cif_output = Path(self.test_json).stem + '.cif'
+        convert_input_file(self.test_json, None, 'json')
+        with open(cif_output) as f:
+            expected = f.read()
+        result = convert_input_file(self.test_json, None, 'json', stream=True)
+        self.assertEqual(result, {"em_imaging": {"microscope_model": "TFS KRIOS", "mode": "BRIGHT FIELD"}})
+        with open(cif_output) as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_native_writer(self):
+        """Test that the native writer writes the same mmCIF file as PdbxWriter."""
+        for name in ("SPA_data.json", "TOMO_data.json"):
+            with open(os.path.join(os.path.dirname(__file__), '..', 'test_data', name)) as f:
+                container_dict = json.load(f)
+            container_dict["short_loop"] = {"id": ["1", "2", "3"], "name": ["a", "b"]}
+            cif_output = Path(self.test_json).stem + '.cif'
+            translate_json_to_cif(container_dict, self.test_json)
+            with open(cif_output) as f:
+                expected = f.read()
+            self.assertTrue(translate_json_to_cif(container_dict, self.test_json, writer="native"))
+            with open(cif_output) as f:
+                self.assertEqual(f.read(), expected, name)
+
+    def test_precheck(self):
+        """Test that data failing the fast check is written but not validated in full."""
+        from dictionary_index import load_index
+        temp_dir = tempfile.mkdtemp()
+        try:
+            dic_file = os.path.join(temp_dir, 'mmcif_pdbx_v50.dic')
+            shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'test_data', 'mmcif_pdbx_test.dic'), dic_file)
+            index = load_index(dic_file)
+            val_output = Path(self.test_json).stem + '_val.txt'
+            self.addCleanup(lambda: os.path.exists(val_output) and os.remove(val_output))
+
+            bad = {"em_imaging": {"entry_id": "E", "id": "1", "specimen_id": "1", "illumination_mode": "PARALLEL"}}
+            self.assertFalse(translate_json_to_cif(bad, self.test_json, index=index))
+            self.assertTrue(os.path.exists(Path(self.test_json).stem + '.cif'))
+            with open(val_output) as f:
+                report = f.read()
+            self.assertIn("PARALLEL is not one of the allowed values", report)
+            self.assertTrue(report.endswith("FAILED\n"))
+            with open(self.test_json, 'w') as f:
+                json.dump(bad, f)
+            data, checked = convert_and_check(self.test_json, None, 'json', index=index)
+            self.assertEqual((data, checked), (bad, False))
+            with patch('mmcif_validator.mmcif_validation') as mock_validate:
+                self.assertFalse(download_and_validate(self.test_json, None, 'no', 'all', checked=checked))
+            mock_validate.assert_not_called()
+
+            good = {"em_imaging": {"entry_id": "E", "id": "1", "specimen_id": "1", "illumination_mode": "OTHER"}}
+            self.assertTrue(translate_json_to_cif(good, self.test_json, index=index))
+            with patch('mmcif_validator.mmcif_validation', return_value=True) as mock_validate:
+                self.assertTrue(download_and_validate(self.test_json, None, 'no', 'all'))
+            mock_validate.assert_called_once()
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_precheck_report(self):
+        """The precheck report reads as the gemmi report of the same file, with the lines of the values."""
+        from dictionary_index import load_index
+        from diagnostics import parse_report
+        from mmcif_validator import MmcifValidator
+        temp_dir = tempfile.mkdtemp()
+        try:
+            dic_file = os.path.join(temp_dir, 'mmcif_pdbx_v50.dic')
+            shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'test_data', 'mmcif_pdbx_test.dic'), dic_file)
+            val_output = Path(self.test_json).stem + '_val.txt'
+            self.addCleanup(lambda: os.path.exists(val_output) and os.remove(val_output))
+            bad = {"em_imaging": {"entry_id": "E", "id": "1", "specimen_id": "1", "illumination_mode": "PARALLEL",
+                                  "unknown": "1"},
+                   "em_software": {"id": ["1", "2"], "category": ["OTHER", "GUESSING"]}}
+            for writer in ("pdbx", "native"):
+                translate_json_to_cif(bad, self.test_json, writer=writer, index=load_index(dic_file))
+                with open(val_output) as f:
+                    [(file_name, valid, precheck)] = parse_report(f.read())
+                self.assertEqual(file_name, self.test_cif)
+                self.assertFalse(valid)
+                self.assertNotIn("syntax", [diagnostic.kind for diagnostic in precheck])
+
+                _, report = MmcifValidator(dic_file).validate_file(self.test_cif)
+                [(_, _, full)] = parse_report(report)
+                located = {(d.line, d.block, d.category, d.item, d.kind) for d in full if d.line is not None}
+                self.assertEqual({(d.line, d.block, d.category, d.item, d.kind) for d in precheck
+                                  if d.line is not None}, located)
+                self.assertEqual(len(located), 2)
+                self.assertIn("unknown_tag", [diagnostic.kind for diagnostic in precheck])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_data_blocks(self):
+        """JSON entries keyed data_<name> are written as data blocks and read back apart."""
+        cif_output = Path(self.test_json).stem + '.cif'
+        data = {"data_session1": {"em_imaging": {"mode": "BRIGHT FIELD"}},
+                "data_session2": {"em_imaging": {"mode": "DARK FIELD"}, "em_software": {"name": ["EPU", "IMOD"]}}}
+        for writer in ("pdbx", "native"):
+            self.assertTrue(translate_json_to_cif(data, self.test_json, writer=writer))
+            self.assertEqual(mmcif_to_json(cif_output), data)
+        self.assertEqual(list(mmcif_to_json(cif_output, blocks=True)), ["data_session1", "data_session2"])
+
+        # Blocks are merged by name; unknown blocks are added
+        cif_dict = mmcif_to_json(cif_output)
+        merged = merge_json_into_cif(cif_dict, {"data_session2": {"em_imaging": {"mode": "OTHER"}},
+                                                "data_session3": {"em_imaging": {"mode": "X"}}})
+        self.assertEqual(merged["data_session2"]["em_imaging"], {"mode": "OTHER"})
+        self.assertEqual(merged["data_session1"]["em_imaging"], {"mode": "BRIGHT FIELD"})
+        self.assertEqual(list(merged), ["data_session1", "data_session2", "data_session3"])
+        with self.assertRaises(ValueError):
+            merge_json_into_cif(mmcif_to_json(cif_output), {"em_imaging": {"mode": "OTHER"}})
+        with self.assertRaises(ValueError):
+            translate_json_to_cif({"data_a": {}, "em_imaging": {"mode": "X"}}, self.test_json)
+
+        # Merge mode reads the mmCIF file block by block when the JSON has blocks
+        with open(self.test_json, 'w') as f:
+            json.dump({"data_session2": {"em_imaging": {"mode": "OTHER"}}}, f)
+        shutil.copy(cif_output, 'blocks_input.cif')
+        self.addCleanup(os.remove, 'blocks_input.cif')
+        convert_input_file(self.test_json, 'blocks_input.cif', 'cif')
+        self.assertEqual(mmcif_to_json(cif_output)["data_session2"]["em_imaging"], {"mode": "OTHER"})
+
+    def test_collect_batch_inputs(self):
+        """Test expansion of directories, glob patterns and manifest files into input pairs."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            for name in ('b.json', 'a.json', 'notes.txt'):
+                with open(os.path.join(temp_dir, name), 'w') as f:
+                    f.write('{}')
+            a_json = os.path.join(temp_dir, 'a.json')
+            b_json = os.path.join(temp_dir, 'b.json')
+
+            self.assertEqual(collect_batch_inputs(temp_dir), [(a_json, None), (b_json, None)])
+            self.assertEqual(collect_batch_inputs(os.path.join(temp_dir, 'b*.json'), 'in.cif'),
+                             [(b_json, 'in.cif')])
+
+            manifest = os.path.join(temp_dir, 'manifest.txt')
+            with open(manifest, 'w') as f:
+                f.write(f"# session 1\n{a_json} model.cif\n\n{b_json}\n")
+            self.assertEqual(collect_batch_inputs(manifest, 'in.cif'),
+                             [(a_json, 'model.cif'), (b_json, 'in.cif')])
+
+            # A file listed twice, under any path, is converted once with its first mmCIF file
+            with open(manifest, 'a') as f:
+                f.write(f"{a_json} other.cif\n{os.path.join(temp_dir, '.', 'b.json')}\n")
+            self.assertEqual(collect_batch_inputs(manifest, 'in.cif'),
+                             [(a_json, 'model.cif'), (b_json, 'in.cif')])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_run_batch(self):
+        """Test that a bad file in a batch is reported without stopping the other conversions."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            for name in ('good1', 'good2'):
+                with open(os.path.join(temp_dir, name + '.json'), 'w') as f:
+                    json.dump({"em_imaging": {"mode": "BRIGHT FIELD"}}, f)
+            with open(os.path.join(temp_dir, 'bad.json'), 'w') as f:
+                f.write('{"em_imaging": ')
+
+            with patch('json_to_mmcif.download_and_validate', return_value=True):
+                results = run_batch(temp_dir, None, 'json', 'no', 'all', workers=1)
+
+            self.assertEqual([os.path.basename(r[0]) for r in results], ['bad.json', 'good1.json', 'good2.json'])
+            self.assertEqual([r[1] for r in results], [False, True, True])
+            self.assertIn('JSONDecodeError', results[0][2])
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, 'good1.cif')))
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, 'good2.cif')))
+        finally:
+            shutil.rmtree(temp_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
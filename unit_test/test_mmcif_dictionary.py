@@ -0,0 +1,135 @@
+"""
+test_mmcif_dictionary.py
+
+Description: This script is a unit test for the mmcif_dictionary script. The dictionary server is stood in for
+by a local HTTP server that honours ETag and If-Modified-Since.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mmcif_dictionary import *
+
+LAST_MODIFIED = "Wed, 01 Oct 2025 00:00:00 GMT"
+
+
+class DictionaryHandler(BaseHTTPRequestHandler):
+    """Serves server.dictionary with an ETag derived from its content, answering 304 when unchanged."""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        etag = '"%x"' % hash(self.server.dictionary)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(self.server.dictionary)))
+        self.end_headers()
+        self.wfile.write(self.server.dictionary)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_dictionary(version):
+    return (f"data_mmcif_pdbx.dic\n    _dictionary.title mmcif_pdbx.dic\n"
+            f"    _dictionary.version {version}\n#\nsave_em_imaging\n    _category.id em_imaging\n    save_\n").encode()
+
+
+class TestMmcifDictionary(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = HTTPServer(("127.0.0.1", 0), DictionaryHandler)
+        self.server.dictionary = make_dictionary("5.390")
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/mmcif_pdbx_v50.dic"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def make_cache(self, **kwargs):
+        return DictionaryCache(self.temp_dir, url=self.url, **kwargs)
+
+    def test_download_and_metadata(self):
+        cache = self.make_cache()
+        path = cache.get()
+        self.assertEqual(path, os.path.join(self.temp_dir, DICTIONARY_NAME))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.server.dictionary)
+        metadata = cache.read_metadata()
+        self.assertEqual(metadata["version"], "5.390")
+        self.assertEqual(metadata["last_modified"], LAST_MODIFIED)
+        self.assertTrue(cache.key().startswith("5.390-"))
+        self.assertEqual([f for f in os.listdir(self.temp_dir) if f.endswith(".part")], [])
+
+    def test_shared_permissions(self):
+        """The dictionary and its metadata can be read by others, as files made with open() can."""
+        self.make_cache().get()
+        umask = os.umask(0o022)
+        os.umask(umask)
+        for name in (DICTIONARY_NAME, DICTIONARY_NAME + ".json"):
+            self.assertEqual(os.stat(os.path.join(self.temp_dir, name)).st_mode & 0o777, 0o666 & ~umask, name)
+
+    def test_fresh_copy_is_not_revalidated(self):
+        self.make_cache().get()
+        self.make_cache().get()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_expired_copy_is_revalidated(self):
+        cache = self.make_cache(ttl=0)
+        cache.get()
+        key = cache.key()
+        self.assertFalse(cache.fetch())
+        self.assertEqual(self.server.requests[-1]["If-None-Match"], cache.read_metadata()["etag"])
+        self.assertEqual(self.server.requests[-1]["If-Modified-Since"], LAST_MODIFIED)
+        self.assertEqual(cache.key(), key)
+
+        self.server.dictionary = make_dictionary("5.391")
+        cache.get()
+        self.assertEqual(cache.read_metadata()["version"], "5.391")
+        self.assertNotEqual(cache.key(), key)
+        with open(cache.path, 'rb') as f:
+            self.assertEqual(f.read(), self.server.dictionary)
+
+    def test_offline(self):
+        with self.assertRaises(FileNotFoundError):
+            self.make_cache(offline=True).get()
+        self.make_cache().get()
+        self.assertEqual(self.make_cache(offline=True, ttl=0).get(), os.path.join(self.temp_dir, DICTIONARY_NAME))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unreachable_server_uses_stale_copy(self):
+        self.make_cache().get()
+        unreachable = DictionaryCache(self.temp_dir, url="http://127.0.0.1:9/missing.dic", ttl=0, timeout=5)
+        self.assertEqual(unreachable.get(), os.path.join(self.temp_dir, DICTIONARY_NAME))
+
+        with self.assertRaises(urllib.error.URLError):
+            DictionaryCache(os.path.join(self.temp_dir, "empty"), url="http://127.0.0.1:9/missing.dic",
+                            timeout=5).get()
+
+    def test_get_dictionary_without_download(self):
+        self.assertEqual(get_dictionary("no", cache_dir=self.temp_dir), os.path.join(self.temp_dir, DICTIONARY_NAME))
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+test_mmcif_server.py
+
+Description: This script is a unit test for the mmcif_server and mmcif_client scripts.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mmcif_server import *
+from mmcif_client import build_request, parse_arguments as parse_client_arguments, run as run_client, send_request
+
+TEST_DATA = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'test_data'))
+TOKEN = "test-token"
+
+
+class TestMmcifServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The server uses the cached dictionary in mmcif_tools/ of its working directory
+        cls.cwd = os.getcwd()
+        cls.temp_dir = tempfile.mkdtemp()
+        os.chdir(cls.temp_dir)
+        os.mkdir('mmcif_tools')
+        shutil.copy(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'), os.path.join('mmcif_tools', 'mmcif_pdbx_v50.dic'))
+        for name in ('SPA_data.json', 'input_mmcif.cif'):
+            shutil.copy(os.path.join(TEST_DATA, name), name)
+
+        cls.service = ConversionService(workers=1, queue=2, download_dict="no")
+        cls.server = make_server(cls.service, port=0, token=TOKEN)
+        cls.token_file = os.path.join(cls.temp_dir, 'token')
+        with open(cls.token_file, 'w') as f:
+            f.write(TOKEN + "\n")
+        cls.address = "127.0.0.1:%d" % cls.server.server_address[1]
+        cls.socket_path = os.path.join(cls.temp_dir, 'server.sock')
+        cls.unix_server = make_server(cls.service, socket_path=cls.socket_path)
+        for server in (cls.server, cls.unix_server):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in (cls.server, cls.unix_server):
+            server.shutdown()
+            server.server_close()
+        cls.service.close()
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.temp_dir)
+
+    def test_health(self):
+        status, reply = send_request("/health", server=self.address, token=TOKEN)
+        self.assertEqual(status, 200)
+        self.assertEqual((reply["workers"], reply["capacity"], reply["in_progress"]), (1, 3, 0))
+
+    def test_convert_and_merge(self):
+        status, reply = send_request("/convert", {"input_json_file": os.path.abspath('SPA_data.json')},
+                                     server=self.address, token=TOKEN)
+        self.assertEqual(status, 200)
+        self.assertTrue(reply["ok"], reply)
+        self.assertTrue(os.path.exists('SPA_data.cif'))
+        self.assertTrue(os.path.exists('SPA_data_val.txt'))
+
+        self.assertEqual(run_client(["--socket", self.socket_path, "-f", "cif", "-j", "SPA_data.json",
+                                     "-c", "input_mmcif.cif", "--writer", "native"]), 0)
+        self.assertEqual(run_client(["--server", self.address, "--token_file", self.token_file, "-f", "cif",
+                                     "-j", "SPA_data.json", "-c", "SPA_data.cif", "-v", "only"]), 0)
+
+    def test_errors(self):
+        status, reply = send_request("/merge", {"input_json_file": "x.json"}, server=self.address, token=TOKEN)
+        self.assertEqual(status, 400)
+        status, reply = send_request("/convert", {"input_json_file": os.path.abspath("missing.json")},
+                                     server=self.address, token=TOKEN)
+        self.assertEqual(status, 200)
+        self.assertFalse(reply["ok"])
+        self.assertIn("FileNotFoundError", reply["message"])
+        self.assertEqual(run_client(["--server", "127.0.0.1:1", "-f", "json", "-j", "SPA_data.json"]), 2)
+
+    def test_busy(self):
+        """Requests beyond the workers and the queue are refused instead of piling up."""
+        for _ in range(self.service.capacity):
+            self.service.slots.acquire()
+        try:
+            status, reply = send_request("/convert", {"input_json_file": os.path.abspath('SPA_data.json')},
+                                         server=self.address, token=TOKEN)
+        finally:
+            for _ in range(self.service.capacity):
+                self.service.slots.release()
+        self.assertEqual(status, 503)
+        self.assertFalse(reply["ok"])
+
+    def test_batch(self):
+        os.mkdir('batch')
+        for name in ('a.json', 'b.json'):
+            shutil.copy('SPA_data.json', os.path.join('batch', name))
+        status, reply = send_request("/batch", {"batch": os.path.abspath('batch'), "input_format": "json"},
+                                     server=self.address, token=TOKEN)
+        self.assertEqual(status, 200)
+        self.assertEqual([os.path.basename(r["input_json_file"]) for r in reply["results"]], ["a.json", "b.json"])
+        self.assertTrue(reply["ok"])
+
+    def test_access(self):
+        """TCP requests need the token, and only files under the roots of the service are used."""
+        for token in (None, "wrong"):
+            status, reply = send_request("/health", server=self.address, token=token)
+            self.assertEqual(status, 401)
+        self.assertEqual(run_client(["--server", self.address, "--token_file", "missing", "-f", "json",
+                                     "-j", "SPA_data.json"]), 1)
+        with self.assertRaises(ValueError):
+            make_server(self.service, port=0)
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+
+        outside = os.path.join(TEST_DATA, 'SPA_data.json')
+        status, reply = send_request("/convert", {"input_json_file": outside}, server=self.address, token=TOKEN)
+        self.assertEqual(status, 403)
+        self.assertIn("outside", reply["message"])
+        with open('manifest.txt', 'w') as f:
+            f.write(os.path.abspath('SPA_data.json') + "\n" + outside + "\n")
+        status, reply = send_request("/batch", {"batch": os.path.abspath('manifest.txt'), "input_format": "json"},
+                                     socket_path=self.socket_path)
+        self.assertEqual(status, 403)
+        self.assertIn(outside, reply["message"])
+
+    def test_refresh_dictionary(self):
+        """The dictionary is refreshed at most once per TTL, and never with download_dict no."""
+        with patch('mmcif_server.get_dictionary') as get:
+            self.service.refresh_dictionary({"download_dict": "yes", "dict_ttl": 3600})
+            self.service.refresh_dictionary({})
+            get.assert_not_called()
+            self.service.refresh_dictionary({"download_dict": "yes", "dict_ttl": 0})
+            self.service.refresh_dictionary({"download_dict": "yes"})
+            get.assert_called_once_with("yes", ttl=0)
+
+    def test_build_request(self):
+        path, params = build_request(parse_client_arguments(["-f", "cif", "-j", "a.json", "-c", "b.cif", "-p"]))
+        self.assertEqual(path, "/merge")
+        self.assertEqual(params["input_json_file"], os.path.abspath("a.json"))
+        self.assertTrue(params["patch"])
+        self.assertNotIn("download_dict", params)
+        path, params = build_request(parse_client_arguments(["-f", "json", "-b", "dir", "-d", "yes"]))
+        self.assertEqual((path, params["batch"], params["download_dict"]), ("/batch", os.path.abspath("dir"), "yes"))
+
+
+if __name__ == '__main__':
+    unittest.main()
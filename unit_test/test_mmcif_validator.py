@@ -13,12 +13,16 @@ import os
 import sys
 import tempfile
 import shutil
+import subprocess
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to the system path to import the script
 sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from mmcif_validator import *
 
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+TEST_DIC = os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic')
+
 class TestMmcifValidator(unittest.TestCase):
 
     def setUp(self):
@@ -52,10 +56,10 @@ class TestMmcifValidator(unittest.TestCase):
             self.assertEqual(args.download_dict, "no")
 
     @patch('subprocess.run')
-    @patch('urllib.request.urlretrieve')
-    def test_mmcif_validation_success(self, mock_urlretrieve, mock_run):
+    @patch('mmcif_dictionary.DictionaryCache.fetch')
+    def test_mmcif_validation_success(self, mock_fetch, mock_run):
         mock_run.return_value = MagicMock(returncode=0, stderr='')
-        mock_urlretrieve.return_value = ('', '')
+        mock_fetch.return_value = False
 
         result = mmcif_validation(self.cif_file, 'yes', self.output_file)
         self.assertTrue(result)
@@ -86,6 +90,60 @@ class TestMmcifValidator(unittest.TestCase):
         # Call validate_and_print and verify the mock was called
         validate_and_print(self.cif_file, "no", self.output_file)
         mock_validation.assert_called_once_with(self.cif_file, "no", self.output_file)
+    def test_validator_report(self):
+        validator = MmcifValidator(TEST_DIC)
+        tomo_cif = os.path.join(TEST_DATA, 'TOMO_data.cif')
+        valid, report = validator.validate_file(tomo_cif)
+        self.assertFalse(valid)
+        lines = report.splitlines()
+        self.assertEqual(lines[0], f"Reading {tomo_cif}...")
+        self.assertIn(f"{tomo_cif}:13 [test_data/TOMO_data] PARALLEL is not one of the allowed values:", lines)
+        self.assertIn("[test_data/TOMO_data] missing category key: _em_imaging.id", lines)
+        self.assertEqual(lines[-1], "FAILED")
+
+        # The same validator is reused for further documents
+        valid, report = validator.validate_string("data_x\n_em_support_film.id 1\n_em_support_film.material CARBON\n")
+        self.assertTrue(valid)
+        self.assertEqual(report, "Reading string...\nOK\n")
+
+        valid, report = validator.validate_string("data_x\n_em_support_film.id 1\n_em_support_film.id 2\n", "dup.cif")
+        self.assertFalse(valid)
+        self.assertIn("duplicate tag _em_support_film.id", report)
+
+    @unittest.skipUnless(shutil.which('gemmi'), "gemmi command line program not installed")
+    def test_validator_matches_gemmi_validate(self):
+        import gemmi
+        version = subprocess.run(["gemmi", "--version"], stdout=subprocess.PIPE, text=True).stdout.split()
+        if version[1:2] != [gemmi.__version__]:
+            self.skipTest("the gemmi program is not the version of the gemmi module")
+        validator = MmcifValidator(TEST_DIC)
+        for name in ('TOMO_data.cif', 'SPA_data.cif', 'input_mmcif.cif'):
+            cif_file = os.path.join(TEST_DATA, name)
+            gemmi_output = subprocess.run(["gemmi", "validate", "-v", cif_file, "-d", TEST_DIC],
+                                          stdout=subprocess.PIPE, text=True).stdout
+            self.assertEqual(validator.validate_file(cif_file)[1], gemmi_output)
+
+    def test_get_validator(self):
+        dic_file = os.path.join(self.temp_dir, 'test.dic')
+        shutil.copy(TEST_DIC, dic_file)
+        validator = get_validator(dic_file)
+        self.assertIs(get_validator(dic_file), validator)
+
+        with open(dic_file, 'a') as f:
+            f.write("\n")
+        self.assertIsNot(get_validator(dic_file), validator)
+
+    @patch('subprocess.run')
+    def test_mmcif_validation_in_process(self, mock_run):
+        with open(self.cif_file, 'w') as f:
+            f.write("data_test\n_em_imaging.illumination_mode PARALLEL\n")
+        with patch('mmcif_validator.get_dictionary', return_value=TEST_DIC):
+            result = mmcif_validation(self.cif_file, 'no', self.output_file, in_process=True)
+        self.assertFalse(result)
+        mock_run.assert_not_called()
+        with open(self.output_file) as f:
+            self.assertIn("PARALLEL is not one of the allowed values", f.read())
+
 
 if __name__ == '__main__':
     unittest.main()
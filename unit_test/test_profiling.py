@@ -0,0 +1,94 @@
+"""
+test_profiling.py
+
+Description: This script is a unit test for the profiling script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from profiling import *
+from json_to_mmcif import convert_input_file
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        disable_profiling()
+        shutil.rmtree(self.temp_dir)
+
+    def test_disabled(self):
+        """Without a profiler every stage is the same no-op context manager."""
+        self.assertIsNone(get_profiler())
+        self.assertIs(stage("a"), stage("b", file="x"))
+        with stage("a"):
+            pass
+
+    def test_nested_stages(self):
+        profiler = enable_profiling()
+        with stage("outer"):
+            with stage("inner", file="data.json"):
+                data = bytearray(20 * 1024 * 1024)
+                with open(os.path.join(self.temp_dir, "out"), "wb") as f:
+                    f.write(data)
+            del data
+        self.assertIs(disable_profiling(), profiler)
+
+        inner, outer = profiler.events
+        self.assertEqual((inner["name"], outer["name"]), ("inner", "outer"))
+        self.assertLessEqual(outer["start"], inner["start"])
+        self.assertGreaterEqual(outer["wall"], inner["wall"])
+        self.assertEqual(inner["args"], {"file": "data.json"})
+        if inner["written"] is not None:
+            self.assertGreaterEqual(inner["written"], 20 * 1024 * 1024)
+        if inner["peak_rss"] is not None:
+            self.assertGreaterEqual(outer["peak_rss"], inner["peak_rss"])
+            self.assertGreater(inner["peak_rss"], 20 * 1024 * 1024)
+        self.assertEqual([row[:2] for row in profiler.summary()], [("outer", 1), ("inner", 1)])
+
+    def test_child_process_cpu(self):
+        profiler = enable_profiling()
+        with stage("child"):
+            subprocess.run([sys.executable, "-c", "sum(range(3000000))"], check=True)
+        event = disable_profiling().events[0]
+        self.assertGreater(event["cpu"], 0)
+        self.assertIn("child_peak_rss", event)
+
+    def test_trace(self):
+        """The conversion stages end up in a Chrome trace of complete events."""
+        json_file = os.path.join(self.temp_dir, 'SPA_data.json')
+        shutil.copy(os.path.join(TEST_DATA, 'SPA_data.json'), json_file)
+        profiler = enable_profiling()
+        convert_input_file(json_file, os.path.join(TEST_DATA, 'input_mmcif.cif'), 'cif')
+        trace_file = os.path.join(self.temp_dir, 'trace.json')
+        write_profile(trace_file)
+        self.assertIsNone(get_profiler())
+
+        with open(trace_file) as f:
+            trace = json.load(f)
+        events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual([event["name"] for event in events],
+                         ["json_to_dict", "mmcif_to_json", "merge", "build_containers", "write_mmcif_file"])
+        for event in events:
+            self.assertGreaterEqual(event["dur"], 0)
+            self.assertIn("cpu_ms", event["args"])
+        self.assertIn("write_mmcif_file", profiler.format_summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
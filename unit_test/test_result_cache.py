@@ -0,0 +1,204 @@
+"""
+test_result_cache.py
+
+Description: This script is a unit test for the result_cache script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import asyncio
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from result_cache import *
+from json_to_mmcif import process_input_file
+from async_pipeline import convert_many_async
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+# Converts and validates files along every path, in a fresh interpreter, and prints the modules of the repository
+# it loaded
+CONVERSION_PATHS = """
+import os, sys, json, asyncio
+sys.path.insert(1, {repo!r})
+from json_to_mmcif import process_input_file
+from async_pipeline import convert_many_async
+from converter import Converter
+from result_cache import ResultCache
+for cache in (None, ResultCache()):
+    for options in ({{}}, {{"writer": "native"}}, {{"output_format": "bcif"}}, {{"output_format": "cif.gz"}},
+                    {{"stream": True}}, {{"precheck": True}}):
+        process_input_file('TOMO_data.json', None, 'json', 'all', cache=cache, **options)
+    process_input_file('SPA_data.json', 'input_mmcif.cif', 'cif', 'all', cache=cache)
+    process_input_file('SPA_data.json', 'input_mmcif.cif', 'cif', 'all', patch=True, cache=cache)
+    asyncio.run(convert_many_async([('SPA_data.json', 'input_mmcif.cif')], 'cif', download_dict='no', cache=cache))
+converter = Converter('native', dic_file=os.path.join('mmcif_tools', 'mmcif_pdbx_v50.dic'))
+converter.validate(converter.convert(converter.merge(open('SPA_data.json').read(), open('input_mmcif.cif').read())))
+converter.check(open('TOMO_data.json').read())
+print(json.dumps(sorted(os.path.basename(module.__file__) for module in list(sys.modules.values())
+                        if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '/')) == {repo!r})))
+"""
+# Modules loaded along the way that do not change the outputs: the dictionary is part of the key itself, and
+# profiling only times the stages
+NOT_TOOL_MODULES = {"mmcif_dictionary.py", "profiling.py"}
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        # The dictionary and the cache are looked up in mmcif_tools/ of the working directory
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        os.mkdir('mmcif_tools')
+        self.dic_file = os.path.join('mmcif_tools', 'mmcif_pdbx_v50.dic')
+        shutil.copy(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'), self.dic_file)
+        for name in ('SPA_data.json', 'TOMO_data.json', 'input_mmcif.cif'):
+            shutil.copy(os.path.join(TEST_DATA, name), name)
+        self.cache = ResultCache()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_job_files(self):
+        self.assertEqual(job_files('a.json', 'm.cif', 'cif', 'all'),
+                         (['a.json', 'm.cif'], {"cif": 'a.cif', "report": 'a_val.txt'}))
+        self.assertEqual(job_files('a.json', 'm.cif', 'json', 'all'),
+                         (['a.json'], {"cif": 'a.cif', "report": 'a_val.txt'}))
+        self.assertEqual(job_files('a.json', 'm.cif', 'cif', 'only'), (['m.cif'], {"report": 'a_val.txt'}))
+
+    def test_key(self):
+        """The key changes with the content of the inputs, the dictionary and the options."""
+        key = self.cache.key(['SPA_data.json'], self.dic_file, writer="pdbx")
+        self.assertEqual(key, self.cache.key(['SPA_data.json'], self.dic_file, writer="pdbx"))
+        self.assertNotEqual(key, self.cache.key(['SPA_data.json'], self.dic_file, writer="native"))
+        self.assertIsNone(self.cache.key(['missing.json'], self.dic_file))
+
+        with open('SPA_data.json', 'a') as f:
+            f.write('\n')
+        changed = self.cache.key(['SPA_data.json'], self.dic_file, writer="pdbx")
+        self.assertNotEqual(key, changed)
+        with open(self.dic_file, 'a') as f:
+            f.write('\n')
+        self.assertNotEqual(changed, self.cache.key(['SPA_data.json'], self.dic_file, writer="pdbx"))
+
+    def test_store_and_restore(self):
+        """Missing or changed outputs are restored; outputs that are up to date are left untouched."""
+        outputs = {"cif": 'out.cif', "report": 'out_val.txt'}
+        for kind, path in outputs.items():
+            with open(path, 'w') as f:
+                f.write(kind)
+        self.assertTrue(self.cache.store('ab' * 32, outputs, False))
+        self.assertIsNone(self.cache.restore('cd' * 32, outputs))
+        self.assertIsNone(self.cache.restore('ab' * 32, {"cif": 'out.cif'}))
+
+        os.remove('out.cif')
+        with open('out_val.txt', 'w') as f:
+            f.write('edited')
+        os.utime('out_val.txt', (0, 0))
+        entry = self.cache.restore('ab' * 32, outputs)
+        self.assertFalse(entry["result"])
+        with open('out.cif') as f:
+            self.assertEqual(f.read(), 'cif')
+        with open('out_val.txt') as f:
+            self.assertEqual(f.read(), 'report')
+
+        os.utime('out_val.txt', (0, 0))
+        self.cache.restore('ab' * 32, outputs)
+        self.assertEqual(os.path.getmtime('out_val.txt'), 0)
+
+    def test_evict_least_recently_used(self):
+        with open('out.cif', 'w') as f:
+            f.write('x' * 1000)
+        outputs = {"cif": 'out.cif'}
+        cache = ResultCache(max_size=2500)
+        for key in ('aa', 'bb', 'cc'):
+            cache.store(key * 32, outputs, True)
+        self.assertEqual(len(cache.entries()), 2)
+        self.assertIsNone(cache.restore('aa' * 32, outputs))
+
+        # bb is used again, so cc is the least recently used when dd is stored
+        for used, key in enumerate(('cc', 'bb')):
+            os.utime(os.path.join(cache.cache_dir, key[:2], key * 32, ENTRY_FILE), (used, used))
+        cache.store('dd' * 32, outputs, True)
+        self.assertEqual(sorted(os.path.basename(path)[:2] for _, _, path in cache.entries()), ['bb', 'dd'])
+        self.assertLessEqual(cache.size(), 2500)
+
+        cache.clear()
+        self.assertEqual(cache.entries(), [])
+
+    def test_category_cache(self):
+        categories = CategoryCache(os.path.join('cache', 'categories.db'), max_entries=2)
+        self.assertEqual(categories.get(['a']), {})
+        keys = [categories.key('dictionary', 'category', str(number).encode()) for number in range(3)]
+        self.assertEqual(len(set(keys)), 3)
+        self.assertTrue(categories.put({keys[0]: {"valid": True, "messages": []}}))
+        self.assertTrue(categories.put({keys[1]: {"valid": False, "messages": [[0, 1, "[x] BAD"]]}}))
+        self.assertEqual(categories.get(keys), {keys[0]: {"valid": True, "messages": []},
+                                                keys[1]: {"valid": False, "messages": [[0, 1, "[x] BAD"]]}})
+        categories.put({keys[2]: {"valid": True, "messages": []}})
+        self.assertEqual(len(categories), 2)
+
+    def test_process_input_file(self):
+        """An unchanged file is not converted or validated again."""
+        first = process_input_file('TOMO_data.json', None, 'json', 'all', cache=self.cache)
+        self.assertFalse(first[1])
+        with open('TOMO_data_val.txt') as f:
+            report = f.read()
+        os.remove('TOMO_data.cif')
+        with patch('json_to_mmcif.convert_and_check') as mock_convert, \
+                patch('json_to_mmcif.download_and_validate') as mock_validate:
+            second = process_input_file('TOMO_data.json', None, 'json', 'all', cache=self.cache)
+        mock_convert.assert_not_called()
+        mock_validate.assert_not_called()
+        self.assertEqual(second[:3], first[:3])
+        self.assertTrue(os.path.exists('TOMO_data.cif'))
+        with open('TOMO_data_val.txt') as f:
+            self.assertEqual(f.read(), report)
+
+        # Without the cache the file is converted again
+        with patch('json_to_mmcif.download_and_validate', return_value=True) as mock_validate:
+            process_input_file('TOMO_data.json', None, 'json', 'all')
+        mock_validate.assert_called_once()
+
+    def test_pipeline(self):
+        """The asyncio pipeline serves unchanged files from the cache and converts changed ones."""
+        pairs = [('SPA_data.json', 'input_mmcif.cif')]
+        first = asyncio.run(convert_many_async(pairs, 'cif', download_dict='no', cache=self.cache))
+        self.assertTrue(first[0][1])
+        with patch('async_pipeline.Pipeline.convert') as mock_convert:
+            second = asyncio.run(convert_many_async(pairs, 'cif', download_dict='no', cache=self.cache))
+        mock_convert.assert_not_called()
+        self.assertEqual(second[0][:3], first[0][:3])
+        # The merged file was validated by category
+        self.assertGreater(len(self.cache.categories()), 0)
+
+        with open('input_mmcif.cif', 'a') as f:
+            f.write('_em_specimen.id 1\n')
+        with patch('async_pipeline.Pipeline.convert') as mock_convert:
+            asyncio.run(convert_many_async(pairs, 'cif', download_dict='no', cache=self.cache))
+        mock_convert.assert_called_once()
+
+    def test_tool_modules(self):
+        """Every module of the repository that converting and validating load is part of the tool version."""
+        repo = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        output = subprocess.run([sys.executable, '-c', CONVERSION_PATHS.format(repo=repo)], check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        loaded = set(json.loads(output.splitlines()[-1]))
+        self.assertIn("converter.py", loaded)
+        self.assertIn("dictionary_subset.py", loaded)
+        self.assertEqual(loaded - NOT_TOOL_MODULES - set(TOOL_MODULES), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
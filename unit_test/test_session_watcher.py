@@ -0,0 +1,148 @@
+"""
+test_session_watcher.py
+
+Description: This script is a unit test for the session_watcher script.
+
+"""
+__author__ = 'Amudha Kumari Duraisamy'
+__email__ = 'emdbhelp@ebi.ac.uk'
+__date__ = '2026-10-17'
+
+import unittest
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from session_watcher import *
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', 'test_data')
+
+
+def wait_for(condition, timeout=10.0):
+    """Waits until condition() is true; returns whether it became true in time."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+class TestSessionWatcher(unittest.TestCase):
+
+    def setUp(self):
+        # The dictionary is looked up in mmcif_tools/ of the working directory
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        os.mkdir('mmcif_tools')
+        shutil.copy(os.path.join(TEST_DATA, 'mmcif_pdbx_test.dic'), os.path.join('mmcif_tools', 'mmcif_pdbx_v50.dic'))
+        os.makedirs(os.path.join('sessions', 'old'))
+        shutil.copy(os.path.join(TEST_DATA, 'SPA_data.json'), os.path.join('sessions', 'old', 'a.json'))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_watchers(self):
+        """Both watchers report existing files, and new files in new directories, but not other files."""
+        for watcher in (PollingWatcher(['sessions'], interval=0.1), InotifyWatcher(['sessions'])):
+            name = type(watcher).__name__
+            self.assertIn(os.path.join('sessions', 'old', 'a.json'), watcher.scan())
+            new_dir = os.path.join('sessions', name)
+            os.mkdir(new_dir)
+            with open(os.path.join(new_dir, 'b.json.gz'), 'w') as f:
+                f.write('x')
+            with open(os.path.join(new_dir, 'b.cif'), 'w') as f:
+                f.write('x')
+            found = set()
+            self.assertTrue(wait_for(lambda: found.update(watcher.changes(0.1)) or
+                                     os.path.join(new_dir, 'b.json.gz') in found), name)
+            self.assertEqual(found, {os.path.join(new_dir, 'b.json.gz')})
+            watcher.close()
+
+    def run_watcher(self, watcher):
+        stop = threading.Event()
+        output = io.StringIO()
+        result = {}
+
+        def run():
+            with redirect_stdout(output):
+                result.update(watcher.run(stop))
+        thread = threading.Thread(target=run)
+        thread.start()
+        return stop, thread, output, result
+
+    def test_watch(self):
+        """New and changed files are converted once, after they settle; up to date files are left alone."""
+        shutil.copy(os.path.join(TEST_DATA, 'TOMO_data.json'), os.path.join('sessions', 'old', 'done.json'))
+        with open(os.path.join('sessions', 'old', 'done.cif'), 'w') as f:
+            f.write('data_done\n')
+        watcher = SessionWatcher(['sessions'], download_dict='no', workers=1, settle=0.3, queue_size=2,
+                                 metrics_file='metrics.json')
+        stop, thread, output, result = self.run_watcher(watcher)
+        try:
+            self.assertTrue(wait_for(lambda: watcher.metrics.processed == 1))
+            self.assertTrue(os.path.exists(os.path.join('sessions', 'old', 'a.cif')))
+
+            # A file written in two steps is only read once it is complete
+            os.mkdir(os.path.join('sessions', 'new'))
+            partial = os.path.join('sessions', 'new', 'c.json')
+            with open(os.path.join(TEST_DATA, 'SPA_data.json')) as f:
+                text = f.read()
+            with open(partial, 'w') as f:
+                f.write(text[:len(text) // 2])
+            time.sleep(0.15)
+            with open(partial, 'a') as f:
+                f.write(text[len(text) // 2:])
+            self.assertTrue(wait_for(lambda: watcher.metrics.processed == 2))
+            self.assertTrue(os.path.exists(os.path.join('sessions', 'new', 'c.cif')))
+
+            # A changed file is converted again; an unchanged one is not
+            with open(partial, 'a') as f:
+                f.write('\n')
+            self.assertTrue(wait_for(lambda: watcher.metrics.processed == 3))
+            time.sleep(0.6)
+            self.assertEqual(watcher.metrics.processed, 3)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(result["files_processed"], 3)
+        self.assertEqual(result["files_failed"], 0)
+        self.assertEqual(result["files_skipped"], 1)
+        self.assertEqual(result["files_seen"], 3)
+        self.assertEqual(result["queue_depth"], 0)
+        self.assertEqual(result["latency_seconds"]["count"], 3)
+        self.assertGreaterEqual(result["latency_seconds"]["p50"], 0.3)
+        with open('metrics.json') as f:
+            self.assertEqual(json.load(f)["files_processed"], 3)
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.assertEqual(os.stat('metrics.json').st_mode & 0o777, 0o666 & ~umask)
+        self.assertEqual(output.getvalue().count("OK sessions"), 3)
+
+    def test_bounded_queue(self):
+        """Settled files beyond the queue size wait until there is room, and each is processed once."""
+        for number in range(5):
+            shutil.copy(os.path.join(TEST_DATA, 'SPA_data.json'), os.path.join('sessions', f'{number}.json'))
+        watcher = SessionWatcher(['sessions'], download_dict='no', workers=1, settle=0.1, queue_size=1, poll=True)
+        stop, thread, output, result = self.run_watcher(watcher)
+        try:
+            self.assertTrue(wait_for(lambda: watcher.metrics.processed == 6))
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(result["max_queue_depth"], 1)
+        self.assertEqual(result["files_processed"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()